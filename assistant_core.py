@@ -0,0 +1,609 @@
+# -*- coding: utf-8 -*-
+"""
+Assistant Core - asyncio pipeline for full-duplex conversation
+Capture, recognition, LLM streaming, tools, synthesis and playback run as
+independent stages connected by bounded queues:
+
+    mic thread → audio_q → recognize → text_q → think (LLM stream + tools)
+               → sentence_q → synthesize → pcm_q → playback
+
+The microphone keeps listening while the assistant thinks and speaks, so the
+next command can be heard mid-reply (barge-in). A new command or an interrupt
+word cancels the current turn in every stage at once. Speech starts with the
+first finished sentence instead of waiting for the whole reply.
+
+IntelligentAssistant stays the synchronous facade; run_duplex() starts this
+core on top of its recognizer, Ollama client, context, tools and memory.
+
+Every turn carries its own TurnTrace from recognition to the end of
+playback. The stages share one event loop thread, so spans are recorded
+with explicit start/end times (add_span) rather than nested span() blocks.
+"""
+
+import asyncio
+import concurrent.futures
+import json
+import re
+import threading
+import time
+
+import pyaudio
+import speech_recognition as sr
+
+from assistant_state import IDLE, THINKING, SPEAKING
+from tool_parser import ToolCallParser, strip_tool_calls, MARKER
+from phrase_bank import read_sample_rate
+from turn_tracing import NULL_TRACE, add_ollama_timings
+
+
+INTERRUPT_WORDS = ["stop", "shut up", "quiet", "pause", "wait", "hold on", "hold"]
+PAUSE_WORDS = ["wait", "pause", "hold"]
+EXIT_PHRASES = [
+    "exit",
+    "quit",
+    "goodbye",
+    "bye",
+    "good bye",
+    "stop assistant",
+    "shut down",
+    "shutdown",
+]
+
+_SENTENCE_END = re.compile(r"[.!?](?=\s)|\n")
+
+
+class Turn:
+    """One user command and everything produced for it"""
+
+    def __init__(self, text, trace=NULL_TRACE):
+        self.text = text
+        self.trace = trace
+        self.cancelled = threading.Event()
+        self.finished = threading.Event()
+        self.response = ""
+        self.tools_used = []
+
+    def cancel(self):
+        self.cancelled.set()
+
+    @property
+    def active(self):
+        return not self.cancelled.is_set()
+
+
+class AssistantCore:
+    """asyncio stage pipeline around an IntelligentAssistant"""
+
+    def __init__(self, assistant, queue_size=4):
+        self.assistant = assistant
+        self.queue_size = queue_size
+
+        self.running = False
+        self.loop = None
+        self.current_turn = None
+        self.think_task = None
+        self.synth_process = None
+        self.sample_rate = read_sample_rate(assistant.voice_model_path)
+
+        # Text currently being spoken, for echo suppression
+        self.speaking_text = ""
+
+    # ========== LIFECYCLE ==========
+
+    async def run(self):
+        """Run all stages until an exit phrase or Ctrl+C"""
+        self.loop = asyncio.get_running_loop()
+        self.running = True
+
+        self.audio_q = asyncio.Queue(self.queue_size)
+        self.text_q = asyncio.Queue(self.queue_size)
+        self.sentence_q = asyncio.Queue(self.queue_size)
+        self.pcm_q = asyncio.Queue(self.queue_size)
+        self.done = asyncio.Event()
+
+        capture = threading.Thread(target=self._capture_thread, daemon=True)
+        capture.start()
+
+        stages = [
+            asyncio.create_task(self._recognize_stage()),
+            asyncio.create_task(self._think_stage()),
+            asyncio.create_task(self._synthesize_stage()),
+            asyncio.create_task(self._playback_stage()),
+        ]
+
+        user_name = self.assistant.memory.preferences.get("name", "friend")
+        await self._say(Turn(""), f"Hello {user_name}! Ready to help. What do you need?")
+
+        try:
+            await self.done.wait()
+        finally:
+            self.running = False
+            self.cancel_turn()
+            for task in stages:
+                task.cancel()
+            await asyncio.gather(*stages, return_exceptions=True)
+            self.assistant.state.stop()
+
+    def stop(self):
+        """Thread-safe shutdown request"""
+        if self.loop:
+            self.loop.call_soon_threadsafe(self.done.set)
+
+    def cancel_turn(self):
+        """Cancel the current turn in every stage"""
+        turn = self.current_turn
+        if turn is None:
+            return
+
+        turn.cancel()
+        now = time.perf_counter()
+        turn.trace.add_span("cancelled", now, now)
+        turn.trace.finish()
+        if self.think_task and not self.think_task.done():
+            self.think_task.cancel()
+        if self.synth_process and self.synth_process.returncode is None:
+            try:
+                self.synth_process.kill()
+            except ProcessLookupError:
+                pass
+
+        for q in (self.sentence_q, self.pcm_q):
+            while not q.empty():
+                q.get_nowait()
+                q.task_done()
+
+        self.assistant.state.set(IDLE, only_from=(THINKING, SPEAKING))
+
+    # ========== CAPTURE (thread) ==========
+
+    def _capture_thread(self):
+        """Always-on microphone - keeps listening while the assistant speaks"""
+        assistant = self.assistant
+        spotter = assistant.wake_spotter
+
+        try:
+            if spotter and spotter.ready:
+                while self.running:
+                    audio = spotter.wait_for_wake_word()
+                    if audio is not None:
+                        self._put_threadsafe(self.audio_q, audio)
+                return
+
+            with sr.Microphone() as source:
+                assistant.recognizer.adjust_for_ambient_noise(source, duration=0.5)
+                while self.running:
+                    try:
+                        audio = assistant.recognizer.listen(
+                            source, timeout=1, phrase_time_limit=15
+                        )
+                    except sr.WaitTimeoutError:
+                        continue
+                    self._put_threadsafe(self.audio_q, audio)
+
+        except Exception as e:
+            print(f"   ❌ Capture error: {e}")
+            self.stop()
+
+    def _put_threadsafe(self, q, item, cancelled=None):
+        """Blocking put from a worker thread; gives up on shutdown/cancel"""
+        try:
+            future = asyncio.run_coroutine_threadsafe(q.put(item), self.loop)
+        except RuntimeError:
+            return False  # Loop already closed
+
+        while self.running and not (cancelled and cancelled.is_set()):
+            try:
+                future.result(timeout=0.2)
+                return True
+            except concurrent.futures.TimeoutError:
+                continue
+            except Exception:
+                return False
+
+        future.cancel()
+        return False
+
+    # ========== RECOGNITION ==========
+
+    async def _recognize_stage(self):
+        assistant = self.assistant
+        while True:
+            audio = await self.audio_q.get()
+            trace = assistant.tracer.start(assistant.session_id)
+
+            started = time.perf_counter()
+            try:
+                text = await asyncio.to_thread(assistant.recognize, audio)
+            except sr.UnknownValueError:
+                trace.discard()
+                continue
+            except Exception as e:
+                print(f"   ❌ Recognition error: {e}")
+                trace.discard()
+                continue
+            trace.add_span("recognition", started, time.perf_counter())
+
+            if text:
+                await self._handle_text(text.strip(), trace)
+            else:
+                trace.discard()
+
+    def _is_echo(self, text):
+        """True if the mic mostly heard our own voice"""
+        if not self.speaking_text:
+            return False
+        heard = set(text.lower().split())
+        spoken = set(self.speaking_text.lower().split())
+        return bool(heard) and len(heard & spoken) / len(heard) > 0.6
+
+    async def _handle_text(self, text, trace=NULL_TRACE):
+        assistant = self.assistant
+        lower = text.lower()
+        busy = assistant.state.is_in(THINKING, SPEAKING)
+
+        if busy and self._is_echo(text):
+            trace.discard()
+            return
+
+        print(f"\n💬 You: {text}")
+
+        if any(phrase in lower for phrase in EXIT_PHRASES):
+            trace.discard()  # control words aren't turns
+            self.cancel_turn()
+            user_name = assistant.memory.preferences.get("name", "friend")
+            farewell = await self._say(Turn(""), f"Goodbye {user_name}!")
+            await asyncio.to_thread(farewell.finished.wait, 10)
+            self.done.set()
+            return
+
+        if assistant.is_paused:
+            assistant.is_paused = False
+            if "continue" in lower:
+                trace.discard()
+                if assistant.pending_response:
+                    print("   ▶️  Resuming...")
+                    await self._say(Turn(""), assistant.pending_response)
+                return
+
+        if busy and any(word in lower for word in INTERRUPT_WORDS):
+            trace.discard()
+            if self.current_turn:
+                assistant.pending_response = self.current_turn.response
+            self.cancel_turn()
+            if any(word in lower for word in PAUSE_WORDS):
+                assistant.is_paused = True
+                print("\n   ⏸️  PAUSED")
+            else:
+                print("\n   ⏹️  STOPPED")
+            return
+
+        if busy:
+            print("   ⏭️  Barge-in")
+            self.cancel_turn()
+
+        await self.text_q.put((text, trace))
+
+    # ========== THINK (LLM stream + tools) ==========
+
+    async def _think_stage(self):
+        while True:
+            text, trace = await self.text_q.get()
+            trace.user_message = text
+            turn = Turn(text, trace)
+            self.current_turn = turn
+
+            self.think_task = asyncio.create_task(self._think(turn))
+            try:
+                await self.think_task
+            except asyncio.CancelledError:
+                if not turn.cancelled.is_set():
+                    raise
+            except Exception as e:
+                print(f"   ❌ Error: {e}")
+
+    async def _think(self, turn):
+        assistant = self.assistant
+        assistant.state.set(THINKING, only_from=(IDLE,))
+        print("🧠 Thinking...")
+
+        try:
+            # Fast path - deterministic questions go straight to the tool
+            route = assistant.router.route(turn.text)
+            routed = None
+            if route:
+                started = time.perf_counter()
+                routed = await asyncio.to_thread(assistant.run_route, route)
+                turn.trace.add_span(
+                    f"tool:{route.tool}", started, time.perf_counter(), routed=True
+                )
+
+            if routed:
+                response, turn.tools_used = routed
+                await self.sentence_q.put((turn, response))
+            else:
+                response = await self._generate(turn)
+
+            turn.response = response
+            print(f"\n🤖 Assistant: {response}\n")
+
+            assistant.context.add_turn(turn.text, response)
+            # Only queues the row - committed by the memory's write-behind thread
+            assistant.memory.save_conversation(
+                turn.text, response, turn.tools_used, assistant.session_id
+            )
+
+        except Exception as e:
+            print(f"   ❌ Error: {e}")
+            assistant.state.set(IDLE, only_from=(THINKING,))
+
+        finally:
+            # End-of-turn marker flows through synthesis and playback - after
+            # an error too, so the turn finishes (a cancelled turn is already
+            # cleaned up by cancel_turn)
+            if turn.active:
+                await self.sentence_q.put((turn, None))
+
+    async def _generate(self, turn):
+        """Stream the LLM reply into synthesis, run its tools, return the text"""
+        assistant = self.assistant
+        messages = assistant.context.build_messages(turn.text)
+        parser = ToolCallParser()
+        spoken = 0
+
+        async for token in self._stream_llm(turn, messages):
+            parser.feed(token)
+            speakable = self._speakable(parser)
+
+            # Hand every finished sentence to synthesis right away
+            for match in _SENTENCE_END.finditer(speakable, spoken):
+                sentence = speakable[spoken : match.end()].strip()
+                spoken = match.end()
+                if sentence:
+                    await self.sentence_q.put((turn, sentence))
+
+        parser.finish()
+        speakable = self._speakable(parser, final=True)
+        if speakable[spoken:].strip():
+            await self.sentence_q.put((turn, speakable[spoken:].strip()))
+
+        response = strip_tool_calls(parser.text, parser.calls)
+
+        if parser.calls:
+            print(f"   🛠️  Executing {len(parser.calls)} tool(s)...")
+            registry = assistant.toolbox.registry
+            calls = [
+                (call.name, registry.arrange(call.name, call.params, call.keywords))
+                for call in parser.calls
+            ]
+            results = await asyncio.to_thread(assistant.tool_executor.run, calls)
+
+            lines = []
+            for (name, params), result in zip(calls, results):
+                turn.trace.add_span(
+                    f"tool:{name}",
+                    result["started"],
+                    result["started"] + result["elapsed"],
+                    success=result["success"],
+                )
+                output = str(result["output"])
+                turn.tools_used.append(
+                    {
+                        "tool": name,
+                        "params": params[:2],
+                        "success": result["success"],
+                        "output": output[:200],
+                    }
+                )
+                lines.append(f"{'✅' if result['success'] else '❌'} {output[:300]}")
+
+            tool_text = "\n".join(lines)
+            if not response.strip():
+                tool_text = assistant.confirm(turn.tools_used, tool_text)
+            response = f"{response}\n\n{tool_text}".strip()
+            if turn.active:
+                # Long tool dumps are printed in full but only summarized aloud
+                await self.sentence_q.put(
+                    (turn, assistant.speech_planner.summarize(tool_text))
+                )
+
+        return response
+
+    def _speakable(self, parser, final=False):
+        """Reply text so far, minus tool calls and any call still streaming"""
+        text = strip_tool_calls(parser.text, parser.calls)
+
+        cut = text.find(MARKER)
+        if cut >= 0:
+            return text[:cut]
+
+        if not final:
+            for k in range(len(MARKER) - 1, 0, -1):
+                if text.endswith(MARKER[:k]):
+                    return text[:-k]
+        return text
+
+    async def _stream_llm(self, turn, messages):
+        """Yield content tokens from Ollama's streaming chat API"""
+        q = asyncio.Queue(64)
+        end = object()
+        ollama = self.assistant.ollama
+        model = self.assistant.ollama_model
+        eval_stats = {}
+
+        def worker():
+            try:
+                response = ollama.chat(
+                    model,
+                    messages,
+                    options=self.assistant.context.options(
+                        temperature=0.6,
+                        top_p=0.85,
+                        num_predict=150,
+                        stop=["User:", "Human:", "\n\n\n", "Master"],
+                    ),
+                    stream=True,
+                )
+                with response:
+                    if response.status_code != 200:
+                        raise RuntimeError(
+                            f"Ollama error {response.status_code}: "
+                            f"{response.text[:200]}"
+                        )
+                    for line in response.iter_lines():
+                        if turn.cancelled.is_set():
+                            break
+                        if not line:
+                            continue
+                        chunk = json.loads(line)
+                        token = chunk.get("message", {}).get("content", "")
+                        if token:
+                            self._put_threadsafe(q, token, turn.cancelled)
+                        if chunk.get("done"):
+                            eval_stats.update(self.assistant.context.record_eval(chunk))
+                            break
+            except Exception as e:
+                self._put_threadsafe(q, e, turn.cancelled)
+            finally:
+                self._put_threadsafe(q, end, turn.cancelled)
+
+        started = time.perf_counter()
+        first_token = None
+        threading.Thread(target=worker, daemon=True).start()
+
+        while True:
+            item = await q.get()
+            if item is end:
+                llm = turn.trace.add_span(
+                    "llm", started, time.perf_counter(), model=model
+                )
+                if llm is not None and first_token is not None:
+                    llm.attributes["first_token_ms"] = round(
+                        (first_token - started) * 1000, 1
+                    )
+                if eval_stats:
+                    add_ollama_timings(turn.trace, llm, eval_stats)
+                return
+            if isinstance(item, Exception):
+                raise item
+            if first_token is None:
+                first_token = time.perf_counter()
+            yield item
+
+    # ========== SYNTHESIS ==========
+
+    async def _synthesize_stage(self):
+        while True:
+            turn, sentence = await self.sentence_q.get()
+
+            if sentence is None:
+                await self.pcm_q.put((turn, None, None))
+                continue
+
+            if not turn.active or not self.assistant.voice_model_path:
+                continue
+
+            # Bounded chunks - a long "sentence" can't hit Piper's limits
+            for chunk in self.assistant.speech_planner.plan(sentence):
+                if not turn.active:
+                    break
+                started = time.perf_counter()
+                pcm = await self._synthesize(chunk)
+                turn.trace.add_span(
+                    "synthesis", started, time.perf_counter(), chars=len(chunk)
+                )
+                if pcm and turn.active:
+                    await self.pcm_q.put((turn, chunk, pcm))
+
+    async def _synthesize(self, text):
+        """Piper → raw 16-bit mono PCM (phrase bank first)"""
+        bank = self.assistant.phrase_bank
+        if bank:
+            pcm = bank.lookup(text)
+            if pcm:
+                return pcm
+
+        try:
+            self.synth_process = await asyncio.create_subprocess_exec(
+                "piper",
+                "--model",
+                self.assistant.voice_model_path,
+                "--output_raw",
+                "--length-scale",
+                "0.95",
+                "--sentence-silence",
+                "0.1",
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+            pcm, _ = await self.synth_process.communicate(text.encode("utf-8"))
+            return pcm if self.synth_process.returncode == 0 else None
+
+        except FileNotFoundError:
+            print("   ❌ Piper not found")
+            return None
+
+        finally:
+            self.synth_process = None
+
+    # ========== PLAYBACK ==========
+
+    async def _playback_stage(self):
+        audio = None
+        stream = None
+
+        try:
+            while True:
+                turn, sentence, pcm = await self.pcm_q.get()
+                try:
+                    if pcm is None:
+                        # End of turn
+                        self.speaking_text = ""
+                        self.assistant.state.set(IDLE, only_from=(THINKING, SPEAKING))
+                        turn.finished.set()
+                        turn.trace.finish()
+                        continue
+
+                    if not turn.active:
+                        continue
+
+                    if stream is None:
+                        audio = pyaudio.PyAudio()
+                        stream = audio.open(
+                            format=pyaudio.paInt16,
+                            channels=1,
+                            rate=self.sample_rate,
+                            output=True,
+                        )
+
+                    self.assistant.state.set(SPEAKING, only_from=(IDLE, THINKING))
+                    self.speaking_text = sentence
+                    started = time.perf_counter()
+                    await asyncio.to_thread(self._play, stream, turn, pcm)
+                    turn.trace.add_span(
+                        "playback",
+                        started,
+                        time.perf_counter(),
+                        seconds=round(len(pcm) / 2 / self.sample_rate, 2),
+                    )
+                finally:
+                    self.pcm_q.task_done()
+        finally:
+            if stream is not None:
+                stream.stop_stream()
+                stream.close()
+                audio.terminate()
+
+    def _play(self, stream, turn, pcm, chunk_bytes=2048):
+        for i in range(0, len(pcm), chunk_bytes):
+            if turn.cancelled.is_set():
+                return
+            stream.write(pcm[i : i + chunk_bytes])
+
+    async def _say(self, turn, text):
+        """Speak fixed text through the synthesis/playback stages"""
+        print(f"\n🤖 Assistant: {text}\n")
+        self.current_turn = turn
+        await self.sentence_q.put((turn, text))
+        await self.sentence_q.put((turn, None))
+        return turn
@@ -0,0 +1,584 @@
+# -*- coding: utf-8 -*-
+"""
+Assistant Server - Many users, one host
+Serves the assistant over HTTP and WebSocket. Every connection is a
+lightweight AssistantSession with its own conversation history, session id
+and interrupt state. All sessions share one resident Ollama client, one
+memory store, one toolbox and a bounded pool of Piper voices.
+
+Sessions come from anyone who can reach the port, so they don't get the
+whole toolbox: only web and utility tools that change nothing on the host
+(no commands, code, file access, apps or browser), plus memory tools that
+see only the session's own facts, tasks and conversations.
+
+Every session gets an unguessable token when it is created. It is sent
+once (in the POST /api/sessions reply or the "ready" message) and must come
+with every later use of the session: the X-Session-Token header on HTTP,
+/ws?session=<id>&token=<token> to resume over WebSocket. Session ids are
+always chosen by the server.
+
+WebSocket protocol (/ws, or /ws?session=<id>&token=<token> to resume):
+    client → server
+        binary                  16-bit mono PCM of the current utterance
+        {"type": "start", "sample_rate": 16000}
+        {"type": "end"}         utterance finished - recognize and answer
+        {"type": "text", "text": "..."}
+        {"type": "interrupt"}   stop the reply (barge-in)
+    server → client
+        {"type": "ready", "session_id": ..., "token": ..., "sample_rate": ...}
+        {"type": "transcript", "text": ...}
+        {"type": "response", "text": ...}
+        binary                  16-bit mono PCM of the reply
+        {"type": "audio_end"}
+        {"type": "error", "text": ...}
+
+Clients send audio only while the user is talking (push-to-talk or their
+own VAD), so any audio arriving during a reply counts as a barge-in.
+"""
+
+import json
+import secrets
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import speech_recognition as sr
+from flask import Flask, jsonify, request
+from flask_sock import Sock
+
+import ollama_client
+from assistant_state import AssistantStateMachine, IDLE, SPEAKING
+from conversation_context import ConversationContext
+from intelligent_assistant import IntelligentAssistant
+from tool_executor import ToolExecutor
+from tool_registry import NETWORK, READ
+from turn_tracing import NULL_TRACE
+
+
+# Tool categories a session may use (read-only / network tools only)
+SESSION_CATEGORIES = ("web", "utility")
+SESSION_EFFECTS = (READ, NETWORK)
+
+
+# ========== SHARED VOICE POOL ==========
+
+
+class VoicePool:
+    """Bounded number of concurrent Piper processes shared by all sessions"""
+
+    def __init__(self, phrase_bank, planner, max_voices=2):
+        self.phrase_bank = phrase_bank
+        self.planner = planner
+        self.sample_rate = phrase_bank.sample_rate if phrase_bank else None
+        self.slots = threading.BoundedSemaphore(max_voices)
+        self.max_voices = max_voices
+
+        self.stats = {"sentences": 0, "waits": 0, "wait_time": 0.0}
+
+    @property
+    def enabled(self):
+        return self.phrase_bank is not None
+
+    def synthesize(self, text):
+        """Yield PCM per chunk - stock phrases from the bank, the rest from Piper"""
+        if not self.enabled:
+            return
+
+        text = self.planner.summarize(text)
+        chunks, remaining = self.phrase_bank.split_prefix(text)
+        yield from chunks
+
+        for sentence in self.planner.plan(remaining):
+            pcm = self.phrase_bank.lookup(sentence)
+            if pcm is None:
+                started = time.perf_counter()
+                if not self.slots.acquire(blocking=False):
+                    self.stats["waits"] += 1
+                    self.slots.acquire()
+                self.stats["wait_time"] += time.perf_counter() - started
+                try:
+                    started = time.perf_counter()
+                    pcm = self.phrase_bank.synthesize(
+                        sentence, timeout=self.planner.timeout_for(sentence)
+                    )
+                    self.planner.record(sentence, pcm, time.perf_counter() - started)
+                finally:
+                    self.slots.release()
+
+            self.stats["sentences"] += 1
+            if pcm:
+                yield pcm
+
+
+# ========== SESSION TOOLS ==========
+
+
+class SessionToolBox:
+    """
+    The host's toolbox as one session sees it: a registry with only the
+    SESSION_CATEGORIES tools that have no side effects on the host, plus
+    memory tools scoped to the session. The tools themselves (and their
+    caches) are the host's.
+    """
+
+    def __init__(self, host, session_id):
+        self.registry = host.toolbox.registry.subset(
+            lambda spec: spec.category in SESSION_CATEGORIES
+            and spec.effect in SESSION_EFFECTS
+        )
+        host.add_memory_tools(self.registry, session_id)
+
+    def execute_tool(self, tool_name, params, keywords=None):
+        return self.registry.dispatch(tool_name, params, keywords)
+
+
+# ========== SESSION ==========
+
+
+class AssistantSession:
+    """
+    One connected user.
+
+    Per-session state (context, session_id, state machine, restricted
+    toolbox) lives here; everything else - memory, router, Ollama client -
+    resolves to the shared IntelligentAssistant host through __getattr__, so
+    the host's process_with_ai runs unchanged against this session's history
+    and tools.
+    """
+
+    process_with_ai = IntelligentAssistant.process_with_ai
+    build_system_prompt = IntelligentAssistant.build_system_prompt
+
+    def __init__(self, host, voice_pool, session_id=None):
+        self.host = host
+        self.voice_pool = voice_pool
+        self.session_id = session_id or str(uuid.uuid4())[:8]
+        self.token = secrets.token_urlsafe(24)  # proves ownership of the id
+
+        self.state = AssistantStateMachine()
+        self.stop_requested = False
+        self.interrupted = threading.Event()
+        self.turn_lock = threading.Lock()
+
+        self.toolbox = SessionToolBox(host, self.session_id)
+        self.tool_executor = ToolExecutor(self.toolbox)
+
+        # The prompt lists only the tools this session can call
+        self.context = ConversationContext(self.build_system_prompt())
+        self.conversation_history = self.context.turns
+        self.trace = NULL_TRACE  # the current turn's trace, never the host's
+
+        self.send = None  # transport callback: dict → JSON, bytes → audio
+        self.created = time.time()
+        self.last_active = self.created
+        self.turn_latencies = []
+
+    def __getattr__(self, name):
+        # Only called for attributes the session doesn't have itself
+        if name == "host":
+            raise AttributeError(name)
+        return getattr(self.host, name)
+
+    @property
+    def is_speaking(self):
+        return self.state.is_in(SPEAKING)
+
+    def emit(self, message):
+        """Send to the client; a closed connection just drops the message"""
+        if self.send is None:
+            return False
+        try:
+            self.send(message)
+            return True
+        except Exception:
+            self.interrupted.set()
+            return False
+
+    # ========== TURNS ==========
+
+    def handle_audio(self, pcm, sample_rate=16000):
+        """Recognize one utterance and answer it"""
+        self.last_active = time.time()
+        if not pcm:
+            return None
+
+        trace = self.host.tracer.start(self.session_id)
+        try:
+            with trace.span("recognition", seconds=len(pcm) / 2 / sample_rate):
+                text = self.host.recognize(sr.AudioData(pcm, sample_rate, 2))
+        except sr.UnknownValueError:
+            self.emit({"type": "error", "text": "Sorry, I didn't catch that."})
+            return None
+        except sr.RequestError as e:
+            self.emit({"type": "error", "text": f"❌ Recognition error: {e}"})
+            return None
+
+        self.emit({"type": "transcript", "text": text})
+        return self.handle_text(text, trace)
+
+    def handle_text(self, text, trace=None):
+        """Answer one message; returns the reply text"""
+        self.last_active = time.time()
+        text = text.strip()
+        if not text:
+            return None
+
+        # A new message always wins over the reply still playing
+        self.interrupt()
+
+        with self.turn_lock:
+            self.interrupted.clear()
+            started = time.perf_counter()
+            self.trace = trace or self.host.tracer.start(self.session_id)
+
+            try:
+                response = self.process_with_ai(text)
+                self.emit({"type": "response", "text": response})
+                self.turn_latencies.append(time.perf_counter() - started)
+
+                with self.trace.span("speech"):
+                    self.speak(response)
+                return response
+            finally:
+                self.trace.finish()
+                self.trace = NULL_TRACE
+
+    def speak(self, text):
+        """Stream the reply's audio until done or interrupted"""
+        if self.send is None or not self.voice_pool.enabled:
+            return
+        if self.interrupted.is_set():
+            return
+
+        self.state.set(SPEAKING)
+        try:
+            for pcm in self.voice_pool.synthesize(text):
+                if self.interrupted.is_set() or not self.emit(pcm):
+                    break
+            self.emit({"type": "audio_end"})
+        finally:
+            self.state.set(IDLE, only_from=(SPEAKING,))
+
+    def interrupt(self):
+        """Barge-in: stop sending the current reply"""
+        self.interrupted.set()
+        self.state.set(IDLE, only_from=(SPEAKING,))
+
+    def get_stats(self):
+        latencies = sorted(self.turn_latencies)
+        # No session_id: the stats are public, and an id is half a login
+        return {
+            "state": self.state.state,
+            "turns": len(self.conversation_history),
+            "age": round(time.time() - self.created, 1),
+            "idle": round(time.time() - self.last_active, 1),
+            "median_turn_ms": (
+                round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None
+            ),
+        }
+
+
+# ========== SESSION MANAGER ==========
+
+
+class SessionManager:
+    """Creates, finds and reaps sessions; runs their turns on a shared pool"""
+
+    def __init__(
+        self, host, max_sessions=50, max_turns=8, max_voices=2, idle_timeout=1800
+    ):
+        self.host = host
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+
+        self.voice_pool = VoicePool(
+            host.phrase_bank, host.speech_planner, max_voices=max_voices
+        )
+        self.turns = ThreadPoolExecutor(
+            max_workers=max_turns, thread_name_prefix="turn"
+        )
+
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    def create(self):
+        """New session with a server-chosen id (or None when the server is full)"""
+        self.reap_idle()
+        with self.lock:
+            if len(self.sessions) >= self.max_sessions:
+                return None
+            session_id = str(uuid.uuid4())[:8]
+            while session_id in self.sessions:
+                session_id = str(uuid.uuid4())[:8]
+            session = AssistantSession(self.host, self.voice_pool, session_id)
+            self.sessions[session_id] = session
+        print(
+            f"   🟢 Session {session.session_id} opened "
+            f"({len(self.sessions)} active)"
+        )
+        return session
+
+    def get(self, session_id, token):
+        """The session, if the token is the one it was created with"""
+        with self.lock:
+            session = self.sessions.get(session_id)
+        if session is None or not secrets.compare_digest(
+            session.token, str(token or "")
+        ):
+            return None
+        return session
+
+    def close(self, session_id, token=None):
+        """Close a session - token is required unless the server closes it"""
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is not None and (
+                token is None or secrets.compare_digest(session.token, str(token))
+            ):
+                self.sessions.pop(session_id)
+            else:
+                session = None
+        if session:
+            session.interrupt()
+            session.send = None
+            session.tool_executor.shutdown()
+            self.host.memory.forget_session(session_id)
+            print(f"   🔴 Session {session_id} closed ({len(self.sessions)} active)")
+        return session is not None
+
+    def reap_idle(self):
+        """Close sessions nobody has used for idle_timeout seconds"""
+        cutoff = time.time() - self.idle_timeout
+        with self.lock:
+            stale = [
+                sid
+                for sid, s in self.sessions.items()
+                if s.last_active < cutoff and not s.turn_lock.locked()
+            ]
+        for session_id in stale:
+            self.close(session_id)
+        return len(stale)
+
+    def submit(self, fn, *args):
+        return self.turns.submit(fn, *args)
+
+    def get_stats(self):
+        with self.lock:
+            sessions = [s.get_stats() for s in self.sessions.values()]
+        return {
+            "sessions": len(sessions),
+            "max_sessions": self.max_sessions,
+            "voices": self.voice_pool.max_voices,
+            "voice_waits": self.voice_pool.stats["waits"],
+            "router": self.host.router.get_stats(),
+            "tool_cache": self.host.toolbox.cache.get_stats(),
+            "metrics": self.host.toolbox.metrics.get_stats(),
+            "sandbox": self.host.toolbox.sandbox.get_stats(),
+            "memory_db": self.host.memory.db.get_stats(),
+            "conversation_log": self.host.memory.conversation_log.get_stats(),
+            "details": sessions,
+        }
+
+    def shutdown(self):
+        for session_id in list(self.sessions):
+            self.close(session_id)
+        self.turns.shutdown(wait=False)
+        self.host.tracer.close()
+        self.host.toolbox.metrics.stop()
+        self.host.toolbox.sandbox.close()
+        self.host.memory.close()
+
+
+# ========== HTTP / WEBSOCKET ==========
+
+
+def create_app(manager):
+    """Flask app exposing the session manager"""
+    app = Flask(__name__)
+    sock = Sock(app)
+
+    @app.route("/api/sessions", methods=["POST"])
+    def create_session():
+        session = manager.create()
+        if session is None:
+            return jsonify({"error": "Server full"}), 503
+        return jsonify({"session_id": session.session_id, "token": session.token})
+
+    def session_token():
+        return request.headers.get("X-Session-Token", "")
+
+    @app.route("/api/sessions/<session_id>", methods=["DELETE"])
+    def delete_session(session_id):
+        if not manager.close(session_id, session_token()):
+            return jsonify({"error": "Unknown session"}), 404
+        return jsonify({"success": True})
+
+    @app.route("/api/sessions/<session_id>/message", methods=["POST"])
+    def send_message(session_id):
+        """Text turn over plain HTTP (no audio)"""
+        session = manager.get(session_id, session_token())
+        if session is None:
+            return jsonify({"error": "Unknown session"}), 404
+
+        text = (request.json or {}).get("text", "")
+        if not text.strip():
+            return jsonify({"error": "No text provided"}), 400
+
+        response = manager.submit(session.handle_text, text).result()
+        return jsonify({"session_id": session_id, "response": response})
+
+    @app.route("/api/server/stats")
+    def server_stats():
+        return jsonify(manager.get_stats())
+
+    @sock.route("/ws")
+    def voice_socket(ws):
+        resume = request.args.get("session")
+        if resume:
+            # Only with the token it was issued with - never a client-chosen id
+            session = manager.get(resume, request.args.get("token"))
+            if session is None:
+                ws.send(json.dumps({"type": "error", "text": "Unknown session"}))
+                return
+        else:
+            session = manager.create()
+            if session is None:
+                ws.send(json.dumps({"type": "error", "text": "Server full"}))
+                return
+
+        send_lock = threading.Lock()
+
+        def send(message):
+            with send_lock:
+                ws.send(json.dumps(message) if isinstance(message, dict) else message)
+
+        session.send = send
+        session.emit(
+            {
+                "type": "ready",
+                "session_id": session.session_id,
+                "token": session.token,
+                "sample_rate": manager.voice_pool.sample_rate,
+            }
+        )
+
+        utterance = bytearray()
+        sample_rate = 16000
+
+        try:
+            while True:
+                message = ws.receive()
+                if message is None:
+                    break
+
+                if isinstance(message, (bytes, bytearray)):
+                    if session.is_speaking:
+                        session.interrupt()
+                    utterance.extend(message)
+                    continue
+
+                try:
+                    data = json.loads(message)
+                except ValueError:
+                    continue
+
+                kind = data.get("type")
+                if kind == "start":
+                    sample_rate = int(data.get("sample_rate", sample_rate))
+                    utterance.clear()
+                elif kind == "end":
+                    manager.submit(session.handle_audio, bytes(utterance), sample_rate)
+                    utterance.clear()
+                elif kind == "text":
+                    manager.submit(session.handle_text, data.get("text", ""))
+                elif kind == "interrupt":
+                    session.interrupt()
+
+        except Exception as e:
+            print(f"   ⚠️  Session {session.session_id}: {e}")
+
+        finally:
+            # Keep the history around for a reconnect; the reaper cleans up
+            session.interrupt()
+            session.send = None
+
+    return app
+
+
+# ========== ENTRY POINT ==========
+
+
+def main():
+    """Entry point"""
+    import sys
+
+    model = "mistral"
+    host_address = "127.0.0.1"
+    port = 5010
+    max_sessions = 50
+    max_turns = 8
+    max_voices = 2
+    ollama_url = None
+
+    for arg in sys.argv[1:]:
+        if arg.startswith("--model="):
+            model = arg.split("=", 1)[1]
+        elif arg.startswith("--host="):
+            host_address = arg.split("=", 1)[1]
+        elif arg.startswith("--port="):
+            port = int(arg.split("=", 1)[1])
+        elif arg.startswith("--max-sessions="):
+            max_sessions = int(arg.split("=", 1)[1])
+        elif arg.startswith("--max-turns="):
+            max_turns = int(arg.split("=", 1)[1])
+        elif arg.startswith("--voices="):
+            max_voices = int(arg.split("=", 1)[1])
+        elif arg.startswith("--ollama-url="):
+            ollama_url = arg.split("=", 1)[1]
+        elif arg in ["--help", "-h"]:
+            print(
+                """
+🌐 Assistant Server - Usage
+
+python assistant_server.py [OPTIONS]
+
+OPTIONS:
+  --model=MODEL          Ollama model (default: mistral)
+  --host=ADDRESS         Bind address (default: 127.0.0.1)
+  --port=PORT            Port (default: 5010)
+  --max-sessions=N       Concurrent sessions (default: 50)
+  --max-turns=N          Turns processed at once (default: 8)
+  --voices=N             Concurrent Piper processes (default: 2)
+  --ollama-url=URL       Ollama server (default: $OLLAMA_HOST or localhost:11434)
+  --help, -h             Show this help
+"""
+            )
+            return
+
+    # One pooled client, sized for the concurrent turns
+    ollama_client.configure(base_url=ollama_url, pool_size=max_turns)
+
+    # No file index - sessions can't use the file tools it speeds up
+    host = IntelligentAssistant(ollama_model=model, index_files=False)
+    manager = SessionManager(
+        host, max_sessions=max_sessions, max_turns=max_turns, max_voices=max_voices
+    )
+
+    print("\n" + "=" * 70)
+    print("     🌐 ASSISTANT SERVER")
+    print("=" * 70)
+    print(f"  HTTP:      http://{host_address}:{port}/api/sessions")
+    print(f"  WebSocket: ws://{host_address}:{port}/ws")
+    print(f"  Sessions:  {max_sessions} max | {max_turns} turns | {max_voices} voices")
+    print("=" * 70 + "\n")
+
+    try:
+        create_app(manager).run(host=host_address, port=port, threaded=True)
+    finally:
+        manager.shutdown()
+        host.tool_executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+Assistant State - Event-driven state machine for the conversation loop
+Replaces sleep-polling on is_speaking / is_paused flags.
+
+States: idle → listening → thinking → speaking → idle, plus paused/stopped.
+Every transition notifies waiters immediately through a Condition, so the
+main loop, the speech thread and the interrupt listener never poll.
+
+    python assistant_state.py --check   (fake audio/LLM backends, wake latency)
+"""
+
+import statistics
+import threading
+import time
+
+
+IDLE = "idle"
+LISTENING = "listening"
+THINKING = "thinking"
+SPEAKING = "speaking"
+PAUSED = "paused"
+STOPPED = "stopped"
+
+
+class AssistantStateMachine:
+    """Thread-safe current state with blocking waits on transitions"""
+
+    def __init__(self, state=IDLE, history_size=200):
+        self._state = state
+        self._cond = threading.Condition()
+        self.history_size = history_size
+
+        # (timestamp, from_state, to_state) for latency diagnostics
+        self.transitions = []
+
+    @property
+    def state(self):
+        return self._state
+
+    def set(self, new_state, only_from=None):
+        """
+        Move to new_state and wake every waiter.
+
+        With only_from, the move happens only if the current state is one of
+        those (returns False otherwise) - used to avoid clobbering a pause.
+        """
+        with self._cond:
+            old_state = self._state
+            if only_from and old_state not in only_from:
+                return False
+            if old_state == STOPPED or old_state == new_state:
+                return old_state == new_state
+
+            self._state = new_state
+            self.transitions.append((time.perf_counter(), old_state, new_state))
+            if len(self.transitions) > self.history_size:
+                del self.transitions[: -self.history_size]
+
+            self._cond.notify_all()
+            return True
+
+    def is_in(self, *states):
+        return self._state in states
+
+    def wait_for(self, *states, timeout=None):
+        """Block until the state is one of states; False on timeout"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._state in states, timeout)
+
+    def wait_while(self, *states, timeout=None):
+        """Block while the state is one of states; False on timeout"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._state not in states, timeout)
+
+    def stop(self):
+        """Final state - wakes everyone, no further transitions"""
+        self.set(STOPPED)
+
+
+# ========== CHECK ==========
+
+
+class _FakeLLM:
+    """Thinks for a fixed time, then hands the reply to the speaker"""
+
+    def __init__(self, state, speaker, think_seconds=0.02):
+        self.state = state
+        self.speaker = speaker
+        self.think_seconds = think_seconds
+
+    def respond(self, text):
+        def run():
+            time.sleep(self.think_seconds)
+            if self.state.set(SPEAKING, only_from=(THINKING,)):
+                self.speaker.say(f"reply to {text}")
+
+        threading.Thread(target=run, daemon=True).start()
+
+
+class _FakeAudio:
+    """Plays a reply in short chunks until done, paused or stopped"""
+
+    def __init__(self, state, chunks=4, chunk_seconds=0.01):
+        self.state = state
+        self.chunks = chunks
+        self.chunk_seconds = chunk_seconds
+        self.played = 0
+
+    def say(self, text):
+        def run():
+            for _ in range(self.chunks):
+                if not self.state.is_in(SPEAKING):
+                    return  # interrupted
+                time.sleep(self.chunk_seconds)
+                self.played += 1
+            self.state.set(IDLE, only_from=(SPEAKING,))
+
+        threading.Thread(target=run, daemon=True).start()
+
+
+def _wake_latency(state, waiting, target, rounds=50):
+    """Median/max ms from set(target) to a waiter blocked in wait_while"""
+    delays = []
+    for _ in range(rounds):
+        state.set(waiting)
+        woke = []
+        waiter = threading.Thread(
+            target=lambda: woke.append(
+                (state.wait_while(waiting, timeout=1), time.perf_counter())
+            )
+        )
+        waiter.start()
+        time.sleep(0.002)  # let it block
+        state.set(target)
+        waiter.join()
+        ok, at = woke[0]
+        if not ok:
+            return None
+        delays.append((at - state.transitions[-1][0]) * 1000)
+    return statistics.median(delays), max(delays)
+
+
+def run_check():
+    passed = True
+
+    def check(label, ok, detail):
+        nonlocal passed
+        passed = passed and ok
+        print(f"  {'✅' if ok else '❌'} {label:<40} {detail}")
+
+    print("\n" + "=" * 70)
+    print("     🧪 ASSISTANT STATE CHECK - fake audio and LLM backends")
+    print("=" * 70)
+
+    # Transition latency: waiters wake as soon as the state changes
+    # (the old loop slept in 100ms steps)
+    for waiting, target in [(SPEAKING, IDLE), (THINKING, SPEAKING), (PAUSED, IDLE)]:
+        latency = _wake_latency(AssistantStateMachine(), waiting, target)
+        check(
+            f"{waiting} → {target} wakes waiter",
+            latency is not None and latency[0] < 5 and latency[1] < 50,
+            latency and f"median {latency[0]:.2f}ms, max {latency[1]:.2f}ms",
+        )
+
+    # A full turn, driven like the main loop: listen → think → speak → idle
+    state = AssistantStateMachine()
+    audio = _FakeAudio(state)
+    llm = _FakeLLM(state, audio)
+    start = time.perf_counter()
+    for turn in range(5):
+        state.set(LISTENING, only_from=(IDLE,))
+        state.set(THINKING, only_from=(IDLE, LISTENING))
+        llm.respond(f"turn {turn}")
+        state.wait_while(THINKING, SPEAKING, timeout=2)
+    elapsed = time.perf_counter() - start
+    work = 5 * (llm.think_seconds + audio.chunks * audio.chunk_seconds)
+    path = [to for _, _, to in state.transitions[-4:]]
+    check(
+        "5 turns, loop never lags the backends",
+        state.is_in(IDLE) and elapsed - work < 0.05,
+        f"{elapsed * 1000:.0f}ms for {work * 1000:.0f}ms of work",
+    )
+    check(
+        "turn goes listen → think → speak → idle",
+        path == [LISTENING, THINKING, SPEAKING, IDLE],
+        " → ".join(path),
+    )
+
+    # Pause mid-reply: the speaker stops and can't clobber the pause
+    state = AssistantStateMachine()
+    audio = _FakeAudio(state, chunks=50)
+    state.set(THINKING)
+    _FakeLLM(state, audio, think_seconds=0).respond("long question")
+    state.wait_for(SPEAKING, timeout=1)
+    time.sleep(0.02)
+    state.set(PAUSED)
+    time.sleep(0.03)
+    played = audio.played
+    check(
+        "pause interrupts speech",
+        state.is_in(PAUSED) and played < audio.chunks,
+        f"{played}/{audio.chunks} chunks played",
+    )
+    check(
+        "speaker's idle can't clobber a pause",
+        not state.set(IDLE, only_from=(SPEAKING,)) and state.is_in(PAUSED),
+        state.state,
+    )
+    check(
+        "late LLM reply can't clobber a pause",
+        not state.set(SPEAKING, only_from=(THINKING,)) and state.is_in(PAUSED),
+        state.state,
+    )
+
+    # Resume wakes whoever was waiting out the pause
+    woke = []
+    waiter = threading.Thread(
+        target=lambda: woke.append(state.wait_while(PAUSED, timeout=1))
+    )
+    waiter.start()
+    time.sleep(0.01)
+    state.set(IDLE, only_from=(PAUSED,))
+    waiter.join()
+    check("resume wakes the main loop", woke == [True] and state.is_in(IDLE), woke)
+
+    # Timeouts and stop
+    check(
+        "wait_for times out → False",
+        AssistantStateMachine().wait_for(SPEAKING, timeout=0.01) is False,
+        "False",
+    )
+    state = AssistantStateMachine(state=SPEAKING)
+    woke = []
+    waiter = threading.Thread(
+        target=lambda: woke.append(state.wait_for(STOPPED, timeout=1))
+    )
+    waiter.start()
+    time.sleep(0.01)
+    state.stop()
+    waiter.join()
+    check(
+        "stop() wakes waiters and is final",
+        woke == [True] and not state.set(IDLE) and state.is_in(STOPPED),
+        state.state,
+    )
+
+    state = AssistantStateMachine(history_size=10)
+    for _ in range(20):
+        state.set(SPEAKING)
+        state.set(IDLE)
+    check(
+        "transition history is capped",
+        len(state.transitions) == 10,
+        f"{len(state.transitions)} kept",
+    )
+
+    print("=" * 70)
+    print(f"  {'✅ All checks passed' if passed else '❌ Some checks failed'}\n")
+    return passed
+
+
+def main():
+    import sys
+
+    if "--check" in sys.argv[1:]:
+        sys.exit(0 if run_check() else 1)
+
+    print(__doc__)
+
+
+if __name__ == "__main__":
+    main()
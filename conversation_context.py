@@ -0,0 +1,359 @@
+# -*- coding: utf-8 -*-
+"""
+Conversation Context - Prompt-cache friendly message building
+Keeps the prompt prefix stable between turns so Ollama can reuse its KV cache.
+
+Layout sent to the model:
+    [system prompt] [summary slot] [turn 1] [turn 2] ... [current user message]
+
+Turns are only ever appended. When the prompt's estimated size passes
+max_tokens, the oldest turns are folded into the summary slot in one large
+step (down to keep_tokens of recent turns), so the prefix changes rarely
+instead of shifting every turn like a sliding window. The budget is in
+tokens, not messages - one fetched web page weighs more than ten "thanks".
+
+Requests must send num_ctx (options()): Ollama's default window is smaller
+than a long conversation, and it silently cuts the *front* of an overlong
+prompt - the system prompt and the cached prefix go first.
+
+    python conversation_context.py --bench[=50]   sliding window vs context
+"""
+
+import time
+
+
+# Context window requested from Ollama for every call (and the warm-up, so
+# the model is not reloaded with a different size on the first turn)
+NUM_CTX = 4096
+
+# Rough size of a message: ~4 characters per token plus role/separator tokens
+CHARS_PER_TOKEN = 4.0
+MESSAGE_TOKENS = 4
+
+
+def estimate_tokens(messages):
+    """Approximate prompt tokens for a list of chat messages"""
+    return sum(
+        len(m["content"]) / CHARS_PER_TOKEN + MESSAGE_TOKENS for m in messages
+    )
+
+
+class ConversationContext:
+    """Append-only conversation history with infrequent compaction"""
+
+    def __init__(
+        self,
+        system_prompt,
+        num_ctx=NUM_CTX,
+        reply_tokens=150,
+        max_tokens=None,
+        keep_tokens=None,
+        summary_chars=1200,
+        summarizer=None,
+    ):
+        self.system_prompt = system_prompt
+        self.num_ctx = num_ctx
+        self.reply_tokens = reply_tokens
+        # Leave a quarter of the window for the next user message (tool
+        # results can be long) besides the reply itself
+        self.max_tokens = max_tokens or int(num_ctx * 0.75) - reply_tokens
+        self.keep_tokens = keep_tokens or self.max_tokens // 4
+        self.summary_chars = summary_chars
+        self.summarizer = summarizer or self.summarize_turns
+
+        self.summary = ""
+        self.turns = []
+        self.compactions = 0
+
+        # Per-turn prompt-eval stats reported by Ollama
+        self.eval_stats = []
+
+    # ========== MESSAGES ==========
+
+    def options(self, **options):
+        """Ollama request options with this context's window size"""
+        options["num_ctx"] = self.num_ctx
+        return options
+
+    def build_messages(self, user_message):
+        """Messages for the next request - prefix is identical to last turn's"""
+        messages = self.prefix()
+        messages.append({"role": "user", "content": user_message})
+        return messages
+
+    def prefix(self):
+        """System prompt, summary slot and turns - everything but the new message"""
+        messages = [{"role": "system", "content": self.system_prompt}]
+
+        if self.summary:
+            messages.append(
+                {"role": "system", "content": f"Earlier conversation:\n{self.summary}"}
+            )
+
+        messages.extend(self.turns)
+        return messages
+
+    def prompt_tokens(self):
+        """Estimated size of the prefix sent with every request"""
+        return estimate_tokens(self.prefix())
+
+    def add_turn(self, user_message, assistant_message):
+        """Append a finished exchange, compacting only when over the budget"""
+        self.turns.append({"role": "user", "content": user_message})
+        self.turns.append({"role": "assistant", "content": assistant_message})
+
+        if self.prompt_tokens() > self.max_tokens:
+            self.compact()
+
+    def compact(self):
+        """Fold all but the newest keep_tokens of turns into the summary slot"""
+        cut, kept = len(self.turns), 0.0
+        # Walk back pair by pair - never split a user/assistant exchange
+        while cut >= 2:
+            pair = estimate_tokens(self.turns[cut - 2 : cut])
+            if kept + pair > self.keep_tokens:
+                break
+            kept += pair
+            cut -= 2
+        if cut <= 0:
+            return
+
+        old_turns = self.turns[:cut]
+        del self.turns[:cut]
+
+        summary = self.summarizer(self.summary, old_turns)
+        if len(summary) > self.summary_chars:
+            # Keep the newest lines, dropping the partial first one
+            summary = summary[-self.summary_chars :].split("\n", 1)[-1]
+        self.summary = summary
+        self.compactions += 1
+
+    def summarize_turns(self, previous_summary, turns):
+        """Cheap extractive summary - one line per exchange"""
+        lines = [previous_summary] if previous_summary else []
+
+        for i in range(0, len(turns) - 1, 2):
+            user = " ".join(turns[i]["content"].split())[:80]
+            assistant = " ".join(turns[i + 1]["content"].split())[:80]
+            lines.append(f"- User: {user} → You: {assistant}")
+
+        return "\n".join(lines)
+
+    def clear(self):
+        self.summary = ""
+        self.turns.clear()
+
+    # ========== PROMPT-EVAL STATS ==========
+
+    def record_eval(self, result):
+        """Record prompt-eval counters from an Ollama /api/chat response"""
+        stats = {
+            "prompt_tokens": result.get("prompt_eval_count", 0),
+            "prompt_ms": result.get("prompt_eval_duration", 0) / 1e6,
+            "eval_tokens": result.get("eval_count", 0),
+            "eval_ms": result.get("eval_duration", 0) / 1e6,
+        }
+        self.eval_stats.append(stats)
+        return stats
+
+    def get_stats(self):
+        """Prompt-eval summary over all recorded turns"""
+        if not self.eval_stats:
+            return "📈 No prompt-eval stats yet"
+
+        turns = len(self.eval_stats)
+        prompt_tokens = sum(s["prompt_tokens"] for s in self.eval_stats)
+        prompt_ms = sum(s["prompt_ms"] for s in self.eval_stats)
+        last = self.eval_stats[-1]
+
+        return (
+            f"📈 Prompt eval: {turns} turns | "
+            f"avg {prompt_tokens / turns:.0f} tokens, {prompt_ms / turns:.0f}ms | "
+            f"last {last['prompt_tokens']} tokens, {last['prompt_ms']:.0f}ms | "
+            f"compactions: {self.compactions} | num_ctx {self.num_ctx}"
+        )
+
+
+# ========== BENCHMARK ==========
+
+
+class SlidingWindow:
+    """The previous prompt building: system prompt + the last `window` messages"""
+
+    def __init__(self, system_prompt, window=12):
+        self.system_prompt = system_prompt
+        self.window = window
+        self.history = []
+
+    def build_messages(self, user_message):
+        messages = [{"role": "system", "content": self.system_prompt}]
+        messages.extend(self.history[-self.window :])
+        messages.append({"role": "user", "content": user_message})
+        return messages
+
+    def add_turn(self, user_message, assistant_message):
+        self.history.append({"role": "user", "content": user_message})
+        self.history.append({"role": "assistant", "content": assistant_message})
+
+
+# Same shape as IntelligentAssistant.build_system_prompt (rules + tool list)
+_SYSTEM_PROMPT = (
+    "You are a helpful AI assistant for bench. Date: January 01, 2026\n\n"
+    "CRITICAL RULES:\n1. Keep responses EXTREMELY SHORT (1-2 sentences max)\n"
+    "2. Be direct and minimal\n\nTOOL FORMAT:\n"
+    "Use ONE LINE per tool: TOOL: function_name(param1, param2)\n\n"
+    "AVAILABLE TOOLS:\n"
+    + "\n".join(
+        f"- {name}(path, content) - {name.replace('_', ' ')} on this computer"
+        for name in [
+            "read_file",
+            "write_file",
+            "list_files",
+            "search_files",
+            "find_all_files",
+            "google_search",
+            "fetch_webpage",
+            "open_app",
+            "run_command",
+            "execute_python",
+            "remember_fact",
+            "add_task",
+        ]
+    )
+)
+
+_SCRIPT = [
+    "What's the weather like in Paris today?",
+    "Remind me to call Alice tomorrow at noon.",
+    "How do I sort a list of tuples by the second item in Python?",
+    "Search for the best pizza places near the station.",
+    "Read the file notes.txt and summarize it.",
+    "What time is it in Tokyo?",
+    "Write a haiku about autumn rain.",
+    "Thanks, that's great!",
+    "What did I ask you to remind me about?",
+    "Open the downloads folder.",
+]
+
+
+def _scripted_reply(i, question):
+    """Stand-in reply - every fifth turn carries a longer tool result"""
+    reply = f"Sure - here is what I found about '{question[:40]}'. " * 2
+    if i % 5 == 4:
+        reply += "\n✅ " + "Result line with some detail, numbers and names. " * 12
+    return reply
+
+
+def _shared_prefix(previous, current):
+    """Messages at the start of current that are identical to previous"""
+    shared = 0
+    for a, b in zip(previous, current):
+        if a != b:
+            break
+        shared += 1
+    return shared
+
+
+def run_benchmark(turns=50, model=None):
+    """
+    Prompt size and re-evaluated tokens per turn: sliding window (before)
+    vs ConversationContext (after). Without a running Ollama the numbers
+    are estimates: re-evaluated = tokens after the prefix shared with the
+    previous request and its reply (what Ollama's prompt cache can't reuse).
+    """
+    live = False
+    if model:
+        import ollama_client
+
+        ollama = ollama_client.get_client()
+        live = ollama.is_running()
+
+    rows = {}
+    contexts = {}
+    for label, context in [
+        ("before", SlidingWindow(_SYSTEM_PROMPT)),
+        ("after", ConversationContext(_SYSTEM_PROMPT)),
+    ]:
+        previous, per_turn = [], []
+        for i in range(turns):
+            question = _SCRIPT[i % len(_SCRIPT)]
+            messages = context.build_messages(question)
+            shared = _shared_prefix(previous, messages)
+            row = {
+                "prompt": estimate_tokens(messages),
+                "evaluated": estimate_tokens(messages[shared:]),
+            }
+
+            reply = _scripted_reply(i, question)
+            if live:
+                options = {"num_predict": 60, "num_ctx": NUM_CTX, "seed": i}
+                started = time.perf_counter()
+                response = ollama.chat(model, messages, options=options, timeout=120)
+                result = response.json()
+                row["wall_ms"] = (time.perf_counter() - started) * 1000
+                row["ollama_tokens"] = result.get("prompt_eval_count", 0)
+                row["ollama_ms"] = result.get("prompt_eval_duration", 0) / 1e6
+                reply = result.get("message", {}).get("content", "") or reply
+
+            context.add_turn(question, reply)
+            # The KV cache holds this request plus the reply it generated
+            previous = messages + [{"role": "assistant", "content": reply}]
+            per_turn.append(row)
+        rows[label] = per_turn
+        contexts[label] = context
+
+    print("\n" + "=" * 78)
+    source = f"Ollama '{model}'" if live else "estimated (no Ollama run)"
+    print(f"     📈 PROMPT EVAL - {turns}-turn scripted conversation, {source}")
+    print("=" * 78)
+    columns = "prompt  re-eval" + ("  eval ms" if live else "")
+    print(f"  {'turn':>4}   {'before: ' + columns:<34}{'after: ' + columns}")
+    for i in range(turns):
+        cells = []
+        for label in ("before", "after"):
+            row = rows[label][i]
+            cell = f"{row['prompt']:6.0f} {row['evaluated']:8.0f}"
+            if live:
+                cell += f" {row['ollama_ms']:8.0f}"
+            cells.append(cell)
+        print(f"  {i + 1:>4}   {'        ' + cells[0]:<34}{'       ' + cells[1]}")
+
+    print("  " + "-" * 74)
+    for label in ("before", "after"):
+        per_turn = rows[label]
+        evaluated = sum(r["evaluated"] for r in per_turn)
+        line = (
+            f"  {label:<7} avg prompt {sum(r['prompt'] for r in per_turn) / turns:6.0f}"
+            f" | re-evaluated {evaluated:8.0f} tokens in total"
+            f" ({evaluated / turns:5.0f}/turn)"
+        )
+        if live:
+            ms = sum(r["ollama_ms"] for r in per_turn)
+            line += f" | prompt eval {ms / turns:.0f}ms/turn"
+        print(line)
+    print(
+        f"  after: {contexts['after'].compactions} compactions "
+        f"(budget {contexts['after'].max_tokens} of num_ctx {NUM_CTX} tokens)"
+    )
+    print("=" * 78 + "\n")
+    return rows
+
+
+def main():
+    import sys
+
+    turns, model = None, None
+    for arg in sys.argv[1:]:
+        if arg.startswith("--bench"):
+            turns = int(arg.split("=", 1)[1]) if "=" in arg else 50
+        elif arg.startswith("--model="):
+            model = arg.split("=", 1)[1]
+
+    if turns:
+        run_benchmark(turns, model)
+    else:
+        print(__doc__)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+"""
+Conversation Search - FTS5 full-text index over the conversation log
+search_conversations used LIKE '%query%' on both text columns: a full
+table scan on every search, newest-first instead of best-first. The
+conversations table now has an external-content FTS5 index, kept in sync
+by triggers, so a search reads only the matching postings. Results are
+ranked by BM25 (the user's words count double) and come with a snippet
+around the match.
+
+Ranking is the expensive part when a search matches a lot of rows, so:
+- the text is first looked for, as typed, in the newest RECENT_WINDOW
+  rows. A common word or a phrase said recently fills the page there,
+  newest first, and nothing is ranked
+- otherwise only the newest MAX_CANDIDATES matches are scored, inside
+  FTS5, and only the rows returned get a snippet (built here - asking
+  FTS5 for it means matching again)
+
+A search within one server session reads only that session's rows,
+through the session_id index, with LIKE - a session is a few hundred
+turns at most.
+
+Older conversations.db files are indexed once, the first time they are
+opened. SQLite builds without FTS5 keep the LIKE scan.
+
+    python conversation_search.py --bench[=10000,100000,1000000]
+"""
+
+import re
+import sqlite3
+import time
+
+
+# Every statement is idempotent - safe to run on each start
+FTS_SCHEMA = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS conversations_fts USING fts5(
+        user_message, assistant_response,
+        content='conversations', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS conversations_ai AFTER INSERT ON conversations
+    BEGIN
+        INSERT INTO conversations_fts(rowid, user_message, assistant_response)
+        VALUES (new.id, new.user_message, new.assistant_response);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS conversations_ad AFTER DELETE ON conversations
+    BEGIN
+        INSERT INTO conversations_fts(
+            conversations_fts, rowid, user_message, assistant_response
+        )
+        VALUES ('delete', old.id, old.user_message, old.assistant_response);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS conversations_au AFTER UPDATE ON conversations
+    BEGIN
+        INSERT INTO conversations_fts(
+            conversations_fts, rowid, user_message, assistant_response
+        )
+        VALUES ('delete', old.id, old.user_message, old.assistant_response);
+        INSERT INTO conversations_fts(rowid, user_message, assistant_response)
+        VALUES (new.id, new.user_message, new.assistant_response);
+    END
+    """,
+]
+
+# Matches scored per search, newest first
+MAX_CANDIDATES = 200
+
+# Newest rows searched for the literal text before anything is ranked
+RECENT_WINDOW = 2000
+
+# ?1 = '%text%', ?2 = limit, ?3 = RECENT_WINDOW (a rowid range - no scan
+# of older rows)
+RECENT_SQL = """
+    SELECT timestamp, user_message, assistant_response
+    FROM conversations
+    WHERE id > (SELECT COALESCE(MAX(id), 0) FROM conversations) - ?3
+      AND (user_message LIKE ?1 OR assistant_response LIKE ?1)
+    ORDER BY id DESC
+    LIMIT ?2
+"""
+
+# ?1 = fts_query(), ?2 = limit, ?3 = MAX_CANDIDATES
+SEARCH_SQL = """
+    SELECT c.timestamp, c.user_message, c.assistant_response
+    FROM (
+        SELECT rowid, bm25(conversations_fts, 2.0, 1.0) AS score
+        FROM conversations_fts
+        WHERE conversations_fts MATCH ?1
+        ORDER BY rowid DESC
+        LIMIT ?3
+    ) AS m
+    JOIN conversations c ON c.id = m.rowid
+    ORDER BY m.score, m.rowid DESC
+    LIMIT ?2
+"""
+
+# ?1 = '%text%', ?2 = limit, ?3 = session_id
+SESSION_SQL = """
+    SELECT timestamp, user_message, assistant_response
+    FROM conversations
+    WHERE session_id = ?3
+      AND (user_message LIKE ?1 OR assistant_response LIKE ?1)
+    ORDER BY id DESC
+    LIMIT ?2
+"""
+
+LIKE_SQL = """
+    SELECT timestamp, user_message, assistant_response
+    FROM conversations
+    WHERE user_message LIKE ? OR assistant_response LIKE ?
+    ORDER BY id DESC
+    LIMIT ?
+"""
+
+_WORDS = re.compile(r"\w+", re.UNICODE)
+
+
+def init_search(conn):
+    """
+    Create the index and triggers on an open connection (inside a
+    transaction). Returns (available, rows indexed by a migration).
+    """
+    existed = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'conversations_fts'"
+    ).fetchone()
+    try:
+        for statement in FTS_SCHEMA:
+            conn.execute(statement)
+    except sqlite3.OperationalError:
+        return False, 0  # no FTS5 in this SQLite
+
+    if existed:
+        return True, 0
+
+    # First open of an older database - index what is already there
+    conn.execute("INSERT INTO conversations_fts(conversations_fts) VALUES ('rebuild')")
+    return True, conn.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+
+
+def fts_query(text):
+    """
+    User text → an FTS5 query: every word must appear, as a prefix, in
+    either column. Words are quoted, so FTS5 operators in the text
+    (AND, NEAR, col:, ^, *) are searched for literally. '' if no words.
+    """
+    words = _WORDS.findall(str(text))
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def snippet(text, query, words=12):
+    """
+    About `words` words of text around the first query word, matches in
+    [brackets] - the same shape as FTS5's snippet(). Words the stemmer
+    matched ("ran" for "running") may go unmarked.
+    """
+    wanted = tuple(word.lower() for word in _WORDS.findall(str(query)))
+    tokens = text.split()
+    hits = [
+        i
+        for i, token in enumerate(tokens)
+        if wanted and "".join(_WORDS.findall(token)).lower().startswith(wanted)
+    ]
+    if not hits:
+        return None
+
+    start = max(0, min(hits[0] - words // 3, len(tokens) - words))
+    shown = []
+    for i in range(start, min(start + words, len(tokens))):
+        shown.append(f"[{tokens[i]}]" if i in hits else tokens[i])
+    return (
+        ("…" if start > 0 else "")
+        + " ".join(shown)
+        + ("…" if start + words < len(tokens) else "")
+    )
+
+
+def search(read, query, limit=10, session_id=None):
+    """
+    Best matches for query → [(timestamp, user, assistant, snippet)], from
+    every session or only session_id's. read(sql, params) runs a SELECT
+    (ConnectionPool.read).
+    """
+    match = fts_query(query)
+    if not match:
+        return []
+
+    text = f"%{query.strip()}%"
+    if session_id is not None:
+        rows = read(SESSION_SQL, (text, limit, session_id))
+    else:
+        rows = read(RECENT_SQL, (text, limit, RECENT_WINDOW))
+        if len(rows) < limit:
+            rows = read(SEARCH_SQL, (match, limit, MAX_CANDIDATES))
+
+    return [
+        (
+            timestamp,
+            user,
+            assistant,
+            snippet(user, query) or snippet(assistant, query),
+        )
+        for timestamp, user, assistant in rows
+    ]
+
+
+# ========== BENCHMARK ==========
+
+
+_TOPICS = [
+    ("what's the weather like in {city}", "It's sunny and 22 degrees in {city}"),
+    ("open {app} please", "Opening {app}"),
+    ("remind me to call {name} tomorrow", "Added task: call {name}"),
+    ("how do I sort a list in python", "Use sorted(items) or items.sort()"),
+    ("search for {city} restaurants", "Here are the top restaurants in {city}"),
+    ("what time is it", "It's 3:45 PM"),
+]
+_CITIES = ["london", "paris", "tokyo", "berlin", "madrid", "oslo", "lima", "cairo"]
+_APPS = ["notepad", "chrome", "spotify", "calculator", "terminal"]
+_NAMES = ["alice", "bob", "carol", "dave", "erin", "frank"]
+
+
+def generate_conversations(conn, rows):
+    """Fill the conversations table with `rows` synthetic turns"""
+
+    def turns():
+        for i in range(rows):
+            user, reply = _TOPICS[i % len(_TOPICS)]
+            values = {
+                "city": _CITIES[(i * 7) % len(_CITIES)],
+                "app": _APPS[(i * 3) % len(_APPS)],
+                "name": _NAMES[(i * 5) % len(_NAMES)],
+            }
+            yield (
+                f"2026-01-01T00:00:{i % 60:02d}",
+                f"{user.format(**values)} #{i}",
+                reply.format(**values),
+                None,
+                "bench",
+            )
+
+    conn.executemany(
+        """
+        INSERT INTO conversations (timestamp, user_message, assistant_response, tools_used, session_id)
+        VALUES (?, ?, ?, ?, ?)
+    """,
+        turns(),
+    )
+
+
+def _time(fn, runs=5):
+    best = float("inf")
+    result = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def run_benchmark(sizes=(10_000, 100_000, 1_000_000)):
+    import os
+    import shutil
+    import tempfile
+
+    # Two words in a sixth of the rows, one common word, a recent phrase,
+    # a phrase in a fiftieth, one row, none
+    queries = [
+        "sort python",
+        "python",
+        "sort a list",
+        "tokyo restaurants",
+        "4242",
+        "zanzibar",
+    ]
+
+    workdir = tempfile.mkdtemp(prefix="conversation_search_bench_")
+    try:
+        print("\n" + "=" * 70)
+        print("     🔎 CONVERSATION SEARCH BENCHMARK - LIKE scan vs search()")
+        print("=" * 70)
+        print(f"  {'rows':>10}  {'query':<20}{'LIKE':>12}{'search':>12}{'speedup':>10}")
+
+        for rows in sizes:
+            conn = sqlite3.connect(os.path.join(workdir, f"c{rows}.db"))
+            conn.execute(
+                """
+                CREATE TABLE conversations (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT NOT NULL,
+                    user_message TEXT NOT NULL,
+                    assistant_response TEXT NOT NULL,
+                    tools_used TEXT,
+                    session_id TEXT
+                )
+            """
+            )
+
+            # Old-style database first, then the migration indexes it
+            generate_conversations(conn, rows)
+            conn.commit()
+            started = time.perf_counter()
+            init_search(conn)
+            conn.commit()
+            migration = time.perf_counter() - started
+
+            example = None
+            for query in queries:
+                like_seconds, _ = _time(
+                    lambda: conn.execute(
+                        LIKE_SQL, (f"%{query}%", f"%{query}%", 10)
+                    ).fetchall()
+                )
+                fts_seconds, found = _time(
+                    lambda: search(
+                        lambda sql, params: conn.execute(sql, params).fetchall(),
+                        query,
+                    )
+                )
+                example = example or found
+                print(
+                    f"  {rows:>10,}  {query!r:<20}{like_seconds * 1000:10.2f}ms"
+                    f"{fts_seconds * 1000:10.2f}ms"
+                    f"{like_seconds / max(fts_seconds, 1e-9):9.1f}x"
+                )
+            print(f"  {'':>10}  migration (rebuild): {migration:.2f}s")
+            if example:
+                print(f"  {'':>10}  e.g. {example[0][3]}")
+            conn.close()
+        print("=" * 70 + "\n")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    import sys
+
+    for arg in sys.argv[1:]:
+        if arg.startswith("--bench"):
+            sizes = (10_000, 100_000, 1_000_000)
+            if "=" in arg:
+                sizes = [int(size) for size in arg.split("=", 1)[1].split(",")]
+            run_benchmark(sizes)
+            return
+
+    print(__doc__)
+
+
+if __name__ == "__main__":
+    main()
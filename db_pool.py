@@ -0,0 +1,425 @@
+# -*- coding: utf-8 -*-
+"""
+DB Pool - Long-lived SQLite connections for the memory database
+Instead of connect / execute / commit / close on every call, the database
+is opened once per role:
+
+- one writer connection, shared by all threads behind a lock, that runs
+  each write in its own BEGIN IMMEDIATE transaction
+- a small pool of reader connections (max_readers), so reads never wait
+  for the write lock and up to max_readers run at once. Threads borrow a
+  reader per read and hand it back, so short-lived threads (ToolExecutor
+  replaces its workers after a hung call) don't each leave one open
+
+The database runs in WAL mode, so readers see the last committed write
+while a write is in progress. synchronous=NORMAL only syncs at checkpoints:
+a crash of the app can't lose a commit, a power cut can lose the last few.
+Every connection keeps a statement cache, so the same SQL text is compiled
+once per connection instead of once per call.
+
+read_only=True opens the file with mode=ro (reports on a live database):
+no journal mode change, and every write fails.
+
+    python db_pool.py --check
+    python db_pool.py --bench[=2000]
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+
+SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+# Prepared statements kept per connection (sqlite3's default is 128)
+CACHED_STATEMENTS = 256
+
+
+class ConnectionPool:
+    """One shared writer plus a bounded set of readers over one SQLite file"""
+
+    def __init__(
+        self,
+        db_file,
+        synchronous="NORMAL",
+        busy_timeout=10.0,
+        max_readers=4,
+        read_only=False,
+    ):
+        synchronous = str(synchronous).upper()
+        if synchronous not in SYNCHRONOUS_MODES:
+            raise ValueError(
+                f"synchronous must be one of {', '.join(SYNCHRONOUS_MODES)}"
+            )
+
+        self.db_file = db_file
+        self.synchronous = synchronous
+        self.busy_timeout = busy_timeout
+        self.max_readers = max_readers
+        self.read_only = read_only
+
+        self.write_lock = threading.Lock()
+        self._writer = None
+        self._idle = queue.LifoQueue()  # readers not in use (warmest first)
+        self._readers = []  # every reader, so close() can reach them
+        self._readers_lock = threading.Lock()
+        self.closed = False
+
+        self.stats_lock = threading.Lock()
+        self.stats = {"reads": 0, "writes": 0, "connections": 0, "rollbacks": 0}
+
+    def _count(self, key):
+        with self.stats_lock:
+            self.stats[key] += 1
+
+    # ========== CONNECTIONS ==========
+
+    def _open(self):
+        if self.closed:
+            raise sqlite3.ProgrammingError("Connection pool is closed")
+
+        # isolation_level=None: no implicit transactions - writes say BEGIN
+        options = dict(
+            timeout=self.busy_timeout,
+            isolation_level=None,
+            check_same_thread=False,  # close() runs on another thread
+            cached_statements=CACHED_STATEMENTS,
+        )
+        if self.read_only:
+            uri = f"{Path(self.db_file).resolve().as_uri()}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, **options)
+            self._count("connections")
+            return conn
+
+        conn = sqlite3.connect(self.db_file, **options)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        self._count("connections")
+        return conn
+
+    @contextmanager
+    def reader(self):
+        """
+        Borrow a read connection - an idle one, a new one while there are
+        fewer than max_readers, otherwise wait for one to come back.
+        """
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._readers_lock:
+                if len(self._readers) < self.max_readers:
+                    conn = self._open()
+                    conn.execute("PRAGMA query_only=ON")
+                    self._readers.append(conn)
+            if conn is None:
+                conn = self._idle.get()
+
+        try:
+            yield conn
+        finally:
+            if self.closed:
+                conn.close()
+            else:
+                self._idle.put(conn)
+
+    def read(self, sql, params=()):
+        """Run a SELECT → list of rows"""
+        self._count("reads")
+        with self.reader() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    @contextmanager
+    def write(self):
+        """
+        Exclusive use of the writer connection inside one transaction.
+
+            with pool.write() as conn:
+                conn.execute("INSERT ...", (...))
+
+        Commits on success, rolls back if the block raises.
+        """
+        with self.write_lock:
+            if self._writer is None:
+                self._writer = self._open()
+            conn = self._writer
+
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                self._count("rollbacks")
+                raise
+            conn.execute("COMMIT")
+            self._count("writes")
+
+    def execute(self, sql, params=()):
+        """One write statement in its own transaction → the cursor"""
+        with self.write() as conn:
+            return conn.execute(sql, params)
+
+    def close(self):
+        """Close every connection (idempotent)"""
+        with self.write_lock:
+            self.closed = True
+            if self._writer is not None:
+                try:
+                    # Fold the WAL back into the main file on the way out
+                    self._writer.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                except sqlite3.Error:
+                    pass
+                self._writer.close()
+                self._writer = None
+
+        # Readers on loan are closed when they come back
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._readers_lock:
+            self._readers.clear()
+
+    def get_stats(self):
+        return (
+            f"🗃️  Memory DB: {self.stats['writes']} writes, "
+            f"{self.stats['reads']} reads | "
+            f"{self.stats['connections']} connections opened "
+            f"(≤{self.max_readers} readers) | "
+            f"synchronous={self.synchronous}"
+        )
+
+
+# ========== CHECK ==========
+
+
+def run_check():
+    import os
+    import shutil
+    import tempfile
+
+    passed = True
+
+    def check(label, ok, detail):
+        nonlocal passed
+        passed = passed and ok
+        print(f"  {'✅' if ok else '❌'} {label:<40} {detail}")
+
+    print("\n" + "=" * 70)
+    print("     🧪 DB POOL CHECK")
+    print("=" * 70)
+
+    workdir = tempfile.mkdtemp(prefix="db_pool_check_")
+    try:
+        pool = ConnectionPool(os.path.join(workdir, "check.db"), max_readers=4)
+        pool.execute("CREATE TABLE t (n INTEGER)")
+
+        # Like ToolExecutor after hung calls: many threads, each short-lived
+        def short_lived():
+            for i in range(25):
+                pool.execute("INSERT INTO t VALUES (?)", (i,))
+                pool.read("SELECT COUNT(*) FROM t")
+
+        for _ in range(5):
+            threads = [threading.Thread(target=short_lived) for _ in range(16)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        check(
+            "80 threads share ≤4 readers",
+            len(pool._readers) <= 4 and pool.stats["connections"] <= 5,
+            f"{pool.stats['connections']} connections opened",
+        )
+        check(
+            "counters exact across threads",
+            pool.stats["reads"] == 2000 and pool.stats["writes"] == 2001,
+            f"{pool.stats['reads']} reads, {pool.stats['writes']} writes",
+        )
+        rows = pool.read("SELECT COUNT(*) FROM t")[0][0]
+        check("every write visible to readers", rows == 2000, f"{rows} rows")
+
+        with pool.reader() as conn:
+            pool.close()
+            conn.execute("SELECT 1")  # still usable until handed back
+        check(
+            "close() reaches readers on loan",
+            pool._idle.empty() and not pool._readers,
+            "all closed",
+        )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print("=" * 70)
+    print(f"  {'✅ All checks passed' if passed else '❌ Some checks failed'}\n")
+    return passed
+
+
+# ========== BENCHMARK ==========
+
+
+def _old_write(db_file, sql, params):
+    """The previous write path: connect, execute, commit, close"""
+    conn = sqlite3.connect(db_file)
+    cursor = conn.cursor()
+    cursor.execute(sql, params)
+    conn.commit()
+    conn.close()
+
+
+def _old_read(db_file, sql, params=()):
+    """The previous read path: connect, execute, fetch, close"""
+    conn = sqlite3.connect(db_file)
+    cursor = conn.cursor()
+    cursor.execute(sql, params)
+    results = cursor.fetchall()
+    conn.close()
+    return results
+
+
+_INSERT_CONVERSATION = """
+    INSERT INTO conversations (timestamp, user_message, assistant_response, tools_used, session_id)
+    VALUES (?, ?, ?, ?, ?)
+"""
+_RECENT_CONVERSATIONS = """
+    SELECT timestamp, user_message, assistant_response
+    FROM conversations
+    ORDER BY id DESC
+    LIMIT ?
+"""
+_INSERT_TASK = """
+    INSERT INTO tasks (task, status, created, priority)
+    VALUES (?, ?, ?, ?)
+"""
+_PENDING_TASKS = """
+    SELECT id, task, status, created, priority
+    FROM tasks
+    WHERE status = ?
+    ORDER BY id DESC
+    LIMIT 50
+"""
+
+
+def _rate(fn, count, threads=1):
+    """Calls per second of fn(i), split across `threads` threads"""
+    per_thread = count // threads
+
+    def work(offset):
+        for i in range(offset, offset + per_thread):
+            fn(i)
+
+    workers = [
+        threading.Thread(target=work, args=(t * per_thread,)) for t in range(threads)
+    ]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return per_thread * threads / (time.perf_counter() - started)
+
+
+def run_benchmark(count=2000):
+    import os
+    import shutil
+    import tempfile
+
+    from memory import AssistantMemory
+
+    workdir = tempfile.mkdtemp(prefix="db_pool_bench_")
+    cwd = os.getcwd()
+    os.chdir(workdir)  # AssistantMemory keeps its files under ./assistant_memory
+    try:
+        old_dir = os.path.join(workdir, "old")
+        os.mkdir(old_dir)
+        old_db = os.path.join(old_dir, "conversations.db")
+
+        memory = AssistantMemory(user_name="bench")
+        # Same schema for the old code path, in the old rollback-journal mode
+        conn = sqlite3.connect(old_db)
+        with memory.db.reader() as reader:
+            reader.backup(conn)
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.close()
+
+        print("\n" + "=" * 70)
+        print(f"     🗃️  MEMORY DB BENCHMARK - {count} operations each")
+        print("=" * 70)
+
+        def old_insert(i):
+            row = ("2026-01-01T12:00:00", f"question {i}", f"answer {i}", None, "b")
+            _old_write(old_db, _INSERT_CONVERSATION, row)
+
+        def old_add_task(i):
+            _old_write(old_db, _INSERT_TASK, (f"t{i}", "pending", "2026", "low"))
+
+        def new_insert(i):
+            memory.save_conversation(f"question {i}", f"answer {i}", None, "b")
+
+        def old_recent(i):
+            return _old_read(old_db, _RECENT_CONVERSATIONS, (5,))
+
+        def old_tasks(i):
+            return _old_read(old_db, _PENDING_TASKS, ("pending",))
+
+        cases = [
+            ("save_conversation", old_insert, new_insert, 1),
+            (
+                "add_task x4 threads",
+                old_add_task,
+                lambda i: memory.add_task(f"t{i}"),
+                4,
+            ),
+            (
+                "get_recent_conversations",
+                old_recent,
+                lambda i: memory.get_recent_conversations(),
+                1,
+            ),
+            (
+                "get_recent_conversations x4",
+                old_recent,
+                lambda i: memory.get_recent_conversations(),
+                4,
+            ),
+            ("get_tasks", old_tasks, lambda i: memory.get_tasks(), 1),
+        ]
+
+        print(f"  {'operation':<30}{'before':>14}{'after':>14}{'speedup':>10}")
+        for label, before, after, threads in cases:
+            old_rate = _rate(before, count, threads)
+            new_rate = _rate(after, count, threads)
+            old = f"{old_rate:10,.0f}/s"
+            speedup = f"{new_rate / old_rate:9.1f}x"
+            print(f"  {label:<30}{old:>14}{new_rate:10,.0f}/s  {speedup}")
+
+        print(f"\n  {memory.db.get_stats()}")
+        memory.close()
+        print("=" * 70 + "\n")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    import sys
+
+    if "--check" in sys.argv[1:]:
+        sys.exit(0 if run_check() else 1)
+
+    for arg in sys.argv[1:]:
+        if arg.startswith("--bench"):
+            count = int(arg.split("=", 1)[1]) if "=" in arg else 2000
+            run_benchmark(count)
+            return
+
+    print(__doc__)
+
+
+if __name__ == "__main__":
+    main()
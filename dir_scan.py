@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""
+Dir Scan - Lazy os.scandir walking for the file tools
+Directory entries come straight from os.scandir: is_file()/is_dir() use the
+type the OS already returned, and stat() is fetched once per entry and
+cached on the DirEntry - only for the entries that are actually shown.
+
+Walks are generators, so callers stop as soon as they have enough matches,
+and listings keep the first N names in a bounded heap instead of sorting
+every entry of a huge directory.
+
+    python dir_scan.py --bench[=100000]
+"""
+
+import fnmatch
+import heapq
+import itertools
+import os
+import time
+from collections import deque, namedtuple
+from pathlib import Path
+
+
+Listing = namedtuple("Listing", "folders files folder_count file_count")
+
+
+def scan(directory):
+    """DirEntry objects for one directory (unreadable directories are empty)"""
+    try:
+        with os.scandir(directory) as entries:
+            yield from entries
+    except OSError:
+        return
+
+
+def _is_dir(entry):
+    try:
+        return entry.is_dir()
+    except OSError:
+        return False
+
+
+def _is_file(entry):
+    try:
+        return entry.is_file()
+    except OSError:
+        return False
+
+
+class _Reversed:
+    """Inverts ordering so heapq's min-heap keeps the n smallest keys"""
+
+    __slots__ = ("key",)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __lt__(self, other):
+        return other.key < self.key
+
+
+class Smallest:
+    """The n smallest items seen so far (by key), without sorting them all"""
+
+    def __init__(self, n, key):
+        self.n = n
+        self.key = key
+        self.count = 0
+        self.heap = []  # (_Reversed(key), tiebreak, item) - largest kept on top
+        self._order = itertools.count()
+
+    def push(self, item):
+        self.count += 1
+        if self.n <= 0:
+            return
+
+        key = self.key(item)
+        if len(self.heap) < self.n:
+            heapq.heappush(self.heap, (_Reversed(key), next(self._order), item))
+        elif key < self.heap[0][0].key:
+            heapq.heapreplace(self.heap, (_Reversed(key), next(self._order), item))
+
+    def items(self):
+        """Kept items, smallest first"""
+        ordered = sorted(self.heap, key=lambda kept: (kept[0].key, kept[1]))
+        return [kept[2] for kept in ordered]
+
+
+def sort_key(entry):
+    """Name order, matching sorted(path.iterdir()) on this platform"""
+    return os.path.normcase(entry.name)
+
+
+def list_dir(directory, limit=30):
+    """First `limit` folders and files by name, plus the full counts"""
+    folders = Smallest(limit, sort_key)
+    files = Smallest(limit, sort_key)
+
+    for entry in scan(directory):
+        if _is_file(entry):
+            files.push(entry)
+        elif _is_dir(entry):
+            folders.push(entry)
+
+    return Listing(folders.items(), files.items(), folders.count, files.count)
+
+
+def walk(directory, follow_symlinks=False):
+    """Every entry below directory, shallowest first"""
+    pending = deque([directory])
+    while pending:
+        for entry in scan(pending.popleft()):
+            yield entry
+            try:
+                if entry.is_dir(follow_symlinks=follow_symlinks):
+                    pending.append(entry.path)
+            except OSError:
+                continue
+
+
+def iglob(directory, pattern):
+    """Entries anywhere below directory whose name matches pattern (like rglob)"""
+    if "/" in pattern or os.sep in pattern:
+        # Path patterns need pathlib's matcher - still consumed lazily
+        for path in Path(directory).rglob(pattern):
+            yield path
+        return
+
+    pattern = os.path.normcase(pattern)
+    for entry in walk(directory):
+        if fnmatch.fnmatchcase(os.path.normcase(entry.name), pattern):
+            yield entry
+
+
+def similar_names(directory, name, limit=3):
+    """Entries in directory whose name contains `name` (case-insensitive)"""
+    needle = name.lower()
+    matches = (entry for entry in scan(directory) if needle in entry.name.lower())
+    return list(itertools.islice(matches, limit))
+
+
+def entry_size(entry):
+    """Size from the (cached) stat result, or None if it can't be read"""
+    try:
+        return entry.stat().st_size
+    except OSError:
+        return None
+
+
+# ========== BENCHMARK ==========
+
+
+def generate_dir(directory, entries=100_000, folders=200):
+    """One flat directory of empty files plus some sub-folders"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    for i in range(folders):
+        (directory / f"folder_{i:05d}").mkdir()
+    for i in range(entries - folders):
+        name = f"file_{(i * 7919) % entries:06d}.{('txt', 'csv', 'md')[i % 3]}"
+        (directory / name).touch()
+    return entries
+
+
+def _old_list_files(path, limit=30):
+    """The previous list_files loop: sort everything, stat every file twice"""
+    files, folders = [], []
+    for item in sorted(path.iterdir()):
+        if item.is_file():
+            size = item.stat().st_size
+            modified = item.stat().st_mtime
+            files.append((item.name, size, modified))
+        elif item.is_dir():
+            folders.append(item.name)
+    return folders[:limit], files[:limit], len(folders), len(files)
+
+
+def _new_list_files(path, limit=30):
+    listing = list_dir(path, limit)
+    files = [(e.name, e.stat().st_size, e.stat().st_mtime) for e in listing.files]
+    return listing.folders, files, listing.folder_count, listing.file_count
+
+
+def _time(fn, runs=3):
+    best = float("inf")
+    result = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def run_benchmark(entries=100_000):
+    import shutil
+    import tempfile
+
+    workdir = Path(tempfile.mkdtemp(prefix="dir_scan_bench_"))
+    flat = workdir / "flat"
+    try:
+        print(f"📁 Generating {entries} entries...")
+        generate_dir(flat, entries)
+        for i in range(10):
+            generate_dir(flat / f"folder_{i:05d}", entries // 10, folders=0)
+
+        print("\n" + "=" * 70)
+        print(f"     📂 DIR SCAN BENCHMARK - {entries} entries per directory")
+        print("=" * 70)
+
+        cases = [
+            (
+                "list_files (top 30)",
+                lambda: _old_list_files(flat),
+                lambda: _new_list_files(flat),
+            ),
+            (
+                "search_files '*.csv' (50)",
+                lambda: list(flat.rglob("*.csv"))[:50],
+                lambda: list(itertools.islice(iglob(flat, "*.csv"), 50)),
+            ),
+            (
+                "search_files, no match",
+                lambda: list(flat.rglob("*.pdf"))[:50],
+                lambda: list(itertools.islice(iglob(flat, "*.pdf"), 50)),
+            ),
+            (
+                "read_file suggestions",
+                lambda: list(flat.glob("*file_0001*"))[:3],
+                lambda: similar_names(flat, "file_0001"),
+            ),
+        ]
+
+        print(f"  {'operation':<30}{'before':>12}{'after':>12}{'speedup':>10}")
+        for label, before, after in cases:
+            old_seconds, _ = _time(before)
+            new_seconds, _ = _time(after)
+            print(
+                f"  {label:<30}{old_seconds * 1000:10.1f}ms{new_seconds * 1000:10.1f}ms"
+                f"{old_seconds / max(new_seconds, 1e-9):9.1f}x"
+            )
+
+        old, new = _old_list_files(flat), _new_list_files(flat)
+        same = old[0] == [e.name for e in new[0]] and old[1] == new[1]
+        same = same and old[2:] == new[2:]
+        print(f"\n  list_files output identical: {'✅' if same else '❌'}")
+        print("=" * 70 + "\n")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    import sys
+
+    for arg in sys.argv[1:]:
+        if arg.startswith("--bench"):
+            entries = int(arg.split("=", 1)[1]) if "=" in arg else 100_000
+            run_benchmark(entries)
+            return
+
+    print(__doc__)
+
+
+if __name__ == "__main__":
+    main()
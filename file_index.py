@@ -0,0 +1,592 @@
+# -*- coding: utf-8 -*-
+"""
+File Index - Persistent filename index for find_all_files and search_files
+A background thread keeps a SQLite index (assistant_memory/file_index.db) of
+every file and folder under the configured roots, so "find my notes file"
+is an index lookup instead of an rglob over the home directory.
+
+Updates are incremental: a directory is only re-listed when its mtime
+changed (adding, removing or renaming an entry changes it), so a refresh of
+an unchanged tree costs one stat per directory. Names are searched exactly,
+by glob, by substring (an FTS5 trigram index) and fuzzily (trigram
+candidates re-ranked by similarity).
+
+    python file_index.py --bench[=500000]   benchmark on a generated tree
+"""
+
+import difflib
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+# Never worth indexing (and often huge)
+SKIP_DIRS = {
+    ".git",
+    ".hg",
+    ".svn",
+    "node_modules",
+    "__pycache__",
+    ".cache",
+    ".venv",
+    "venv",
+    ".tox",
+    ".mypy_cache",
+    ".pytest_cache",
+    "$RECYCLE.BIN",
+    "AppData",
+}
+
+_GLOB_CHARS = set("*?[")
+
+
+def default_roots():
+    """The places find_all_files has always searched"""
+    home = Path.home()
+    return [Path.cwd(), home / "Desktop", home / "Documents", home / "Downloads"]
+
+
+def _subtree_range(path):
+    """(low, high) so that low <= p < high selects everything under path"""
+    prefix = path.rstrip(os.sep) + os.sep
+    return prefix, prefix[:-1] + chr(ord(os.sep) + 1)
+
+
+class FileIndex:
+    """Filename index of a few roots, refreshed in the background"""
+
+    def __init__(self, roots=None, db_file=None, rescan_interval=60):
+        if db_file is None:
+            memory_dir = Path("assistant_memory")
+            memory_dir.mkdir(exist_ok=True)
+            db_file = memory_dir / "file_index.db"
+
+        self.db_file = str(db_file)
+        self.rescan_interval = rescan_interval
+        self.roots = self._distinct_roots(roots or default_roots())
+
+        self.ready = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.fts = True
+
+        self.stats = {"files": 0, "scans": 0, "relisted": 0, "last_scan": 0.0}
+
+        self.init_database()
+
+    @staticmethod
+    def _distinct_roots(roots):
+        """Existing roots, with roots nested in another root dropped"""
+        resolved = sorted(
+            {str(Path(r).expanduser().resolve()) for r in roots if Path(r).is_dir()}
+        )
+        distinct = []
+        for root in resolved:
+            if not any(root.startswith(_subtree_range(d)[0]) for d in distinct):
+                distinct.append(root)
+        return distinct
+
+    # ========== DATABASE ==========
+
+    def connect(self):
+        conn = sqlite3.connect(self.db_file, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def init_database(self):
+        conn = self.connect()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                parent TEXT NOT NULL,
+                is_dir INTEGER NOT NULL
+            )
+        """
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_file_name ON files(name COLLATE NOCASE)"
+        )
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_file_parent ON files(parent)")
+
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS dirs (
+                path TEXT PRIMARY KEY,
+                parent TEXT,
+                mtime REAL NOT NULL
+            )
+        """
+        )
+
+        # Substring search on names; plain LIKE if this SQLite lacks trigrams
+        try:
+            cursor.execute(
+                """
+                CREATE VIRTUAL TABLE IF NOT EXISTS file_names USING fts5(
+                    name, content='files', content_rowid='rowid',
+                    tokenize='trigram'
+                )
+            """
+            )
+            cursor.execute(
+                """
+                CREATE TRIGGER IF NOT EXISTS files_ai AFTER INSERT ON files BEGIN
+                    INSERT INTO file_names(rowid, name) VALUES (new.rowid, new.name);
+                END
+            """
+            )
+            cursor.execute(
+                """
+                CREATE TRIGGER IF NOT EXISTS files_ad AFTER DELETE ON files BEGIN
+                    INSERT INTO file_names(file_names, rowid, name)
+                    VALUES ('delete', old.rowid, old.name);
+                END
+            """
+            )
+        except sqlite3.OperationalError:
+            self.fts = False
+
+        conn.commit()
+
+        cursor.execute("SELECT COUNT(*) FROM files")
+        self.stats["files"] = cursor.fetchone()[0]
+        conn.close()
+
+    # ========== INDEXING ==========
+
+    def start(self):
+        """Index in the background; lookups work once the first pass is done"""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"   ⚠️  File index: {e}")
+            self.ready.set()
+            self.stop_event.wait(self.rescan_interval)
+
+    def refresh(self):
+        """Bring the index up to date - only changed directories are re-listed"""
+        started = time.perf_counter()
+        conn = self.connect()
+        cursor = conn.cursor()
+
+        known = {}  # dir → mtime
+        children = {}  # dir → [subdirs]
+        rows = cursor.execute("SELECT path, parent, mtime FROM dirs").fetchall()
+        for path, parent, mtime in rows:
+            known[path] = mtime
+            children.setdefault(parent, []).append(path)
+
+        # Roots no longer configured
+        for path in list(known):
+            if not self._under_root(path):
+                self._forget(cursor, path)
+
+        relisted = 0
+        stack = list(self.roots)
+        while stack and not self.stop_event.is_set():
+            directory = stack.pop()
+            try:
+                mtime = os.stat(directory).st_mtime
+            except OSError:
+                self._forget(cursor, directory)
+                continue
+
+            if known.get(directory) == mtime:
+                stack.extend(children.get(directory, ()))
+                continue
+
+            stack.extend(
+                self._relist(cursor, directory, mtime, known=directory in known)
+            )
+            relisted += 1
+            if relisted % 200 == 0:
+                conn.commit()
+
+        conn.commit()
+        cursor.execute("SELECT COUNT(*) FROM files")
+        self.stats["files"] = cursor.fetchone()[0]
+        conn.close()
+
+        self.stats["scans"] += 1
+        self.stats["relisted"] += relisted
+        self.stats["last_scan"] = time.perf_counter() - started
+        return relisted
+
+    def update(self, *paths):
+        """
+        Re-list the folders holding paths right away - called after the
+        assistant writes, renames or deletes them, so lookups don't wait for
+        the next refresh. Returns the number of folders re-listed.
+        """
+        stack = {str(Path(p).parent) for p in paths}
+        stack = [d for d in stack if self._under_root(d)]
+        if not stack:
+            return 0
+
+        conn = self.connect()
+        relisted = 0
+        try:
+            cursor = conn.cursor()
+            while stack:
+                directory = stack.pop()
+                try:
+                    mtime = os.stat(directory).st_mtime
+                except OSError:
+                    self._forget(cursor, directory)
+                    continue
+
+                known = cursor.execute(
+                    "SELECT 1 FROM dirs WHERE path = ?", (directory,)
+                ).fetchone()
+                subdirs = self._relist(cursor, directory, mtime, known=bool(known))
+                relisted += 1
+
+                # New folders (e.g. a renamed one) are listed too - refresh()
+                # only walks into folders it already knows
+                for subdir in subdirs:
+                    if not cursor.execute(
+                        "SELECT 1 FROM dirs WHERE path = ?", (subdir,)
+                    ).fetchone():
+                        stack.append(subdir)
+            conn.commit()
+        finally:
+            conn.close()
+        return relisted
+
+    def _relist(self, cursor, directory, mtime, known=True):
+        """Replace one directory's entries; returns its subdirectories"""
+        entries, subdirs = [], []
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    skipped = entry.name in SKIP_DIRS or entry.name.startswith(".")
+                    if is_dir and skipped:
+                        continue
+                    entries.append((entry.path, entry.name, directory, int(is_dir)))
+                    if is_dir:
+                        subdirs.append(entry.path)
+        except OSError:
+            return []
+
+        # Entries that disappeared (nothing to compare on the first listing)
+        if known:
+            cursor.execute(
+                "SELECT path, is_dir FROM files WHERE parent = ?", (directory,)
+            )
+            current = {path for path, _, _, _ in entries}
+            for path, is_dir in cursor.fetchall():
+                if path not in current:
+                    if is_dir:
+                        self._forget(cursor, path)
+                    else:
+                        cursor.execute("DELETE FROM files WHERE path = ?", (path,))
+
+        cursor.executemany("INSERT OR IGNORE INTO files VALUES (?, ?, ?, ?)", entries)
+        cursor.execute(
+            "INSERT OR REPLACE INTO dirs VALUES (?, ?, ?)",
+            (directory, str(Path(directory).parent), mtime),
+        )
+        return subdirs
+
+    def _forget(self, cursor, directory):
+        """Drop a directory and everything below it"""
+        low, high = _subtree_range(directory)
+        cursor.execute(
+            "DELETE FROM files WHERE path = ? OR (path >= ? AND path < ?)",
+            (directory, low, high),
+        )
+        cursor.execute(
+            "DELETE FROM dirs WHERE path = ? OR (path >= ? AND path < ?)",
+            (directory, low, high),
+        )
+
+    # ========== LOOKUP ==========
+
+    def covers(self, path):
+        """True if path is inside an indexed root and the index is built"""
+        if not self.ready.is_set():
+            return False
+        return self._under_root(str(path))
+
+    def _under_root(self, path):
+        return any(
+            path == root or path.startswith(_subtree_range(root)[0])
+            for root in self.roots
+        )
+
+    def find(self, query, limit=20):
+        """Glob or exact-name matches, else substring, else fuzzy (paths)"""
+        query = query.strip()
+        if not query:
+            return []
+
+        conn = self.connect()
+        cursor = conn.cursor()
+        try:
+            if _GLOB_CHARS & set(query):
+                cursor.execute(
+                    "SELECT path FROM files WHERE name GLOB ? LIMIT ?", (query, limit)
+                )
+                return [row[0] for row in cursor.fetchall()]
+
+            cursor.execute(
+                "SELECT path FROM files WHERE name = ? COLLATE NOCASE LIMIT ?",
+                (query, limit),
+            )
+            found = [row[0] for row in cursor.fetchall()]
+
+            # Looser matching only when the stricter kind found nothing
+            if not found:
+                found = self._substring(cursor, query, limit)
+            if not found:
+                found = self._fuzzy(cursor, query, limit)
+            return found
+        finally:
+            conn.close()
+
+    def glob(self, directory, pattern, limit=50):
+        """Paths under directory whose name matches pattern (search_files)"""
+        low, high = _subtree_range(str(directory))
+        conn = self.connect()
+        try:
+            cursor = conn.execute(
+                """
+                SELECT path FROM files
+                WHERE path >= ? AND path < ? AND name GLOB ?
+                LIMIT ?
+            """,
+                (low, high, pattern, limit),
+            )
+            return [row[0] for row in cursor.fetchall()]
+        finally:
+            conn.close()
+
+    def _substring(self, cursor, query, limit):
+        if self.fts and len(query) >= 3:
+            phrase = '"' + query.replace('"', '""') + '"'
+            cursor.execute(
+                """
+                SELECT files.path FROM file_names
+                JOIN files ON files.rowid = file_names.rowid
+                WHERE file_names MATCH ?
+                ORDER BY length(files.name)
+                LIMIT ?
+            """,
+                (phrase, limit),
+            )
+        else:
+            escaped = re.sub(r"([\\%_])", r"\\\1", query)
+            cursor.execute(
+                """
+                SELECT path FROM files WHERE name LIKE ? ESCAPE '\\'
+                ORDER BY length(name) LIMIT ?
+            """,
+                (f"%{escaped}%", limit),
+            )
+        return [row[0] for row in cursor.fetchall()]
+
+    def _fuzzy(self, cursor, query, limit, candidates=500, cutoff=0.6):
+        """Names sharing a 4-character run with query, ranked by similarity"""
+        needle = query.lower()
+        runs = {needle[i : i + 4] for i in range(len(needle) - 3)}
+        runs = [run for run in runs if '"' not in run]
+        if not self.fts or not runs:
+            return []
+
+        # A typo rarely breaks every 4-character run of a name
+        cursor.execute(
+            """
+            SELECT files.path, files.name FROM file_names
+            JOIN files ON files.rowid = file_names.rowid
+            WHERE file_names MATCH ?
+            LIMIT ?
+        """,
+            (" OR ".join(f'"{run}"' for run in runs), candidates),
+        )
+
+        scored = []
+        matcher = difflib.SequenceMatcher(None, "", needle)
+        for path, name in cursor.fetchall():
+            name = name.lower()
+            best = 0.0
+            for candidate in (name, os.path.splitext(name)[0]):
+                matcher.set_seq1(candidate)
+                # Cheap upper bounds first - ratio() is the slow part
+                if matcher.real_quick_ratio() < cutoff:
+                    continue
+                if matcher.quick_ratio() >= cutoff:
+                    best = max(best, matcher.ratio())
+            if best >= cutoff:
+                scored.append((best, path))
+
+        scored.sort(key=lambda item: -item[0])
+        return [path for _, path in scored[:limit]]
+
+    def get_stats(self):
+        state = "ready" if self.ready.is_set() else "building"
+        return (
+            f"🗂️  File index: {self.stats['files']} entries ({state}) | "
+            f"{len(self.roots)} roots | last refresh {self.stats['last_scan']:.2f}s"
+        )
+
+
+# ========== BENCHMARK ==========
+
+
+_WORDS = [
+    "report",
+    "notes",
+    "invoice",
+    "photo",
+    "draft",
+    "budget",
+    "summary",
+    "backup",
+    "resume",
+    "agenda",
+]
+_EXTS = [".txt", ".pdf", ".docx", ".jpg", ".py", ".csv", ".md"]
+
+
+def _bench_name(n):
+    return f"{_WORDS[(n * 7) % len(_WORDS)]}_{n}{_EXTS[n % len(_EXTS)]}"
+
+
+def generate_tree(root, files=500_000, per_dir=200, fanout=10):
+    """A nested tree of empty files with varied names"""
+    root = Path(root)
+    dirs = [root]
+    made = 0
+    d = 0
+    while made < files:
+        directory = dirs[d]
+        d += 1
+        directory.mkdir(parents=True, exist_ok=True)
+        for i in range(fanout):
+            dirs.append(directory / f"{_WORDS[(d + i) % len(_WORDS)]}_dir{d}_{i}")
+        for i in range(min(per_dir, files - made)):
+            (directory / _bench_name(made)).touch()
+            made += 1
+    return made
+
+
+def _time(fn, runs=5):
+    best = float("inf")
+    result = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def run_benchmark(files=500_000):
+    import shutil
+    import tempfile
+
+    workdir = Path(tempfile.mkdtemp(prefix="file_index_bench_"))
+    tree = workdir / "tree"
+    try:
+        print(f"📁 Generating {files} files...")
+        started = time.perf_counter()
+        generate_tree(tree, files)
+        print(f"   done in {time.perf_counter() - started:.1f}s")
+
+        index = FileIndex([tree], db_file=workdir / "index.db")
+
+        print("\n" + "=" * 70)
+        print(f"     🗂️  FILE INDEX BENCHMARK - {files} files")
+        print("=" * 70)
+
+        build, _ = _time(index.refresh, runs=1)
+        noop, unchanged = _time(index.refresh, runs=3)
+
+        changed = [p for p in tree.iterdir() if p.is_dir()][:5]
+        for i, directory in enumerate(changed):
+            (directory / f"fresh_file_{i}.txt").touch()
+        incremental, relisted = _time(index.refresh, runs=1)
+        index.ready.set()
+
+        entries = index.stats["files"]
+        print(f"  Initial build             {build:9.2f}s   ({entries} entries)")
+        print(
+            f"  Refresh, nothing changed  {noop * 1000:9.1f}ms  ({unchanged} relisted)"
+        )
+        print(
+            f"  Refresh, 5 dirs changed   {incremental * 1000:9.1f}ms  "
+            f"({relisted} relisted)"
+        )
+
+        target = _bench_name(files // 2)
+        queries = [
+            (
+                f"exact '{target}'",
+                lambda: index.find(target),
+                lambda: [next(tree.rglob(target), None)],
+            ),
+            ("substring 'fresh_file'", lambda: index.find("fresh_file"), None),
+            ("fuzzy 'budgt_4'", lambda: index.find("budgt_4"), None),
+            (
+                "glob '*.csv' (search_files)",
+                lambda: index.glob(tree, "*.csv"),
+                lambda: list(tree.rglob("*.csv"))[:50],
+            ),
+        ]
+
+        print(f"\n  {'lookup':<30}{'index':>10}{'rglob':>11}")
+        for label, lookup, scan in queries:
+            seconds, found = _time(lookup)
+            scanned = ""
+            if scan:
+                scan_seconds, _ = _time(scan, runs=1)
+                scanned = f"{scan_seconds * 1000:.0f}ms"
+            print(
+                f"  {label[:29]:<30}{seconds * 1000:8.2f}ms{scanned:>11}"
+                f"   ({len(found)} hits)"
+            )
+        print("=" * 70 + "\n")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    import sys
+
+    for arg in sys.argv[1:]:
+        if arg.startswith("--bench"):
+            files = int(arg.split("=", 1)[1]) if "=" in arg else 500_000
+            run_benchmark(files)
+            return
+        if arg in ["--help", "-h"]:
+            print(__doc__)
+            return
+
+    index = FileIndex()
+    print("🗂️  Indexing...")
+    index.refresh()
+    print(index.get_stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,392 @@
+# -*- coding: utf-8 -*-
+"""
+File Reader - Memory-mapped, ranged reads for read_file
+Files are mapped instead of read into a string, the encoding is sniffed
+once from a prefix, and only the lines that are asked for get decoded:
+
+    head N | tail N | lines A-B | grep TEXT
+
+Line totals (and grep match counts) come from one streaming pass over the
+mapping in newline-aligned chunks, so a multi-GB log can be queried by
+voice while the reply stays a bounded excerpt.
+
+    python file_reader.py --bench[=200]   (size in MB)
+"""
+
+import codecs
+import mmap
+import os
+import re
+import time
+from collections import namedtuple
+from pathlib import Path
+
+
+CHUNK_SIZE = 4 * 1024 * 1024
+SNIFF_BYTES = 64 * 1024
+
+# UTF-16 can't be scanned bytewise for b"\n" - it is transcoded up to this size
+MAX_TRANSCODE = 50 * 1024 * 1024
+
+DEFAULT_LINES = 20
+MAX_LINES = 200
+MAX_MATCHES = 20
+EXCERPT_CHARS = 3000
+
+# A plain read shows the whole file when it fits, else its start
+FULL_LINES = 1000
+FULL_CHARS = 8000
+
+MODES = ("head", "tail", "lines", "grep")
+
+Excerpt = namedtuple(
+    "Excerpt", "lines total_lines matches size encoding truncated complete"
+)
+
+
+class ReadError(Exception):
+    """A read that can't be answered (binary file, bad range...)"""
+
+
+# ========== ENCODING ==========
+
+
+_BOMS = [
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+]
+
+
+def sniff_encoding(prefix):
+    """(encoding, bom_length) from the first bytes, or None for binary"""
+    for bom, encoding in _BOMS:
+        if prefix.startswith(bom):
+            return encoding, len(bom)
+
+    if b"\x00" in prefix:
+        return None
+
+    try:
+        # final=False: a multi-byte character cut off by the prefix is fine
+        codecs.getincrementaldecoder("utf-8")().decode(prefix, final=False)
+        return "utf-8", 0
+    except UnicodeDecodeError:
+        pass
+
+    try:
+        prefix.decode("cp1252")
+        return "cp1252", 0
+    except UnicodeDecodeError:
+        return "latin-1", 0
+
+
+# ========== SCANNING ==========
+
+
+def _chunks(data, start=0, size=CHUNK_SIZE):
+    """(offset, bytes) slices of data that each end on a newline"""
+    length = len(data)
+    while start < length:
+        end = data.find(b"\n", min(start + size, length) - 1)
+        end = length if end == -1 else end + 1
+        yield start, data[start:end]
+        start = end
+
+
+def _count_lines(data):
+    """Lines in data - a final line without a newline still counts"""
+    if not len(data):
+        return 0
+    newlines = sum(chunk.count(b"\n") for _, chunk in _chunks(data))
+    return newlines + (data[-1:] != b"\n")
+
+
+def _pick_lines(data, first, last):
+    """Lines first..last (1-based) plus the total, in one pass"""
+    picked = []
+    seen = 0  # newlines before the current chunk
+    for _, chunk in _chunks(data):
+        count = chunk.count(b"\n")
+        if seen < last and seen + count + 1 >= first:
+            pieces = chunk.split(b"\n")
+            if chunk.endswith(b"\n"):
+                pieces.pop()
+            for number, line in enumerate(pieces, seen + 1):
+                if first <= number <= last:
+                    picked.append((number, line))
+        seen += count
+
+    total = seen + (len(data) > 0 and data[-1:] != b"\n")
+    return picked, total
+
+
+def _grep(data, needle, limit):
+    """Up to limit lines containing needle (ASCII case-insensitive), the
+    number of matching lines and the total"""
+    needle = needle.lower()
+    picked = []
+    matches = 0
+    seen = 0
+    for _, chunk in _chunks(data):
+        haystack = chunk.lower()  # same offsets - bytes.lower() is ASCII-only
+        position = 0
+        counted_to, line_number = 0, seen
+        while True:
+            found = haystack.find(needle, position)
+            if found == -1:
+                break
+            line_start = chunk.rfind(b"\n", 0, found) + 1
+            line_end = chunk.find(b"\n", found + len(needle))
+            if line_end == -1:
+                line_end = len(chunk)
+
+            matches += 1
+            if len(picked) < limit:
+                line_number += chunk.count(b"\n", counted_to, line_start)
+                counted_to = line_start
+                picked.append((line_number + 1, chunk[line_start:line_end]))
+
+            position = line_end + 1  # one hit per line
+        seen += chunk.count(b"\n")
+
+    total = seen + (len(data) > 0 and data[-1:] != b"\n")
+    return picked, matches, total
+
+
+def _tail(data, count):
+    """Byte offset where the last `count` lines start"""
+    end = len(data)
+    if data[end - 1 : end] == b"\n":
+        end -= 1
+    start = end
+    for _ in range(count):
+        start = data.rfind(b"\n", 0, start)
+        if start == -1:
+            return 0
+    return start + 1
+
+
+# ========== READING ==========
+
+
+def _parse_count(arg):
+    if arg in (None, ""):
+        return DEFAULT_LINES
+    try:
+        count = int(str(arg).strip())
+    except ValueError:
+        raise ReadError(f"'{arg}' is not a number of lines")
+    return max(1, min(count, MAX_LINES))
+
+
+def _parse_range(arg):
+    """'100-150', '100:150' or '100' (→ the lines from 100 on)"""
+    match = re.fullmatch(r"\s*(\d+)\s*(?:[-:]|to)?\s*(\d*)\s*", str(arg or ""))
+    if not match:
+        raise ReadError(f"'{arg}' is not a line range (e.g. 100-150)")
+    first = max(1, int(match.group(1)))
+    last = int(match.group(2)) if match.group(2) else first + DEFAULT_LINES - 1
+    if last < first:
+        raise ReadError(f"Line range {first}-{last} is backwards")
+    return first, min(last, first + MAX_LINES - 1)
+
+
+def _decode(lines, encoding, chars=EXCERPT_CHARS):
+    """Decode picked lines until the excerpt budget runs out"""
+    decoded = []
+    used = 0
+    for number, raw in lines:
+        text = raw.decode(encoding, errors="replace").rstrip("\r")
+        if number == 1:
+            text = text.lstrip("\ufeff")
+        if used + len(text) > chars:
+            if not decoded:
+                decoded.append((number, text[:chars]))
+            return decoded, True
+        decoded.append((number, text))
+        used += len(text) + 1
+    return decoded, False
+
+
+def _read(data, encoding, mode, arg, chars):
+    if mode == "grep":
+        if not arg or not str(arg).strip():
+            raise ReadError("grep needs something to search for")
+        needle = str(arg).strip().encode(encoding, errors="replace")
+        picked, matches, total = _grep(data, needle, MAX_MATCHES)
+        lines, truncated = _decode(picked, encoding, chars)
+        return lines, total, matches, truncated or matches > len(lines)
+
+    if mode == "tail":
+        count = _parse_count(arg)
+        total = _count_lines(data)
+        start = _tail(data, count)
+        raw = data[start:].split(b"\n")
+        if raw and raw[-1] == b"":
+            raw.pop()
+        first = total - len(raw) + 1
+        lines, truncated = _decode(
+            list(enumerate(raw, first))[::-1], encoding, chars
+        )  # budget spent from the end backwards
+        return lines[::-1], total, None, truncated
+
+    if mode == "lines":
+        first, last = _parse_range(arg)
+    elif mode == "head":
+        first, last = 1, _parse_count(arg)
+    else:
+        first, last = 1, FULL_LINES
+
+    picked, total = _pick_lines(data, first, last)
+    if first > total:
+        raise ReadError(f"Line {first} is past the end ({total:,} lines)")
+    lines, truncated = _decode(picked, encoding, chars)
+    return lines, total, None, truncated or lines[-1][0] < total
+
+
+def read(path, mode="", arg=None, chars=None):
+    """
+    Read part of a text file without loading it.
+
+    mode is '' (the whole file if it fits, else its start), 'head', 'tail',
+    'lines' or 'grep'. Returns an Excerpt whose lines are (line number,
+    text) pairs.
+    """
+    mode = (mode or "").strip().lower()
+    if mode and mode not in MODES:
+        raise ReadError(f"Unknown mode '{mode}' (use {', '.join(MODES)})")
+    if chars is None:
+        chars = EXCERPT_CHARS if mode else FULL_CHARS
+
+    size = os.path.getsize(path)
+    if size == 0:
+        return Excerpt([], 0, None, 0, "utf-8", False, True)
+
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            sniffed = sniff_encoding(mapped[:SNIFF_BYTES])
+            if sniffed is None:
+                raise ReadError("Binary file - not readable as text")
+            encoding, bom = sniffed
+
+            data, scan_as = mapped, encoding
+            if encoding.startswith("utf-16"):
+                if size > MAX_TRANSCODE:
+                    raise ReadError("UTF-16 files over 50 MB aren't supported")
+                data = mapped[bom:].decode(encoding, errors="replace")
+                data, scan_as = data.encode("utf-8"), "utf-8"
+
+            lines, total, matches, truncated = _read(data, scan_as, mode, arg, chars)
+
+    complete = not mode and not truncated
+    return Excerpt(lines, total, matches, size, encoding, truncated, complete)
+
+
+# ========== BENCHMARK ==========
+
+
+_LEVELS = ["INFO", "INFO", "INFO", "DEBUG", "WARN", "ERROR"]
+
+
+def generate_log(path, megabytes=200):
+    """A log file of roughly `megabytes` MB with numbered lines"""
+    target = megabytes * 1024 * 1024
+    written = 0
+    number = 0
+    with open(path, "w", encoding="utf-8") as f:
+        while written < target:
+            block = []
+            for _ in range(10_000):
+                number += 1
+                level = _LEVELS[(number * 7) % len(_LEVELS)]
+                block.append(
+                    f"2026-01-01 12:{number % 60:02d}:{number % 60:02d} {level:<5} "
+                    f"worker-{number % 16} request {number} handled in "
+                    f"{number % 997}ms - café ✓\n"
+                )
+            text = "".join(block)
+            f.write(text)
+            written += len(text.encode("utf-8"))
+    return number
+
+
+def _old_read(path):
+    """The previous read_file body (minus the 2MB cap)"""
+    for encoding in ["utf-8", "latin-1", "cp1252"]:
+        try:
+            with open(path, "r", encoding=encoding) as f:
+                content = f.read()
+            break
+        except UnicodeDecodeError:
+            continue
+    return len(content), content.count("\n") + 1
+
+
+def _time(fn, runs=3):
+    best = float("inf")
+    result = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def run_benchmark(megabytes=200):
+    import shutil
+    import tempfile
+
+    workdir = Path(tempfile.mkdtemp(prefix="file_reader_bench_"))
+    log = workdir / "big.log"
+    try:
+        print(f"📝 Generating a {megabytes} MB log...")
+        lines = generate_log(log, megabytes)
+        middle = lines // 2
+
+        print("\n" + "=" * 70)
+        print(f"     📖 FILE READER BENCHMARK - {megabytes} MB, {lines:,} lines")
+        print("=" * 70)
+
+        cases = [
+            ("old: read + decode whole file", lambda: _old_read(log)),
+            ("head 20", lambda: read(log, "head", 20)),
+            ("tail 20", lambda: read(log, "tail", 20)),
+            (
+                f"lines {middle}-{middle + 40}",
+                lambda: read(log, "lines", f"{middle}-{middle + 40}"),
+            ),
+            ("grep 'request 4242 '", lambda: read(log, "grep", "request 4242 ")),
+            ("grep 'ERROR' (very common)", lambda: read(log, "grep", "ERROR")),
+        ]
+
+        print(f"  {'operation':<36}{'time':>12}   result")
+        for label, fn in cases:
+            seconds, result = _time(fn)
+            if isinstance(result, Excerpt):
+                shown = sum(len(text) for _, text in result.lines)
+                detail = f"{len(result.lines)} lines / {shown} chars shown"
+                if result.matches is not None:
+                    detail += f", {result.matches:,} matches"
+            else:
+                detail = f"{result[0]:,} chars in memory"
+            print(f"  {label:<36}{seconds * 1000:10.1f}ms   {detail}")
+        print("=" * 70 + "\n")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    import sys
+
+    for arg in sys.argv[1:]:
+        if arg.startswith("--bench"):
+            megabytes = int(arg.split("=", 1)[1]) if "=" in arg else 200
+            run_benchmark(megabytes)
+            return
+
+    print(__doc__)
+
+
+if __name__ == "__main__":
+    main()
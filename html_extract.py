@@ -0,0 +1,537 @@
+# -*- coding: utf-8 -*-
+"""
+HTML Extract - Main-content text from web pages, fed as they download
+fetch_webpage used to download the whole page, build a BeautifulSoup tree,
+strip script/nav/footer nodes and then keep only the first 3000 characters.
+
+Here the page is parsed incrementally (lxml's parser when it is installed,
+html.parser otherwise) into text blocks. Each block is scored on length,
+link density, punctuation and the class/id of its containers, and only the
+best blocks are kept - in page order. The download stops as soon as enough
+clear content has been collected.
+
+Benchmark against the old BeautifulSoup approach:
+
+    python html_extract.py [--corpus=DIR] [--limit=3000] [--runs=5]
+    python html_extract.py --check
+"""
+
+import codecs
+import importlib.util
+import re
+import time
+from collections import namedtuple
+from html.parser import HTMLParser
+
+try:
+    from lxml import etree
+except ImportError:  # optional - html.parser is used instead
+    etree = None
+
+
+Extract = namedtuple("Extract", "title text truncated bytes_read complete")
+
+SKIP_TAGS = {
+    "script",
+    "style",
+    "noscript",
+    "template",
+    "svg",
+    "nav",
+    "footer",
+    "header",
+    "aside",
+    "button",
+    "select",
+    "textarea",
+    "iframe",
+}
+
+BLOCK_TAGS = {
+    "p",
+    "div",
+    "li",
+    "td",
+    "th",
+    "pre",
+    "blockquote",
+    "article",
+    "section",
+    "main",
+    "br",
+    "tr",
+    "ul",
+    "ol",
+    "table",
+    "dd",
+    "dt",
+    "figcaption",
+    "h1",
+    "h2",
+    "h3",
+    "h4",
+    "h5",
+    "h6",
+}
+
+HEADINGS = {"h1", "h2", "h3", "h4"}
+
+VOID_TAGS = {"br", "hr", "img", "input", "meta", "link", "wbr", "source", "area"}
+
+_NEGATIVE = re.compile(
+    r"comment|footer|sidebar|menu|share|social|promo|advert|\bads?\b|banner|"
+    r"cookie|related|breadcrumb|popup|newsletter|subscribe|nav",
+    re.I,
+)
+_POSITIVE = re.compile(r"article|content|post|entry|story|main|body-?text|prose", re.I)
+_SPACES = re.compile(r"\s+")
+_CHARSET = re.compile(rb"""charset\s*=\s*["']?([\w.:-]+)""", re.I)
+
+# Blocks scoring at least this are unmistakably content
+CLEAR_CONTENT = 60
+
+
+class BlockCollector:
+    """Parser target: turns start/end/data events into scored text blocks"""
+
+    def __init__(self):
+        self.blocks = []  # [score, text, heading]
+        self.title = ""
+
+        self.stack = []  # (tag, -1 / 0 / +1 class hint)
+        self.skip_depth = 0
+        self.link_depth = 0
+        self.in_title = False
+
+        self.parts = []
+        self.link_chars = 0
+        self.heading = False
+        self.clear_chars = 0
+
+    # ----- parser target interface (lxml and the html.parser adapter) -----
+
+    def start(self, tag, attrs):
+        tag = tag.lower()
+        if tag in SKIP_TAGS:
+            self.skip_depth += 1
+        if tag == "title":
+            self.in_title = True
+        if tag == "a":
+            self.link_depth += 1
+        if tag in BLOCK_TAGS:
+            self.flush()
+            self.heading = tag in HEADINGS
+
+        if tag not in VOID_TAGS:
+            hint = f"{attrs.get('class', '')} {attrs.get('id', '')}"
+            if tag in ("article", "main"):
+                mark = 1
+            elif _NEGATIVE.search(hint):
+                mark = -1
+            elif _POSITIVE.search(hint):
+                mark = 1
+            else:
+                mark = 0
+            self.stack.append((tag, mark))
+
+    def end(self, tag):
+        tag = tag.lower()
+        if tag in VOID_TAGS:
+            return
+        if tag in BLOCK_TAGS:
+            self.flush()
+
+        # Tolerate unclosed tags - pop back to the matching start
+        for i in range(len(self.stack) - 1, -1, -1):
+            if self.stack[i][0] == tag:
+                for open_tag, _ in self.stack[i:]:
+                    self._closed(open_tag)
+                del self.stack[i:]
+                break
+
+    def _closed(self, tag):
+        if tag in SKIP_TAGS:
+            self.skip_depth = max(0, self.skip_depth - 1)
+        elif tag == "a":
+            self.link_depth = max(0, self.link_depth - 1)
+        elif tag == "title":
+            self.in_title = False
+
+    def data(self, text):
+        if self.in_title:
+            self.title += text
+            return
+        if self.skip_depth:
+            return
+        self.parts.append(text)
+        if self.link_depth:
+            self.link_chars += len(text.strip())
+
+    def close(self):
+        self.flush()
+        return self
+
+    # ----- scoring -----
+
+    def flush(self):
+        if not self.parts:
+            return
+        text = _SPACES.sub(" ", "".join(self.parts)).strip()
+        link_chars, heading = self.link_chars, self.heading
+        self.parts, self.link_chars, self.heading = [], 0, False
+        if not text:
+            return
+
+        marks = [mark for _, mark in self.stack]
+        link_density = min(1.0, link_chars / len(text))
+
+        if heading:
+            score = 2 * len(text) * (1 - link_density)
+        else:
+            score = len(text) * (1 - link_density) ** 2
+            score += 10 * text.count(",") + 5 * text.count(". ")
+            if len(text) < 25:
+                score *= 0.3  # labels, bylines, buttons
+        if -1 in marks:
+            score *= 0.15
+        elif 1 in marks:
+            score *= 1.5
+
+        self.blocks.append([score, text, heading])
+        if score >= CLEAR_CONTENT and not heading:
+            self.clear_chars += len(text)
+
+    def select(self, limit):
+        """Best blocks in page order → (text, truncated)"""
+        if not self.blocks:
+            return "", False
+
+        best = max(score for score, _, _ in self.blocks)
+        threshold = max(20.0, 0.08 * best)
+
+        # Nothing stands out (a short page like "short answer: 42") - keep
+        # all of its text rather than none
+        if not any(score >= threshold for score, _, h in self.blocks if not h):
+            threshold = 0.0
+
+        kept = []
+        for i, (score, text, heading) in enumerate(self.blocks):
+            if heading and not threshold:
+                kept.append(text)
+            elif heading:
+                # Headings only when content follows them
+                following = self.blocks[i + 1 : i + 3]
+                if score >= 10 and any(s >= threshold for s, _, h in following):
+                    kept.append(text)
+            elif score >= threshold:
+                kept.append(text)
+
+        text = "\n".join(kept)
+        if len(text) <= limit:
+            return text, False
+
+        cut = text[:limit]
+        end = cut.rfind("\n")
+        if end > limit // 2:
+            cut = cut[:end]
+        return cut, True
+
+
+class _StdlibParser(HTMLParser):
+    """html.parser → BlockCollector events"""
+
+    def __init__(self, target):
+        super().__init__(convert_charrefs=True)
+        self.target = target
+
+    def handle_starttag(self, tag, attrs):
+        self.target.start(tag, {k: v or "" for k, v in attrs})
+
+    def handle_startendtag(self, tag, attrs):
+        self.target.start(tag, {k: v or "" for k, v in attrs})
+        self.target.end(tag)
+
+    def handle_endtag(self, tag):
+        self.target.end(tag)
+
+    def handle_data(self, data):
+        self.target.data(data)
+
+
+def make_parser(collector, backend=None):
+    """Incremental parser for collector - 'lxml' if installed, else 'stdlib'"""
+    backend = backend or ("lxml" if etree is not None else "stdlib")
+    if backend == "lxml":
+        return etree.HTMLParser(target=collector, recover=True)
+    return _StdlibParser(collector)
+
+
+def _encoding(first_chunk, content_type):
+    """Charset from the Content-Type header, else a <meta> tag, else UTF-8"""
+    declared = _CHARSET.search(content_type.encode("latin-1", "ignore"))
+    found = declared or _CHARSET.search(first_chunk[:4096])
+    name = found.group(1).decode("ascii", "ignore") if found else "utf-8"
+    try:
+        codecs.lookup(name)
+        return name
+    except LookupError:
+        return "utf-8"
+
+
+def extract_stream(
+    chunks,
+    content_type="",
+    limit=3000,
+    max_bytes=2_000_000,
+    backend=None,
+    stop_early=True,
+):
+    """
+    Main-content text from an iterable of byte chunks (e.g. iter_content).
+
+    Stops consuming chunks once there is comfortably more clear content than
+    limit (unless stop_early is False), or after max_bytes.
+    """
+    collector = BlockCollector()
+    parser = make_parser(collector, backend)
+    decoder = None
+    bytes_read = 0
+    complete = True
+
+    for chunk in chunks:
+        if not chunk:
+            continue
+        if decoder is None:
+            decoder = codecs.getincrementaldecoder(_encoding(chunk, content_type))(
+                errors="replace"
+            )
+        bytes_read += len(chunk)
+        parser.feed(decoder.decode(chunk))
+
+        enough = stop_early and collector.clear_chars > 2 * limit
+        if enough or bytes_read >= max_bytes:
+            complete = False
+            break
+
+    if decoder is not None:
+        parser.feed(decoder.decode(b"", final=True))
+    parser.close()
+    collector.flush()
+
+    text, truncated = collector.select(limit)
+    title = _SPACES.sub(" ", collector.title).strip()
+    return Extract(title, text, truncated or not complete, bytes_read, complete)
+
+
+def extract_html(html, limit=3000, backend=None, stop_early=True, chunk_size=16384):
+    """Same as extract_stream for an in-memory page (str or bytes)"""
+    data = html.encode("utf-8") if isinstance(html, str) else html
+    chunks = (data[i : i + chunk_size] for i in range(0, len(data), chunk_size))
+    content_type = "text/html; charset=utf-8" if isinstance(html, str) else ""
+    return extract_stream(
+        chunks,
+        content_type,
+        limit=limit,
+        max_bytes=len(data) + 1,
+        backend=backend,
+        stop_early=stop_early,
+    )
+
+
+# ========== BENCHMARK ==========
+
+
+def soup_extract(html, limit=3000):
+    """The previous fetch_webpage extraction, for comparison"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    for element in soup(["script", "style", "nav", "footer", "header"]):
+        element.decompose()
+
+    text = soup.get_text()
+    lines = (line.strip() for line in text.splitlines())
+    text = "\n".join(line for line in lines if line)
+    return text[:limit]
+
+
+def synthetic_page(paragraphs=400):
+    """A large, realistic-looking article page (~300 KB) for offline runs"""
+    menu = "".join(f'<li><a href="/s{i}">Section {i}</a></li>' for i in range(60))
+    sentence = (
+        "The harbour was quiet that morning, and the fishing boats, painted "
+        "in faded blues and reds, rocked gently against the stone quay. "
+    )
+    body = "".join(
+        f"<p>{sentence * 3}Paragraph {i}.</p>"
+        + ('<div class="share-buttons"><a href="/x">Share</a></div>' if i % 5 else "")
+        for i in range(paragraphs)
+    )
+    comments = "".join(
+        f'<div class="comment"><a href="/u{i}">user{i}</a> Nice!</div>'
+        for i in range(200)
+    )
+    script = "<script>" + "var x = 1;" * 2000 + "</script>"
+    return (
+        f"<html><head><title>Harbour Mornings</title>{script}</head><body>"
+        f'<header><nav><ul class="menu">{menu}</ul></nav></header>'
+        f'<main><article class="post-content"><h1>Harbour Mornings</h1>{body}'
+        f'</article></main><section id="comments">{comments}</section>'
+        f"<footer>© Example</footer></body></html>"
+    )
+
+
+def _measure(fn, runs):
+    import tracemalloc
+
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(times), peak
+
+
+def run_benchmark(pages, limit=3000, runs=5):
+    """pages: [(name, html_bytes)] → prints a table, returns the rows"""
+    backends = ["lxml", "stdlib"] if etree is not None else ["stdlib"]
+    methods = []
+    for backend in backends:
+        methods.append(
+            (backend, lambda d, b=backend: extract_html(d, limit, backend=b))
+        )
+        methods.append(
+            (
+                f"{backend} whole",
+                lambda d, b=backend: extract_html(d, limit, b, stop_early=False),
+            )
+        )
+    if importlib.util.find_spec("bs4") is not None:
+        methods.append(
+            ("soup (old)", lambda d: soup_extract(d.decode("utf-8", "replace"), limit))
+        )
+
+    print("\n" + "=" * 78)
+    print("     🧪 HTML EXTRACTION BENCHMARK")
+    print("=" * 78)
+    print(
+        f"  {'page':<24}{'size':>8}  {'method':<14}"
+        f"{'time':>9}{'peak mem':>11}{'read':>7}"
+    )
+
+    rows = []
+    for name, data in pages:
+        for method, fn in methods:
+            seconds, peak = _measure(lambda: fn(data), runs)
+            read = ""
+            if method != "soup (old)":
+                read = f"{fn(data).bytes_read / len(data) * 100:.0f}%"
+            print(
+                f"  {name[:23]:<24}{len(data) / 1024:>6.0f}KB  {method:<14}"
+                f"{seconds * 1000:>7.1f}ms{peak / 1024:>9.0f}KB{read:>7}"
+            )
+            rows.append((name, method, seconds, peak))
+    print("=" * 78 + "\n")
+    return rows
+
+
+# ========== CHECK ==========
+
+
+def run_check():
+    passed = True
+
+    def check(label, ok, detail):
+        nonlocal passed
+        passed = passed and ok
+        print(f"  {'✅' if ok else '❌'} {label:<36} {detail!r}"[:110])
+
+    print("\n" + "=" * 70)
+    print("     🧪 HTML EXTRACT CHECK")
+    print("=" * 70)
+
+    article = (
+        "The quarterly report shows revenue grew by twelve percent, driven by "
+        "strong demand in Europe, Asia and South America. "
+    ) * 3
+    webforms = (
+        "<html><body><form id='form1' method='post' action='./page.aspx'>"
+        "<input type='hidden' name='__VIEWSTATE' value='abc'>"
+        f"<div class='content'><p>{article}</p></div>"
+        "<select><option>English</option></select>"
+        "</form></body></html>"
+    )
+    short = "<html><body><p>short answer: 42</p></body></html>"
+
+    backends = ["lxml", "stdlib"] if etree is not None else ["stdlib"]
+    for backend in backends:
+        page = extract_html(webforms, backend=backend)
+        check(
+            f"{backend}: ASP.NET page inside <form>",
+            "revenue grew" in page.text and "English" not in page.text,
+            page.text[:50],
+        )
+        page = extract_html(short, backend=backend)
+        check(f"{backend}: short page", page.text == "short answer: 42", page.text)
+        page = extract_html(synthetic_page(40), backend=backend)
+        check(
+            f"{backend}: menus and comments dropped",
+            "harbour" in page.text
+            and "Section 1" not in page.text
+            and "Nice!" not in page.text,
+            page.text[:50],
+        )
+
+    print("=" * 70)
+    print(f"  {'✅ All checks passed' if passed else '❌ Some checks failed'}\n")
+    return passed
+
+
+def main():
+    import sys
+    from pathlib import Path
+
+    corpus = None
+    limit = 3000
+    runs = 5
+    show = False
+
+    for arg in sys.argv[1:]:
+        if arg.startswith("--corpus="):
+            corpus = Path(arg.split("=", 1)[1])
+        elif arg.startswith("--limit="):
+            limit = int(arg.split("=", 1)[1])
+        elif arg.startswith("--runs="):
+            runs = int(arg.split("=", 1)[1])
+        elif arg == "--show":
+            show = True
+        elif arg == "--check":
+            sys.exit(0 if run_check() else 1)
+        elif arg in ["--help", "-h"]:
+            print(__doc__)
+            return
+
+    if corpus:
+        paths = sorted(corpus.glob("*.htm*"))
+        pages = [(path.name, path.read_bytes()) for path in paths]
+        if not pages:
+            print(f"❌ No .html files in {corpus}")
+            return
+    else:
+        pages = [("synthetic article", synthetic_page().encode("utf-8"))]
+
+    run_benchmark(pages, limit, runs)
+
+    if show:
+        for name, data in pages:
+            page = extract_html(data, limit)
+            print(f"----- {name}: {page.title}\n{page.text}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -22,13 +22,31 @@ import threading
 import queue
 import time
 from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import re
 import pyaudio
-import wave
 import uuid
 
 from tools import ToolBox
 from memory import AssistantMemory
+from wake_word import WakeWordSpotter
+import ollama_client
+from conversation_context import ConversationContext, NUM_CTX
+from tool_executor import ToolExecutor
+from tool_registry import WRITE, Param
+from tool_parser import parse_tool_calls, parse_arguments, strip_tool_calls, unescape
+from phrase_bank import PhraseBank, read_sample_rate, tool_confirmation
+from speech_planner import SpeechPlanner, SpeechPipeline, wait_until_spoken
+from intent_router import IntentRouter
+from turn_tracing import Tracer, NULL_TRACE, add_ollama_timings
+from assistant_state import (
+    AssistantStateMachine,
+    IDLE,
+    LISTENING,
+    THINKING,
+    SPEAKING,
+    PAUSED,
+)
 
 
 class IntelligentAssistant:
@@ -38,9 +56,17 @@ class IntelligentAssistant:
         personality="friendly",
         wake_word_mode=False,
         user_name=None,
+        speak_chars=400,
+        trace_otel=None,
+        native_tools=False,
+        memory_durability="journal",
+        index_files=True,
     ):
         """Initialize the intelligent assistant - FIXED"""
 
+        # State machine (is_speaking / is_paused / is_listening are views of it)
+        self.state = AssistantStateMachine()
+
         # Control flags
         self.is_paused = False
         self.stop_requested = False
@@ -53,6 +79,7 @@ class IntelligentAssistant:
         self.should_stop_audio = False
         self.audio_lock = threading.Lock()
         self.audio_process = None
+        self.speech_pipeline = None  # the reply being spoken (see wait_for_speech)
         self.current_audio_file = None
 
         # Interrupt detection
@@ -71,9 +98,24 @@ class IntelligentAssistant:
             user_name = os.getenv("USERNAME", "friend")
 
         # Initialize memory
-        self.memory = AssistantMemory(user_name=user_name)
+        self.memory = AssistantMemory(
+            user_name=user_name, durability=memory_durability
+        )
+
+        # Per-stage timings of every turn (turn_traces table, optional OTel file)
+        self.tracer = Tracer(self.memory, otel_path=trace_otel)
+
+        # Send the registry's JSON schemas to Ollama instead of parsing TOOL: text
+        self.native_tools = native_tools
+        self.trace = NULL_TRACE
         self.voice_model_path = self.find_voice_model()
 
+        # Long replies are spoken as bounded chunks (speak_chars=0: no summary cap)
+        self.speech_planner = SpeechPlanner(
+            sample_rate=read_sample_rate(self.voice_model_path),
+            summary_chars=speak_chars,
+        )
+
         # Update personality
         stored_personality = self.memory.get_preference("personality")
         if stored_personality:
@@ -85,6 +127,16 @@ class IntelligentAssistant:
         self.output_dir = Path("voice_output")
         self.output_dir.mkdir(exist_ok=True)
 
+        # Pre-synthesized stock phrases (filled in the background)
+        self.phrase_bank = None
+        if self.voice_model_path:
+            self.phrase_bank = PhraseBank(
+                self.voice_model_path,
+                user_name=self.memory.preferences.get("name", user_name),
+                wake_word=self.wake_word,
+            )
+            self.phrase_bank.start_warming()
+
         # Audio settings
         self.recognizer = sr.Recognizer()
         self.recognizer.energy_threshold = 2000
@@ -93,32 +145,142 @@ class IntelligentAssistant:
         self.recognizer.phrase_threshold = 0.3
         self.recognizer.non_speaking_duration = 0.5
 
-        # Conversation context
-        self.conversation_history = []
+        # Wake word spotter (falls back to transcript matching if not enrolled)
+        self.wake_spotter = None
+        if self.wake_word_mode:
+            self.wake_spotter = WakeWordSpotter(self.wake_word)
+            if not self.wake_spotter.ready:
+                print("⚠️  Wake word not enrolled - run with --enroll-wake-word")
 
         # Threading
         self.executor = ThreadPoolExecutor(max_workers=3)
 
+        # Shared Ollama session - load the model while we greet the user
+        self.ollama = ollama_client.get_client()
+        self.executor.submit(
+            self.ollama.warm_up, self.ollama_model, options={"num_ctx": NUM_CTX}
+        )
+
         # Initialize tools
-        self.toolbox = ToolBox()
+        self.toolbox = ToolBox(index_files=index_files)
         self.add_memory_tools()
+        self.tool_executor = ToolExecutor(self.toolbox)
+
+        # Time/date/math/system questions skip the LLM
+        self.router = IntentRouter()
 
         # FIXED: Short, clear system prompt
         self.system_prompt = self.build_system_prompt()
 
+        # Conversation context (stable prefix for Ollama's prompt cache)
+        self.context = ConversationContext(self.system_prompt)
+        self.conversation_history = self.context.turns
+
         self.print_welcome()
 
-    def add_memory_tools(self):
-        """Add memory tools to toolbox"""
-        self.toolbox.tools.update(
-            {
-                "remember_fact": self.memory.add_fact,
-                "recall_facts": self.memory.get_facts,
-                "add_task": self.memory.add_task,
-                "get_tasks": self.memory.get_tasks,
-                "complete_task": self.memory.complete_task,
-                "search_memory": self.memory.search_conversations,
-            }
+    # ========== STATE ==========
+
+    @property
+    def is_speaking(self):
+        return self.state.is_in(SPEAKING)
+
+    @is_speaking.setter
+    def is_speaking(self, value):
+        if value:
+            self.state.set(SPEAKING)
+        else:
+            self.state.set(IDLE, only_from=(SPEAKING,))
+
+    @property
+    def is_paused(self):
+        return self.state.is_in(PAUSED)
+
+    @is_paused.setter
+    def is_paused(self, value):
+        if value:
+            self.state.set(PAUSED)
+        else:
+            self.state.set(IDLE, only_from=(PAUSED,))
+
+    @property
+    def is_listening(self):
+        return self.state.is_in(LISTENING)
+
+    @is_listening.setter
+    def is_listening(self, value):
+        if value:
+            self.state.set(LISTENING, only_from=(IDLE,))
+        else:
+            self.state.set(IDLE, only_from=(LISTENING,))
+
+    def add_memory_tools(self, registry=None, session_id=None):
+        """
+        Add memory tools to toolbox (group "memory" keeps them in order).
+        With a session_id (assistant_server) they only see and change that
+        session's facts, tasks and conversations.
+        """
+        if registry is None:
+            registry = self.toolbox.registry
+        register = registry.register
+        memory = {"category": "memory", "group": "memory"}
+
+        def scoped(method):
+            return partial(method, session_id=session_id) if session_id else method
+
+        register(
+            "remember_fact",
+            scoped(self.memory.add_fact),
+            "Remember a fact about the user",
+            [Param("category"), Param("fact")],
+            effect=WRITE,
+            advertise=False,
+            **memory,
+        )
+        register(
+            "recall_facts",
+            scoped(self.memory.get_facts),
+            "Recall remembered facts",
+            [Param("category", default=None)],
+            advertise=False,
+            **memory,
+        )
+        register(
+            "add_task",
+            scoped(self.memory.add_task),
+            "Add a task to the to-do list",
+            [
+                Param("task"),
+                Param("priority", default="medium", description="low, medium or high"),
+            ],
+            effect=WRITE,
+            **memory,
+        )
+        register(
+            "get_tasks",
+            scoped(self.memory.get_tasks),
+            "List tasks",
+            [
+                Param(
+                    "status", default="pending", description="pending, completed or all"
+                )
+            ],
+            **memory,
+        )
+        register(
+            "complete_task",
+            scoped(self.memory.complete_task),
+            "Mark a task as done",
+            [Param("id", "int")],
+            effect=WRITE,
+            **memory,
+        )
+        register(
+            "search_memory",
+            scoped(self.memory.search_conversations),
+            "Search past conversations",
+            [Param("query"), Param("limit", "int", default=10)],
+            advertise=False,
+            **memory,
         )
 
     def build_system_prompt(self):
@@ -152,11 +314,7 @@ You: Opening Chrome and searching. TOOL: open_app("chrome")
 TOOL: google_search("Python")
 
 AVAILABLE TOOLS:
-write_file(path, content), read_file(path), list_files(dir), rename_file(old, new), delete_file(path)
-google_search(query), open_url(url), fetch_webpage(url)
-open_app(name), run_command(cmd), system_info()
-add_task(task), get_tasks(), complete_task(id)
-calculate(expr), get_current_time(), get_current_date()
+{self.toolbox.registry.prompt_lines()}
 
 Remember: MINIMAL responses only. No chatter."""
 
@@ -197,44 +355,90 @@ Remember: MINIMAL responses only. No chatter."""
 
     # ========== SPEECH RECOGNITION ==========
 
+    def recognize(self, audio):
+        """Speech to text (Google, then Sphinx)"""
+        try:
+            return self.recognizer.recognize_google(audio)
+        except sr.UnknownValueError:
+            try:
+                return self.recognizer.recognize_sphinx(audio)
+            except:
+                raise sr.UnknownValueError
+
+    def listen_for_wake_word(self, timeout=8, phrase_time_limit=15):
+        """Wait for the wake word, then recognize only the command after it"""
+        print(f"\n🎤 Say '{self.wake_word}' to activate...")
+
+        self.is_listening = True
+
+        try:
+            audio = self.wake_spotter.wait_for_wake_word(
+                command_timeout=timeout, phrase_time_limit=phrase_time_limit
+            )
+            if audio is None:
+                return None
+
+            # The wait for the wake word is idle time - the turn starts here
+            self.trace = self.tracer.start(self.session_id)
+
+            print("   🔄 Processing...")
+            with self.trace.span("recognition"):
+                text = self.recognize(audio)
+
+            print(f"\n💬 You: {text}")
+            return text
+
+        except sr.UnknownValueError:
+            self.trace.discard()
+            return None
+
+        except Exception as e:
+            print(f"   ❌ Error: {e}")
+            return None
+
+        finally:
+            self.is_listening = False
+
     def listen(self, timeout=10, phrase_time_limit=20):
         """Listen to microphone - FIXED"""
 
+        if self.wake_spotter and self.wake_spotter.ready:
+            return self.listen_for_wake_word()
+
         if self.wake_word_mode:
             print(f"\n🎤 Say '{self.wake_word}' to activate...")
         else:
             print("\n🎤 Listening...")
 
         self.is_listening = True
+        self.trace = trace = self.tracer.start(self.session_id)
 
         try:
             with sr.Microphone() as source:
                 print("   ⚙️  Calibrating...")
-                self.recognizer.adjust_for_ambient_noise(source, duration=0.5)
+                with trace.span("calibration"):
+                    self.recognizer.adjust_for_ambient_noise(source, duration=0.5)
 
                 print("   ✅ Ready! Speak now...")
 
-                audio = self.recognizer.listen(
-                    source,
-                    timeout=timeout,
-                    phrase_time_limit=phrase_time_limit,
-                )
+                with trace.span("capture"):
+                    audio = self.recognizer.listen(
+                        source,
+                        timeout=timeout,
+                        phrase_time_limit=phrase_time_limit,
+                    )
 
                 print("   🔄 Processing...")
 
-                try:
-                    text = self.recognizer.recognize_google(audio)
-                except sr.UnknownValueError:
-                    try:
-                        text = self.recognizer.recognize_sphinx(audio)
-                    except:
-                        raise sr.UnknownValueError
+                with trace.span("recognition"):
+                    text = self.recognize(audio)
 
                 # Handle wake word
                 if self.wake_word_mode:
                     if self.wake_word.lower() not in text.lower():
                         print(f"   ⚠️  Wake word not detected")
                         self.is_listening = False
+                        trace.discard()
                         return None
                     else:
                         text = text.lower().replace(self.wake_word.lower(), "").strip()
@@ -242,7 +446,12 @@ Remember: MINIMAL responses only. No chatter."""
 
                         if not text:
                             print("   🎤 Listening for command...")
-                            return self.listen(timeout=8, phrase_time_limit=15)
+                            with trace.span("capture", command=True):
+                                audio = self.recognizer.listen(
+                                    source, timeout=8, phrase_time_limit=15
+                                )
+                            with trace.span("recognition", command=True):
+                                text = self.recognize(audio)
 
                 print(f"\n💬 You: {text}")
                 self.is_listening = False
@@ -250,18 +459,21 @@ Remember: MINIMAL responses only. No chatter."""
 
         except sr.WaitTimeoutError:
             self.is_listening = False
+            trace.discard()
             if not self.wake_word_mode:
                 print("   ⏱️  Timeout")
             return None
 
         except sr.UnknownValueError:
             self.is_listening = False
+            trace.discard()
             if not self.wake_word_mode:
                 print("   ❌ Couldn't understand")
             return None
 
         except Exception as e:
             self.is_listening = False
+            trace.discard()
             print(f"   ❌ Error: {e}")
             return None
 
@@ -350,8 +562,12 @@ Remember: MINIMAL responses only. No chatter."""
         # Always print
         print(f"\n🤖 Assistant: {text}\n")
 
+        # The turn's trace ends when its reply has been spoken
+        trace, self.trace = self.trace, NULL_TRACE
+
         # Skip TTS if no model
         if not self.voice_model_path:
+            trace.finish()
             return True
 
         try:
@@ -359,69 +575,60 @@ Remember: MINIMAL responses only. No chatter."""
             self.interrupt_detected = False
             self.pending_response = text
 
-            future = self.executor.submit(self._speak_thread, text)
+            # Speaking starts now - the main loop must not start listening
+            self.is_speaking = True
+            self.executor.submit(self._speak_thread, text, trace)
             return True
 
         except Exception as e:
             print(f"   ⚠️  Speech error: {e}")
+            trace.finish()
             return False
 
-    def _speak_thread(self, text):
+    def _speak_thread(self, text, trace=NULL_TRACE):
         """TTS generation thread"""
+        rate = self.speech_planner.sample_rate
+
+        def synthesize(chunk, timeout):
+            with trace.span("synthesis", chars=len(chunk)):
+                return self._synthesize_chunk(chunk, timeout)
+
+        def play(pcm):
+            with trace.span("playback", seconds=round(len(pcm) / 2 / rate, 2)):
+                self._play_pcm_with_interrupt(pcm, rate)
+
         try:
             with self.audio_lock:
                 if self.should_stop_audio:
                     return
-                self.is_speaking = True
 
             try:
                 self.start_interrupt_listener()
             except:
                 pass
 
-            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_file = self.output_dir / f"response_{timestamp}.wav"
-            self.current_audio_file = output_file
-
             print("   🔊 Speaking...")
 
-            cmd = [
-                "piper",
-                "--model",
-                self.voice_model_path,
-                "--output_file",
-                str(output_file),
-                "--length-scale",
-                "0.95",
-                "--sentence-silence",
-                "0.1",
-            ]
-
-            try:
-                result = subprocess.run(
-                    cmd,
-                    input=text,
-                    text=True,
-                    capture_output=True,
-                    encoding="utf-8",
-                    timeout=20,
-                )
+            # Long tool dumps are printed in full but only summarized aloud
+            text = self.speech_planner.summarize(text)
 
-                if self.should_stop_audio:
-                    return
+            # Stock phrases play instantly; Piper only handles the rest
+            bank_audio, text = [], text
+            if self.phrase_bank:
+                bank_audio, text = self.phrase_bank.split_prefix(text)
 
-                if result.returncode == 0 and output_file.exists():
-                    try:
-                        self._play_audio_with_interrupt(str(output_file))
-                    except Exception as e:
-                        print(f"   ❌ Playback failed: {e}")
+            # Bounded chunks, synthesized ahead of playback
+            pipeline = SpeechPipeline(
+                self.speech_planner,
+                synthesize=synthesize,
+                play=play,
+                should_stop=lambda: self.should_stop_audio or self.interrupt_detected,
+            )
+            self.speech_pipeline = pipeline
+            pipeline.run(self.speech_planner.plan(text), preface=bank_audio)
 
-            except subprocess.TimeoutExpired:
-                print("   ❌ TTS timeout")
-            except FileNotFoundError:
-                print("   ❌ Piper not found")
-            except Exception as e:
-                print(f"   ❌ TTS error: {e}")
+            if not self.should_stop_audio and not self.interrupt_detected:
+                print("   ✅ Done\n")
 
         except Exception as e:
             print(f"   ❌ Speech error: {e}")
@@ -430,34 +637,80 @@ Remember: MINIMAL responses only. No chatter."""
             self.is_speaking = False
             if not self.is_paused:
                 self.pending_response = ""
+            trace.finish()
+
+    def wait_for_speech(self):
+        """
+        Block until the reply has been spoken. A long reply takes as long as
+        it takes - audio is only cut off if its pipeline stops draining.
+        """
+        if wait_until_spoken(
+            self.state, self.speech_planner, lambda: self.speech_pipeline
+        ):
+            return True
+        print("   ⚠️  Speech stalled, continuing...")
+        self.stop_audio()
+        return False
+
+    def _synthesize_chunk(self, text, timeout):
+        """Piper → raw 16-bit mono PCM for one chunk (None on failure)"""
+        cmd = [
+            "piper",
+            "--model",
+            self.voice_model_path,
+            "--output_raw",
+            "--length-scale",
+            "0.95",
+            "--sentence-silence",
+            "0.1",
+        ]
 
-    def _play_audio_with_interrupt(self, audio_file):
-        """Play audio with interrupt support"""
         try:
-            wf = wave.open(audio_file, "rb")
-            p = pyaudio.PyAudio()
+            with self.audio_lock:
+                if self.should_stop_audio:
+                    return None
+                process = subprocess.Popen(
+                    cmd,
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                )
+                self.audio_process = process
+
+            try:
+                pcm, _ = process.communicate(text.encode("utf-8"), timeout=timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.communicate()
+                print(f"   ❌ TTS timeout ({timeout:.0f}s)")
+                return None
+
+            return pcm if process.returncode == 0 and pcm else None
+
+        except FileNotFoundError:
+            print("   ❌ Piper not found")
+            return None
+        except Exception as e:
+            print(f"   ❌ TTS error: {e}")
+            return None
 
+    def _play_pcm_with_interrupt(self, pcm, sample_rate):
+        """Play raw 16-bit mono PCM with interrupt support"""
+        try:
+            p = pyaudio.PyAudio()
             stream = p.open(
-                format=p.get_format_from_width(wf.getsampwidth()),
-                channels=wf.getnchannels(),
-                rate=wf.getframerate(),
-                output=True,
+                format=pyaudio.paInt16, channels=1, rate=sample_rate, output=True
             )
 
-            chunk = 1024
-            data = wf.readframes(chunk)
-
-            while data and not self.should_stop_audio and not self.interrupt_detected:
-                stream.write(data)
-                data = wf.readframes(chunk)
+            chunk = 2048
+            for i in range(0, len(pcm), chunk):
+                if self.should_stop_audio or self.interrupt_detected:
+                    break
+                stream.write(pcm[i : i + chunk])
 
             stream.stop_stream()
             stream.close()
             p.terminate()
-            wf.close()
-
-            if not self.should_stop_audio and not self.interrupt_detected:
-                print("   ✅ Done\n")
 
         except Exception as e:
             print(f"   ❌ Playback error: {e}")
@@ -468,39 +721,52 @@ Remember: MINIMAL responses only. No chatter."""
         """Process with AI - FIXED for speed and accuracy"""
 
         print(f"🧠 Thinking...")
+        self.state.set(THINKING, only_from=(IDLE, LISTENING))
 
         if self.stop_requested:
             self.stop_requested = False
 
-        try:
-            # Build messages
-            messages = [{"role": "system", "content": self.system_prompt}]
+        trace = self.trace
+        trace.user_message = user_message
 
-            # Only last 4 exchanges
-            recent_history = self.conversation_history[-8:]
-            messages.extend(recent_history)
+        try:
+            # Fast path - deterministic questions go straight to the tool
+            route = self.router.route(user_message)
+            routed = None
+            if route:
+                with trace.span(f"tool:{route.tool}", routed=True):
+                    routed = self.run_route(route)
+            if routed:
+                ai_response, tools_used = routed
+                self.context.add_turn(user_message, ai_response)
+                self.memory.save_conversation(
+                    user_message, ai_response, tools_used, self.session_id
+                )
+                return ai_response
 
-            # Add current message
-            messages.append({"role": "user", "content": user_message})
+            # Build messages - append-only so the prompt prefix stays cached
+            messages = self.context.build_messages(user_message)
 
             print("   ⚡ Generating...")
 
             try:
-                response = requests.post(
-                    "http://localhost:11434/api/chat",
-                    json={
-                        "model": self.ollama_model,
-                        "messages": messages,
-                        "stream": False,
-                        "options": {
-                            "temperature": 0.6,  # More focused
-                            "top_p": 0.85,
-                            "num_predict": 150,  # Shorter responses
-                            "stop": ["User:", "Human:", "\n\n\n", "Master"],
-                        },
-                    },
-                    timeout=25,
-                )
+                with trace.span("llm", model=self.ollama_model) as llm:
+                    response = self.ollama.chat(
+                        self.ollama_model,
+                        messages,
+                        options=self.context.options(
+                            temperature=0.6,  # More focused
+                            top_p=0.85,
+                            num_predict=150,  # Shorter responses
+                            stop=["User:", "Human:", "\n\n\n", "Master"],
+                        ),
+                        timeout=25,
+                        tools=(
+                            self.toolbox.registry.ollama_tools()
+                            if self.native_tools
+                            else None
+                        ),
+                    )
 
             except requests.exceptions.ConnectionError:
                 return "❌ Ollama not running. Start with: ollama serve"
@@ -512,94 +778,96 @@ Remember: MINIMAL responses only. No chatter."""
                 return f"❌ Ollama error: {response.status_code}"
 
             result = response.json()
-            ai_response = result.get("message", {}).get("content", "")
+            message = result.get("message", {})
+            ai_response = message.get("content", "")
+            tool_calls = message.get("tool_calls")
+            eval_stats = self.context.record_eval(result)
+            add_ollama_timings(trace, llm, eval_stats)
 
-            if not ai_response or len(ai_response.strip()) < 2:
+            if not tool_calls and (not ai_response or len(ai_response.strip()) < 2):
                 return "❌ Empty response. Try again."
 
-            print(f"   ✅ Response ({len(ai_response)} chars)")
+            print(
+                f"   ✅ Response ({len(ai_response)} chars, "
+                f"prompt eval {eval_stats['prompt_tokens']} tokens / {eval_stats['prompt_ms']:.0f}ms)"
+            )
 
             # FIXED: Execute tools if present
             tools_used = []
-            if "TOOL:" in ai_response:
+            if tool_calls:
+                print("   🛠️  Executing tools (native)...")
+                ai_response, tools_used = self.execute_native_tools(
+                    ai_response, tool_calls, trace
+                )
+            elif "TOOL:" in ai_response:
                 print("   🛠️  Executing tools...")
-                ai_response, tools_used = self.execute_tools_from_response(ai_response)
+                ai_response, tools_used = self.execute_tools_from_response(
+                    ai_response, trace
+                )
 
             # Update history
-            self.conversation_history.append({"role": "user", "content": user_message})
-            self.conversation_history.append(
-                {"role": "assistant", "content": ai_response}
-            )
+            self.context.add_turn(user_message, ai_response)
 
             # Save to memory
             self.memory.save_conversation(
                 user_message, ai_response, tools_used, self.session_id
             )
 
-            # Keep history short
-            if len(self.conversation_history) > 12:
-                self.conversation_history = self.conversation_history[-12:]
-
             return ai_response
 
         except Exception as e:
             print(f"   ❌ Error: {e}")
             return "❌ Something went wrong."
 
+        finally:
+            self.state.set(IDLE, only_from=(THINKING,))
+
+    def run_route(self, route):
+        """Run a routed tool → (reply, tools_used), or None to ask the LLM"""
+        result = self.toolbox.execute_tool(route.tool, route.params)
+        output = str(result["output"])
+
+        if not result["success"] or output.startswith("❌"):
+            print(f"   🧭 Router: {route.tool} failed → LLM")
+            return None
+
+        tools_used = [
+            {
+                "tool": route.tool,
+                "params": route.params[:2],
+                "success": True,
+                "output": output[:200],
+            }
+        ]
+        return output, tools_used
+
     # ========== TOOL EXECUTION (COMPLETELY REWRITTEN - FIXED!) ==========
 
-    def execute_tools_from_response(self, ai_response):
+    def execute_tools_from_response(self, ai_response, trace=NULL_TRACE):
         """Execute tools from AI response - FIXED"""
 
         tools_used = []
 
         try:
-            # FIXED: Better pattern that handles TOOL: lines
-            tool_pattern = r"TOOL:\s*(\w+)\s*\((.*?)\)"
+            # Single-pass parser - handles nested parens, quotes and escapes
+            parsed = parse_tool_calls(ai_response)
 
-            matches = re.findall(tool_pattern, ai_response, re.DOTALL)
-
-            if not matches:
+            if not parsed:
                 print("   ⚠️  No valid tool calls found")
                 return ai_response, tools_used
 
-            print(f"   ✅ Found {len(matches)} tool(s)")
-
-            results = []
-
-            for tool_name, params_str in matches:
-                print(f"\n   🔧 {tool_name}")
-                print(f"      Raw params: {params_str[:50]}")
+            print(f"   ✅ Found {len(parsed)} tool(s)")
 
-                # Parse parameters
-                params = self.parse_tool_parameters(params_str)
-
-                print(f"      Parsed params: {params}")
-
-                # Execute tool
-                result = self.toolbox.execute_tool(tool_name, params)
-
-                # Store result
-                tools_used.append(
-                    {
-                        "tool": tool_name,
-                        "params": params[:2],
-                        "success": result["success"],
-                        "output": result["output"][:200],
-                    }
-                )
+            registry = self.toolbox.registry
+            calls = [
+                (call.name, registry.arrange(call.name, call.params, call.keywords))
+                for call in parsed
+            ]
 
-                if result["success"]:
-                    output_preview = result["output"][:300]
-                    results.append(f"✅ {output_preview}")
-                    print(f"      ✅ Success")
-                else:
-                    results.append(f"❌ {result['output'][:300]}")
-                    print(f"      ❌ Failed: {result['output'][:80]}")
+            results, tools_used = self.run_tool_calls(calls, trace)
 
-            # Remove TOOL: lines from response
-            clean_response = re.sub(r"TOOL:.*?\)", "", ai_response, flags=re.DOTALL)
-            clean_response = re.sub(r"\n\n+", "\n\n", clean_response).strip()
+            # Remove TOOL: calls from response
+            clean_response = strip_tool_calls(ai_response, parsed)
 
             # Add tool results
             if results:
@@ -608,7 +876,7 @@ Remember: MINIMAL responses only. No chatter."""
                 if clean_response:
                     final_response = f"{clean_response}{result_text}"
                 else:
-                    final_response = result_text.strip()
+                    final_response = self.confirm(tools_used, result_text.strip())
 
                 return final_response, tools_used
 
@@ -621,77 +889,85 @@ Remember: MINIMAL responses only. No chatter."""
             traceback.print_exc()
             return ai_response, tools_used
 
-    def parse_tool_parameters(self, params_str):
-        """Parse tool parameters - COMPLETELY FIXED"""
+    def run_tool_calls(self, calls, trace=NULL_TRACE):
+        """Run [(tool_name, params)] → (result lines, tools_used)"""
 
-        if not params_str or not params_str.strip():
-            return []
+        tools_used = []
+
+        # Execute tools - independent calls run concurrently
+        started = time.perf_counter()
+        tool_results = self.tool_executor.run(calls)
+        print(f"   ⏱️  Tools took {time.perf_counter() - started:.2f}s")
 
-        params = []
-        params_str = params_str.strip()
-
-        # Handle simple cases first
-        if '"' not in params_str and "'" not in params_str:
-            # No quotes - just split by comma
-            parts = [p.strip() for p in params_str.split(",")]
-            return [p for p in parts if p]
-
-        # Complex parsing for quoted strings
-        current_param = ""
-        in_quotes = False
-        quote_char = None
-        depth = 0
-
-        i = 0
-        while i < len(params_str):
-            char = params_str[i]
-
-            # Handle escape sequences
-            if char == "\\" and i + 1 < len(params_str):
-                current_param += params_str[i : i + 2]
-                i += 2
-                continue
-
-            # Handle quotes
-            if char in ['"', "'"] and (i == 0 or params_str[i - 1] != "\\"):
-                if not in_quotes:
-                    in_quotes = True
-                    quote_char = char
-                elif char == quote_char:
-                    in_quotes = False
-                    quote_char = None
-                current_param += char
-
-            # Handle nested structures
-            elif char in "([{" and not in_quotes:
-                depth += 1
-                current_param += char
-
-            elif char in ")]}" and not in_quotes:
-                depth -= 1
-                current_param += char
-
-            # Handle comma separator
-            elif char == "," and not in_quotes and depth == 0:
-                if current_param.strip():
-                    params.append(self.clean_parameter(current_param.strip()))
-                current_param = ""
-                i += 1
-                continue
+        results = []
 
+        for (tool_name, params), result in zip(calls, tool_results):
+            print(f"\n   🔧 {tool_name} ({result['elapsed']:.2f}s)")
+            trace.add_span(
+                f"tool:{tool_name}",
+                result["started"],
+                result["started"] + result["elapsed"],
+                success=result["success"],
+            )
+            print(f"      Parsed params: {params}")
+
+            # Store result
+            tools_used.append(
+                {
+                    "tool": tool_name,
+                    "params": params[:2],
+                    "success": result["success"],
+                    "output": result["output"][:200],
+                }
+            )
+
+            if result["success"]:
+                output_preview = result["output"][:300]
+                results.append(f"✅ {output_preview}")
+                print(f"      ✅ Success")
             else:
-                current_param += char
+                results.append(f"❌ {result['output'][:300]}")
+                print(f"      ❌ Failed: {result['output'][:80]}")
+
+        return results, tools_used
+
+    def execute_native_tools(self, ai_response, tool_calls, trace=NULL_TRACE):
+        """Execute message.tool_calls from Ollama's native tool calling"""
+
+        calls = self.toolbox.registry.from_ollama(tool_calls)
+        print(f"   ✅ Found {len(calls)} tool(s)")
+
+        results, tools_used = self.run_tool_calls(calls, trace)
+        clean_response = (ai_response or "").strip()
+        result_text = "\n".join(results)
+
+        if clean_response and result_text:
+            return f"{clean_response}\n\n{result_text}", tools_used
+        if result_text:
+            return self.confirm(tools_used, result_text), tools_used
+        return clean_response or "Done.", tools_used
+
+    def confirm(self, tools_used, result_text):
+        """
+        Lead a tools-only reply with the tool's stock confirmation - it is in
+        the phrase bank, so it plays while the rest is synthesized
+        """
+        if not tools_used or not all(t["success"] for t in tools_used):
+            return result_text
+        first = tools_used[0]
+        confirmation = tool_confirmation(first["tool"], first["params"])
+        return f"{confirmation}\n{result_text}" if confirmation else result_text
 
-            i += 1
+    def parse_tool_parameters(self, params_str):
+        """Parse tool parameters"""
 
-        # Add last parameter
-        if current_param.strip():
-            params.append(self.clean_parameter(current_param.strip()))
+        if not params_str or not params_str.strip():
+            return []
 
-        return params
+        return parse_arguments(params_str)
 
     def clean_parameter(self, param):
-        """Clean a single parameter - IMPROVED"""
+        """Clean a single parameter"""
 
         param = param.strip()
 
@@ -706,15 +982,30 @@ Remember: MINIMAL responses only. No chatter."""
             ):
                 param = param[1:-1]
 
-        # Unescape
-        param = param.replace("\\n", "\n")
-        param = param.replace("\\t", "\t")
-        param = param.replace("\\r", "\r")
-        param = param.replace('\\"', '"')
-        param = param.replace("\\'", "'")
-        param = param.replace("\\\\", "\\")
+        # Unescape (single pass)
+        return unescape(param)
 
-        return param
+    # ========== FULL-DUPLEX LOOP (ASYNCIO CORE) ==========
+
+    def run_duplex(self):
+        """Run the asyncio pipeline - listens while thinking and speaking"""
+        import asyncio
+        from assistant_core import AssistantCore
+
+        print("=" * 70 + "\n")
+        print("🔁 Full-duplex mode: talk over me to interrupt\n")
+
+        try:
+            asyncio.run(AssistantCore(self).run())
+        except KeyboardInterrupt:
+            print("\n\n⏹️  Stopped (Ctrl+C)")
+        finally:
+            print("\n" + "=" * 70)
+            print("🔌 Shutting down...")
+            print("👋 Goodbye!")
+            print("=" * 70 + "\n")
+
+            self.shutdown()
 
     # ========== MAIN CONVERSATION LOOP (CRASH-PROOF) ==========
 
@@ -745,23 +1036,10 @@ Remember: MINIMAL responses only. No chatter."""
         try:
             while self.conversation_active:
                 try:
-                    # Wait for speech to finish (with timeout)
-                    wait_count = 0
-                    while self.is_speaking and not self.is_paused:
-                        time.sleep(0.1)
-                        wait_count += 1
-
-                        if wait_count > 300:  # 30 second timeout
-                            print("   ⚠️  Timeout, continuing...")
-                            self.is_speaking = False
-                            break
-
-                    # Don't listen while paused
-                    if self.is_paused:
-                        time.sleep(0.5)
-                        continue
+                    # Wait for speech to finish - woken as soon as it does
+                    self.wait_for_speech()
 
-                    # Listen for input
+                    # Listen for input (while paused, only to hear "continue")
                     print(f"\n{'='*70}")
                     print(f"💬 Turn #{conversation_count + 1}")
                     print("=" * 70)
@@ -776,15 +1054,16 @@ Remember: MINIMAL responses only. No chatter."""
                     consecutive_errors = 0
 
                     # Handle continue command
-                    if self.is_paused and "continue" in user_text.lower():
+                    if self.is_paused:
                         self.is_paused = False
-                        if self.pending_response:
-                            print("   ▶️  Resuming...")
-                            try:
-                                self.speak(self.pending_response)
-                            except:
-                                pass
-                        continue
+                        if "continue" in user_text.lower():
+                            if self.pending_response:
+                                print("   ▶️  Resuming...")
+                                try:
+                                    self.speak(self.pending_response)
+                                except:
+                                    pass
+                            continue
 
                     # Exit detection
                     exit_phrases = [
@@ -804,7 +1083,7 @@ Remember: MINIMAL responses only. No chatter."""
 
                         try:
                             self.speak(farewell)
-                            time.sleep(2)
+                            self.wait_for_speech()
                         except:
                             pass
 
@@ -820,6 +1099,7 @@ Remember: MINIMAL responses only. No chatter."""
                             f"   ⚠️  Error {consecutive_errors}/{max_consecutive_errors}"
                         )
 
+                        self.trace.finish()
                         if consecutive_errors >= max_consecutive_errors:
                             print("\n❌ Too many errors. Check Ollama.")
                             break
@@ -836,6 +1116,7 @@ Remember: MINIMAL responses only. No chatter."""
                     else:
                         print("   ⏹️  Skipped (interrupted)")
                         self.stop_requested = False
+                        self.trace.finish()
 
                     conversation_count += 1
                     print("-" * 70)
@@ -846,6 +1127,7 @@ Remember: MINIMAL responses only. No chatter."""
                 except Exception as e:
                     consecutive_errors += 1
                     print(f"\n   ❌ Error: {e}")
+                    self.trace.finish()
 
                     if consecutive_errors >= max_consecutive_errors:
                         print("\n❌ Too many errors. Exiting...")
@@ -873,12 +1155,43 @@ Remember: MINIMAL responses only. No chatter."""
             print("👋 Goodbye!")
             print("=" * 70 + "\n")
 
-            self.conversation_active = False
+            self.shutdown()
 
-            try:
-                self.executor.shutdown(wait=False)
-            except:
-                pass
+    def shutdown(self):
+        """Stop every background worker and save what is pending (both modes)"""
+        self.conversation_active = False
+        self.state.stop()
+
+        print(self.context.get_stats())
+        print(self.router.get_stats())
+        print(self.speech_planner.get_stats())
+        print(self.toolbox.cache.get_stats())
+        if self.toolbox.file_index is not None:
+            print(self.toolbox.file_index.get_stats())
+        print(self.toolbox.metrics.get_stats())
+        print(self.toolbox.sandbox.get_stats())
+
+        if self.phrase_bank:
+            print(self.phrase_bank.get_stats())
+
+        if self.wake_spotter and self.wake_spotter.ready:
+            print(self.wake_spotter.get_stats())
+
+        try:
+            self.executor.shutdown(wait=False)
+            self.tool_executor.shutdown()
+            self.toolbox.metrics.stop()
+            self.toolbox.sandbox.close()
+        except:
+            pass
+
+        self.tracer.close()
+        print(f"🔬 Traces saved: {self.tracer.stats['written']} turns")
+
+        # After the tracer - its writer thread saves through the pool
+        self.memory.close()
+        print(self.memory.conversation_log.get_stats())
+        print(self.memory.db.get_stats())
 
 
 # ========== ENTRY POINT ==========
@@ -892,7 +1205,14 @@ def main():
     model = "mistral"
     personality = "friendly"
     wake_word_mode = False
+    enroll_wake_word = False
+    duplex = False
     user_name = None
+    ollama_url = None
+    speak_chars = 400
+    trace_otel = None
+    native_tools = False
+    memory_durability = "journal"
 
     # Parse arguments
     args = sys.argv[1:]
@@ -903,6 +1223,12 @@ def main():
         if arg in ["--wake-word", "-w"]:
             wake_word_mode = True
 
+        elif arg == "--enroll-wake-word":
+            enroll_wake_word = True
+
+        elif arg in ["--duplex", "-d"]:
+            duplex = True
+
         elif arg.startswith("--model="):
             model = arg.split("=", 1)[1]
 
@@ -912,6 +1238,24 @@ def main():
         elif arg.startswith("--name="):
             user_name = arg.split("=", 1)[1]
 
+        elif arg.startswith("--ollama-url="):
+            ollama_url = arg.split("=", 1)[1]
+
+        elif arg.startswith("--speak-chars="):
+            try:
+                speak_chars = int(arg.split("=", 1)[1])
+            except ValueError:
+                print(f"⚠️  --speak-chars needs a number - using {speak_chars}")
+
+        elif arg.startswith("--trace-otel="):
+            trace_otel = arg.split("=", 1)[1]
+
+        elif arg == "--native-tools":
+            native_tools = True
+
+        elif arg.startswith("--memory-durability="):
+            memory_durability = arg.split("=", 1)[1]
+
         elif arg in ["--help", "-h"]:
             print(
                 """
@@ -923,7 +1267,14 @@ OPTIONS:
   --model=MODEL          Ollama model (default: mistral)
   --personality=TYPE     Personality (default: friendly)
   --name=NAME            Your name
+  --ollama-url=URL       Ollama server (default: $OLLAMA_HOST or localhost:11434)
   --wake-word, -w        Enable wake word mode
+  --enroll-wake-word     Record the wake word for the local spotter
+  --duplex, -d           Full-duplex mode (listen while speaking, barge-in)
+  --speak-chars=N        Speak at most N chars of tool output (0 = all, default: 400)
+  --trace-otel=FILE      Also append turn traces to FILE as OpenTelemetry JSON
+  --native-tools         Use Ollama's tool calling (needs a model that supports it)
+  --memory-durability=M  journal (survives a crash, default) or memory (faster)
   --help, -h             Show this help
 
 EXAMPLES:
@@ -935,6 +1286,10 @@ EXAMPLES:
 
         i += 1
 
+    if enroll_wake_word:
+        WakeWordSpotter().enroll()
+        return
+
     # Print startup
     print("\n" + "=" * 70)
     print("     🚀 STARTING AI ASSISTANT")
@@ -945,14 +1300,12 @@ EXAMPLES:
 
     # Check Ollama
     print("\n🔍 Checking Ollama...")
-    try:
-        response = requests.get("http://localhost:11434/api/tags", timeout=3)
-        if response.status_code == 200:
-            print("   ✅ Ollama running")
-        else:
-            print("   ❌ Ollama not responding")
-            return
-    except:
+    if ollama_url:
+        ollama_client.configure(base_url=ollama_url)
+
+    if ollama_client.get_client().is_running():
+        print("   ✅ Ollama running")
+    else:
         print("   ❌ Ollama not running!")
         print("   💡 Start with: ollama serve")
         return
@@ -992,9 +1345,16 @@ EXAMPLES:
         personality=personality,
         wake_word_mode=wake_word_mode,
         user_name=user_name,
+        speak_chars=speak_chars,
+        trace_otel=trace_otel,
+        native_tools=native_tools,
+        memory_durability=memory_durability,
     )
 
-    assistant.run()
+    if duplex:
+        assistant.run_duplex()
+    else:
+        assistant.run()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,361 @@
+# -*- coding: utf-8 -*-
+"""
+Intent Router - Fast path for deterministic questions
+"What time is it", "calculate 15% of 200", "convert 5 km to miles" don't need
+the LLM. High-confidence matches go straight to the ToolBox function; anything
+ambiguous (low confidence, several requests in one sentence) falls back to
+process_with_ai as before.
+
+    python intent_router.py --bench[=ROUNDS]   (full turns, mock Ollama)
+"""
+
+import re
+import time
+from collections import namedtuple
+
+
+Route = namedtuple("Route", "tool params confidence intent")
+
+# Polite filler and the wake word don't change the intent
+_FILLER = re.compile(
+    r"^(?:(?:hey|ok|okay|jarvis|please|can you|could you|tell me|"
+    r"do you know|quick question)[\s,]+)+|[\s,]*(?:please|thanks|thank you)?[?.!\s]*$",
+    re.IGNORECASE,
+)
+
+# More than one request → let the LLM plan it
+_COMPOUND = re.compile(r"\b(?:and then|and also|then|and)\b", re.IGNORECASE)
+
+_NUMBER = r"-?\d+(?:\.\d+)?"
+
+_SPOKEN_OPERATORS = [
+    (re.compile(r"\bmultiplied by\b|\btimes\b|\bx\b", re.I), "*"),
+    (re.compile(r"\bdivided by\b|\bover\b", re.I), "/"),
+    (re.compile(r"\bplus\b", re.I), "+"),
+    (re.compile(r"\bminus\b", re.I), "-"),
+    (re.compile(r"\bto the power of\b|\bsquared\b", re.I), "^"),
+    (
+        re.compile(rf"({_NUMBER})\s*(?:%|percent)\s*of\s*({_NUMBER})", re.I),
+        r"(\1/100*\2)",
+    ),
+]
+
+# Spoken plurals → the singular names ToolBox.convert_units uses
+_UNIT_ALIASES = {
+    "meters": "meter",
+    "metres": "meter",
+    "metre": "meter",
+    "kilometers": "kilometer",
+    "kilometres": "kilometer",
+    "centimeters": "centimeter",
+    "millimeters": "millimeter",
+    "miles": "mile",
+    "feet": "foot",
+    "inches": "inch",
+    "grams": "gram",
+    "kilograms": "kilogram",
+    "kilos": "kg",
+    "milligrams": "milligram",
+    "pounds": "pound",
+    "lbs": "lb",
+    "ounces": "ounce",
+}
+
+_MATH_CHARS = re.compile(r"^[\d+\-*/().^%\s]+$")
+
+
+def spoken_math(text):
+    """'15% of 200' → '(15/100*200)', '3 times 4' → '3 * 4'"""
+    for pattern, replacement in _SPOKEN_OPERATORS:
+        text = pattern.sub(replacement, text)
+    text = re.sub(r"(\d)\s*\^\s*$", r"\1^2", text)  # "5 squared"
+    return text.strip()
+
+
+class IntentRouter:
+    """Compiled pattern index mapping utterances to ToolBox calls"""
+
+    def __init__(self, threshold=0.8, log_size=100):
+        self.threshold = threshold
+        self.log_size = log_size
+        self.log = []  # recent routing decisions
+
+        # (intent, compiled pattern, tool, param builder)
+        self.rules = [
+            (
+                "time",
+                re.compile(
+                    r"(?:what(?:'s| is) the )?(?:current )?time"
+                    r"(?: is it)?(?: now| right now)?"
+                    r"|what time is it(?: now| right now)?",
+                    re.I,
+                ),
+                "get_current_time",
+                lambda m: [],
+            ),
+            (
+                "date",
+                re.compile(
+                    r"what(?:'s| is) (?:the |today'?s )?date(?: today)?"
+                    r"|what day is (?:it|today)|today'?s date|(?:the )?date today",
+                    re.I,
+                ),
+                "get_current_date",
+                lambda m: [],
+            ),
+            (
+                "convert",
+                re.compile(
+                    rf"convert ({_NUMBER}) ?([a-z]+) (?:to|into|in) ([a-z]+)"
+                    rf"|(?:what(?:'s| is) |how much is )?"
+                    rf"({_NUMBER}) ?([a-z]+) (?:to|in|into) ([a-z]+)",
+                    re.I,
+                ),
+                "convert_units",
+                lambda m: [
+                    m.group(1) or m.group(4),
+                    self._unit(m.group(2) or m.group(5)),
+                    self._unit(m.group(3) or m.group(6)),
+                ],
+            ),
+            (
+                "calculate",
+                re.compile(
+                    r"(?:calculate|compute|what(?:'s| is)|how much is) (.+)", re.I
+                ),
+                "calculate",
+                self._math_params,
+            ),
+            (
+                "system_info",
+                re.compile(
+                    r"(?:show |get )?(?:my )?(?:system info(?:rmation)?|system status"
+                    r"|cpu usage|memory usage|ram usage"
+                    r"|how(?:'s| is) my (?:pc|computer) doing)",
+                    re.I,
+                ),
+                "system_info",
+                lambda m: [],
+            ),
+            (
+                "running_apps",
+                re.compile(
+                    r"(?:list |show )?(?:the )?(?:running apps|running applications"
+                    r"|running programs|what(?:'s| is) running)",
+                    re.I,
+                ),
+                "list_running_apps",
+                lambda m: [],
+            ),
+        ]
+
+        # Word-bounded variants for matching inside longer sentences
+        self._bounded = {
+            intent: re.compile(rf"\b(?:{pattern.pattern})\b", pattern.flags)
+            for intent, pattern, _, _ in self.rules
+        }
+
+    def _unit(self, unit):
+        """'miles' → 'mile' so ToolBox.convert_units knows it"""
+        unit = unit.lower()
+        return _UNIT_ALIASES.get(unit, unit)
+
+    def _math_params(self, match):
+        expression = spoken_math(match.group(1))
+        if not _MATH_CHARS.match(expression) or not re.search(r"\d", expression):
+            return None
+        return [expression]
+
+    def route(self, text):
+        """Best high-confidence Route for text, or None for the LLM"""
+        started = time.perf_counter()
+        decision = self._match(text)
+        elapsed = (time.perf_counter() - started) * 1000
+
+        self.log.append(
+            {
+                "text": text,
+                "intent": decision.intent if decision else None,
+                "confidence": decision.confidence if decision else 0.0,
+                "routed": bool(decision and decision.confidence >= self.threshold),
+                "ms": elapsed,
+            }
+        )
+        if len(self.log) > self.log_size:
+            del self.log[: -self.log_size]
+
+        if decision is None:
+            return None
+
+        if decision.confidence < self.threshold:
+            print(
+                f"   🧭 Router: '{decision.intent}' only "
+                f"{decision.confidence:.2f} → LLM"
+            )
+            return None
+
+        print(
+            f"   🧭 Router: {decision.tool}({', '.join(decision.params)}) "
+            f"[{decision.confidence:.2f}, {elapsed:.2f}ms]"
+        )
+        return decision
+
+    def _match(self, text):
+        utterance = _FILLER.sub("", text.strip())
+        if not utterance:
+            return None
+
+        compound = bool(_COMPOUND.search(utterance))
+
+        # The whole utterance is the request → high confidence. Otherwise a
+        # rule matching somewhere inside a longer sentence is only a guess.
+        for confidence, matcher in ((0.95, "fullmatch"), (0.6, "search")):
+            for intent, pattern, tool, build in self.rules:
+                if matcher == "search":
+                    pattern = self._bounded[intent]
+                match = getattr(pattern, matcher)(utterance)
+                if not match:
+                    continue
+
+                params = build(match)
+                if params is None:
+                    continue
+
+                if compound and intent != "calculate":
+                    confidence = min(confidence, 0.5)
+
+                return Route(tool, params, confidence, intent)
+
+        return None
+
+    def get_stats(self):
+        """How many turns skipped the LLM"""
+        total = len(self.log)
+        routed = sum(1 for d in self.log if d["routed"])
+        avg_ms = sum(d["ms"] for d in self.log) / total if total else 0.0
+        return (
+            f"🧭 Router: {routed}/{total} recent turns answered without the LLM | "
+            f"avg {avg_ms:.2f}ms per decision"
+        )
+
+
+# ========== BENCHMARK ==========
+
+# Scripted turns: questions the router answers, then ones it leaves to the LLM
+BENCH_SCRIPT = [
+    "what time is it",
+    "what's the date today",
+    "calculate 15% of 200",
+    "what is 12 times 7",
+    "convert 5 km to miles",
+    "convert 3 pounds to kg",
+    "what should I cook for dinner tonight",
+    "give me a fun fact about space",
+    "tell me the time and then open notepad",
+]
+
+
+class _NoRoute:
+    """Stands in for the router: every turn goes to the LLM"""
+
+    def route(self, text):
+        return None
+
+    def get_stats(self):
+        return "🧭 Router: off"
+
+
+def run_benchmark(rounds=3, ttft=0.25, tokens_per_second=25.0):
+    """
+    End-to-end process_with_ai turns over BENCH_SCRIPT against
+    latency_bench's mock Ollama - once with the router, once with every
+    turn sent to the LLM. Best of `rounds` per utterance.
+    """
+    import contextlib
+    import io
+    import os
+    import shutil
+    import tempfile
+
+    import ollama_client
+    from intelligent_assistant import IntelligentAssistant
+    from latency_bench import MockOllamaServer, Recorder
+
+    workdir = tempfile.mkdtemp(prefix="intent_router_bench_")
+    home = os.getcwd()
+    os.chdir(workdir)  # the assistant's memory and output dirs go here
+    mock = MockOllamaServer(Recorder(), ttft, tokens_per_second)
+    quiet = io.StringIO()  # the assistant's per-turn prints
+
+    try:
+        ollama_client.configure(base_url=mock.start())
+        with contextlib.redirect_stdout(quiet):
+            assistant = IntelligentAssistant(
+                ollama_model="bench", user_name="bench", index_files=False
+            )
+        router = assistant.router
+
+        def turn(text, with_router):
+            assistant.router = router if with_router else _NoRoute()
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(quiet):
+                assistant.process_with_ai(text)
+            return time.perf_counter() - started
+
+        print("\n" + "=" * 70)
+        print(
+            f"     🧭 INTENT ROUTER BENCHMARK - full turns, mock LLM "
+            f"(TTFT {ttft * 1000:.0f}ms @ {tokens_per_second:.0f} tok/s)"
+        )
+        print("=" * 70)
+        print(f"  {'utterance':<40}{'path':>8}{'router':>10}{'LLM':>10}")
+
+        routed_times, llm_times, routed_count = [], [], 0
+        for text in BENCH_SCRIPT:
+            with_router = min(turn(text, True) for _ in range(rounds))
+            routed = router.log[-1]["routed"]
+            llm_only = min(turn(text, False) for _ in range(rounds))
+
+            if routed:
+                routed_count += 1
+                routed_times.append(with_router)
+                llm_times.append(llm_only)
+            print(
+                f"  {text[:39]:<40}{'router' if routed else 'LLM':>8}"
+                f"{with_router * 1000:8.1f}ms{llm_only * 1000:8.1f}ms"
+            )
+
+        print("-" * 70)
+        if routed_count:
+            routed_ms = sum(routed_times) / routed_count * 1000
+            llm_ms = sum(llm_times) / routed_count * 1000
+            print(
+                f"  Routed turns ({routed_count}/{len(BENCH_SCRIPT)}): "
+                f"{routed_ms:.1f}ms with the router, {llm_ms:.1f}ms through the "
+                f"LLM ({llm_ms / max(routed_ms, 1e-6):.0f}x)"
+            )
+        print("=" * 70 + "\n")
+
+        with contextlib.redirect_stdout(quiet):
+            assistant.router = router
+            assistant.shutdown()
+    finally:
+        mock.stop()
+        os.chdir(home)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    import sys
+
+    for arg in sys.argv[1:]:
+        if arg.startswith("--bench"):
+            rounds = int(arg.split("=", 1)[1]) if "=" in arg else 3
+            run_benchmark(rounds)
+            return
+
+    print(__doc__)
+
+
+if __name__ == "__main__":
+    main()
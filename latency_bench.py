@@ -0,0 +1,656 @@
+# -*- coding: utf-8 -*-
+"""
+Latency Bench - Replayable end-to-end turn latency for the voice loop
+Drives IntelligentAssistant and SimpleVoiceAgent through their real main
+loops with nothing but local fakes around them:
+
+    microphone  → FakeMicrophone replays WAV utterances in real time
+    ASR         → transcript sidecars (hello.wav + hello.txt), fixed delay
+    Ollama      → MockOllamaServer on localhost with a configurable
+                  time-to-first-token and token rate
+    Piper       → a stand-in `piper` executable on PATH (or a real --voice)
+    speakers    → FileSinkPyAudio writes every stream to a WAV file and
+                  blocks for its real duration
+
+Per turn it records end of speech, ASR done, first token, LLM done, first
+audio byte and playback end, and prints percentiles relative to end of
+speech. Runs offline on a CPU-only box.
+
+    python latency_bench.py [--agent=both|intelligent|simple] [--audio-dir=DIR]
+"""
+
+import array
+import json
+import math
+import os
+import random
+import shutil
+import stat
+import sys
+import tempfile
+import threading
+import time
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pyaudio
+import speech_recognition as sr
+
+import ollama_client
+
+
+SCRIPT = [
+    "tell me something about the ocean",
+    "what should I cook for dinner tonight",
+    "give me a fun fact about space",
+    "how do I stay focused while working",
+    "recommend a short book",
+]
+
+EVENTS = [
+    "end_of_speech",
+    "asr_done",
+    "first_token",
+    "llm_done",
+    "first_audio",
+    "playback_end",
+]
+
+FAKE_PIPER = '''#!{python}
+# Stand-in for Piper: silent speech of realistic length after RTF * duration
+import json, sys, time, wave
+
+args = sys.argv[1:]
+def option(*names, default=None):
+    for name in names:
+        if name in args:
+            return args[args.index(name) + 1]
+    return default
+
+model = option("--model", "-m")
+rate = 22050
+try:
+    with open(model + ".json") as f:
+        rate = json.load(f)["audio"]["sample_rate"]
+except Exception:
+    pass
+
+text = sys.stdin.buffer.read().decode("utf-8", "ignore")
+length = float(option("--length-scale", "--length_scale", default="1.0"))
+seconds = max(0.3, len(text) / 15.0 * length)
+time.sleep(seconds * {rtf})
+
+pcm = bytes(int(seconds * rate) * 2)
+output = option("--output_file", "--output-file", "-f")
+if output:
+    with wave.open(output, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(pcm)
+else:
+    sys.stdout.buffer.write(pcm)
+'''
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+# ========== RECORDER ==========
+
+
+class Recorder:
+    """Timestamps (perf_counter) per turn - first occurrence, playback_end last"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.turns = []  # [{"text": ..., "end_of_speech": t, ...}]
+        self.current = None
+
+    def begin_turn(self, text):
+        with self.lock:
+            self.current = {"text": text}
+            self.turns.append(self.current)
+
+    def mark(self, event, when=None):
+        when = when or time.perf_counter()
+        with self.lock:
+            turn = self.current
+            if turn is None:
+                return  # greeting, before the first utterance
+            if event == "playback_end" or event not in turn:
+                turn[event] = when
+
+    def latencies(self, skip=("goodbye",)):
+        """{event: [seconds after end of speech, per turn]}"""
+        result = {event: [] for event in EVENTS[1:]}
+        for turn in self.turns:
+            start = turn.get("end_of_speech")
+            if start is None or turn["text"] in skip:
+                continue
+            for event in EVENTS[1:]:
+                if event in turn:
+                    result[event].append(turn[event] - start)
+        return result
+
+
+# ========== FAKE MICROPHONE ==========
+
+
+class MicScript:
+    """The utterances to replay, handed out one listen() at a time"""
+
+    def __init__(self, utterances, recorder, lead_in=0.7):
+        self.utterances = list(utterances)
+        self.recorder = recorder
+        self.lead_in = lead_in
+        self.index = 0
+        self.current_text = None
+
+    def next(self):
+        if self.index >= len(self.utterances):
+            return None
+        utterance = self.utterances[self.index]
+        self.index += 1
+        return utterance
+
+
+class _FakeStream:
+    """PCM source paced like a real microphone"""
+
+    def __init__(self, script, utterance, sample_rate, chunk):
+        self.script = script
+        self.utterance = utterance
+        self.bytes_per_second = sample_rate * 2
+        self.position = 0
+        self.clock = time.perf_counter()
+
+        if utterance:
+            lead_in = bytes(int(script.lead_in * sample_rate) * 2)
+            self.speech_start = len(lead_in)
+            self.speech_end = len(lead_in) + len(utterance[0])
+            self.data = lead_in + utterance[0]
+        else:
+            self.speech_start = self.speech_end = None
+            self.data = b""
+
+    def read(self, size, exception_on_overflow=True):
+        size_bytes = size * 2
+        start = self.position
+        self.position += size_bytes
+
+        # Real-time pacing - the listener waits for audio like on a mic
+        self.clock += size_bytes / self.bytes_per_second
+        delay = self.clock - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+        if self.utterance:
+            if start <= self.speech_start < self.position:
+                self.script.current_text = self.utterance[2]
+                self.script.recorder.begin_turn(self.utterance[2])
+            if start <= self.speech_end < self.position:
+                # The user stopped talking somewhere inside this chunk
+                overshoot = (self.position - self.speech_end) / self.bytes_per_second
+                self.script.recorder.mark(
+                    "end_of_speech", time.perf_counter() - overshoot
+                )
+
+        piece = self.data[start : self.position]
+        return piece + bytes(size_bytes - len(piece))
+
+    def close(self):
+        pass
+
+
+class FakeMicrophone(sr.AudioSource):
+    """sr.Microphone stand-in; only the main loop's listen() gets speech"""
+
+    script = None  # set by the bench
+
+    def __init__(self, device_index=None, sample_rate=None, chunk_size=1024):
+        self.SAMPLE_WIDTH = 2
+        self.SAMPLE_RATE = 16000
+        self.CHUNK = chunk_size
+        self.format = pyaudio.paInt16
+        self.stream = None
+        self.utterance = None
+
+    def __enter__(self):
+        # Interrupt listeners run on worker threads - they only hear silence
+        if threading.current_thread() is threading.main_thread():
+            self.utterance = self.script.next()
+            if self.utterance is None:
+                raise KeyboardInterrupt  # script finished - stop the loop
+            self.SAMPLE_RATE = self.utterance[1]
+
+        self.stream = _FakeStream(
+            self.script, self.utterance, self.SAMPLE_RATE, self.CHUNK
+        )
+        return self
+
+    def __exit__(self, *exc):
+        self.stream = None
+
+
+# ========== FILE SINK SPEAKERS ==========
+
+
+class _SinkStream:
+    def __init__(self, bench, rate, channels, width):
+        self.bench = bench
+        self.bytes_per_second = rate * channels * width
+        self.clock = None
+
+        self.path = bench.next_sink_path()
+        self.wav = wave.open(str(self.path), "wb")
+        self.wav.setnchannels(channels)
+        self.wav.setsampwidth(width)
+        self.wav.setframerate(rate)
+
+    def write(self, data, *args):
+        if not data:
+            return
+        now = time.perf_counter()
+        if self.clock is None or self.clock < now:
+            self.clock = now
+            self.bench.recorder.mark("first_audio", now)
+
+        self.wav.writeframes(data)
+
+        # Block like a sound card would
+        self.clock += len(data) / self.bytes_per_second
+        delay = self.clock - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        self.bench.recorder.mark("playback_end")
+
+    def stop_stream(self):
+        pass
+
+    def close(self):
+        self.wav.close()
+
+
+class FileSinkPyAudio:
+    """pyaudio.PyAudio stand-in that plays into WAV files"""
+
+    bench = None  # set by the bench
+
+    def open(self, format=None, channels=1, rate=22050, output=False, **kwargs):
+        width = {pyaudio.paInt16: 2}.get(format, 2)
+        return _SinkStream(self.bench, rate, channels, width)
+
+    def get_format_from_width(self, width, unsigned=True):
+        return pyaudio.paInt16
+
+    def terminate(self):
+        pass
+
+
+# ========== MOCK OLLAMA ==========
+
+
+class MockOllamaServer:
+    """Local /api/chat with a fixed time-to-first-token and token rate"""
+
+    def __init__(self, recorder, ttft=0.25, tokens_per_second=25.0, reply_words=24):
+        self.recorder = recorder
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.reply_words = reply_words
+        self.server = None
+
+    def reply_for(self, text):
+        words = (
+            "Here is a short answer about that. It keeps things simple and useful, "
+            "with one more sentence so the reply has a realistic length for speech."
+        ).split()
+        words = (words * (self.reply_words // len(words) + 1))[: self.reply_words]
+        return " ".join(words).rstrip(",.") + "."
+
+    def start(self):
+        bench = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _json(self, payload):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                self._json({"models": [{"name": "bench"}]})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                messages = request.get("messages") or []
+
+                if not messages:  # warm-up
+                    self._json({"done": True, "message": {"content": ""}})
+                    return
+
+                reply = bench.reply_for(messages[-1]["content"])
+                tokens = [word + " " for word in reply.split()]
+                prompt_chars = sum(len(m.get("content", "")) for m in messages)
+                stats = {
+                    "done": True,
+                    "prompt_eval_count": prompt_chars // 4,
+                    "prompt_eval_duration": int(bench.ttft * 1e9),
+                    "eval_count": len(tokens),
+                }
+
+                time.sleep(bench.ttft)
+                bench.recorder.mark("first_token")
+                interval = 1.0 / bench.tokens_per_second
+
+                if not request.get("stream"):
+                    time.sleep(interval * (len(tokens) - 1))
+                    bench.recorder.mark("llm_done")
+                    self._json(dict(stats, message={"content": reply}))
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                def chunk(payload):
+                    data = (json.dumps(payload) + "\n").encode("utf-8")
+                    self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                    self.wfile.flush()
+
+                for i, token in enumerate(tokens):
+                    if i:
+                        time.sleep(interval)
+                    chunk({"done": False, "message": {"content": token}})
+                bench.recorder.mark("llm_done")
+                chunk(stats)
+                self.wfile.write(b"0\r\n\r\n")
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+
+# ========== BENCH ==========
+
+
+def load_utterances(audio_dir=None):
+    """[(pcm, sample_rate, transcript)] from WAV + .txt pairs, or synthetic"""
+    utterances = []
+
+    if audio_dir:
+        for wav_path in sorted(Path(audio_dir).glob("*.wav")):
+            txt_path = wav_path.with_suffix(".txt")
+            if not txt_path.exists():
+                continue
+            with wave.open(str(wav_path), "rb") as wav:
+                if wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+                    print(f"   ⚠️  Skipping {wav_path.name} (need 16-bit mono)")
+                    continue
+                pcm = wav.readframes(wav.getnframes())
+                rate = wav.getframerate()
+            utterances.append((pcm, rate, txt_path.read_text(encoding="utf-8").strip()))
+
+    if not utterances:
+        # Voiced-sounding bursts, long enough for the text, loud enough for VAD
+        rng = random.Random(7)
+        for text in SCRIPT:
+            rate = 16000
+            seconds = 0.5 + 0.055 * len(text)
+            samples = array.array("h")
+            for n in range(int(seconds * rate)):
+                envelope = 0.6 + 0.4 * math.sin(2 * math.pi * 3 * n / rate)
+                value = 7000 * envelope * math.sin(2 * math.pi * 180 * n / rate)
+                samples.append(int(value + rng.uniform(-600, 600)))
+            utterances.append((samples.tobytes(), rate, text))
+
+    return utterances
+
+
+class LatencyBench:
+    """Sets up the fakes, runs one agent over the script, reports"""
+
+    def __init__(
+        self,
+        utterances,
+        ttft=0.25,
+        tokens_per_second=25.0,
+        reply_words=24,
+        asr_delay=0.3,
+        tts_rtf=0.2,
+        voice=None,
+        output_dir="bench_output",
+    ):
+        self.utterances = utterances
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.reply_words = reply_words
+        self.asr_delay = asr_delay
+        self.tts_rtf = tts_rtf
+        self.voice = voice
+        self.output_dir = Path(output_dir).absolute()
+        self.sink_count = 0
+        self.recorder = None
+
+    def next_sink_path(self):
+        self.sink_count += 1
+        return self.sink_dir / f"stream_{self.sink_count:03d}.wav"
+
+    def _install_fake_piper(self, workdir):
+        """Fake `piper` on PATH plus a placeholder voice model"""
+        bin_dir = workdir / "bin"
+        bin_dir.mkdir()
+        piper = bin_dir / "piper"
+        piper.write_text(FAKE_PIPER.format(python=sys.executable, rtf=self.tts_rtf))
+        piper.chmod(piper.stat().st_mode | stat.S_IEXEC)
+        os.environ["PATH"] = f"{bin_dir}{os.pathsep}{os.environ['PATH']}"
+
+        models = workdir / "piper_models"
+        models.mkdir()
+        (models / "bench-voice.onnx").write_bytes(b"")
+        (models / "bench-voice.onnx.json").write_text(
+            json.dumps({"audio": {"sample_rate": 22050}})
+        )
+
+    def _fake_asr(self, audio, *args, **kwargs):
+        time.sleep(self.asr_delay)
+        self.recorder.mark("asr_done")
+        return self.mic_script.current_text
+
+    def run(self, agent_name):
+        """Run one agent over every utterance, return the Recorder"""
+        self.recorder = Recorder()
+        # A final "goodbye" ends both agents' loops the normal way
+        pcm, rate, _ = self.utterances[0]
+        self.mic_script = MicScript(
+            self.utterances + [(pcm, rate, "goodbye")], self.recorder
+        )
+        self.sink_dir = self.output_dir / agent_name
+        self.sink_dir.mkdir(parents=True, exist_ok=True)
+
+        home = Path.cwd()
+        path = os.environ["PATH"]
+        workdir = Path(tempfile.mkdtemp(prefix=f"bench_{agent_name}_"))
+        os.chdir(workdir)
+
+        mock = MockOllamaServer(
+            self.recorder, self.ttft, self.tokens_per_second, self.reply_words
+        )
+        saved = (sr.Microphone, pyaudio.PyAudio)
+
+        try:
+            if self.voice:
+                models = workdir / "piper_models"
+                models.mkdir()
+                for source in (Path(self.voice), Path(f"{self.voice}.json")):
+                    shutil.copy(source, models / source.name)
+            else:
+                self._install_fake_piper(workdir)
+
+            ollama_client.configure(base_url=mock.start())
+
+            FakeMicrophone.script = self.mic_script
+            FileSinkPyAudio.bench = self
+            sr.Microphone = FakeMicrophone
+            pyaudio.PyAudio = FileSinkPyAudio
+
+            if agent_name == "intelligent":
+                from intelligent_assistant import IntelligentAssistant
+
+                # No home-directory crawl competing with the measured turns
+                agent = IntelligentAssistant(
+                    ollama_model="bench", user_name="bench", index_files=False
+                )
+                agent.recognizer.recognize_google = self._fake_asr
+
+                # Let the phrase bank finish before the clock starts
+                bank = agent.phrase_bank
+                deadline = time.time() + 60
+                while bank and time.time() < deadline:
+                    if len(bank.bank) >= len(bank.phrases()):
+                        break
+                    time.sleep(0.1)
+            else:
+                from voice_agent_simple import SimpleVoiceAgent
+
+                agent = SimpleVoiceAgent(ollama_model="bench")
+                agent.recognizer.recognize_google = self._fake_asr
+
+            agent.run()
+
+        finally:
+            sr.Microphone, pyaudio.PyAudio = saved
+            mock.stop()
+            os.chdir(home)
+            os.environ["PATH"] = path
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        return self.recorder
+
+    def report(self, agent_name, recorder):
+        """Percentile table (text) and the same numbers as a dict"""
+        latencies = recorder.latencies()
+        measured = len(latencies["asr_done"])
+
+        lines = [
+            "",
+            "=" * 70,
+            f"     ⏱️  LATENCY - {agent_name}",
+            "=" * 70,
+            f"  Turns: {measured}/{len(self.utterances)} | "
+            f"LLM TTFT {self.ttft * 1000:.0f}ms @ {self.tokens_per_second:.0f} tok/s | "
+            f"ASR {self.asr_delay * 1000:.0f}ms | "
+            f"TTS {'real voice' if self.voice else f'fake RTF {self.tts_rtf}'}",
+            f"  {'after end of speech':<22}{'p50':>9}{'p90':>9}{'p99':>9}{'n':>5}",
+        ]
+
+        results = {}
+        for event, values in latencies.items():
+            results[event] = {
+                "p50": percentile(values, 50),
+                "p90": percentile(values, 90),
+                "p99": percentile(values, 99),
+                "n": len(values),
+            }
+            if not values:
+                lines.append(f"  {event:<22}{'-':>9}{'-':>9}{'-':>9}{0:>5}")
+                continue
+            p50, p90, p99 = (results[event][p] * 1000 for p in ("p50", "p90", "p99"))
+            lines.append(
+                f"  {event:<22}{p50:>7.0f}ms{p90:>7.0f}ms{p99:>7.0f}ms{len(values):>5}"
+            )
+
+        lines.append(f"  Audio written to {self.sink_dir}")
+        lines.append("=" * 70)
+        return "\n".join(lines), results
+
+
+def main():
+    options = {}
+    agents = ["intelligent", "simple"]
+    audio_dir = None
+    json_path = None
+
+    for arg in sys.argv[1:]:
+        key, _, value = arg.partition("=")
+        if key == "--agent":
+            agents = agents if value == "both" else [value]
+        elif key == "--audio-dir":
+            audio_dir = value
+        elif key == "--ttft":
+            options["ttft"] = float(value)
+        elif key == "--tokens-per-sec":
+            options["tokens_per_second"] = float(value)
+        elif key == "--reply-words":
+            options["reply_words"] = int(value)
+        elif key == "--asr-delay":
+            options["asr_delay"] = float(value)
+        elif key == "--tts-rtf":
+            options["tts_rtf"] = float(value)
+        elif key == "--voice":
+            options["voice"] = os.path.abspath(value)
+        elif key == "--output":
+            options["output_dir"] = value
+        elif key == "--json":
+            json_path = value
+        elif key in ["--help", "-h"]:
+            print(
+                """
+⏱️  Latency Bench - Usage
+
+python latency_bench.py [OPTIONS]
+
+OPTIONS:
+  --agent=NAME           intelligent, simple or both (default: both)
+  --audio-dir=DIR        16-bit mono WAVs with .txt transcripts (default: synthetic)
+  --ttft=SECONDS         Mock LLM time to first token (default: 0.25)
+  --tokens-per-sec=N     Mock LLM generation rate (default: 25)
+  --reply-words=N        Mock reply length (default: 24)
+  --asr-delay=SECONDS    Simulated recognition time (default: 0.3)
+  --tts-rtf=RATIO        Fake Piper real-time factor (default: 0.2)
+  --voice=MODEL.onnx     Use the real Piper with this voice instead
+  --output=DIR           Where the played audio goes (default: bench_output)
+  --json=FILE            Also write the percentiles as JSON
+"""
+            )
+            return
+
+    bench = LatencyBench(load_utterances(audio_dir), **options)
+
+    reports, results = [], {}
+    for agent_name in agents:
+        recorder = bench.run(agent_name)
+        text, results[agent_name] = bench.report(agent_name, recorder)
+        reports.append(text)
+
+    print("\n".join(reports) + "\n")
+
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
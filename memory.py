@@ -2,31 +2,75 @@
 """
 Memory System - OPTIMIZED VERSION
 Persistent storage for the assistant - Fast and efficient
+SQLite access goes through one long-lived connection pool (db_pool.py),
+and conversation turns are logged behind the reply (write_behind.py).
 """
 
 import json
 from pathlib import Path
 from datetime import datetime
-import sqlite3
 
+import conversation_search
+from db_pool import ConnectionPool
+from write_behind import WriteBehindLog
+
+
+INSERT_CONVERSATION = """
+    INSERT INTO conversations (timestamp, user_message, assistant_response, tools_used, session_id)
+    VALUES (?, ?, ?, ?, ?)
+"""
 
 class AssistantMemory:
     """Handles all persistent memory for the assistant"""
 
-    def __init__(self, user_name="friend"):
+    def __init__(
+        self,
+        user_name="friend",
+        synchronous="NORMAL",
+        durability="journal",
+        conversation_batch=32,
+        flush_interval=1.0,
+        write_behind=True,
+        read_only=False,
+    ):
         self.user_name = user_name
         self.memory_dir = Path("assistant_memory")
-        self.memory_dir.mkdir(exist_ok=True)
+        if not read_only:
+            self.memory_dir.mkdir(exist_ok=True)
 
         # Files
         self.prefs_file = self.memory_dir / "preferences.json"
         self.facts_file = self.memory_dir / "user_facts.json"
         self.db_file = self.memory_dir / "conversations.db"
+        self.db = ConnectionPool(
+            self.db_file, synchronous=synchronous, read_only=read_only
+        )
 
         # Load or create memory
         self.preferences = self.load_preferences()
         self.user_facts = self.load_user_facts()
-        self.init_database()
+        self.session_facts = {}  # server sessions' facts, never written to disk
+
+        # read_only=True (the trace report): no schema setup or migrations on
+        # the database of a running assistant - search falls back to LIKE
+        self.fts = False
+        if not read_only:
+            self.init_database()
+
+        # save_conversation only queues - a background thread commits batches.
+        # write_behind=False writes directly and never touches the spool
+        # files of a running assistant
+        self.conversation_log = None
+        if write_behind and not read_only:
+            self.conversation_log = WriteBehindLog(
+                self.db,
+                "conversations",
+                INSERT_CONVERSATION,
+                spool_file=self.memory_dir / "conversations.spool",
+                durability=durability,
+                batch_size=conversation_batch,
+                flush_interval=flush_interval,
+            )
 
         print(f"💾 Memory system ready for {user_name}")
 
@@ -97,26 +141,39 @@ class AssistantMemory:
         except Exception as e:
             print(f"⚠️  Could not save facts: {e}")
 
-    def add_fact(self, category, fact):
+    def facts_for(self, session_id=None):
+        """The local user's facts, or one server session's"""
+        if session_id is None:
+            return self.user_facts
+        return self.session_facts.setdefault(session_id, {})
+
+    def forget_session(self, session_id):
+        """Drop a closed server session's facts"""
+        self.session_facts.pop(session_id, None)
+
+    def add_fact(self, category, fact, session_id=None):
         """Add a fact about the user"""
-        if category not in self.user_facts:
-            self.user_facts[category] = []
+        facts = self.facts_for(session_id)
+        if category not in facts:
+            facts[category] = []
 
         fact_entry = {"content": fact, "added": datetime.now().isoformat()}
 
-        if isinstance(self.user_facts[category], list):
-            self.user_facts[category].append(fact_entry)
+        if isinstance(facts[category], list):
+            facts[category].append(fact_entry)
         else:
-            self.user_facts[category] = fact
+            facts[category] = fact
 
-        self.save_user_facts()
+        if session_id is None:
+            self.save_user_facts()
         return f"✅ Remembered: {fact}"
 
-    def get_facts(self, category=None):
+    def get_facts(self, category=None, session_id=None):
         """Get facts about user"""
+        facts = self.facts_for(session_id)
         if category:
-            return self.user_facts.get(category, [])
-        return self.user_facts
+            return facts.get(category, [])
+        return facts
 
     def search_facts(self, query):
         """Search through stored facts"""
@@ -142,93 +199,117 @@ class AssistantMemory:
 
     def init_database(self):
         """Initialize SQLite database"""
-        conn = sqlite3.connect(self.db_file)
-        cursor = conn.cursor()
+        with self.db.write() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS conversations (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT NOT NULL,
+                    user_message TEXT NOT NULL,
+                    assistant_response TEXT NOT NULL,
+                    tools_used TEXT,
+                    session_id TEXT
+                )
+            """
+            )
 
-        cursor.execute(
+            conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_timestamp 
+                ON conversations(timestamp)
             """
-            CREATE TABLE IF NOT EXISTS conversations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT NOT NULL,
-                user_message TEXT NOT NULL,
-                assistant_response TEXT NOT NULL,
-                tools_used TEXT,
-                session_id TEXT
             )
-        """
-        )
 
-        cursor.execute(
+            conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_session 
+                ON conversations(session_id)
             """
-            CREATE INDEX IF NOT EXISTS idx_timestamp 
-            ON conversations(timestamp)
-        """
-        )
+            )
 
-        cursor.execute(
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS tasks (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    task TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    created TEXT NOT NULL,
+                    completed TEXT,
+                    priority TEXT,
+                    session_id TEXT
+                )
             """
-            CREATE INDEX IF NOT EXISTS idx_session 
-            ON conversations(session_id)
-        """
-        )
+            )
+
+            # Older databases: tasks had no owner (NULL = the local user)
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(tasks)")]
+            if "session_id" not in columns:
+                conn.execute("ALTER TABLE tasks ADD COLUMN session_id TEXT")
+
+            conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_task_status 
+                ON tasks(status)
+            """
+            )
 
-        cursor.execute(
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS turn_traces (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    trace_id TEXT UNIQUE NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    session_id TEXT,
+                    user_message TEXT,
+                    duration_ms REAL,
+                    spans TEXT NOT NULL
+                )
             """
-            CREATE TABLE IF NOT EXISTS tasks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                task TEXT NOT NULL,
-                status TEXT NOT NULL,
-                created TEXT NOT NULL,
-                completed TEXT,
-                priority TEXT
             )
-        """
-        )
 
-        cursor.execute(
+            conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_trace_timestamp
+                ON turn_traces(timestamp)
             """
-            CREATE INDEX IF NOT EXISTS idx_task_status 
-            ON tasks(status)
-        """
-        )
+            )
 
-        conn.commit()
-        conn.close()
+        # Full-text index for search_conversations (own transaction - it may
+        # fail on SQLite builds without FTS5)
+        with self.db.write() as conn:
+            self.fts, migrated = conversation_search.init_search(conn)
+        if migrated:
+            print(f"🔎 Indexed {migrated} past conversations for search")
 
     def save_conversation(
         self, user_msg, assistant_msg, tools_used=None, session_id=None
     ):
-        """Save a conversation turn"""
+        """Queue a conversation turn (committed in the background)"""
+        row = (
+            datetime.now().isoformat(),
+            user_msg[:500],
+            assistant_msg[:1000],
+            json.dumps(tools_used) if tools_used else None,
+            session_id or "default",
+        )
         try:
-            conn = sqlite3.connect(self.db_file)
-            cursor = conn.cursor()
-
-            cursor.execute(
-                """
-                INSERT INTO conversations (timestamp, user_message, assistant_response, tools_used, session_id)
-                VALUES (?, ?, ?, ?, ?)
-            """,
-                (
-                    datetime.now().isoformat(),
-                    user_msg[:500],
-                    assistant_msg[:1000],
-                    json.dumps(tools_used) if tools_used else None,
-                    session_id or "default",
-                ),
-            )
-
-            conn.commit()
-            conn.close()
+            if self.conversation_log is None:
+                self.db.execute(INSERT_CONVERSATION, row)
+            else:
+                self.conversation_log.append(row)
         except Exception as e:
             print(f"⚠️  Could not save conversation: {e}")
 
+    def flush_conversations(self):
+        """Commit queued turns so reads see them"""
+        if self.conversation_log is not None and self.conversation_log.pending():
+            self.conversation_log.flush()
+
     def get_recent_conversations(self, limit=5):
         """Get recent conversation history"""
         try:
-            conn = sqlite3.connect(self.db_file)
-            cursor = conn.cursor()
-
-            cursor.execute(
+            self.flush_conversations()
+            results = self.db.read(
                 """
                 SELECT timestamp, user_message, assistant_response
                 FROM conversations
@@ -238,9 +319,6 @@ class AssistantMemory:
                 (limit,),
             )
 
-            results = cursor.fetchall()
-            conn.close()
-
             return [
                 {
                     "timestamp": r[0],
@@ -253,88 +331,141 @@ class AssistantMemory:
             print(f"⚠️  Could not get conversations: {e}")
             return []
 
-    def search_conversations(self, query, limit=10):
-        """Search through conversation history"""
+    def search_conversations(self, query, limit=10, session_id=None):
+        """
+        Search through conversation history (best matches first) - every
+        session's, or only session_id's
+        """
         try:
-            conn = sqlite3.connect(self.db_file)
-            cursor = conn.cursor()
+            self.flush_conversations()
 
-            cursor.execute(
+            if not self.fts and session_id is None:
+                results = self.db.read(
+                    conversation_search.LIKE_SQL,
+                    (f"%{query}%", f"%{query}%", limit),
+                )
+                return [
+                    {"timestamp": r[0], "user": r[1][:100], "assistant": r[2][:100]}
+                    for r in results
+                ]
+
+            results = conversation_search.search(
+                self.db.read, query, limit, session_id
+            )
+            return [
+                {
+                    "timestamp": r[0],
+                    "user": r[1][:100],
+                    "assistant": r[2][:100],
+                    "snippet": r[3],
+                }
+                for r in results
+            ]
+        except Exception as e:
+            print(f"⚠️  Could not search conversations: {e}")
+            return []
+
+    # ========== TURN TRACES ==========
+
+    def save_trace(self, trace):
+        """Save one turn's spans (a TurnTrace.to_row() dict)"""
+        try:
+            self.db.execute(
                 """
-                SELECT timestamp, user_message, assistant_response
-                FROM conversations
-                WHERE user_message LIKE ? OR assistant_response LIKE ?
+                INSERT OR REPLACE INTO turn_traces
+                    (trace_id, timestamp, session_id, user_message, duration_ms, spans)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """,
+                (
+                    trace["trace_id"],
+                    trace["timestamp"],
+                    trace["session_id"],
+                    trace["user_message"],
+                    trace["duration_ms"],
+                    json.dumps(trace["spans"]),
+                ),
+            )
+            return True
+        except Exception as e:
+            print(f"⚠️  Could not save trace: {e}")
+            return False
+
+    def get_recent_traces(self, limit=50):
+        """Get the most recent turn traces, oldest first"""
+        try:
+            results = self.db.read(
+                """
+                SELECT trace_id, timestamp, session_id, user_message,
+                       duration_ms, spans
+                FROM turn_traces
                 ORDER BY id DESC
                 LIMIT ?
             """,
-                (f"%{query}%", f"%{query}%", limit),
+                (limit,),
             )
 
-            results = cursor.fetchall()
-            conn.close()
-
             return [
-                {"timestamp": r[0], "user": r[1][:100], "assistant": r[2][:100]}
-                for r in results
+                {
+                    "trace_id": r[0],
+                    "timestamp": r[1],
+                    "session_id": r[2],
+                    "user_message": r[3] or "",
+                    "duration_ms": r[4] or 0.0,
+                    "spans": json.loads(r[5]),
+                }
+                for r in reversed(results)
             ]
         except Exception as e:
-            print(f"⚠️  Could not search conversations: {e}")
+            print(f"⚠️  Could not get traces: {e}")
             return []
 
     # ========== TASKS & REMINDERS ==========
 
-    def add_task(self, task, priority="medium"):
+    # Tasks belong to the local user (session_id NULL) or to one server
+    # session - "session_id IS ?" matches either
+
+    def add_task(self, task, priority="medium", session_id=None):
         """Add a task/reminder"""
         try:
-            conn = sqlite3.connect(self.db_file)
-            cursor = conn.cursor()
-
-            cursor.execute(
+            cursor = self.db.execute(
                 """
-                INSERT INTO tasks (task, status, created, priority)
-                VALUES (?, ?, ?, ?)
+                INSERT INTO tasks (task, status, created, priority, session_id)
+                VALUES (?, ?, ?, ?, ?)
             """,
-                (task, "pending", datetime.now().isoformat(), priority),
+                (task, "pending", datetime.now().isoformat(), priority, session_id),
             )
-
-            conn.commit()
             task_id = cursor.lastrowid
-            conn.close()
 
             return f"✅ Added task #{task_id}: {task}"
         except Exception as e:
             return f"❌ Could not add task: {e}"
 
-    def get_tasks(self, status="pending"):
+    def get_tasks(self, status="pending", session_id=None):
         """Get tasks by status"""
         try:
-            conn = sqlite3.connect(self.db_file)
-            cursor = conn.cursor()
-
             if status == "all":
-                cursor.execute(
+                results = self.db.read(
                     """
                     SELECT id, task, status, created, priority 
                     FROM tasks 
+                    WHERE session_id IS ?
                     ORDER BY id DESC 
                     LIMIT 50
-                """
+                """,
+                    (session_id,),
                 )
             else:
-                cursor.execute(
+                results = self.db.read(
                     """
                     SELECT id, task, status, created, priority
                     FROM tasks
-                    WHERE status = ?
+                    WHERE status = ? AND session_id IS ?
                     ORDER BY id DESC
                     LIMIT 50
                 """,
-                    (status,),
+                    (status, session_id),
                 )
 
-            results = cursor.fetchall()
-            conn.close()
-
             return [
                 {
                     "id": r[0],
@@ -349,24 +480,18 @@ class AssistantMemory:
             print(f"⚠️  Could not get tasks: {e}")
             return []
 
-    def complete_task(self, task_id):
+    def complete_task(self, task_id, session_id=None):
         """Mark task as complete"""
         try:
-            conn = sqlite3.connect(self.db_file)
-            cursor = conn.cursor()
-
-            cursor.execute(
+            cursor = self.db.execute(
                 """
                 UPDATE tasks
                 SET status = ?, completed = ?
-                WHERE id = ?
+                WHERE id = ? AND session_id IS ?
             """,
-                ("completed", datetime.now().isoformat(), task_id),
+                ("completed", datetime.now().isoformat(), task_id, session_id),
             )
-
-            conn.commit()
             rows_affected = cursor.rowcount
-            conn.close()
 
             if rows_affected > 0:
                 return f"✅ Task #{task_id} completed!"
@@ -378,14 +503,8 @@ class AssistantMemory:
     def delete_task(self, task_id):
         """Delete a task"""
         try:
-            conn = sqlite3.connect(self.db_file)
-            cursor = conn.cursor()
-
-            cursor.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
-
-            conn.commit()
+            cursor = self.db.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
             rows_affected = cursor.rowcount
-            conn.close()
 
             if rows_affected > 0:
                 return f"✅ Task #{task_id} deleted"
@@ -433,18 +552,13 @@ class AssistantMemory:
         try:
             cutoff = datetime.now().timestamp() - (days * 24 * 3600)
             cutoff_iso = datetime.fromtimestamp(cutoff).isoformat()
+            self.flush_conversations()
 
-            conn = sqlite3.connect(self.db_file)
-            cursor = conn.cursor()
-
-            cursor.execute(
+            cursor = self.db.execute(
                 "DELETE FROM conversations WHERE timestamp < ?", (cutoff_iso,)
             )
             deleted = cursor.rowcount
 
-            conn.commit()
-            conn.close()
-
             return f"✅ Cleared {deleted} old conversations"
         except Exception as e:
             return f"❌ Could not clear conversations: {e}"
@@ -452,16 +566,11 @@ class AssistantMemory:
     def get_stats(self):
         """Get memory statistics"""
         try:
-            conn = sqlite3.connect(self.db_file)
-            cursor = conn.cursor()
-
-            cursor.execute("SELECT COUNT(*) FROM conversations")
-            total_convos = cursor.fetchone()[0]
-
-            cursor.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status")
-            task_stats = dict(cursor.fetchall())
-
-            conn.close()
+            self.flush_conversations()
+            total_convos = self.db.read("SELECT COUNT(*) FROM conversations")[0][0]
+            task_stats = dict(
+                self.db.read("SELECT status, COUNT(*) FROM tasks GROUP BY status")
+            )
 
             stats = [
                 f"📊 Memory Statistics:",
@@ -474,3 +583,9 @@ class AssistantMemory:
             return "\n".join(stats)
         except Exception as e:
             return f"❌ Could not get stats: {e}"
+
+    def close(self):
+        """Flush queued turns and close the database connections"""
+        if self.conversation_log is not None:
+            self.conversation_log.close()
+        self.db.close()
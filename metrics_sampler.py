@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+"""
+Metrics Sampler - Background system stats for instant tool answers
+A daemon thread samples CPU, memory and disk every couple of seconds into
+a fixed-size ring buffer, and the busiest processes a little less often.
+system_info and list_running_apps read the latest snapshot instead of
+blocking the turn (cpu_percent(interval=0.5) alone cost half a second),
+and the history answers trend questions like "CPU over the last 5 minutes".
+
+    python metrics_sampler.py [--bench] [--interval=2]
+"""
+
+import heapq
+import threading
+import time
+from collections import deque, namedtuple
+
+import psutil
+
+
+# One ring-buffer entry (percentages, bytes)
+Sample = namedtuple("Sample", "time cpu memory memory_used disk")
+
+# One process in the latest listing
+ProcessInfo = namedtuple("ProcessInfo", "pid name cpu memory")
+
+TREND_METRICS = {
+    "cpu": ("CPU", "cpu"),
+    "memory": ("RAM", "memory"),
+    "ram": ("RAM", "memory"),
+    "disk": ("Disk", "disk"),
+}
+
+
+def _percent(value):
+    return f"{value:.0f}%"
+
+
+class MetricsSampler:
+    """Rolling CPU / memory / disk history plus the top processes"""
+
+    def __init__(
+        self,
+        interval=2.0,
+        history=3600,
+        process_interval=10.0,
+        top_processes=15,
+        disk_path="/",
+    ):
+        self.interval = interval
+        self.process_interval = max(process_interval, interval)
+        self.top_processes = top_processes
+        self.disk_path = disk_path
+
+        # history seconds worth of samples, oldest dropped first
+        self.samples = deque(maxlen=max(2, int(history / interval)))
+        self.processes = []
+        self.processes_at = 0.0
+        self.memory_total = 0
+        self.disk_used = 0
+        self.disk_total = 0
+
+        self.lock = threading.Lock()
+        self.running = threading.Event()
+        self.thread = None
+
+        self.stats = {"samples": 0, "process_scans": 0, "cpu_seconds": 0.0}
+
+    # ========== SAMPLING ==========
+
+    def start(self):
+        """Prime the counters and begin sampling in the background"""
+        if self.thread is not None:
+            return self
+        psutil.cpu_percent(interval=None)  # first call only sets the baseline
+        self.running.set()
+        self.thread = threading.Thread(
+            target=self._run, name="metrics", daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running.clear()
+        if self.thread is not None:
+            self.thread.join(timeout=self.interval + 1)
+            self.thread = None
+
+    def _run(self):
+        # The first CPU reading needs a short baseline - don't wait a full tick
+        time.sleep(min(0.5, self.interval))
+        next_processes = 0.0
+        while self.running.is_set():
+            started = time.thread_time()
+            try:
+                self.sample()
+                if time.monotonic() >= next_processes:
+                    self.sample_processes()
+                    next_processes = time.monotonic() + self.process_interval
+            except Exception as e:
+                print(f"⚠️  Metrics sample failed: {e}")
+            self.stats["cpu_seconds"] += time.thread_time() - started
+
+            self._sleep(self.interval)
+
+    def _sleep(self, seconds):
+        deadline = time.monotonic() + seconds
+        while self.running.is_set() and time.monotonic() < deadline:
+            time.sleep(min(0.25, deadline - time.monotonic()))
+
+    def sample(self):
+        """Record CPU, memory and disk now (non-blocking)"""
+        cpu = psutil.cpu_percent(interval=None)
+        mem = psutil.virtual_memory()
+        disk = psutil.disk_usage(self.disk_path)
+
+        with self.lock:
+            self.samples.append(
+                Sample(time.time(), cpu, mem.percent, mem.used, disk.percent)
+            )
+            self.memory_total = mem.total
+            self.disk_used = disk.used
+            self.disk_total = disk.total
+        self.stats["samples"] += 1
+
+    def sample_processes(self):
+        """Keep the top processes by memory (cpu_percent since the last scan)"""
+        candidates = []
+        for proc in psutil.process_iter(
+            ["pid", "name", "cpu_percent", "memory_percent"]
+        ):
+            info = proc.info
+            if info["name"] and (info["memory_percent"] or 0) > 0.1:
+                candidates.append(
+                    ProcessInfo(
+                        info["pid"],
+                        info["name"],
+                        info["cpu_percent"] or 0.0,
+                        info["memory_percent"],
+                    )
+                )
+
+        top = heapq.nlargest(self.top_processes, candidates, key=lambda p: p.memory)
+        with self.lock:
+            self.processes = top
+            self.processes_at = time.time()
+        self.stats["process_scans"] += 1
+
+    # ========== QUERIES ==========
+
+    def latest(self):
+        """Most recent Sample, or None before the first one"""
+        with self.lock:
+            return self.samples[-1] if self.samples else None
+
+    def top(self):
+        """(processes, when they were sampled)"""
+        with self.lock:
+            return list(self.processes), self.processes_at
+
+    def window(self, seconds):
+        """Samples from the last `seconds`"""
+        since = time.time() - seconds
+        with self.lock:
+            return [s for s in self.samples if s.time >= since]
+
+    def trend(self, metric="cpu", seconds=300):
+        """{'min', 'avg', 'max', 'now', 'delta', 'span', 'count'} or None"""
+        field = TREND_METRICS[metric][1]
+        window = self.window(seconds)
+        if not window:
+            return None
+
+        values = [getattr(s, field) for s in window]
+        # Average of the newest quarter vs the oldest quarter
+        quarter = max(1, len(values) // 4)
+        delta = sum(values[-quarter:]) / quarter - sum(values[:quarter]) / quarter
+
+        return {
+            "min": min(values),
+            "avg": sum(values) / len(values),
+            "max": max(values),
+            "now": values[-1],
+            "delta": delta,
+            "span": window[-1].time - window[0].time,
+            "count": len(values),
+        }
+
+    def describe_trend(self, metric="cpu", minutes=5):
+        """One line for the assistant to say"""
+        metric = str(metric).strip().lower()
+        if metric not in TREND_METRICS:
+            return f"❌ Unknown metric '{metric}' (use cpu, memory or disk)"
+
+        label = TREND_METRICS[metric][0]
+        trend = self.trend(metric, float(minutes) * 60)
+        if trend is None:
+            return f"📈 No {label} history yet - sampling just started"
+
+        if trend["delta"] > 5:
+            direction = "rising"
+        elif trend["delta"] < -5:
+            direction = "falling"
+        else:
+            direction = "steady"
+
+        covered = trend["span"] / 60
+        span = f"last {float(minutes):g} min"
+        if covered < float(minutes) * 0.9:
+            span += f" (only {covered:.1f} min recorded)"
+
+        return (
+            f"📈 {label} over the {span}: avg {_percent(trend['avg'])}, "
+            f"min {_percent(trend['min'])}, max {_percent(trend['max'])}, "
+            f"now {_percent(trend['now'])} - {direction}"
+        )
+
+    def get_stats(self):
+        samples = self.stats["samples"] or 1
+        per_sample = self.stats["cpu_seconds"] / samples * 1000
+        return (
+            f"📈 Metrics: {self.stats['samples']} samples, "
+            f"{self.stats['process_scans']} process scans | "
+            f"{per_sample:.1f}ms CPU/sample | "
+            f"{len(self.samples)}/{self.samples.maxlen} in history"
+        )
+
+
+# ========== BENCHMARK ==========
+
+
+def _old_system_info():
+    """The previous blocking calls in system_info"""
+    cpu = psutil.cpu_percent(interval=0.5)
+    return cpu, psutil.virtual_memory(), psutil.disk_usage("/")
+
+
+def _old_list_running_apps():
+    """The previous full process walk and sort"""
+    processes = []
+    for proc in psutil.process_iter(["pid", "name", "cpu_percent", "memory_percent"]):
+        info = proc.info
+        if info["name"] and info["memory_percent"] > 0.1:
+            processes.append(info)
+    processes.sort(key=lambda x: x["memory_percent"], reverse=True)
+    return processes[:15]
+
+
+def _time(fn, runs=5):
+    best = float("inf")
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run_benchmark(interval=2.0, seconds=20):
+    sampler = MetricsSampler(interval=interval).start()
+
+    print("\n" + "=" * 70)
+    print("     📈 METRICS SAMPLER BENCHMARK")
+    print("=" * 70)
+
+    cases = [
+        ("system_info", _old_system_info, sampler.latest),
+        ("list_running_apps", _old_list_running_apps, sampler.top),
+        ("CPU trend (5 min)", None, lambda: sampler.trend("cpu", 300)),
+    ]
+
+    time.sleep(1.0)  # first sample and process scan
+    print(f"  {'tool query':<26}{'before':>12}{'after':>12}")
+    for label, before, after in cases:
+        old = f"{_time(before, runs=3) * 1000:10.1f}ms" if before else f"{'-':>12}"
+        print(f"  {label:<26}{old}{_time(after, runs=100) * 1000:10.3f}ms")
+
+    print(f"\n  Sampling for {seconds}s at {interval:g}s intervals...")
+    process_started = time.process_time()
+    time.sleep(seconds)
+    process_cpu = time.process_time() - process_started
+    sampler.stop()
+
+    samples = sampler.stats["samples"] or 1
+    print(f"  {sampler.get_stats()}")
+    print(
+        f"  Sampler thread: {sampler.stats['cpu_seconds'] * 1000:.0f}ms CPU total, "
+        f"{sampler.stats['cpu_seconds'] / samples * 1000:.2f}ms per sample"
+    )
+    print(
+        f"  Whole process while idle: {process_cpu / seconds * 100:.2f}% of one core"
+    )
+    print("=" * 70 + "\n")
+
+
+def main():
+    import sys
+
+    interval = 2.0
+    bench = False
+    for arg in sys.argv[1:]:
+        if arg.startswith("--interval="):
+            interval = float(arg.split("=", 1)[1])
+        elif arg == "--bench":
+            bench = True
+        elif arg in ["--help", "-h"]:
+            print(__doc__)
+            return
+
+    if bench:
+        run_benchmark(interval)
+        return
+
+    sampler = MetricsSampler(interval=interval).start()
+    try:
+        while True:
+            time.sleep(interval)
+            latest = sampler.latest()
+            if latest:
+                print(
+                    f"CPU {latest.cpu:5.1f}% | RAM {latest.memory:5.1f}% | "
+                    f"Disk {latest.disk:5.1f}%"
+                )
+    except KeyboardInterrupt:
+        sampler.stop()
+        print(sampler.get_stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+"""
+Ollama Client - Shared, pooled HTTP access to the local LLM
+One keep-alive session for every Ollama call, with retries and model pinning.
+
+    python ollama_client.py --check     (against a local stub server)
+"""
+
+import json
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+DEFAULT_BASE_URL = "http://localhost:11434"
+
+
+class OllamaClient:
+    """Pooled Ollama API client"""
+
+    def __init__(
+        self,
+        base_url=None,
+        keep_alive="30m",
+        timeout=25,
+        retries=2,
+        backoff=0.3,
+        pool_size=4,
+    ):
+        base_url = base_url or os.getenv("OLLAMA_HOST", DEFAULT_BASE_URL)
+        if not base_url.startswith(("http://", "https://")):
+            base_url = "http://" + base_url
+
+        self.base_url = base_url.rstrip("/")
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+
+        # Only retry failures that can't have started a generation
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=0,
+            status=retries,
+            status_forcelist=[502, 503, 504],
+            allowed_methods=None,
+            backoff_factor=backoff,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, max_retries=retry
+        )
+
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def url(self, path):
+        return f"{self.base_url}{path}"
+
+    def chat(
+        self, model, messages, options=None, stream=False, timeout=None, tools=None
+    ):
+        """POST /api/chat - returns the requests.Response"""
+        payload = {
+            "model": model,
+            "messages": messages,
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+        }
+        if options:
+            payload["options"] = options
+        if tools:
+            payload["tools"] = tools
+
+        return self.session.post(
+            self.url("/api/chat"),
+            json=payload,
+            stream=stream,
+            timeout=timeout or self.timeout,
+        )
+
+    def is_running(self, timeout=3):
+        """Check that the Ollama server answers"""
+        try:
+            response = self.session.get(self.url("/api/tags"), timeout=timeout)
+            return response.status_code == 200
+        except requests.exceptions.RequestException:
+            return False
+
+    def warm_up(self, model, timeout=120, options=None):
+        """Load and pin the model before the first turn (same num_ctx as turns)"""
+        try:
+            response = self.chat(model, [], options=options, timeout=timeout)
+            if response.status_code == 200:
+                print(f"   🔥 Model '{model}' loaded")
+                return True
+            print(f"   ⚠️  Warm-up failed: {response.status_code}")
+        except requests.exceptions.RequestException as e:
+            print(f"   ⚠️  Warm-up failed: {e}")
+        return False
+
+    def close(self):
+        self.session.close()
+
+
+# ========== SHARED CLIENT ==========
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Get the process-wide Ollama client"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = OllamaClient()
+        return _client
+
+
+def configure(**kwargs):
+    """Replace the shared client (e.g. with a different base_url)"""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = OllamaClient(**kwargs)
+        return _client
+
+
+# ========== CHECK ==========
+
+
+def _stub_server(statuses=()):
+    """
+    Local stand-in for Ollama on a free port → (server, requests seen).
+    Each request is recorded as (client port, path, JSON body); the first
+    len(statuses) replies use those status codes, the rest are 200.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    seen = []
+    statuses = list(statuses)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like Ollama
+
+        def _reply(self, body):
+            status = statuses.pop(0) if statuses else 200
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            seen.append((self.client_address[1], self.path, None))
+            self._reply({"models": []})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            seen.append((self.client_address[1], self.path, body))
+            self._reply({"message": {"role": "assistant", "content": "ok"}})
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, seen
+
+
+def run_check():
+    passed = True
+
+    def check(label, ok, detail):
+        nonlocal passed
+        passed = passed and ok
+        print(f"  {'✅' if ok else '❌'} {label:<40} {detail}")
+
+    print("\n" + "=" * 70)
+    print("     🧪 OLLAMA CLIENT CHECK - local stub server")
+    print("=" * 70)
+
+    def client_for(server, **options):
+        host, port = server.server_address
+        return OllamaClient(base_url=f"http://{host}:{port}", backoff=0, **options)
+
+    # Connection reuse and model pinning
+    server, seen = _stub_server()
+    client = client_for(server)
+    for _ in range(5):
+        client.chat("mistral", [{"role": "user", "content": "hi"}])
+    client.is_running()
+    ports = {port for port, _, _ in seen}
+    check(
+        "6 calls share one connection", len(ports) == 1, f"{len(ports)} connections"
+    )
+    pinned = [body.get("keep_alive") for _, path, body in seen if body]
+    check(
+        "keep_alive sent on every chat",
+        pinned == ["30m"] * 5,
+        pinned[:2],
+    )
+    server.shutdown()
+
+    # Retries: 503s before the model answers are retried, with backoff
+    server, seen = _stub_server([503, 503])
+    client = client_for(server)
+    response = client.chat("mistral", [{"role": "user", "content": "hi"}])
+    check(
+        "503, 503, then 200 - retried",
+        response.status_code == 200 and len(seen) == 3,
+        f"HTTP {response.status_code} after {len(seen)} requests",
+    )
+    server.shutdown()
+
+    server, seen = _stub_server([500])
+    client = client_for(server)
+    response = client.chat("mistral", [{"role": "user", "content": "hi"}])
+    check(
+        "500 (generation failed) - not retried",
+        response.status_code == 500 and len(seen) == 1,
+        f"HTTP {response.status_code} after {len(seen)} requests",
+    )
+    server.shutdown()
+
+    # Warm-up: loads and pins the model with the turns' num_ctx
+    server, seen = _stub_server()
+    client = client_for(server)
+    warmed = client.warm_up("mistral", options={"num_ctx": 4096})
+    body = seen[0][2] if seen else {}
+    check(
+        "warm-up loads and pins the model",
+        warmed
+        and body.get("messages") == []
+        and body.get("keep_alive") == "30m"
+        and body.get("options") == {"num_ctx": 4096},
+        body,
+    )
+    server.shutdown()
+
+    server, seen = _stub_server([503, 503, 503])
+    client = client_for(server)
+    check(
+        "warm-up failure is reported, not raised",
+        client.warm_up("mistral") is False,
+        f"{len(seen)} requests",
+    )
+    server.shutdown()
+
+    # Nothing listening: no exception from the startup probe
+    client = OllamaClient(base_url="http://127.0.0.1:9", retries=0)
+    check("is_running() with no server", client.is_running() is False, "False")
+
+    print("=" * 70)
+    print(f"  {'✅ All checks passed' if passed else '❌ Some checks failed'}\n")
+    return passed
+
+
+def main():
+    import sys
+
+    if "--check" in sys.argv[1:]:
+        sys.exit(0 if run_check() else 1)
+
+    print(__doc__)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,478 @@
+# -*- coding: utf-8 -*-
+"""
+Phrase Bank - Pre-synthesized audio for short, predictable replies
+The system prompt makes the model answer with stock phrases ("Opening
+Chrome", "Creating file", "Done") and every session starts and ends with the
+same greeting/farewell. Each tool also has a confirmation ("File created.",
+"Opening Chrome.") that leads the reply when the model's answer was only tool
+calls. Those are synthesized once at startup (in the background) and kept as
+in-memory PCM, so speaking them is instant.
+
+Lookups are per sentence: leading sentences found in the bank play right
+away while Piper synthesizes only the rest of the reply.
+
+    python phrase_bank.py --check
+    python phrase_bank.py --bench [--voice=path/to/model.onnx]
+"""
+
+import json
+import re
+import shutil
+import subprocess
+import threading
+import time
+
+
+# Apps the model is most likely to announce ("Opening Chrome.")
+COMMON_APPS = [
+    "Chrome",
+    "Google Chrome",
+    "Firefox",
+    "Edge",
+    "Notepad",
+    "Calculator",
+    "Explorer",
+    "File Explorer",
+    "Terminal",
+    "Command Prompt",
+    "PowerShell",
+    "Paint",
+    "Word",
+    "Excel",
+    "PowerPoint",
+    "VS Code",
+    "Spotify",
+]
+
+# Stock replies from build_system_prompt
+ACKNOWLEDGEMENTS = [
+    "Done.",
+    "Okay.",
+    "Sure.",
+    "Got it.",
+    "Creating file.",
+    "Creating file. Done.",
+    "Searching.",
+    "Searching now.",
+    "Let me check.",
+    "Noted.",
+    "Sorry, I didn't catch that.",
+]
+
+# Spoken first when a tool succeeded ({0} is the call's first argument)
+TOOL_CONFIRMATIONS = {
+    "write_file": "File created.",
+    "create_file": "File created.",
+    "append_to_file": "Added to the file.",
+    "rename_file": "File renamed.",
+    "move_file": "File moved.",
+    "delete_file": "File deleted.",
+    "create_folder": "Folder created.",
+    "open_app": "Opening {0}.",
+    "open_url": "Opening the page.",
+    "web_search": "Here's what I found.",
+    "google_search": "Here's what I found.",
+    "fetch_webpage": "Here's the page.",
+    "remember_fact": "I'll remember that.",
+    "add_task": "Task added.",
+    "complete_task": "Task completed.",
+}
+
+TEMPLATES = [
+    "Hello {user_name}! Ready to help. What do you need?",
+    "Hello {user_name}! Say '{wake_word}' when you need me.",
+    "Goodbye {user_name}!",
+]
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def read_sample_rate(voice_model_path, default=22050):
+    """Sample rate from a Piper model's .onnx.json config"""
+    if not voice_model_path:
+        return default
+    try:
+        with open(f"{voice_model_path}.json", "r", encoding="utf-8") as f:
+            return json.load(f)["audio"]["sample_rate"]
+    except Exception:
+        return default
+
+
+def tool_confirmation(tool_name, params=()):
+    """Confirmation for a successful call, or None (unknown tool/argument)"""
+    template = TOOL_CONFIRMATIONS.get(tool_name)
+    if template is None:
+        return None
+    if "{0}" in template:
+        argument = str(params[0]).strip() if params else ""
+        if not argument:
+            return None
+        # "chrome" → "Chrome", as the phrase was banked
+        for app in COMMON_APPS:
+            if app.lower() == argument.lower():
+                argument = app
+        return template.format(argument)
+    return template
+
+
+def normalize(text):
+    """Lowercase, single-spaced, without trailing punctuation"""
+    return " ".join(text.lower().split()).rstrip(".!? ")
+
+
+class PhraseBank:
+    """In-memory PCM for phrases the assistant says over and over"""
+
+    def __init__(
+        self,
+        voice_model_path,
+        user_name="friend",
+        wake_word="jarvis",
+        length_scale="0.95",
+        sentence_silence="0.1",
+    ):
+        self.voice_model_path = voice_model_path
+        self.user_name = user_name
+        self.wake_word = wake_word
+        self.length_scale = length_scale
+        self.sentence_silence = sentence_silence
+        self.sample_rate = read_sample_rate(voice_model_path)
+
+        self.lock = threading.Lock()
+        self.bank = {}  # normalized text -> (pcm, synth_seconds)
+
+        self.stats = {"hits": 0, "misses": 0, "saved": 0.0}
+
+    def phrases(self):
+        """Every phrase to pre-synthesize"""
+        phrases = list(ACKNOWLEDGEMENTS)
+        for tool_name, template in TOOL_CONFIRMATIONS.items():
+            if "{0}" not in template:
+                phrases.append(template)
+        phrases += [tool_confirmation("open_app", [app]) for app in COMMON_APPS]
+        phrases += [
+            t.format(user_name=self.user_name, wake_word=self.wake_word)
+            for t in TEMPLATES
+        ]
+        return list(dict.fromkeys(phrases))  # tools share some confirmations
+
+    # ========== SYNTHESIS ==========
+
+    def synthesize(self, text, timeout=20):
+        """Piper → raw 16-bit mono PCM bytes (or None)"""
+        cmd = [
+            "piper",
+            "--model",
+            self.voice_model_path,
+            "--output_raw",
+            "--length-scale",
+            self.length_scale,
+            "--sentence-silence",
+            self.sentence_silence,
+        ]
+        try:
+            result = subprocess.run(
+                cmd, input=text.encode("utf-8"), capture_output=True, timeout=timeout
+            )
+            return result.stdout if result.returncode == 0 and result.stdout else None
+        except (subprocess.TimeoutExpired, FileNotFoundError):
+            return None
+
+    def add(self, text):
+        """Synthesize one phrase into the bank"""
+        started = time.perf_counter()
+        pcm = self.synthesize(text)
+        if pcm:
+            with self.lock:
+                self.bank[normalize(text)] = (pcm, time.perf_counter() - started)
+        return pcm
+
+    def available(self):
+        return bool(self.voice_model_path) and shutil.which("piper") is not None
+
+    def warm(self):
+        """Synthesize every phrase (run in a background thread)"""
+        if not self.available():
+            print("   ⚠️  Phrase bank: Piper unavailable")
+            return
+
+        started = time.perf_counter()
+        failed = 0
+        for text in self.phrases():
+            with self.lock:
+                if normalize(text) in self.bank:
+                    continue
+            if self.add(text) is None:
+                failed += 1  # this phrase is synthesized live instead
+
+        skipped = f" ({failed} failed)" if failed else ""
+        print(
+            f"   🗣️  Phrase bank ready: {len(self.bank)} phrases{skipped} "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+
+    def start_warming(self):
+        thread = threading.Thread(target=self.warm, daemon=True)
+        thread.start()
+        return thread
+
+    # ========== LOOKUP ==========
+
+    def _get(self, text):
+        """Bank entry for text, counted as a hit (misses are counted by callers)"""
+        with self.lock:
+            entry = self.bank.get(normalize(text))
+            if entry is not None:
+                self.stats["hits"] += 1
+                self.stats["saved"] += entry[1]
+        return entry
+
+    def _miss(self):
+        with self.lock:
+            self.stats["misses"] += 1
+
+    def lookup(self, text):
+        """PCM for an exact (normalized) match, or None"""
+        entry = self._get(text)
+        if entry is None:
+            self._miss()
+            return None
+        return entry[0]
+
+    def split_prefix(self, text):
+        """
+        Serve leading sentences from the bank.
+
+        Returns (pcm_chunks, remaining_text) - the remainder still needs
+        synthesis (empty string if the whole reply was in the bank).
+        """
+        # Whole reply first (multi-sentence templates like the greeting)
+        entry = self._get(text)
+        if entry is not None:
+            return [entry[0]], ""
+
+        sentences = [s for s in _SENTENCE_SPLIT.split(text.strip()) if s.strip()]
+
+        chunks = []
+        for i, sentence in enumerate(sentences):
+            entry = self._get(sentence)
+            if entry is None:
+                self._miss()
+                return chunks, " ".join(sentences[i:])
+            chunks.append(entry[0])
+
+        return chunks, ""
+
+    def get_stats(self):
+        """Hit rate and synthesis time saved"""
+        with self.lock:
+            hits, misses = self.stats["hits"], self.stats["misses"]
+            saved = self.stats["saved"]
+        total = hits + misses
+        rate = 100 * hits / total if total else 0.0
+        return (
+            f"🗣️  Phrase bank: {hits}/{total} hits ({rate:.0f}%) | "
+            f"~{saved:.1f}s synthesis saved"
+        )
+
+
+# ========== CHECK ==========
+
+
+class _SimulatedPiper(PhraseBank):
+    """
+    PhraseBank with a stand-in for the Piper subprocess: each call costs
+    startup + per_char seconds (roughly Piper on a laptop CPU) and returns
+    silence of about the right length. Phrases in fail are never synthesized.
+    """
+
+    def __init__(self, startup=0.15, per_char=0.004, fail=(), **kwargs):
+        super().__init__(None, **kwargs)
+        self.startup = startup
+        self.per_char = per_char
+        self.fail = {normalize(text) for text in fail}
+
+    def available(self):
+        return True
+
+    def synthesize(self, text, timeout=20):
+        time.sleep(self.startup + self.per_char * len(text))
+        if normalize(text) in self.fail:
+            return None
+        return b"\x00\x00" * int(self.sample_rate * 0.06 * len(text))
+
+
+def run_check():
+    passed = True
+
+    def check(label, ok, detail):
+        nonlocal passed
+        passed = passed and ok
+        print(f"  {'✅' if ok else '❌'} {label:<40} {detail}")
+
+    print("\n" + "=" * 70)
+    print("     🧪 PHRASE BANK CHECK")
+    print("=" * 70)
+
+    bank = _SimulatedPiper(startup=0, per_char=0, fail=["Okay.", "Opening Paint."])
+    bank.warm()
+    phrases = {normalize(text) for text in bank.phrases()}
+    check(
+        "failed phrases skipped, rest warmed",
+        set(bank.bank) == phrases - bank.fail,
+        f"{len(bank.bank)}/{len(phrases)} phrases",
+    )
+    check(
+        "failed phrase still speakable live",
+        bank.lookup("Okay") is None and bank.lookup("done!") is not None,
+        "'okay' misses, 'done!' hits",
+    )
+
+    opening = tool_confirmation("open_app", ["chrome"])
+    check(
+        "confirmations keyed by tool name",
+        bank.lookup(opening) is not None
+        and bank.lookup(tool_confirmation("delete_file", ["a.txt"])) is not None
+        and tool_confirmation("run_command", ["dir"]) is None
+        and tool_confirmation("open_app", [""]) is None,
+        f"open_app → '{opening}'",
+    )
+
+    started = time.perf_counter()
+    PhraseBank(None).warm()
+    check(
+        "no Piper → gives up at once",
+        time.perf_counter() - started < 0.1,
+        f"{(time.perf_counter() - started) * 1000:.0f}ms",
+    )
+
+    chunks, remaining = bank.split_prefix("Creating file. Done. It has 3 lines.")
+    check(
+        "leading sentences served from bank",
+        len(chunks) == 2 and remaining == "It has 3 lines.",
+        f"{len(chunks)} chunks + '{remaining}'",
+    )
+    greeting = "Hello friend! Ready to help. What do you need?"
+    chunks, remaining = bank.split_prefix(greeting)
+    check(
+        "whole template is one hit",
+        len(chunks) == 1 and remaining == "",
+        f"{len(chunks)} chunk",
+    )
+
+    # Counters stay exact with several speakers looking up at once
+    bank = _SimulatedPiper(startup=0, per_char=0)
+    bank.warm()
+
+    def speaker():
+        for _ in range(500):
+            bank.lookup("Done.")
+            bank.lookup("Something the bank has never heard.")
+
+    threads = [threading.Thread(target=speaker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    check(
+        "hit/miss counters under 8 threads",
+        bank.stats["hits"] == 4000 and bank.stats["misses"] == 4000,
+        f"{bank.stats['hits']} hits, {bank.stats['misses']} misses",
+    )
+
+    print("=" * 70)
+    print(f"  {'✅ All checks passed' if passed else '❌ Some checks failed'}\n")
+    return passed
+
+
+# ========== BENCHMARK ==========
+
+# One scripted session, replying the way build_system_prompt asks
+_SESSION = [
+    "Hello {user_name}! Ready to help. What do you need?",
+    "Opening Chrome.",
+    "Creating file. Done.",
+    "Searching now.",
+    "Here's what I found. Python was created by Guido van Rossum in 1991.",
+    "It's 3:42 PM on Monday.",
+    "Opening Spotify.",
+    "Task added.",
+    "I'll remember that.",
+    "The file has 42 lines, mostly configuration for the build.",
+    "Done.",
+    "Goodbye {user_name}!",
+]
+
+
+def run_benchmark(voice_model_path=None, user_name="Alex"):
+    """Hit rate and time to first audio, with and without the bank"""
+    if voice_model_path:
+        bank = PhraseBank(voice_model_path, user_name=user_name)
+        if not bank.available():
+            print("⚠️  Piper not found on PATH")
+            return
+        mode = f"Piper ({voice_model_path})"
+    else:
+        bank = _SimulatedPiper(user_name=user_name)
+        mode = "simulated Piper (150ms + 4ms/char)"
+
+    print("\n" + "=" * 70)
+    print("     ⏱️  PHRASE BANK BENCHMARK - scripted session")
+    print(f"     {mode}")
+    print("=" * 70)
+
+    bank.warm()
+    print()
+
+    total_without = total_with = 0.0
+    for template in _SESSION:
+        reply = template.format(user_name=user_name)
+        first = _SENTENCE_SPLIT.split(reply)[0]
+
+        # Without the bank the first sentence is synthesized before playback
+        started = time.perf_counter()
+        bank.synthesize(first)
+        without = time.perf_counter() - started
+
+        started = time.perf_counter()
+        chunks, remaining = bank.split_prefix(reply)
+        if not chunks:
+            bank.synthesize(_SENTENCE_SPLIT.split(remaining)[0])
+        served = time.perf_counter() - started
+
+        total_without += without
+        total_with += served
+        print(
+            f"  {'✅' if chunks else '  '} {reply[:44]:<44} "
+            f"{without * 1000:6.0f}ms → {served * 1000:6.0f}ms"
+        )
+
+    print("=" * 70)
+    print(f"  {bank.get_stats()}")
+    print(
+        f"  Time to first audio over {len(_SESSION)} replies: "
+        f"{total_without:.2f}s → {total_with:.2f}s "
+        f"({total_without - total_with:.2f}s saved)\n"
+    )
+
+
+def main():
+    import sys
+
+    args = sys.argv[1:]
+    if "--check" in args:
+        sys.exit(0 if run_check() else 1)
+
+    if "--bench" in args:
+        voice = None
+        for arg in args:
+            if arg.startswith("--voice="):
+                voice = arg.split("=", 1)[1]
+        run_benchmark(voice)
+        return
+
+    print(__doc__)
+
+
+if __name__ == "__main__":
+    main()
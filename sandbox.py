@@ -0,0 +1,499 @@
+# -*- coding: utf-8 -*-
+"""
+Sandbox - Pre-forked, resource-limited workers for execute_python/run_command
+Code and commands run in a small pool of warm worker processes instead of
+the assistant itself. Each worker captures its own stdout (no more swapping
+sys.stdout under the tool threads), and every job runs under limits:
+
+- CPU time (RLIMIT_CPU → SIGXCPU, reported as a limit hit)
+- address space (RLIMIT_AS → MemoryError, reported as a limit hit)
+- wall clock (the worker is killed and replaced)
+
+A worker that hit a limit is recycled. rlimits need the POSIX resource
+module - on Windows only the wall-clock kill applies.
+
+    python sandbox.py --check
+"""
+
+import math
+import multiprocessing
+import os
+import queue
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows - wall-clock limits only
+    resource = None
+
+
+SAFE_BUILTINS = [
+    "abs",
+    "all",
+    "any",
+    "chr",
+    "len",
+    "list",
+    "max",
+    "min",
+    "print",
+    "range",
+    "str",
+    "sum",
+    "type",
+]
+
+MAX_OUTPUT = 10_000
+
+
+# ========== WORKER ==========
+
+
+class CPULimitExceeded(BaseException):
+    """Raised by SIGXCPU - a BaseException so `except Exception` can't eat it"""
+
+
+class _BoundedOutput:
+    """stdout replacement that keeps only the first MAX_OUTPUT chars"""
+
+    def __init__(self, limit=MAX_OUTPUT):
+        self.limit = limit
+        self.parts = []
+        self.size = 0
+        self.truncated = False
+
+    def write(self, text):
+        room = self.limit - self.size
+        if room <= 0:
+            self.truncated = True
+        elif len(text) > room:
+            self.parts.append(text[:room])
+            self.size = self.limit
+            self.truncated = True
+        else:
+            self.parts.append(text)
+            self.size += len(text)
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def getvalue(self):
+        return "".join(self.parts)
+
+
+def _on_cpu_limit(signum, frame):
+    raise CPULimitExceeded()
+
+
+def _cpu_used():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _set_limits(cpu_seconds, memory_bytes):
+    """Soft limits for the next job (the hard limits stay untouched)"""
+    if resource is None:
+        return
+    if cpu_seconds:
+        _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        soft = math.ceil(_cpu_used() + cpu_seconds)
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+    if memory_bytes:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        if hard != resource.RLIM_INFINITY:
+            memory_bytes = min(memory_bytes, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, hard))
+
+
+def _clear_limits():
+    if resource is None:
+        return
+    for limit in (resource.RLIMIT_CPU, resource.RLIMIT_AS):
+        _, hard = resource.getrlimit(limit)
+        resource.setrlimit(limit, (hard, hard))
+
+
+def _run_python(code, options):
+    import builtins
+
+    safe = {name: getattr(builtins, name) for name in SAFE_BUILTINS}
+    output = _BoundedOutput()
+    local_vars = {}
+    result = {"status": "ok"}
+
+    old_stdout = sys.stdout
+    sys.stdout = output
+    try:
+        _set_limits(options.get("cpu_seconds"), options.get("memory_bytes"))
+        exec(code, {"__builtins__": safe}, local_vars)
+    except CPULimitExceeded:
+        result = {"status": "cpu", "recycle": True}
+    except MemoryError:
+        local_vars = {}
+        result = {"status": "memory", "recycle": True}
+    except Exception as e:
+        result = {"status": "error", "error": str(e)}
+    finally:
+        sys.stdout = old_stdout
+        _clear_limits()
+
+    result["output"] = output.getvalue()
+    result["truncated"] = output.truncated
+    if local_vars and result["status"] == "ok":
+        result["variables"] = repr(local_vars)[:MAX_OUTPUT]
+    return result
+
+
+def _run_command(command, options):
+    cpu_seconds = options.get("cpu_seconds")
+    memory_bytes = options.get("memory_bytes")
+
+    def limit_child():
+        _set_limits(cpu_seconds, memory_bytes)
+
+    kwargs = {}
+    if os.name == "posix":
+        # Own process group, so a timeout kills everything the shell started
+        kwargs["start_new_session"] = True
+        kwargs["preexec_fn"] = limit_child
+
+    process = subprocess.Popen(
+        command,
+        shell=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        errors="replace",
+        **kwargs,
+    )
+    try:
+        stdout, stderr = process.communicate(timeout=options.get("timeout"))
+    except subprocess.TimeoutExpired:
+        if os.name == "posix":
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+        process.communicate()
+        return {"status": "timeout"}
+
+    return {
+        "status": "ok",
+        "stdout": stdout[:MAX_OUTPUT],
+        "stderr": stderr[:MAX_OUTPUT],
+        "returncode": process.returncode,
+    }
+
+
+def _worker_main(conn):
+    """Worker loop: receive a job, run it under limits, send the result"""
+    if resource is not None:
+        signal.signal(signal.SIGXCPU, _on_cpu_limit)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C is the assistant's
+
+    while True:
+        try:
+            kind, payload, options = conn.recv()
+        except (EOFError, OSError):
+            return
+
+        try:
+            if kind == "python":
+                result = _run_python(payload, options)
+            else:
+                result = _run_command(payload, options)
+        except CPULimitExceeded:
+            result = {"status": "cpu", "recycle": True}
+        except Exception as e:
+            result = {"status": "error", "error": str(e)}
+
+        conn.send(result)
+        if result.get("recycle"):
+            return
+
+
+# ========== POOL ==========
+
+
+def _context():
+    """forkserver where available: workers fork from a clean, tiny server
+    process, not from the multi-threaded assistant"""
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(["sandbox"])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+class _Worker:
+    __slots__ = ("process", "conn", "jobs")
+
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.jobs = 0
+
+
+class Sandbox:
+    """Pool of warm worker processes that run untrusted jobs under limits"""
+
+    def __init__(
+        self,
+        workers=2,
+        cpu_seconds=3,
+        memory_mb=256,
+        wall_seconds=8,
+        command_memory_mb=2048,
+        max_jobs=200,
+    ):
+        self.size = workers
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.wall_seconds = wall_seconds
+        self.command_memory_mb = command_memory_mb
+        self.max_jobs = max_jobs  # recycle workers now and then
+
+        self.context = _context()
+        self.idle = queue.Queue()
+        self.lock = threading.Lock()
+        self.closed = False
+        self.workers = []
+
+        self.stats = {
+            "jobs": 0,
+            "timeouts": 0,
+            "cpu_limits": 0,
+            "memory_limits": 0,
+            "crashes": 0,
+            "respawns": 0,
+        }
+
+    def start(self):
+        """Fork the workers in the background - the first job waits for one"""
+        threading.Thread(target=self._fill, daemon=True).start()
+        return self
+
+    def _fill(self):
+        for _ in range(self.size):
+            self._add_worker()
+
+    def _add_worker(self):
+        if self.closed:
+            return
+        try:
+            parent_conn, child_conn = self.context.Pipe()
+            process = self.context.Process(
+                target=_worker_main,
+                args=(child_conn,),
+                name="sandbox-worker",
+                daemon=True,
+            )
+            process.start()
+            child_conn.close()
+        except Exception as e:
+            print(f"⚠️  Sandbox worker failed to start: {e}")
+            return
+
+        worker = _Worker(process, parent_conn)
+        with self.lock:
+            self.workers.append(worker)
+        self.idle.put(worker)
+
+    def _retire(self, worker, replace=True):
+        """Kill a worker (if still running) and fork a replacement"""
+        try:
+            if worker.process.is_alive():
+                worker.process.kill()
+            worker.process.join(timeout=1)
+            worker.conn.close()
+        except Exception:
+            pass
+
+        with self.lock:
+            if worker in self.workers:
+                self.workers.remove(worker)
+
+        if replace and not self.closed:
+            self.stats["respawns"] += 1
+            threading.Thread(target=self._add_worker, daemon=True).start()
+
+    def _call(self, kind, payload, options, wall_seconds):
+        started = time.monotonic()
+        try:
+            worker = self.idle.get(timeout=wall_seconds)
+        except queue.Empty:
+            return {"status": "busy"}
+
+        self.stats["jobs"] += 1
+        remaining = max(0.5, wall_seconds - (time.monotonic() - started))
+
+        try:
+            worker.conn.send((kind, payload, options))
+            if not worker.conn.poll(remaining):
+                self.stats["timeouts"] += 1
+                self._retire(worker)
+                return {"status": "timeout"}
+            result = worker.conn.recv()
+        except (EOFError, OSError):
+            # Died mid-job (e.g. killed at the hard CPU limit)
+            self.stats["crashes"] += 1
+            self._retire(worker)
+            return {"status": "crashed"}
+
+        worker.jobs += 1
+        if result["status"] == "cpu":
+            self.stats["cpu_limits"] += 1
+        elif result["status"] == "memory":
+            self.stats["memory_limits"] += 1
+
+        if result.get("recycle") or worker.jobs >= self.max_jobs:
+            self._retire(worker)
+        else:
+            self.idle.put(worker)
+        return result
+
+    def run_python(self, code):
+        """exec code with SAFE_BUILTINS → {'status', 'output', ...}"""
+        options = {
+            "cpu_seconds": self.cpu_seconds,
+            "memory_bytes": self.memory_mb * 1024 * 1024,
+        }
+        return self._call("python", code, options, self.wall_seconds)
+
+    def run_command(self, command, timeout=15):
+        """Run a shell command → {'status', 'stdout', 'stderr', 'returncode'}"""
+        options = {
+            "timeout": timeout,
+            "cpu_seconds": timeout,
+            "memory_bytes": (
+                self.command_memory_mb * 1024 * 1024
+                if self.command_memory_mb
+                else None
+            ),
+        }
+        return self._call("command", command, options, timeout + 2)
+
+    def close(self):
+        self.closed = True
+        with self.lock:
+            workers = list(self.workers)
+        for worker in workers:
+            self._retire(worker, replace=False)
+
+    def get_stats(self):
+        return (
+            f"🧪 Sandbox: {self.stats['jobs']} jobs | "
+            f"{self.stats['timeouts']} timeouts, "
+            f"{self.stats['cpu_limits']} CPU / "
+            f"{self.stats['memory_limits']} memory limits | "
+            f"{self.stats['respawns']} respawns"
+        )
+
+
+# ========== CHECK ==========
+
+
+def _spawn_per_call(code):
+    """What a fresh interpreter per call costs (the alternative to the pool)"""
+    return subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, timeout=30
+    ).stdout
+
+
+def run_check(calls=50):
+    sandbox = Sandbox(workers=2, cpu_seconds=2, memory_mb=256, wall_seconds=5)
+    sandbox.start()
+    passed = True
+
+    def check(label, ok, detail):
+        nonlocal passed
+        passed = passed and ok
+        print(f"  {'✅' if ok else '❌'} {label:<34} {detail}")
+
+    print("\n" + "=" * 70)
+    print("     🧪 SANDBOX CHECK")
+    print("=" * 70)
+
+    started = time.perf_counter()
+    result = sandbox.run_python("print(sum(range(10)))")
+    check(
+        "runs code, captures output",
+        result.get("output") == "45\n",
+        f"{result} (first call {time.perf_counter() - started:.2f}s)",
+    )
+
+    started = time.perf_counter()
+    result = sandbox.run_python("while True:\n    pass")
+    elapsed = time.perf_counter() - started
+    expected = "cpu" if resource is not None else "timeout"
+    check(
+        "infinite loop is stopped",
+        result["status"] == expected and elapsed < sandbox.wall_seconds + 1,
+        f"{result['status']} after {elapsed:.1f}s",
+    )
+
+    started = time.perf_counter()
+    result = sandbox.run_python("x = []\nwhile True:\n    x.append('x' * 10**6)")
+    elapsed = time.perf_counter() - started
+    check(
+        "memory bomb is stopped",
+        result["status"] in ("memory", "cpu", "timeout"),
+        f"{result['status']} after {elapsed:.1f}s",
+    )
+
+    result = sandbox.run_python("x = 'a' * 10**10")
+    check("huge allocation fails cleanly", result["status"] == "memory", result)
+
+    started = time.perf_counter()
+    result = sandbox.run_command("sleep 30", timeout=1)
+    elapsed = time.perf_counter() - started
+    check(
+        "command wall-clock timeout",
+        result["status"] == "timeout" and elapsed < 3,
+        f"{result['status']} after {elapsed:.1f}s",
+    )
+
+    result = sandbox.run_python("print('still alive')")
+    check("pool recovers", result.get("output") == "still alive\n", result)
+
+    code = "print(sum(i * i for i in range(1000)))"
+    started = time.perf_counter()
+    for _ in range(calls):
+        sandbox.run_python(code)
+    pooled = (time.perf_counter() - started) / calls
+
+    started = time.perf_counter()
+    for _ in range(min(calls, 20)):
+        _spawn_per_call(code)
+    spawned = (time.perf_counter() - started) / min(calls, 20)
+
+    check(
+        "pool beats spawn-per-call",
+        pooled < spawned,
+        f"{pooled * 1000:.1f}ms vs {spawned * 1000:.1f}ms per call "
+        f"({spawned / pooled:.0f}x)",
+    )
+
+    print(f"\n  {sandbox.get_stats()}")
+    print("=" * 70 + "\n")
+    sandbox.close()
+    return passed
+
+
+def main():
+    if "--check" in sys.argv[1:]:
+        # Workers unpickle _worker_main by module name - not from __main__
+        from sandbox import run_check as check
+
+        sys.exit(0 if check() else 1)
+    print(__doc__)
+
+
+if __name__ == "__main__":
+    main()
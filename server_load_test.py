@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+"""
+Server Load Test - N concurrent sessions against one SessionManager
+Drives AssistantSession exactly like the WebSocket handler does (utterance
+PCM in, JSON + PCM out) but in-process, with pre-recorded audio, a stub
+recognizer, a stub LLM and a stub Piper, so it runs offline and measures
+the server's own overhead: turn latency percentiles and memory per session.
+
+Pre-recorded audio: --audio-dir=DIR with 16-bit mono WAVs, each next to a
+.txt transcript (hello.wav + hello.txt). Without it, a built-in script of
+utterances is used with silent audio of realistic length.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import wave
+from pathlib import Path
+
+import ollama_client
+from assistant_server import SessionManager, VoicePool
+from intelligent_assistant import IntelligentAssistant
+from phrase_bank import PhraseBank
+
+
+SCRIPT = [
+    ("what time is it", None),
+    ("tell me something about the ocean", "The ocean covers most of the planet."),
+    ("calculate 15% of 200", None),
+    ("what should I cook tonight", "Try a quick pasta. It takes twenty minutes."),
+    ("open notepad", 'Opening Notepad. TOOL: get_current_date()'),
+    ("give me a fun fact", "Honey never spoils. Archaeologists found edible honey."),
+]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+# ========== STUBS ==========
+
+
+class StubResponse:
+    """Just enough of requests.Response for process_with_ai"""
+
+    status_code = 200
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+
+class StubOllama:
+    """OllamaClient stand-in with a fixed think time and canned replies"""
+
+    def __init__(self, replies, delay=0.4):
+        self.replies = replies
+        self.delay = delay
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def chat(self, model, messages, options=None, stream=False, timeout=None):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        text = self.replies.get(messages[-1]["content"], "Okay. Done.")
+        return StubResponse(
+            {
+                "message": {"content": text},
+                "prompt_eval_count": 40,
+                "prompt_eval_duration": int(self.delay * 0.2 * 1e9),
+                "eval_count": len(text.split()),
+            }
+        )
+
+    def warm_up(self, model, timeout=120):
+        return True
+
+    def is_running(self, timeout=3):
+        return True
+
+    def close(self):
+        pass
+
+
+class StubVoice(PhraseBank):
+    """Piper stand-in: silent PCM after a real-time-factor delay"""
+
+    def __init__(self, real_time_factor=0.1):
+        super().__init__(None)
+        self.real_time_factor = real_time_factor
+
+    def synthesize(self, text, timeout=20):
+        seconds = 0.065 * len(text)  # ~15 characters per second of speech
+        time.sleep(seconds * self.real_time_factor)
+        return bytes(int(seconds * self.sample_rate) * 2)
+
+
+class Sink:
+    """Collects what the WebSocket would have sent, with timestamps"""
+
+    def __init__(self):
+        self.first_audio = None
+        self.response_at = None
+        self.audio_bytes = 0
+
+    def reset(self):
+        self.first_audio = None
+        self.response_at = None
+
+    def __call__(self, message):
+        now = time.perf_counter()
+        if isinstance(message, bytes):
+            if self.first_audio is None:
+                self.first_audio = now
+            self.audio_bytes += len(message)
+        elif message.get("type") == "response":
+            self.response_at = now
+
+
+# ========== LOAD TEST ==========
+
+
+def load_utterances(audio_dir=None):
+    """[(pcm, sample_rate, transcript)]"""
+    utterances = []
+
+    if audio_dir:
+        for wav_path in sorted(Path(audio_dir).glob("*.wav")):
+            txt_path = wav_path.with_suffix(".txt")
+            if not txt_path.exists():
+                continue
+            with wave.open(str(wav_path), "rb") as wav:
+                pcm = wav.readframes(wav.getnframes())
+                rate = wav.getframerate()
+            text = txt_path.read_text(encoding="utf-8").strip()
+            utterances.append((pcm, rate, text))
+
+    if not utterances:
+        for text, _ in SCRIPT:
+            seconds = 0.4 + 0.06 * len(text)
+            utterances.append((bytes(int(16000 * seconds) * 2), 16000, text))
+
+    return utterances
+
+
+def run_load_test(
+    sessions=20, turns=5, llm_delay=0.4, max_turns=8, voices=2, audio_dir=None
+):
+    utterances = load_utterances(audio_dir)
+    transcripts = {pcm: text for pcm, _, text in utterances}
+    replies = {text: reply for text, reply in SCRIPT if reply}
+
+    # Memory DB, preferences and voice output go to a scratch directory
+    workdir = tempfile.mkdtemp(prefix="assistant_load_")
+    os.chdir(workdir)
+
+    ollama_client._client = StubOllama(replies, delay=llm_delay)
+    host = IntelligentAssistant(index_files=False)  # no home-directory crawl
+    host.recognize = lambda audio: transcripts[audio.frame_data]
+
+    manager = SessionManager(
+        host, max_sessions=sessions, max_turns=max_turns, max_voices=voices
+    )
+    manager.voice_pool = VoicePool(
+        StubVoice(), host.speech_planner, max_voices=voices
+    )
+
+    response_latencies = []
+    audio_latencies = []
+    errors = []
+    results_lock = threading.Lock()
+
+    tracemalloc.start()
+    baseline = tracemalloc.take_snapshot()
+
+    def client(index):
+        session = manager.create()
+        sink = Sink()
+        session.send = sink
+
+        for turn in range(turns):
+            pcm, rate, _ = utterances[(index + turn) % len(utterances)]
+            sink.reset()
+            started = time.perf_counter()
+            try:
+                manager.submit(session.handle_audio, pcm, rate).result()
+            except Exception as e:
+                errors.append(str(e))
+                continue
+
+            with results_lock:
+                if sink.response_at:
+                    response_latencies.append(sink.response_at - started)
+                if sink.first_audio:
+                    audio_latencies.append(sink.first_audio - started)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    grown = sum(stat.size_diff for stat in snapshot.compare_to(baseline, "filename"))
+
+    print("\n" + "=" * 70)
+    print("     📈 SERVER LOAD TEST")
+    print("=" * 70)
+    print(
+        f"  {sessions} sessions × {turns} turns | LLM {llm_delay * 1000:.0f}ms | "
+        f"{max_turns} turn workers | {voices} voices"
+    )
+    print(
+        f"  Wall time: {wall:.1f}s | Turns: {len(response_latencies)} | "
+        f"Errors: {len(errors)}"
+    )
+    for name, values in [
+        ("Reply", response_latencies),
+        ("First audio", audio_latencies),
+    ]:
+        print(
+            f"  {name:<12} p50 {percentile(values, 50) * 1000:7.0f}ms | "
+            f"p90 {percentile(values, 90) * 1000:7.0f}ms | "
+            f"p99 {percentile(values, 99) * 1000:7.0f}ms"
+        )
+    print(f"  LLM calls: {ollama_client._client.calls} (rest answered by the router)")
+    print(f"  Voice pool waits: {manager.voice_pool.stats['waits']}")
+    print(
+        f"  Memory: {grown / 1024:.0f} KB total, "
+        f"{grown / 1024 / sessions:.1f} KB per session"
+    )
+    print("=" * 70 + "\n")
+
+    manager.shutdown()
+    host.tool_executor.shutdown()
+
+    return {
+        "response_p50": percentile(response_latencies, 50),
+        "response_p99": percentile(response_latencies, 99),
+        "audio_p50": percentile(audio_latencies, 50),
+        "audio_p99": percentile(audio_latencies, 99),
+        "bytes_per_session": grown / sessions,
+        "errors": errors,
+    }
+
+
+def main():
+    options = {}
+    for arg in sys.argv[1:]:
+        if arg.startswith("--sessions="):
+            options["sessions"] = int(arg.split("=", 1)[1])
+        elif arg.startswith("--turns="):
+            options["turns"] = int(arg.split("=", 1)[1])
+        elif arg.startswith("--llm-delay="):
+            options["llm_delay"] = float(arg.split("=", 1)[1])
+        elif arg.startswith("--max-turns="):
+            options["max_turns"] = int(arg.split("=", 1)[1])
+        elif arg.startswith("--voices="):
+            options["voices"] = int(arg.split("=", 1)[1])
+        elif arg.startswith("--audio-dir="):
+            options["audio_dir"] = os.path.abspath(arg.split("=", 1)[1])
+        elif arg in ["--help", "-h"]:
+            print(
+                """
+📈 Server Load Test - Usage
+
+python server_load_test.py [--sessions=20] [--turns=5] [--llm-delay=0.4]
+                           [--max-turns=8] [--voices=2] [--audio-dir=DIR]
+"""
+            )
+            return
+
+    run_load_test(**options)
+
+
+if __name__ == "__main__":
+    main()
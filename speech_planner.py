@@ -0,0 +1,419 @@
+# -*- coding: utf-8 -*-
+"""
+Speech Planner - Duration-aware chunking for long replies
+Piper is given one bounded chunk at a time instead of the whole reply, so
+a long answer (a fetched web page, a file listing) can never run into the
+synthesis timeout and get dropped.
+
+Chunk sizes come from a duration estimate (phoneme-ish character counts,
+sentence pauses and the length scale) and the voice's measured real-time
+factor, which is updated after every chunk. SpeechPipeline synthesizes
+ahead of playback, so chunk N+1 is ready by the time chunk N finishes.
+
+    python speech_planner.py --check    (slow fake synthesizer)
+"""
+
+import queue
+import re
+import threading
+import time
+
+from assistant_state import AssistantStateMachine, IDLE, SPEAKING
+
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?;:])\s+|\n+")
+_CLAUSE_SPLIT = re.compile(r"(?<=[,;:)\-])\s+")
+_SPOKEN = re.compile(r"[A-Za-z]")
+_DIGIT = re.compile(r"\d")
+_TOOL_LINE = re.compile(r"^\s*[✅❌]")
+
+
+def estimate_phonemes(text):
+    """Rough phoneme count - letters, with digits read out as words"""
+    return len(_SPOKEN.findall(text)) + 3 * len(_DIGIT.findall(text))
+
+
+class SpeechPlanner:
+    """Splits replies into chunks Piper can always finish in time"""
+
+    def __init__(
+        self,
+        sample_rate=22050,
+        length_scale=0.95,
+        sentence_silence=0.1,
+        max_chunk_seconds=8.0,
+        synth_timeout=20,
+        real_time_factor=0.3,
+        summary_chars=400,
+    ):
+        self.sample_rate = sample_rate
+        self.length_scale = float(length_scale)
+        self.sentence_silence = float(sentence_silence)
+        self.max_chunk_seconds = max_chunk_seconds
+        self.synth_timeout = synth_timeout
+        self.summary_chars = summary_chars  # 0 = speak tool output in full
+
+        # Calibrated from every synthesized chunk (moving averages)
+        self.real_time_factor = real_time_factor
+        self.phonemes_per_second = 13.0
+
+        self.stats = {"chunks": 0, "audio": 0.0, "synth": 0.0, "skipped": 0}
+
+    # ========== ESTIMATES ==========
+
+    def estimate_seconds(self, text):
+        """Expected length of the spoken audio"""
+        pauses = len(_SENTENCE_SPLIT.findall(text.strip())) + 1
+        speech = estimate_phonemes(text) / self.phonemes_per_second
+        return speech * self.length_scale + pauses * self.sentence_silence
+
+    def estimate_synthesis(self, text):
+        """Expected wall time for Piper to synthesize text"""
+        return self.estimate_seconds(text) * self.real_time_factor
+
+    def chunk_limit(self):
+        """Longest chunk (in seconds of audio) that stays well inside the timeout"""
+        safe = 0.5 * self.synth_timeout / max(self.real_time_factor, 0.01)
+        return max(1.0, min(self.max_chunk_seconds, safe))
+
+    def stall_timeout(self):
+        """Longest a healthy pipeline goes without finishing a chunk"""
+        return self.synth_timeout + 2 * self.max_chunk_seconds
+
+    def timeout_for(self, text):
+        """Per-chunk timeout - generous, but never above synth_timeout"""
+        return min(self.synth_timeout, max(5.0, 4 * self.estimate_synthesis(text)))
+
+    def record(self, text, pcm, synth_seconds):
+        """Update the real-time factor and speaking rate from a finished chunk"""
+        audio_seconds = len(pcm) / 2 / self.sample_rate if pcm else 0.0
+        if audio_seconds <= 0:
+            return
+
+        self.real_time_factor = 0.7 * self.real_time_factor + 0.3 * (
+            synth_seconds / audio_seconds
+        )
+
+        phonemes = estimate_phonemes(text)
+        if phonemes:
+            pauses = len(_SENTENCE_SPLIT.findall(text.strip())) + 1
+            speaking = audio_seconds - pauses * self.sentence_silence
+            speaking = max(speaking, 0.1) / self.length_scale
+            self.phonemes_per_second = (
+                0.8 * self.phonemes_per_second + 0.2 * phonemes / speaking
+            )
+
+        self.stats["chunks"] += 1
+        self.stats["audio"] += audio_seconds
+        self.stats["synth"] += synth_seconds
+
+    # ========== PLANNING ==========
+
+    def summarize(self, text):
+        """Cap spoken tool output at summary_chars (the full text is printed)"""
+        if not self.summary_chars:
+            return text
+
+        # A tool block is its ✅/❌ line plus every line up to the next one
+        # (e.g. the page body under "📄 Content from ...")
+        spoken, blocks = [], []
+        for line in text.splitlines():
+            if _TOOL_LINE.match(line):
+                blocks.append([line])
+            elif blocks:
+                blocks[-1].append(line)
+            else:
+                spoken.append(line)
+
+        room, trimmed = self.summary_chars, False
+        for block in blocks:
+            if room <= 0:
+                trimmed = True
+                continue
+
+            output = "\n".join(block).strip()
+            if len(output) > room:
+                output = self._cut(output, room)
+                trimmed = True
+
+            spoken.append(output)
+            room -= len(output)
+
+        if trimmed:
+            spoken.append("The full result is on screen.")
+
+        return "\n".join(spoken).strip()
+
+    @staticmethod
+    def _cut(text, room):
+        """text cut to room chars, ending on a sentence (or word) boundary"""
+        cut = text[:room]
+        end = max(cut.rfind(". "), cut.rfind("! "), cut.rfind("? "), cut.rfind("\n"))
+        cut = cut[: end + 1] if end > room // 3 else cut.rsplit(" ", 1)[0]
+        cut = cut.rstrip(" ,;:\n")
+        if not cut.endswith((".", "!", "?")):
+            cut += "."
+        return cut
+
+    def plan(self, text):
+        """Split text into chunks no longer than chunk_limit() seconds"""
+        limit = self.chunk_limit()
+        chunks, current = [], ""
+
+        for sentence in _SENTENCE_SPLIT.split(text.strip()):
+            sentence = sentence.strip()
+            if not sentence:
+                continue
+
+            for piece in self._split_long(sentence, limit):
+                candidate = f"{current} {piece}".strip()
+                if current and self.estimate_seconds(candidate) > limit:
+                    chunks.append(current)
+                    current = piece
+                else:
+                    current = candidate
+
+        if current:
+            chunks.append(current)
+
+        return chunks
+
+    def _split_long(self, sentence, limit):
+        """Break one over-long sentence at clauses, then between words"""
+        if self.estimate_seconds(sentence) <= limit:
+            return [sentence]
+
+        pieces, current = [], ""
+        for part in _CLAUSE_SPLIT.split(sentence):
+            words = [part] if self.estimate_seconds(part) <= limit else part.split()
+            for word in words:
+                candidate = f"{current} {word}".strip()
+                if current and self.estimate_seconds(candidate) > limit:
+                    pieces.append(current)
+                    current = word
+                else:
+                    current = candidate
+
+        if current:
+            pieces.append(current)
+        return pieces
+
+    def get_stats(self):
+        chunks = self.stats["chunks"]
+        return (
+            f"🗣️  Speech: {chunks} chunks, {self.stats['audio']:.1f}s audio | "
+            f"RTF {self.real_time_factor:.2f} | "
+            f"{self.stats['skipped']} skipped"
+        )
+
+
+class SpeechPipeline:
+    """Synthesize upcoming chunks while the current one plays"""
+
+    def __init__(self, planner, synthesize, play, should_stop, ahead=2):
+        self.planner = planner
+        self.synthesize = synthesize  # (text, timeout) → PCM bytes or None
+        self.play = play  # (pcm) → None, blocks while playing
+        self.should_stop = should_stop
+        self.ahead = ahead
+        self.last_progress = time.monotonic()  # last chunk synthesized/played
+
+    def idle_for(self):
+        """Seconds since a chunk was last synthesized or played"""
+        return time.monotonic() - self.last_progress
+
+    def _produce(self, chunks, ready):
+        try:
+            for chunk in chunks:
+                if self.should_stop():
+                    break
+
+                started = time.perf_counter()
+                pcm = self.synthesize(chunk, self.planner.timeout_for(chunk))
+                elapsed = time.perf_counter() - started
+
+                if pcm is None:
+                    self.planner.stats["skipped"] += 1
+                    print(
+                        f"   ⚠️  Skipped a chunk ({elapsed:.1f}s): {chunk[:40]}..."
+                    )
+                    continue
+
+                self.planner.record(chunk, pcm, elapsed)
+                self.last_progress = time.monotonic()
+                while not self.should_stop():
+                    try:
+                        ready.put(pcm, timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+        finally:
+            ready.put(None)
+
+    def run(self, chunks, preface=()):
+        """
+        Play preface PCM (e.g. phrase-bank audio), then every chunk.
+
+        Synthesis starts before the preface plays, so it is hidden behind it.
+        Returns the number of chunks played.
+        """
+        # Room for the end marker even when playback stops early
+        ready = queue.Queue(maxsize=self.ahead + 1)
+        producer = threading.Thread(
+            target=self._produce, args=(chunks, ready), daemon=True
+        )
+        producer.start()
+
+        for pcm in preface:
+            if self.should_stop():
+                break
+            self.play(pcm)
+            self.last_progress = time.monotonic()
+
+        played = 0
+        while True:
+            pcm = ready.get()
+            if pcm is None:
+                break
+            if self.should_stop():
+                continue  # drain so the producer can finish
+            self.play(pcm)
+            self.last_progress = time.monotonic()
+            played += 1
+
+        producer.join()
+        return played
+
+
+def wait_until_spoken(state, planner, current_pipeline):
+    """
+    Block while state is SPEAKING. A long reply takes as long as it takes -
+    False only once the current pipeline (current_pipeline() → the
+    SpeechPipeline or None) has stopped draining its chunks.
+    """
+    stall = planner.stall_timeout()
+    while not state.wait_while(SPEAKING, timeout=stall):
+        pipeline = current_pipeline()
+        if pipeline is None or pipeline.idle_for() >= stall:
+            return False
+    return True
+
+
+# ========== CHECK ==========
+
+
+def _speak(planner, text, synthesize, play):
+    """Speak text like IntelligentAssistant._speak_thread → (pipeline, played)"""
+    state = AssistantStateMachine()
+    state.set(SPEAKING)
+    played = []
+    pipeline = SpeechPipeline(
+        planner,
+        synthesize=synthesize,
+        play=lambda pcm: (play(pcm), played.append(pcm)),
+        should_stop=lambda: not state.is_in(SPEAKING),
+    )
+
+    def speak():
+        try:
+            pipeline.run(planner.plan(planner.summarize(text)))
+        finally:
+            state.set(IDLE, only_from=(SPEAKING,))
+
+    threading.Thread(target=speak, daemon=True).start()
+    return state, pipeline, played
+
+
+def run_check():
+    passed = True
+
+    def check(label, ok, detail):
+        nonlocal passed
+        passed = passed and ok
+        print(f"  {'✅' if ok else '❌'} {label:<40} {detail}")
+
+    print("\n" + "=" * 70)
+    print("     🧪 SPEECH PLANNER CHECK - slow fake synthesizer")
+    print("=" * 70)
+
+    # Tool dumps: the whole block is capped, not just its ✅ line
+    planner = SpeechPlanner(summary_chars=100)
+    body = "\n".join(f"Paragraph {i} of the page goes on and on." for i in range(25))
+    reply = f"Here is the page.\n\n✅ 📄 Content from https://example.com:\n\n{body}"
+    spoken = planner.summarize(reply)
+    tool_part = spoken.split("Here is the page.", 1)[1].replace(
+        "The full result is on screen.", ""
+    )
+    check(
+        "tool block capped at summary_chars",
+        len(tool_part.strip()) <= 100 and "Paragraph 24" not in spoken,
+        f"{len(reply)} chars → {len(tool_part.strip())} spoken from the tool",
+    )
+    two = planner.summarize("✅ first\nline two\n❌ " + "x " * 200)
+    capped = two.replace("The full result is on screen.", "").strip()
+    check(
+        "cap shared across tool blocks",
+        len(capped) <= 100 + 1,  # plus the newline between the two blocks
+        f"{len(capped)} chars from 2 tools",
+    )
+
+    # A long reply on a slow voice: takes several stall timeouts, all spoken
+    rate = 16000
+    planner = SpeechPlanner(
+        sample_rate=rate, synth_timeout=2.0, max_chunk_seconds=2.0, summary_chars=0
+    )
+    speed = 0.15  # playback runs faster than real time so the check stays short
+
+    def synthesize(chunk, timeout):
+        seconds = planner.estimate_seconds(chunk)
+        time.sleep(0.1 * seconds)
+        return b"\0\0" * int(seconds * rate)
+
+    def play(pcm):
+        time.sleep(len(pcm) / 2 / rate * speed)
+
+    text = " ".join(f"This is sentence number {i} of a long answer." for i in range(25))
+    chunks = len(planner.plan(text))
+    started = time.monotonic()
+    state, pipeline, played = _speak(planner, text, synthesize, play)
+    finished = wait_until_spoken(state, planner, lambda: pipeline)
+    elapsed = time.monotonic() - started
+    check(
+        "long reply spoken to the end",
+        finished and len(played) == chunks and elapsed > planner.stall_timeout(),
+        f"{len(played)}/{chunks} chunks in {elapsed:.1f}s "
+        f"(stall timeout {planner.stall_timeout():.1f}s)",
+    )
+
+    # A synthesizer that hangs: the wait gives up after the stall timeout
+    hang = threading.Event()
+    state, pipeline, played = _speak(
+        planner, text, lambda chunk, timeout: hang.wait(30) and None, play
+    )
+    started = time.monotonic()
+    finished = wait_until_spoken(state, planner, lambda: pipeline)
+    elapsed = time.monotonic() - started
+    state.set(IDLE)
+    hang.set()
+    check(
+        "stalled speech gives up",
+        not finished and elapsed < 2 * planner.stall_timeout(),
+        f"after {elapsed:.1f}s",
+    )
+
+    print("=" * 70)
+    print(f"  {'✅ All checks passed' if passed else '❌ Some checks failed'}\n")
+    return passed
+
+
+def main():
+    import sys
+
+    if "--check" in sys.argv[1:]:
+        sys.exit(0 if run_check() else 1)
+
+    print(__doc__)
+
+
+if __name__ == "__main__":
+    main()
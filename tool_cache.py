@@ -0,0 +1,512 @@
+# -*- coding: utf-8 -*-
+"""
+Tool Cache - Remembered results for slow web tools
+Search results and fetched pages are kept in a small in-memory LRU in front
+of a SQLite store (assistant_memory/tool_cache.db), so asking the same thing
+twice - in one session or the next - skips the network entirely.
+
+Entries expire after a per-tool TTL. Expired pages that came with an ETag
+or Last-Modified header are revalidated with a conditional request instead
+of being downloaded and parsed again.
+
+    python tool_cache.py --check    (against a local HTTP stand-in)
+"""
+
+import re
+import sqlite3
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+from pathlib import Path
+
+
+# Seconds before an entry must be fetched (or revalidated) again
+DEFAULT_TTLS = {
+    "web_search": 15 * 60,
+    "fetch_webpage": 60 * 60,
+}
+
+# Expired entries with validators are kept this long for revalidation
+MAX_STALE = 7 * 24 * 3600
+
+_SPACES = re.compile(r"\s+")
+_EDGE_PUNCTUATION = re.compile(r"^[\s\"'“”?!.,]+|[\s\"'“”?!.,]+$")
+
+
+def normalize_query(query):
+    """'  What is  Python? ' and 'what is python' share one entry"""
+    query = _EDGE_PUNCTUATION.sub("", str(query))
+    return _SPACES.sub(" ", query).lower()
+
+
+def normalize_url(url):
+    """Lowercase scheme/host, drop the fragment, sort the query string"""
+    parts = urllib.parse.urlsplit(url.strip())
+    query = urllib.parse.urlencode(
+        sorted(urllib.parse.parse_qsl(parts.query, keep_blank_values=True))
+    )
+    return urllib.parse.urlunsplit(
+        (
+            parts.scheme.lower(),
+            parts.netloc.lower(),
+            parts.path or "/",
+            query,
+            "",
+        )
+    )
+
+
+class CacheEntry:
+    """One cached tool output"""
+
+    __slots__ = ("value", "stored", "ttl", "etag", "last_modified")
+
+    def __init__(self, value, stored, ttl, etag=None, last_modified=None):
+        self.value = value
+        self.stored = stored
+        self.ttl = ttl
+        self.etag = etag
+        self.last_modified = last_modified
+
+    @property
+    def fresh(self):
+        return time.time() - self.stored < self.ttl
+
+    def validators(self):
+        """Headers for a conditional request (empty if the server sent none)"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ToolCache:
+    """In-memory LRU backed by SQLite, keyed by (tool, normalized key)"""
+
+    def __init__(self, db_file=None, max_entries=256, ttls=None):
+        if db_file is None:
+            memory_dir = Path("assistant_memory")
+            memory_dir.mkdir(exist_ok=True)
+            db_file = memory_dir / "tool_cache.db"
+
+        self.db_file = db_file
+        self.max_entries = max_entries
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+
+        self.lru = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.stats = {
+            "hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "revalidated": 0,
+            "stores": 0,
+        }
+
+        self.init_database()
+
+    # ========== STORAGE ==========
+
+    def init_database(self):
+        """Create the table and drop entries too old to revalidate"""
+        try:
+            conn = sqlite3.connect(self.db_file)
+            cursor = conn.cursor()
+
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS tool_cache (
+                    tool TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    stored REAL NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    PRIMARY KEY (tool, key)
+                )
+            """
+            )
+
+            cursor.execute(
+                "DELETE FROM tool_cache WHERE stored < ?", (time.time() - MAX_STALE,)
+            )
+
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"⚠️  Tool cache unavailable: {e}")
+
+    def _load(self, tool, key):
+        try:
+            conn = sqlite3.connect(self.db_file)
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT value, stored, etag, last_modified
+                FROM tool_cache
+                WHERE tool = ? AND key = ?
+            """,
+                (tool, key),
+            )
+            row = cursor.fetchone()
+            conn.close()
+        except Exception:
+            return None
+
+        if row is None:
+            return None
+        return CacheEntry(row[0], row[1], self.ttls.get(tool, 0), row[2], row[3])
+
+    def _save(self, tool, key, entry):
+        try:
+            conn = sqlite3.connect(self.db_file)
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                INSERT OR REPLACE INTO tool_cache
+                    (tool, key, value, stored, etag, last_modified)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """,
+                (tool, key, entry.value, entry.stored, entry.etag, entry.last_modified),
+            )
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"⚠️  Could not cache {tool}: {e}")
+
+    def _remember(self, tool, key, entry):
+        with self.lock:
+            self.lru[(tool, key)] = entry
+            self.lru.move_to_end((tool, key))
+            while len(self.lru) > self.max_entries:
+                self.lru.popitem(last=False)
+
+    # ========== LOOKUP ==========
+
+    def get(self, tool, key):
+        """Cached entry (fresh or stale), or None"""
+        with self.lock:
+            entry = self.lru.get((tool, key))
+            if entry is not None:
+                self.lru.move_to_end((tool, key))
+
+        if entry is None:
+            entry = self._load(tool, key)
+            if entry is not None:
+                self._remember(tool, key, entry)
+                if entry.fresh:
+                    self.stats["disk_hits"] += 1
+
+        if entry is not None and entry.fresh:
+            self.stats["hits"] += 1
+        else:
+            self.stats["misses"] += 1
+
+        return entry
+
+    def put(self, tool, key, value, etag=None, last_modified=None):
+        """Store a tool result"""
+        entry = CacheEntry(
+            value, time.time(), self.ttls.get(tool, 0), etag, last_modified
+        )
+        self._remember(tool, key, entry)
+        self._save(tool, key, entry)
+        self.stats["stores"] += 1
+        return entry
+
+    def refresh(self, tool, key, entry):
+        """The server said 304 Not Modified - the entry is fresh again"""
+        entry.stored = time.time()
+        self._remember(tool, key, entry)
+        self._save(tool, key, entry)
+        self.stats["revalidated"] += 1
+        return entry
+
+    def cached(self, tool, key, compute, cacheable):
+        """Cached value for key, or compute() - stored only if cacheable(value)"""
+        entry = self.get(tool, key)
+        if entry is not None and entry.fresh:
+            return entry.value
+
+        value = compute()
+        if cacheable(value):
+            self.put(tool, key, value)
+        return value
+
+    def clear(self, tool=None):
+        """Forget everything (or one tool's entries)"""
+        with self.lock:
+            for cache_key in list(self.lru):
+                if tool is None or cache_key[0] == tool:
+                    del self.lru[cache_key]
+
+        try:
+            conn = sqlite3.connect(self.db_file)
+            if tool is None:
+                conn.execute("DELETE FROM tool_cache")
+            else:
+                conn.execute("DELETE FROM tool_cache WHERE tool = ?", (tool,))
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"⚠️  Could not clear tool cache: {e}")
+
+    def get_stats(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        rate = self.stats["hits"] / lookups * 100 if lookups else 0
+        return (
+            f"🗄️  Tool cache: {self.stats['hits']}/{lookups} hits ({rate:.0f}%) | "
+            f"{self.stats['disk_hits']} from disk | "
+            f"{self.stats['revalidated']} revalidated | "
+            f"{len(self.lru)} in memory"
+        )
+
+
+# ========== CHECK ==========
+
+_RESULTS_HTML = (
+    '<div class="result"><a class="result__a" href="http://example.com/">'
+    'Example result</a><a class="result__snippet">A snippet</a></div>'
+)
+
+
+def _stub_site():
+    """
+    Local stand-in for the web on a free port → (server, site).
+    /page serves site["version"] with an ETag and Last-Modified (304 when
+    they still match); /search answers like DuckDuckGo, /broken with a 500.
+    site["hits"] counts requests per path, site["304"] the revalidations.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    site = {"version": 1, "hits": {}, "304": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status, body=b"", headers=()):
+            self.send_response(status)
+            for name, value in headers:
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = urllib.parse.urlsplit(self.path).path
+            site["hits"][path] = site["hits"].get(path, 0) + 1
+
+            if path == "/page":
+                etag = '"v%d"' % site["version"]
+                modified = f"Mon, 0{site['version']} Jan 2024 00:00:00 GMT"
+                if self.headers.get("If-None-Match") == etag:
+                    site["304"] += 1
+                    return self._send(304, headers=[("ETag", etag)])
+                body = (
+                    f"<html><title>Page v{site['version']}</title><body>"
+                    f"<p>{'Version %d of the page. ' % site['version'] * 8}</p>"
+                    "</body></html>"
+                ).encode("utf-8")
+                return self._send(
+                    200,
+                    body,
+                    [
+                        ("Content-Type", "text/html; charset=utf-8"),
+                        ("ETag", etag),
+                        ("Last-Modified", modified),
+                    ],
+                )
+
+            if path == "/search":
+                body = f"<html><body>{_RESULTS_HTML}</body></html>".encode("utf-8")
+                return self._send(200, body, [("Content-Type", "text/html")])
+
+            self._send(500, b"down")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, site
+
+
+def run_check():
+    import shutil
+    import tempfile
+
+    passed = True
+
+    def check(label, ok, detail):
+        nonlocal passed
+        passed = passed and ok
+        print(f"  {'✅' if ok else '❌'} {label:<40} {detail}")
+
+    print("\n" + "=" * 70)
+    print("     🧪 TOOL CACHE CHECK - local HTTP stand-in")
+    print("=" * 70)
+
+    workdir = Path(tempfile.mkdtemp(prefix="tool_cache_check_"))
+    db_file = workdir / "tool_cache.db"
+    try:
+        # Keys
+        check(
+            "query normalization",
+            normalize_query("  What is  Python? ") == normalize_query("what is python"),
+            normalize_query("  What is  Python? "),
+        )
+        check(
+            "URL normalization",
+            normalize_url("HTTP://Example.com/a?b=2&a=1#top")
+            == normalize_url("http://example.com/a?a=1&b=2"),
+            normalize_url("HTTP://Example.com/a?b=2&a=1#top"),
+        )
+
+        # TTL
+        cache = ToolCache(db_file, ttls={"web_search": 0.2})
+        cache.put("web_search", "python", "🔍 results")
+        entry = cache.get("web_search", "python")
+        check("fresh entry is a hit", entry and entry.fresh, cache.stats["hits"])
+        time.sleep(0.25)
+        entry = cache.get("web_search", "python")
+        check(
+            "expired entry is a miss",
+            entry is not None and not entry.fresh and cache.stats["misses"] == 1,
+            f"{cache.stats['misses']} misses",
+        )
+
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return "🔍 computed"
+
+        for _ in range(3):
+            cache.cached("web_search", "rust", compute, lambda v: v.startswith("🔍"))
+        cache.cached("web_search", "down", lambda: "Search failed", lambda v: False)
+        check(
+            "cached() computes once",
+            len(calls) == 1 and cache.get("web_search", "down") is None,
+            f"{len(calls)} computes, failures not stored",
+        )
+
+        # LRU in front of SQLite
+        cache = ToolCache(db_file, max_entries=2, ttls={"web_search": 60})
+        for key in "abc":
+            cache.put("web_search", key, f"🔍 {key}")
+        check(
+            "LRU keeps the newest entries",
+            list(cache.lru) == [("web_search", "b"), ("web_search", "c")],
+            [key for _, key in cache.lru],
+        )
+        entry = cache.get("web_search", "a")
+        check(
+            "evicted entry comes back from disk",
+            entry and entry.value == "🔍 a" and cache.stats["disk_hits"] == 1,
+            f"{cache.stats['disk_hits']} disk hits",
+        )
+        reopened = ToolCache(db_file, ttls={"web_search": 60})
+        entry = reopened.get("web_search", "c")
+        check(
+            "entries survive a restart",
+            entry and entry.value == "🔍 c",
+            entry and entry.value,
+        )
+        reopened.clear("web_search")
+        check(
+            "clear() empties memory and disk",
+            ToolCache(db_file).get("web_search", "c") is None and not reopened.lru,
+            f"{len(reopened.lru)} in memory",
+        )
+
+        # The web tools against the stand-in
+        from metrics_sampler import MetricsSampler
+        from sandbox import Sandbox
+        from tools import ToolBox
+
+        server, site = _stub_site()
+        base = f"http://{server.server_address[0]}:{server.server_address[1]}"
+        cache = ToolCache(
+            workdir / "web.db", ttls={"fetch_webpage": 0.2, "web_search": 60}
+        )
+        toolbox = ToolBox(
+            cache=cache,
+            search_urls={"duckduckgo": base + "/search?q={}"},
+            metrics=MetricsSampler(),
+            sandbox=Sandbox(workers=0),
+        )
+        try:
+            first = toolbox.fetch_webpage(base + "/page")
+            second = toolbox.fetch_webpage(base + "/page")
+            check(
+                "second fetch skips the network",
+                first == second and site["hits"].get("/page") == 1,
+                f"{site['hits'].get('/page')} request(s)",
+            )
+
+            time.sleep(0.25)
+            third = toolbox.fetch_webpage(base + "/page")
+            check(
+                "expired page revalidated (304)",
+                third == first
+                and site["304"] == 1
+                and cache.stats["revalidated"] == 1,
+                f"{site['304']} × 304, {cache.stats['revalidated']} revalidated",
+            )
+
+            site["version"] = 2
+            time.sleep(0.25)
+            fourth = toolbox.fetch_webpage(base + "/page")
+            stored = cache.get("fetch_webpage", normalize_url(base + "/page"))
+            check(
+                "changed page downloaded again",
+                "Version 2" in fourth and stored.value == fourth,
+                fourth.splitlines()[2][:30],
+            )
+
+            toolbox.web_search("What is Python?")
+            toolbox.web_search("  what is python ")
+            check(
+                "same search asked twice → 1 request",
+                site["hits"].get("/search") == 1,
+                f"{site['hits'].get('/search')} request(s)",
+            )
+
+            toolbox.search_urls = {"duckduckgo": base + "/broken?q={}"}
+            toolbox.web_search("down")
+            toolbox.web_search("down")
+            check(
+                "failed search is not cached",
+                site["hits"].get("/broken") == 2,
+                f"{site['hits'].get('/broken')} request(s)",
+            )
+        finally:
+            toolbox.sandbox.close()
+            toolbox.metrics.stop()
+            server.shutdown()
+
+        stats = cache.get_stats()
+        check("stats report", "revalidated" in stats and "hits" in stats, stats)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print("=" * 70)
+    print(f"  {'✅ All checks passed' if passed else '❌ Some checks failed'}\n")
+    return passed
+
+
+def main():
+    import sys
+
+    if "--check" in sys.argv[1:]:
+        sys.exit(0 if run_check() else 1)
+
+    print(__doc__)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+# -*- coding: utf-8 -*-
+"""
+Tool Executor - Concurrent, dependency-aware tool execution
+Runs independent TOOL: calls from one response at the same time.
+
+Calls are only ordered when they have to be (from each tool's registry
+schema):
+- calls touching the same path (or a parent/child of it) run in order,
+  unless both only read
+- tools in the same group (the memory tools) run in order, same rule
+- system tools (run_command / execute_python) act as barriers
+
+Every call gets its tool's declared timeout, counted from when it starts
+running (not from when it was queued). A call that times out is abandoned,
+not stopped: Python threads can't be killed and the tools don't poll for
+cancellation, so it runs on in the background and may still finish (a
+write may still land). Only the sandboxed tools (run_command,
+execute_python) are really stopped, by the sandbox's own wall-clock limit.
+Anything that depends on an abandoned call is cancelled, and the pool is
+replaced so later calls (and calls still queued behind it) get fresh
+workers. Results come back in the original order.
+
+    python tool_executor.py --bench     (stub tools that sleep)
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+
+from tool_registry import DEFAULT_TIMEOUT, READ, SYSTEM
+
+
+class ToolExecutor:
+    """Runs parsed tool calls concurrently on a small thread pool"""
+
+    def __init__(self, toolbox, max_workers=4, timeouts=None):
+        self.toolbox = toolbox
+        self.registry = toolbox.registry
+        self.overrides = dict(timeouts or {})
+        self.max_workers = max_workers
+        self.pool_lock = threading.Lock()
+        self.pool = self._new_pool()
+        self.replaced = 0  # pools given up because a call hung in them
+        self.abandoned = 0  # timed-out calls left running in the background
+
+    def _new_pool(self):
+        return ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="tool"
+        )
+
+    # ========== PLANNING ==========
+
+    def _resolve(self, raw, base=None):
+        path = Path(str(raw)).expanduser()
+        if not path.is_absolute():
+            path = (base or Path.cwd()) / path
+        return path.resolve()
+
+    def timeout_for(self, tool_name):
+        if tool_name in self.overrides:
+            return self.overrides[tool_name]
+        spec = self.registry.get(tool_name)
+        return spec.timeout if spec else DEFAULT_TIMEOUT
+
+    def _writes(self, tool_name):
+        spec = self.registry.get(tool_name)
+        return spec is None or spec.effect != READ
+
+    def _resources(self, tool_name, params):
+        """Resource keys a call touches (paths, groups), or None for a barrier"""
+        spec = self.registry.get(tool_name)
+        if spec is None:
+            return set()  # fails straight away - nothing to order
+        if spec.effect == SYSTEM:
+            return None
+
+        keys = set()
+        if spec.group:
+            keys.add(spec.group)
+
+        for index in spec.path_params:
+            raw = str(params[index]) if index < len(params) else "."
+            base = None
+
+            # rename_file(old, "new.txt") lands next to the old file
+            if tool_name == "rename_file" and index == 1 and keys:
+                if "/" not in raw and "\\" not in raw:
+                    base = next(iter(keys)).parent
+
+            try:
+                keys.add(self._resolve(raw, base))
+            except Exception:
+                keys.add(Path(raw))
+
+        return keys
+
+    def _conflicts(self, a, b):
+        """True if two resource sets overlap (same path or parent/child)"""
+        for x in a:
+            for y in b:
+                if x == y:
+                    return True
+                if isinstance(x, Path) and isinstance(y, Path):
+                    if x in y.parents or y in x.parents:
+                        return True
+        return False
+
+    def plan(self, calls):
+        """For each call, the set of earlier call indices it must wait for"""
+        resources = [self._resources(name, params) for name, params in calls]
+        writes = [self._writes(name) for name, _ in calls]
+        deps = []
+
+        for i, res in enumerate(resources):
+            waits = set()
+            for j in range(i):
+                other = resources[j]
+                if res is None or other is None:
+                    waits.add(j)
+                elif (writes[i] or writes[j]) and self._conflicts(res, other):
+                    waits.add(j)
+            deps.append(waits)
+
+        return deps
+
+    # ========== EXECUTION ==========
+
+    def _submit(self, name, params):
+        """Queue one call → (future, pool, begun); begun["at"] = its start time"""
+        begun = {}
+
+        def call():
+            begun["at"] = time.perf_counter()
+            return self.toolbox.execute_tool(name, params)
+
+        with self.pool_lock:
+            pool = self.pool
+            return pool.submit(call), pool, begun
+
+    def _abandon(self, pool):
+        """A call hung in pool - send everything after it to fresh workers"""
+        with self.pool_lock:
+            if pool is not self.pool:
+                return  # already replaced
+            self.pool = self._new_pool()
+            self.replaced += 1
+        # Running calls finish on the old threads, which then exit
+        pool.shutdown(wait=False)
+
+    def run(self, calls):
+        """
+        Execute [(tool_name, params), ...] and return results in order.
+
+        Each result is the ToolBox.execute_tool dict plus 'started' (a
+        perf_counter timestamp) and 'elapsed'.
+        """
+        deps = self.plan(calls)
+        results = [None] * len(calls)
+        running = {}  # future -> (index, pool, begun)
+        pending = list(range(len(calls)))
+        timed_out = set()
+
+        while pending or running:
+            # Start everything whose dependencies are done
+            for i in list(pending):
+                if deps[i] & timed_out:
+                    name = calls[i][0]
+                    results[i] = {
+                        "success": False,
+                        "output": f"Cancelled {name}: an earlier tool timed out",
+                        "started": time.perf_counter(),
+                        "elapsed": 0.0,
+                    }
+                    timed_out.add(i)
+                    pending.remove(i)
+                elif all(results[j] is not None for j in deps[i]):
+                    future, pool, begun = self._submit(*calls[i])
+                    running[future] = (i, pool, begun)
+                    pending.remove(i)
+
+            if not running:
+                continue
+
+            # Deadlines of the calls that have started; queued ones are
+            # looked at again shortly
+            now = time.perf_counter()
+            next_deadline = now + 0.05
+            if all("at" in begun for _, _, begun in running.values()):
+                next_deadline = float("inf")
+            for i, _, begun in running.values():
+                if "at" in begun:
+                    deadline = begun["at"] + self.timeout_for(calls[i][0])
+                    next_deadline = min(next_deadline, deadline)
+
+            done, _ = wait(
+                running,
+                timeout=max(0.0, next_deadline - now),
+                return_when=FIRST_COMPLETED,
+            )
+
+            now = time.perf_counter()
+            for future in list(running):
+                i, pool, begun = running[future]
+                started = begun.get("at", now)
+
+                if future in done:
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = {"success": False, "output": f"Error: {e}"}
+                    result["started"] = started
+                    result["elapsed"] = now - started
+                    results[i] = result
+                    del running[future]
+
+                elif "at" not in begun:
+                    # Still queued behind a hung call in a replaced pool
+                    if pool is not self.pool and future.cancel():
+                        del running[future]
+                        future, pool, begun = self._submit(*calls[i])
+                        running[future] = (i, pool, begun)
+
+                elif now >= started + self.timeout_for(calls[i][0]):
+                    name = calls[i][0]
+                    self._abandon(pool)
+                    self.abandoned += 1
+                    results[i] = {
+                        "success": False,
+                        "output": (
+                            f"⏱️ {name} timed out after {self.timeout_for(name)}s "
+                            "(abandoned - it may still finish)"
+                        ),
+                        "started": started,
+                        "elapsed": now - started,
+                    }
+                    timed_out.add(i)
+                    del running[future]
+
+        return results
+
+    def shutdown(self):
+        with self.pool_lock:
+            pool = self.pool
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+# ========== BENCHMARK ==========
+
+
+class _StubToolBox:
+    """Tools that only sleep, registered with the real tools' schemas"""
+
+    # name -> (seconds, effect, path parameter?)
+    TOOLS = {
+        "open_app": (0.3, "write", False),
+        "google_search": (1.0, "network", False),
+        "fetch_webpage": (1.5, "network", False),
+        "read_file": (0.05, "read", True),
+        "list_files": (0.05, "read", True),
+        "get_file_info": (0.05, "read", True),
+        "system_info": (0.1, "read", False),
+        "hang": (3.0, "network", False),
+    }
+
+    def __init__(self):
+        from tool_registry import Param, ToolRegistry
+
+        self.registry = ToolRegistry()
+        for name, (seconds, effect, path) in self.TOOLS.items():
+            self.registry.register(
+                name,
+                lambda *args, s=seconds, n=name: time.sleep(s) or f"{n} done",
+                params=[Param("arg", "path" if path else "str", default="")],
+                effect=effect,
+                timeout=0.5 if name == "hang" else 5,
+            )
+
+    def execute_tool(self, name, params, keywords=None):
+        return self.registry.dispatch(name, params, keywords)
+
+
+def run_benchmark():
+    toolbox = _StubToolBox()
+    turns = {
+        "one reply, 7 tools": [
+            ("open_app", ["chrome"]),
+            ("google_search", ["python"]),
+            ("fetch_webpage", ["python.org"]),
+            ("read_file", ["notes.txt"]),
+            ("list_files", ["."]),
+            ("get_file_info", ["todo.txt"]),
+            ("system_info", []),
+        ],
+        "same + a hung call": [
+            ("hang", ["slow.example"]),
+            ("google_search", ["python"]),
+            ("fetch_webpage", ["python.org"]),
+            ("read_file", ["notes.txt"]),
+            ("system_info", []),
+        ],
+    }
+
+    print("\n" + "=" * 70)
+    print("     ⏱️  TOOL EXECUTOR BENCHMARK - stub tools that sleep")
+    print("=" * 70)
+    print(f"  {'turn':<22} {'one by one':>12} {'concurrent':>12}")
+
+    for label, calls in turns.items():
+        # One after another, as execute_tools_from_response used to run them
+        # (no timeouts - a hung call held up the whole turn)
+        started = time.perf_counter()
+        for name, params in calls:
+            toolbox.execute_tool(name, params)
+        sequential = time.perf_counter() - started
+
+        executor = ToolExecutor(toolbox)
+        started = time.perf_counter()
+        results = executor.run(calls)
+        concurrent = time.perf_counter() - started
+        executor.shutdown()
+
+        failed = sum(1 for result in results if not result["success"])
+        note = f"  ({failed} timed out, abandoned)" if failed else ""
+        print(f"  {label:<22} {sequential:>11.2f}s {concurrent:>11.2f}s{note}")
+
+    print("=" * 70)
+    print(
+        "  A hung call is abandoned at its timeout; its thread sleeps on in\n"
+        "  the background while the rest of the turn carries on.\n"
+    )
+
+
+def main():
+    import sys
+
+    if "--bench" in sys.argv[1:]:
+        run_benchmark()
+        return
+
+    print(__doc__)
+
+
+if __name__ == "__main__":
+    main()
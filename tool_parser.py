@@ -0,0 +1,499 @@
+# -*- coding: utf-8 -*-
+"""
+Tool Call Parser - Incremental, single-pass parser for TOOL: calls
+Works on a complete response or on streamed LLM output chunk by chunk.
+
+Grammar (loosely):
+    call   := "TOOL:" ws* NAME ws* "(" args ")"
+    args   := arg ("," arg)*
+    arg    := [NAME ws* "="] value
+    value  := quoted string | raw text, with balanced (), [], {} nesting
+
+A quote only starts a string at the start of a value (or right after an
+opening bracket, comma or "=" inside one) - in what's new it is just an
+apostrophe. Empty arguments are kept: f(, ) has two.
+
+Every character is tokenized once by a compiled regex. Argument values are
+collected as token lists and joined once, and text already scanned is moved
+out of the working buffer, so there is no quadratic string building. Only an
+unterminated quoted string at the end of a chunk makes the parser wait for
+more input; chunks without its closing quote are just set aside.
+
+    python tool_parser.py --check       (fixed cases + chunking fuzz)
+    python tool_parser.py --bench
+"""
+
+import random
+import re
+import time
+from collections import namedtuple
+
+
+ToolCall = namedtuple("ToolCall", "name params keywords start end")
+ToolCall.__doc__ = """A parsed tool call.
+
+params   - argument values in order (keyword names stripped)
+keywords - keyword name per argument, or None for positional ones
+start/end - span of the call in the full text
+"""
+
+MARKER = "TOOL:"
+
+_HEAD = re.compile(r"\s*(\w+)\s*\(")
+_HEAD_PARTIAL = re.compile(r"\s*(?:\w+\s*)?\Z")
+
+_TOKEN = re.compile(
+    r"""
+      (?P<ws>\s+)
+    | (?P<str>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+    | (?P<open>[(\[{])
+    | (?P<close>[)\]}])
+    | (?P<comma>,)
+    | (?P<eq>=)
+    | (?P<text>[^\s"'()\[\]{},=]+)
+    | (?P<quote>["'])
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+# Tokens after which a quote inside a bracketed value opens a string
+_STRING_AFTER = ("open", "comma", "eq")
+
+_IDENT = re.compile(r"[A-Za-z_]\w*\Z")
+
+_ESCAPE = re.compile(r"\\(.)", re.DOTALL)
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", '"': '"', "'": "'", "\\": "\\"}
+
+
+def unescape(text):
+    """Single-pass backslash unescaping (unknown escapes are kept as-is)"""
+    if "\\" not in text:
+        return text
+    return _ESCAPE.sub(lambda m: _ESCAPES.get(m.group(1), m.group(0)), text)
+
+
+class ToolCallParser:
+    """Incremental TOOL: call parser - feed() chunks, get completed calls"""
+
+    TEXT, HEAD, ARGS = range(3)
+
+    # Scanned text is moved out of the working buffer in steps of this size
+    COMPACT_SIZE = 4096
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self._offset = 0  # Absolute position of buffer[0]
+        self._scanned = []
+        self._pending = []  # Chunks set aside while a string is unterminated
+        self._waiting = None  # That string's quote character
+        self.state = self.TEXT
+        self.calls = []
+
+        # Current call
+        self._name = None
+        self._start = 0  # Absolute position of the current call
+        self._depth = 0
+        self._params = []
+        self._keywords = []
+        self._parts = []  # (kind, value) tokens of the current argument
+        self._keyword = None
+
+    # ========== PUBLIC API ==========
+
+    @property
+    def text(self):
+        """Everything fed so far"""
+        return "".join(self._scanned) + self.buffer + "".join(self._pending)
+
+    def feed(self, chunk):
+        """Add streamed text, return the calls completed by it"""
+        if self._waiting is not None and self._waiting not in chunk:
+            # Still inside the string - nothing can complete yet
+            self._pending.append(chunk)
+            return []
+
+        self._join_pending(chunk)
+        completed = self._run(final=False)
+        self._compact()
+        return completed
+
+    def finish(self):
+        """End of stream - close any call the model left open"""
+        self._join_pending("")
+        completed = self._run(final=True)
+
+        if self.state == self.ARGS:
+            self._end_argument()
+            completed.append(self._end_call(len(self.buffer)))
+
+        return completed
+
+    def text_without_calls(self):
+        """The text seen so far with every parsed call removed"""
+        return strip_tool_calls(self.text, self.calls)
+
+    def _join_pending(self, chunk):
+        if self._pending:
+            self._pending.append(chunk)
+            chunk = "".join(self._pending)
+            self._pending.clear()
+        self.buffer += chunk
+
+    def _compact(self):
+        # Argument tokens are already collected - only unscanned text is kept
+        keep = self.pos
+        if keep < self.COMPACT_SIZE:
+            return
+
+        self._scanned.append(self.buffer[:keep])
+        self.buffer = self.buffer[keep:]
+        self._offset += keep
+        self.pos -= keep
+
+    # ========== STATE MACHINE ==========
+
+    def _run(self, final):
+        completed = []
+        buf = self.buffer
+        self._waiting = None
+
+        while True:
+            if self.state == self.TEXT:
+                found = buf.find(MARKER, self.pos)
+                if found < 0:
+                    # Keep a possible partial marker at the end
+                    self.pos = max(self.pos, len(buf) - len(MARKER) + 1)
+                    return completed
+                self._start = self._offset + found
+                self.pos = found + len(MARKER)
+                self.state = self.HEAD
+
+            elif self.state == self.HEAD:
+                match = _HEAD.match(buf, self.pos)
+                if match:
+                    self._begin_call(match.group(1), self._start)
+                    self.pos = match.end()
+                elif not final and _HEAD_PARTIAL.match(buf, self.pos):
+                    return completed
+                else:
+                    self.state = self.TEXT
+
+            else:
+                call = self._scan_args(buf, final)
+                if call is None:
+                    return completed
+                completed.append(call)
+
+    def _begin_call(self, name, start=0):
+        self.state = self.ARGS
+        self._start = start
+        self._name = name
+        self._depth = 0
+        self._params = []
+        self._keywords = []
+        self._parts = []
+        self._keyword = None
+
+    def _scan_args(self, buf, final):
+        """Consume argument tokens; return a ToolCall when the call closes"""
+        parts = self._parts
+        size = len(buf)
+
+        while self.pos < size:
+            match = _TOKEN.match(buf, self.pos)
+            kind = match.lastgroup
+            value = match.group()
+            end = match.end()
+
+            if kind in ("str", "quote") and not self._opens_string(parts):
+                # An apostrophe or quote inside a word - plain text
+                kind, value, end = "text", value[0], self.pos + 1
+            elif kind == "quote":
+                if not final:
+                    self._waiting = value
+                    return None  # Unterminated string - wait for more input
+                kind = "text"
+
+            self.pos = end
+
+            if self._depth:
+                if kind == "open":
+                    self._depth += 1
+                elif kind == "close":
+                    self._depth -= 1
+                if kind == "text" and parts and parts[-1][0] == "text":
+                    parts[-1] = ("text", parts[-1][1] + value)
+                else:
+                    parts.append((kind, value))
+
+            elif kind == "comma":
+                self._end_argument(keep_empty=True)
+                parts = self._parts
+
+            elif kind == "close":
+                self._end_argument()
+                return self._end_call(self.pos)
+
+            elif kind == "open":
+                self._depth += 1
+                parts.append((kind, value))
+
+            elif kind == "eq" and self._keyword is None and self._is_keyword(parts):
+                self._keyword = "".join(v for k, v in parts if k == "text")
+                parts.clear()
+
+            elif kind == "text" and parts and parts[-1][0] == "text":
+                # A word split across two chunks
+                parts[-1] = ("text", parts[-1][1] + value)
+
+            else:
+                parts.append((kind, value))
+
+        return None
+
+    def _opens_string(self, parts):
+        """A quote here starts a string (not an apostrophe mid-value)"""
+        for kind, _ in reversed(parts):
+            if kind != "ws":
+                return self._depth > 0 and kind in _STRING_AFTER
+        return True
+
+    def _is_keyword(self, parts):
+        content = [(k, v) for k, v in parts if k != "ws"]
+        return (
+            len(content) == 1 and content[0][0] == "text" and _IDENT.match(content[0][1])
+        )
+
+    def _end_argument(self, keep_empty=False):
+        parts = self._parts
+        content = [(k, v) for k, v in parts if k != "ws"]
+
+        if len(content) == 1 and content[0][0] == "str":
+            value = unescape(content[0][1][1:-1])
+        else:
+            value = unescape("".join(v for _, v in parts).strip())
+
+        # A comma always ends an argument, even an empty one; ")" ends one
+        # only if there is something in it or an argument came before
+        if keep_empty or content or self._keyword or self._params:
+            self._params.append(value)
+            self._keywords.append(self._keyword)
+
+        self._parts = []
+        self._keyword = None
+
+    def _end_call(self, end):
+        call = ToolCall(
+            self._name,
+            self._params,
+            self._keywords,
+            self._start,
+            self._offset + end,
+        )
+        self.calls.append(call)
+        self.state = self.TEXT
+        return call
+
+
+# ========== HELPERS ==========
+
+
+def parse_tool_calls(text):
+    """Parse every TOOL: call in a complete response"""
+    parser = ToolCallParser()
+    parser.feed(text)
+    parser.finish()
+    return parser.calls
+
+
+def parse_arguments(params_str):
+    """Parse just an argument list, e.g. '"a.txt", content="hi"'"""
+    parser = ToolCallParser()
+    parser._begin_call(None)
+    parser.feed(params_str)
+    parser.finish()
+    return parser.calls[0].params
+
+
+def strip_tool_calls(text, calls=None):
+    """Remove tool calls from text and tidy up blank lines"""
+    if calls is None:
+        calls = parse_tool_calls(text)
+
+    pieces = []
+    last = 0
+    for call in calls:
+        pieces.append(text[last : call.start])
+        last = call.end
+    pieces.append(text[last:])
+
+    return re.sub(r"\n\n+", "\n\n", "".join(pieces)).strip()
+
+
+# ========== CHECK ==========
+
+
+_WORDS = ["what's", "new", "here's", "it", "don't", "x-1", "a.txt", "café", "42"]
+_CHARS = "ab (),[]{}='\"\\\n\t:é"
+
+
+def _quote(value, quote):
+    escaped = value.replace("\\", "\\\\").replace(quote, "\\" + quote)
+    return quote + escaped.replace("\n", "\\n").replace("\t", "\\t") + quote
+
+
+def _random_argument(rng):
+    """(source text, expected value, keyword) of one random argument"""
+    keyword = rng.choice([None, None, "content", "path"])
+    kind = rng.choice(["plain", "quoted", "empty"])
+    if kind == "plain":
+        value = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(1, 3)))
+        source = value
+    elif kind == "quoted":
+        value = "".join(rng.choice(_CHARS) for _ in range(rng.randint(0, 12)))
+        source = _quote(value, rng.choice("\"'"))
+    else:
+        value = source = ""
+    if keyword:
+        source = f"{keyword}={source}"
+    return f"{' ' * rng.randint(0, 1)}{source}", value, keyword
+
+
+def _random_response(rng):
+    """A reply with a few tool calls → (text, [(name, params, keywords)])"""
+    pieces = ["Sure, here's what I'll do: "]
+    expected = []
+    for i in range(rng.randint(1, 3)):
+        args = [_random_argument(rng) for _ in range(rng.randint(1, 4))]
+        if len(args) == 1 and not args[0][0].strip():
+            args = []  # f() - no arguments at all
+        name = rng.choice(["google_search", "write_file", "f"])
+        pieces.append(f"TOOL: {name}({','.join(a[0] for a in args)})")
+        pieces.append(rng.choice([" and that's it. ", "\n", " (done) "]))
+        expected.append((name, [a[1] for a in args], [a[2] for a in args]))
+    return "".join(pieces), expected
+
+
+def _chunked(text, rng):
+    parser = ToolCallParser()
+    pos = 0
+    while pos < len(text):
+        size = rng.randint(1, 8)
+        parser.feed(text[pos : pos + size])
+        pos += size
+    parser.finish()
+    return parser
+
+
+def run_check(cases=2000, seed=0):
+    passed = True
+
+    def check(label, ok, detail):
+        nonlocal passed
+        passed = passed and ok
+        print(f"  {'✅' if ok else '❌'} {label:<44} {detail}")
+
+    print("\n" + "=" * 70)
+    print("     🧪 TOOL PARSER CHECK")
+    print("=" * 70)
+
+    fixed = [
+        ("TOOL: google_search(what's new) and here's more", [["what's new"]]),
+        ("TOOL: f(, )", [["", ""]]),
+        ("TOOL: f()", [[]]),
+        ('TOOL: write_file("a.txt", content="it\'s (x)")', [["a.txt", "it's (x)"]]),
+        ("TOOL: f([1, 'a)b'], x='q')", [["[1, 'a)b']", "q"]]),
+        ("TOOL: f(it's) TOOL: g(\"a\\\"b\")", [["it's"], ['a"b']]),
+        ("no calls, just a 'quote", []),
+    ]
+    for text, expected in fixed:
+        calls = parse_tool_calls(text)
+        got = [call.params for call in calls]
+        check(repr(text)[:44], got == expected, got)
+
+    # Fuzz: known arguments come back exactly, however the text is chunked
+    rng = random.Random(seed)
+    wrong = []
+    for _ in range(cases):
+        text, expected = _random_response(rng)
+        whole = parse_tool_calls(text)
+        parser = _chunked(text, rng)
+        got = [(c.name, c.params, c.keywords) for c in whole]
+        if got != expected or parser.calls != whole or parser.text != text:
+            wrong.append(text)
+    check(
+        f"fuzz: {cases} generated replies",
+        not wrong,
+        f"{len(wrong)} wrong" + (f", e.g. {wrong[0]!r}" if wrong else ""),
+    )
+
+    # Fuzz: arbitrary text parses the same whole or chunked
+    differ = []
+    for _ in range(cases):
+        text = "TOOL: f(" + "".join(rng.choice(_CHARS + "TOOL:") for _ in range(40))
+        if parse_tool_calls(text) != _chunked(text, rng).calls:
+            differ.append(text)
+    check(
+        f"fuzz: {cases} random texts, whole vs chunked",
+        not differ,
+        f"{len(differ)} differ" + (f", e.g. {differ[0]!r}" if differ else ""),
+    )
+
+    print("=" * 70)
+    print(f"  {'✅ All checks passed' if passed else '❌ Some checks failed'}\n")
+    return passed
+
+
+# ========== BENCHMARK ==========
+
+
+def run_benchmark(sizes=(10_000, 100_000, 1_000_000), chunk=4):
+    print("\n" + "=" * 70)
+    print(f"     ⏱️  TOOL PARSER BENCHMARK - streamed in {chunk}-char chunks")
+    print("=" * 70)
+
+    reply = (
+        "Sure, here's what I found. "
+        'TOOL: google_search("python asyncio tutorial") '
+        "TOOL: write_file(notes.txt, content='it\\'s done') Let me know!"
+    )
+    runs = 2000
+    started = time.perf_counter()
+    for _ in range(runs):
+        parse_tool_calls(reply)
+    per_reply = (time.perf_counter() - started) / runs
+    print(f"  typical reply ({len(reply)} chars): {per_reply * 1e6:.1f}µs per parse")
+
+    print(f"\n  {'write_file content':<22}{'total':>10}{'per KB':>12}")
+    for size in sizes:
+        text = f'TOOL: write_file("big.txt", content="{"x" * size}") done'
+        parser = ToolCallParser()
+        started = time.perf_counter()
+        for i in range(0, len(text), chunk):
+            parser.feed(text[i : i + chunk])
+        parser.finish()
+        seconds = time.perf_counter() - started
+        assert len(parser.calls[0].params[1]) == size
+        print(
+            f"  {size:>14,} chars{seconds * 1000:8.1f}ms"
+            f"{seconds * 1e6 / (size / 1000):9.1f}µs"
+        )
+    print("=" * 70 + "\n")
+
+
+def main():
+    import sys
+
+    for arg in sys.argv[1:]:
+        if arg == "--check":
+            sys.exit(0 if run_check() else 1)
+        elif arg.startswith("--bench"):
+            run_benchmark()
+            return
+
+    print(__doc__)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,542 @@
+# -*- coding: utf-8 -*-
+"""
+Tool Registry - Declared parameters, timeouts and side effects per tool
+Every tool is registered once with typed parameters. Registration compiles
+a coercer per parameter and a call function per tool, so dispatch validates
+and converts the LLM's raw strings ("3", "2.5 ", "yes") in one step instead
+of calling tool_func(*params) and working out what went wrong from a
+TypeError.
+
+The same schema drives:
+- the tool list in the system prompt
+- Ollama native tool calling ("tools" JSON in, message.tool_calls out)
+- ToolExecutor's ordering (path parameters, side-effect class, groups)
+  and per-tool timeouts
+
+    python tool_registry.py --bench
+"""
+
+import json
+import time
+
+
+# Side-effect classes
+READ = "read"  # no side effects - two reads never wait for each other
+WRITE = "write"  # changes files or stored state
+NETWORK = "network"  # talks to the internet, no local side effects
+SYSTEM = "system"  # unknown side effects (commands, code) - runs alone
+
+DEFAULT_TIMEOUT = 10
+
+_MISSING = object()
+
+_JSON_TYPES = {
+    "str": "string",
+    "path": "string",
+    "int": "integer",
+    "float": "number",
+    "bool": "boolean",
+}
+
+_TRUE = {"true", "yes", "y", "1", "on"}
+_FALSE = {"false", "no", "n", "0", "off"}
+
+
+class ParamError(ValueError):
+    """A tool argument that can't be coerced to its declared type"""
+
+
+class Param:
+    """One declared tool parameter"""
+
+    __slots__ = ("name", "type", "default", "description", "choices", "coerce")
+
+    def __init__(
+        self, name, type="str", default=_MISSING, description="", choices=None
+    ):
+        if type not in _JSON_TYPES:
+            raise ValueError(f"Unknown parameter type '{type}'")
+        self.name = name
+        self.type = type
+        self.default = default
+        self.description = description
+        self.choices = tuple(choices) if choices else None
+        self.coerce = _coercer(self)
+
+    @property
+    def required(self):
+        return self.default is _MISSING
+
+
+# ========== COERCION ==========
+
+
+def _to_str(value):
+    return value if isinstance(value, str) else str(value)
+
+
+def _to_int(value):
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, int):
+        return value
+    text = str(value).strip().lstrip("#").replace(",", "")
+    try:
+        return int(text)
+    except ValueError:
+        number = float(text)  # "3.0" is fine, "3.5" is not
+        if not number.is_integer():
+            raise ValueError(text)
+        return int(number)
+
+
+def _to_float(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return float(str(value).strip().replace(",", ""))
+
+
+def _to_bool(value):
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in _TRUE:
+        return True
+    if text in _FALSE:
+        return False
+    raise ValueError(text)
+
+
+_CONVERTERS = {
+    "str": _to_str,
+    "path": _to_str,
+    "int": _to_int,
+    "float": _to_float,
+    "bool": _to_bool,
+}
+
+_EXPECTED = {
+    "int": "a whole number",
+    "float": "a number",
+    "bool": "yes or no",
+}
+
+
+def _coercer(param):
+    """Compile value → typed value (raising ParamError) for one parameter"""
+    convert = _CONVERTERS[param.type]
+    name = param.name
+    expected = _EXPECTED.get(param.type)
+
+    if param.choices:
+        allowed = {str(choice).lower(): choice for choice in param.choices}
+        listed = "|".join(str(choice) for choice in param.choices)
+
+        def coerce(value):
+            key = _to_str(value).strip().lower()
+            if key == "" and not param.required:
+                return param.default
+            if key not in allowed:
+                raise ParamError(f"'{name}' must be one of {listed}, got '{value}'")
+            return allowed[key]
+
+        return coerce
+
+    if expected is None:
+        return convert
+
+    def coerce(value):
+        try:
+            return convert(value)
+        except (TypeError, ValueError):
+            raise ParamError(f"'{name}' must be {expected}, got '{value}'")
+
+    return coerce
+
+
+def _compile_call(spec):
+    """
+    Generate call(params) for one tool, once, at registration (the way
+    namedtuple and dataclasses generate their methods): validate, coerce
+    and call spec.func. Bad arguments raise ParamError before the tool runs.
+
+    A call with every argument is straight-line code: text arguments that
+    are already strings pass through, numbers try int()/float() before the
+    full coercer. Shorter calls (optional parameters left out) and wrong
+    arity take the general path.
+    """
+    func, coercers = spec.func, spec.coercers
+    lo, hi, expected = spec.min_args, spec.max_args, spec.expected()
+
+    def general(params):
+        count = len(params)
+        if count < lo or count > hi:
+            raise ParamError(f"Expected {expected}, got {count}")
+        return func(*[coerce(value) for coerce, value in zip(coercers, params)])
+
+    names = [f"a{i}" for i in range(hi)]
+    lines = [
+        "def call(params):",
+        f"    if len(params) != {hi}:",
+        "        return general(params)",
+    ]
+    if names:
+        lines.append(f"    {', '.join(names)}, = params")
+
+    namespace = {"general": general, "func": func, "ParamError": ParamError}
+    for i, (param, arg) in enumerate(zip(spec.params, names)):
+        namespace[f"c{i}"] = param.coerce
+        if param.coerce is _to_str:
+            lines += [
+                f"    if {arg}.__class__ is not str:",
+                f"        {arg} = str({arg})",
+            ]
+        elif param.type in ("int", "float") and not param.choices:
+            # The full coercer only helps with "1,000" ("#3", "3.0" for int)
+            fixable = ",#." if param.type == "int" else ","
+            unfixable = " and ".join(f"{char!r} not in {arg}" for char in fixable)
+            namespace[f"m{i}"] = f"'{param.name}' must be {_EXPECTED[param.type]}"
+            lines += [
+                f"    if {arg}.__class__ is str:",
+                "        try:",
+                f"            {arg} = {param.type}({arg})",
+                "        except ValueError:",
+                f"            if {unfixable}:",
+                f"                raise ParamError(f\"{{m{i}}}, got '{{{arg}}}'\")",
+                f"            {arg} = c{i}({arg})",
+                "    else:",
+                f"        {arg} = c{i}({arg})",
+            ]
+        else:
+            lines.append(f"    {arg} = c{i}({arg})")
+    lines.append(f"    return func({', '.join(names)})")
+
+    exec("\n".join(lines), namespace)
+    return namespace["call"]
+
+
+# ========== SPECS ==========
+
+
+class ToolSpec:
+    """A registered tool: function, schema and execution hints"""
+
+    def __init__(
+        self,
+        name,
+        func,
+        description="",
+        params=(),
+        effect=READ,
+        timeout=DEFAULT_TIMEOUT,
+        group=None,
+        category="other",
+        advertise=True,
+        prompt=None,
+    ):
+        self.name = name
+        self.func = func
+        self.description = description
+        self.params = list(params)
+        self.effect = effect
+        self.timeout = timeout
+        self.group = group  # tools sharing a group run in call order
+        self.category = category
+        self.advertise = advertise
+        self.prompt = prompt  # overrides the generated prompt signature
+
+        # Compiled once - dispatch only looks up the spec and calls it
+        self.coercers = [param.coerce for param in self.params]
+        self.names = {param.name: i for i, param in enumerate(self.params)}
+        self.min_args = sum(1 for param in self.params if param.required)
+        self.max_args = len(self.params)
+        self.path_params = [
+            i for i, param in enumerate(self.params) if param.type == "path"
+        ]
+        self.call = _compile_call(self)  # call(params) → func(*coerced params)
+
+    def expected(self):
+        if self.min_args == self.max_args:
+            return str(self.max_args)
+        return f"{self.min_args}-{self.max_args}"
+
+    def arrange(self, params, keywords=None):
+        """Put keyword arguments in schema order (unknown names stay in place)"""
+        if not keywords or not any(keywords):
+            return list(params)
+
+        positional = []
+        named = {}
+        for value, keyword in zip(params, keywords):
+            index = self.names.get(keyword) if keyword else None
+            if index is None:
+                positional.append(value)
+            else:
+                named[index] = value
+
+        arranged = []
+        for i, param in enumerate(self.params):
+            if i in named:
+                arranged.append(named.pop(i))
+            elif positional:
+                arranged.append(positional.pop(0))
+            elif any(j > i for j in named):
+                if param.required:
+                    raise ParamError(f"'{param.name}' is missing")
+                arranged.append(param.default)
+            else:
+                break
+        return arranged + positional
+
+    def signature(self):
+        """name(a, b, [c]) as the system prompt shows it"""
+        if self.prompt:
+            return self.prompt
+        parts = []
+        for param in self.params:
+            label = "|".join(map(str, param.choices)) if param.choices else param.name
+            parts.append(label if param.required else f"[{label}]")
+        return f"{self.name}({', '.join(parts)})"
+
+    def to_ollama(self):
+        """Ollama / OpenAI function-calling schema"""
+        properties = {}
+        for param in self.params:
+            prop = {"type": _JSON_TYPES[param.type]}
+            if param.description:
+                prop["description"] = param.description
+            if param.choices:
+                prop["enum"] = list(param.choices)
+            properties[param.name] = prop
+
+        return {
+            "type": "function",
+            "function": {
+                "name": self.name,
+                "description": self.description,
+                "parameters": {
+                    "type": "object",
+                    "properties": properties,
+                    "required": [p.name for p in self.params if p.required],
+                },
+            },
+        }
+
+
+# ========== REGISTRY ==========
+
+
+# Order of the tool list lines in the system prompt
+PROMPT_CATEGORIES = ["file", "web", "system", "memory", "utility"]
+
+
+class ToolRegistry:
+    """Name → ToolSpec, with one-step validated dispatch"""
+
+    def __init__(self):
+        self.specs = {}
+
+    def register(self, name, func, description="", params=(), **options):
+        """Add (or replace) a tool. params are Param objects"""
+        spec = ToolSpec(name, func, description, params, **options)
+        self.specs[name] = spec
+        return spec
+
+    def get(self, name):
+        return self.specs.get(name)
+
+    def __contains__(self, name):
+        return name in self.specs
+
+    def subset(self, keep):
+        """A registry of the tools keep(spec) accepts (sharing their specs)"""
+        registry = ToolRegistry()
+        registry.specs = {
+            name: spec for name, spec in self.specs.items() if keep(spec)
+        }
+        return registry
+
+    def functions(self):
+        """{name: func} - the old ToolBox.tools view"""
+        return {name: spec.func for name, spec in self.specs.items()}
+
+    def arrange(self, name, params, keywords=None):
+        """Parsed TOOL: call arguments in schema order (as-is if that fails)"""
+        spec = self.specs.get(name)
+        if spec is None or not keywords:
+            return list(params)
+        try:
+            return spec.arrange(params, keywords)
+        except ParamError:
+            return list(params)
+
+    def dispatch(self, name, params, keywords=None):
+        """Validate, coerce and call → {'success', 'output'}"""
+        spec = self.specs.get(name)
+        if spec is None:
+            available = list(self.specs)[:10]
+            return {
+                "success": False,
+                "output": f"Tool '{name}' not found. Available: {', '.join(available)}",
+            }
+
+        if params.__class__ is not list and not isinstance(params, tuple):
+            params = [params] if params else []
+
+        try:
+            if keywords:
+                params = spec.arrange(params, keywords)
+            return {"success": True, "output": spec.call(params)}
+        except ParamError as e:
+            return {"success": False, "output": f"Wrong params for {name}. {e}"}
+        except Exception as e:
+            return {"success": False, "output": f"Error in {name}: {str(e)}"}
+
+    # ========== SCHEMA EXPORT ==========
+
+    def timeouts(self):
+        return {name: spec.timeout for name, spec in self.specs.items()}
+
+    def prompt_lines(self):
+        """Advertised tools, one line per category, for the system prompt"""
+        lines = []
+        for category in PROMPT_CATEGORIES:
+            signatures = [
+                spec.signature()
+                for spec in self.specs.values()
+                if spec.advertise and spec.category == category
+            ]
+            if signatures:
+                lines.append(", ".join(signatures))
+        return "\n".join(lines)
+
+    def ollama_tools(self, advertised_only=True):
+        """The "tools" list for Ollama's /api/chat"""
+        return [
+            spec.to_ollama()
+            for spec in self.specs.values()
+            if spec.advertise or not advertised_only
+        ]
+
+    def from_ollama(self, tool_calls):
+        """message.tool_calls → [(name, positional params)] in schema order"""
+        calls = []
+        for call in tool_calls or []:
+            function = call.get("function", {})
+            name = function.get("name", "")
+            arguments = function.get("arguments") or {}
+            if isinstance(arguments, str):
+                try:
+                    arguments = json.loads(arguments)
+                except ValueError:
+                    arguments = {}
+
+            if not isinstance(arguments, dict):
+                arguments = {}
+            params = list(arguments.values())
+
+            spec = self.specs.get(name)
+            if spec is not None:
+                try:
+                    params = spec.arrange(params, list(arguments))
+                except ParamError:
+                    pass  # bind() reports it when the call runs
+            calls.append((name, params))
+        return calls
+
+
+# ========== BENCHMARK ==========
+
+
+def _old_dispatch(tools, tool_name, params):
+    """The previous ToolBox.execute_tool"""
+    try:
+        if tool_name not in tools:
+            return {"success": False, "output": "not found"}
+        tool_func = tools[tool_name]
+        if not isinstance(params, list):
+            params = [params] if params else []
+        result = tool_func(*params)
+        return {"success": True, "output": result}
+    except TypeError:
+        import inspect
+
+        sig = inspect.signature(tools[tool_name])
+        expected = len([p for p in sig.parameters.keys() if p != "self"])
+        return {
+            "success": False,
+            "output": f"Wrong params for {tool_name}. Expected {expected}, got {len(params)}",
+        }
+    except Exception as e:
+        return {"success": False, "output": f"Error in {tool_name}: {str(e)}"}
+
+
+def run_benchmark(calls=200_000):
+    def convert_units(value, from_unit, to_unit):
+        return float(value)  # the old tool had to parse the string itself
+
+    def convert_typed(value, from_unit, to_unit):
+        return value
+
+    registry = ToolRegistry()
+    registry.register(
+        "convert_units",
+        convert_typed,
+        "Convert a value between units",
+        [Param("value", "float"), Param("from", "str"), Param("to", "str")],
+    )
+    old_tools = {"convert_units": convert_units}
+
+    cases = [
+        ("valid call", ["12.5", "km", "mi"]),
+        ("wrong arity", ["12.5", "km"]),
+        ("bad number", ["twelve", "km", "mi"]),
+    ]
+
+    print("\n" + "=" * 70)
+    print(f"     🧰 TOOL DISPATCH BENCHMARK - {calls:,} calls each")
+    print("=" * 70)
+    print(f"  {'case':<16}{'old':>14}{'registry':>14}")
+
+    for label, params in cases:
+        timings = []
+        for dispatch in (
+            lambda: _old_dispatch(old_tools, "convert_units", params),
+            lambda: registry.dispatch("convert_units", params),
+        ):
+            runs = calls if label == "valid call" else calls // 10
+            best = float("inf")
+            for _ in range(5):  # best of 5 - one noisy run decides nothing
+                started = time.perf_counter()
+                for _ in range(runs // 5):
+                    dispatch()
+                best = min(best, (time.perf_counter() - started) / (runs // 5))
+            timings.append(best * 1e9)
+        print(f"  {label:<16}{timings[0]:>12.0f}ns{timings[1]:>12.0f}ns")
+
+    print("\n  Sample errors:")
+    for label, params in cases[1:]:
+        print(f"    {registry.dispatch('convert_units', params)['output']}")
+
+    started = time.perf_counter()
+    for _ in range(1000):
+        registry.prompt_lines()
+        registry.ollama_tools()
+    print(
+        f"\n  Prompt + Ollama schema generation: "
+        f"{(time.perf_counter() - started) * 1000:.3f}µs each"
+    )
+    print("=" * 70 + "\n")
+
+
+def main():
+    import sys
+
+    if "--bench" in sys.argv[1:]:
+        run_benchmark()
+        return
+    print(__doc__)
+
+
+if __name__ == "__main__":
+    main()
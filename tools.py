@@ -2,6 +2,8 @@
 """
 Tools Module - FIXED VERSION
 Fast, reliable action capabilities
+
+    python tools.py --check     (search race against slow/failing stub providers)
 """
 
 import os
@@ -17,192 +19,517 @@ import json
 from datetime import datetime
 import urllib.parse
 import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
 
+from requests.adapters import HTTPAdapter
 
-class ToolBox:
-    """Container for all assistant tools"""
-
-    def __init__(self):
-        self.tools = {
-            # Web tools
-            "web_search": self.web_search,
-            "google_search": self.google_search,
-            "get_current_time": self.get_current_time,
-            "get_current_date": self.get_current_date,
-            "fetch_webpage": self.fetch_webpage,
-            "open_url": self.open_url,
-            # File tools
-            "read_file": self.read_file,
-            "write_file": self.write_file,
-            "create_file": self.write_file,
-            "append_to_file": self.append_to_file,
-            "list_files": self.list_files,
-            "delete_file": self.delete_file,
-            "rename_file": self.rename_file,
-            "move_file": self.move_file,
-            "create_folder": self.create_folder,
-            "search_files": self.search_files,
-            "get_file_info": self.get_file_info,
-            "find_all_files": self.find_all_files,
-            # System tools
-            "open_app": self.open_app,
-            "run_command": self.run_command,
-            "system_info": self.system_info,
-            "execute_python": self.execute_python,
-            "list_running_apps": self.list_running_apps,
-            # Utility tools
-            "calculate": self.calculate,
-            "convert_units": self.convert_units,
-        }
-
-    def execute_tool(self, tool_name, params):
-        """Execute a tool"""
-        try:
-            if tool_name not in self.tools:
-                available = list(self.tools.keys())[:10]
-                return {
-                    "success": False,
-                    "output": f"Tool '{tool_name}' not found. Available: {', '.join(available)}",
-                }
+import dir_scan
+import file_reader
+from file_index import FileIndex, default_roots
+from html_extract import extract_stream
+from metrics_sampler import MetricsSampler
+from sandbox import Sandbox
+from tool_cache import ToolCache, normalize_query, normalize_url
+from tool_registry import NETWORK, SYSTEM, WRITE, Param, ToolRegistry
 
-            tool_func = self.tools[tool_name]
 
-            if not isinstance(params, list):
-                params = [params] if params else []
+# Search providers raced by web_search ({} is the quoted query)
+SEARCH_URLS = {
+    "google": "https://www.google.com/search?q={}",
+    "duckduckgo": "https://html.duckduckgo.com/html/?q={}",
+}
 
-            result = tool_func(*params)
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
 
-            return {"success": True, "output": result}
 
-        except TypeError as e:
-            import inspect
+class ToolBox:
+    """Container for all assistant tools"""
 
-            sig = inspect.signature(self.tools[tool_name])
-            expected = len([p for p in sig.parameters.keys() if p != "self"])
-            return {
-                "success": False,
-                "output": f"Wrong params for {tool_name}. Expected {expected}, got {len(params)}",
-            }
-        except Exception as e:
-            return {
-                "success": False,
-                "output": f"Error in {tool_name}: {str(e)}",
-            }
+    def __init__(
+        self,
+        cache=None,
+        search_urls=None,
+        search_deadline=6.0,
+        file_index=None,
+        metrics=None,
+        sandbox=None,
+        index_files=False,
+    ):
+        # Search results and fetched pages survive across turns and sessions
+        self.cache = cache if cache is not None else ToolCache()
+
+        # One keep-alive session for every web tool
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+        self.http = requests.Session()
+        self.http.mount("http://", adapter)
+        self.http.mount("https://", adapter)
+        self.http.headers["User-Agent"] = USER_AGENT
+
+        self.search_urls = dict(search_urls or SEARCH_URLS)
+        self.search_deadline = search_deadline
+        self.search_pool = ThreadPoolExecutor(
+            max_workers=8, thread_name_prefix="search"
+        )
+        self.search_wins = {}
+
+        # Filename index of the usual search roots, kept fresh in the background.
+        # Opt-in: without one the file tools scan the disk as before
+        if file_index is None and index_files:
+            file_index = FileIndex()
+        self.file_index = file_index
+        if self.file_index is not None:
+            self.file_index.start()
+
+        # CPU / memory / disk / process stats, sampled in the background
+        self.metrics = metrics if metrics is not None else MetricsSampler()
+        self.metrics.start()
+
+        # Warm, resource-limited worker processes for code and commands
+        self.sandbox = sandbox if sandbox is not None else Sandbox()
+        self.sandbox.start()
+
+        self.registry = ToolRegistry()
+        self.register_tools()
+
+    @property
+    def tools(self):
+        """{name: function} for every registered tool"""
+        return self.registry.functions()
+
+    def register_tools(self):
+        """Declare every tool: typed parameters, side effects, timeout"""
+        register = self.registry.register
+
+        # File tools (advertised ones first - they make up the prompt line)
+        register(
+            "write_file",
+            self.write_file,
+            "Create or overwrite a text file",
+            [Param("path", "path"), Param("content", default="")],
+            effect=WRITE,
+            category="file",
+        )
+        register(
+            "read_file",
+            self.read_file,
+            "Read a text file, or part of a large one",
+            [
+                Param("path", "path"),
+                Param("mode", default="", choices=file_reader.MODES),
+                Param("arg", default="", description="N lines, A-B, or text"),
+            ],
+            timeout=30,  # grep reads the whole file
+            category="file",
+        )
+        register(
+            "list_files",
+            self.list_files,
+            "List a directory",
+            [Param("dir", "path", default=".")],
+            category="file",
+        )
+        register(
+            "rename_file",
+            self.rename_file,
+            "Rename a file in place",
+            [Param("old", "path"), Param("new", "path")],
+            effect=WRITE,
+            category="file",
+        )
+        register(
+            "delete_file",
+            self.delete_file,
+            "Delete a file",
+            [Param("path", "path")],
+            effect=WRITE,
+            category="file",
+        )
+        register(
+            "create_file",
+            self.write_file,
+            "Create a text file",
+            [Param("path", "path"), Param("content", default="")],
+            effect=WRITE,
+            category="file",
+            advertise=False,
+        )
+        register(
+            "append_to_file",
+            self.append_to_file,
+            "Append text to a file",
+            [Param("path", "path"), Param("content")],
+            effect=WRITE,
+            category="file",
+            advertise=False,
+        )
+        register(
+            "move_file",
+            self.move_file,
+            "Move a file",
+            [Param("source", "path"), Param("destination", "path")],
+            effect=WRITE,
+            category="file",
+            advertise=False,
+        )
+        register(
+            "create_folder",
+            self.create_folder,
+            "Create a folder",
+            [Param("path", "path")],
+            effect=WRITE,
+            category="file",
+            advertise=False,
+        )
+        register(
+            "search_files",
+            self.search_files,
+            "Find files matching a pattern under a directory",
+            [Param("dir", "path"), Param("pattern")],
+            timeout=15,
+            category="file",
+            advertise=False,
+        )
+        register(
+            "get_file_info",
+            self.get_file_info,
+            "Size and dates of a file",
+            [Param("path", "path")],
+            category="file",
+            advertise=False,
+        )
+        register(
+            "find_all_files",
+            self.find_all_files,
+            "Find a file anywhere in the usual folders",
+            [Param("filename")],
+            timeout=20,
+            category="file",
+            advertise=False,
+        )
+
+        # Web tools
+        register(
+            "google_search",
+            self.google_search,
+            "Search the web",
+            [Param("query")],
+            effect=NETWORK,
+            timeout=8,
+            category="web",
+        )
+        register(
+            "open_url",
+            self.open_url,
+            "Open a URL in the browser",
+            [Param("url")],
+            effect=WRITE,
+            category="web",
+        )
+        register(
+            "fetch_webpage",
+            self.fetch_webpage,
+            "Fetch the main text of a web page",
+            [Param("url")],
+            effect=NETWORK,
+            timeout=10,
+            category="web",
+        )
+        register(
+            "web_search",
+            self.web_search,
+            "Search the web",
+            [Param("query")],
+            effect=NETWORK,
+            timeout=8,
+            category="web",
+            advertise=False,
+        )
+
+        # System tools
+        register(
+            "open_app",
+            self.open_app,
+            "Open an application",
+            [Param("name")],
+            effect=WRITE,
+            timeout=15,
+            category="system",
+        )
+        register(
+            "run_command",
+            self.run_command,
+            "Run a shell command",
+            [Param("cmd")],
+            effect=SYSTEM,
+            timeout=20,
+            category="system",
+        )
+        register(
+            "system_info",
+            self.system_info,
+            "CPU, memory, disk and uptime",
+            timeout=3,
+            category="system",
+        )
+        register(
+            "system_trend",
+            self.system_trend,
+            "CPU, memory or disk use over the last few minutes",
+            [
+                Param("metric", default="cpu", choices=["cpu", "memory", "disk"]),
+                Param("minutes", "float", default=5),
+            ],
+            timeout=3,
+            category="system",
+            prompt="system_trend(cpu|memory|disk, minutes)",
+        )
+        register(
+            "execute_python",
+            self.execute_python,
+            "Run a short Python snippet",
+            [Param("code")],
+            effect=SYSTEM,
+            timeout=10,
+            category="system",
+            advertise=False,
+        )
+        register(
+            "list_running_apps",
+            self.list_running_apps,
+            "The busiest running applications",
+            timeout=5,
+            category="system",
+            advertise=False,
+        )
+
+        # Utility tools
+        register(
+            "calculate",
+            self.calculate,
+            "Evaluate a math expression",
+            [Param("expr")],
+            category="utility",
+        )
+        register(
+            "get_current_time",
+            self.get_current_time,
+            "The current time",
+            category="utility",
+        )
+        register(
+            "get_current_date",
+            self.get_current_date,
+            "Today's date",
+            category="utility",
+        )
+        register(
+            "convert_units",
+            self.convert_units,
+            "Convert length, weight or temperature",
+            [Param("value", "float"), Param("from"), Param("to")],
+            category="utility",
+            advertise=False,
+        )
+
+    def execute_tool(self, tool_name, params, keywords=None):
+        """Execute a tool (arguments validated and coerced by its schema)"""
+        return self.registry.dispatch(tool_name, params, keywords)
 
     # ========== WEB TOOLS ==========
 
+    def web_search(self, query):
+        """Search the web - providers race, first good answer wins (cached)"""
+        return self.cache.cached(
+            "web_search",
+            normalize_query(query),
+            lambda: self._race_search(query),
+            cacheable=lambda output: output.startswith("🔍"),
+        )
+
     def google_search(self, query):
-        """Search Google"""
+        """Search Google (raced against DuckDuckGo - same as web_search)"""
+        return self.web_search(query)
+
+    def _race_search(self, query):
+        """Ask every provider at once; cancel the rest when one answers"""
+        started = time.perf_counter()
+        deadline = started + self.search_deadline
+        cancelled = threading.Event()
+
+        futures = {
+            self.search_pool.submit(
+                self._search_provider, name, query, deadline, cancelled
+            ): name
+            for name in self.search_urls
+        }
+
+        errors = []
+        pending = set(futures)
         try:
-            url = f"https://www.google.com/search?q={urllib.parse.quote(query)}"
-            headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
+            while pending:
+                done, pending = wait(
+                    pending,
+                    timeout=max(0.0, deadline - time.perf_counter()),
+                    return_when=FIRST_COMPLETED,
+                )
+                if not done:
+                    errors.append(f"no answer within {self.search_deadline:.1f}s")
+                    break
 
-            response = requests.get(url, headers=headers, timeout=5)
+                for future in done:
+                    name = futures[future]
+                    try:
+                        results = future.result()
+                    except Exception as e:
+                        errors.append(f"{name}: {e}")
+                        continue
+
+                    if results:
+                        elapsed = time.perf_counter() - started
+                        self.search_wins[name] = self.search_wins.get(name, 0) + 1
+                        print(f"   🏁 {name} answered first ({elapsed:.2f}s)")
+                        return self._format_results(query, results)
+
+                    errors.append(f"{name}: no results")
+        finally:
+            cancelled.set()  # losers stop reading and drop their connection
+
+        if errors and all(e.endswith("no results") for e in errors):
+            return f"No results for '{query}'"
+        return f"Search failed: {'; '.join(errors)}"
+
+    def _search_provider(self, name, query, deadline, cancelled):
+        url = self.search_urls[name].format(urllib.parse.quote(query))
+        html = self._get_text(url, deadline, cancelled)
+        if name == "google":
+            return self._parse_google(html)
+        return self._parse_duckduckgo(html)
+
+    def _get_text(self, url, deadline, cancelled):
+        """GET on the shared session, abandoned at the deadline or on cancel"""
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            raise TimeoutError("deadline passed")
+
+        response = self.http.get(
+            url, timeout=(min(3.0, remaining), remaining), stream=True
+        )
+        try:
             response.raise_for_status()
+            body = []
+            for chunk in response.iter_content(16384):
+                if cancelled.is_set():
+                    raise RuntimeError("cancelled")
+                if time.perf_counter() > deadline:
+                    raise TimeoutError("deadline passed")
+                body.append(chunk)
+            return b"".join(body).decode(response.encoding or "utf-8", "replace")
+        finally:
+            response.close()
+
+    def _parse_google(self, html):
+        soup = BeautifulSoup(html, "html.parser")
+        results = []
+
+        for g in soup.find_all("div", class_="g")[:6]:
+            title_elem = g.find("h3")
+            if not title_elem:
+                continue
 
-            soup = BeautifulSoup(response.text, "html.parser")
-            results = []
-
-            for g in soup.find_all("div", class_="g")[:6]:
-                title_elem = g.find("h3")
-                if not title_elem:
-                    continue
+            title = title_elem.get_text()
+            link_elem = g.find("a")
+            link = link_elem.get("href") if link_elem else ""
 
-                title = title_elem.get_text()
-                link_elem = g.find("a")
-                link = link_elem.get("href") if link_elem else ""
-
-                snippet = ""
-                for container in g.find_all(
-                    ["div", "span"], class_=["VwiC3b", "lEBKkf"]
-                ):
-                    text = container.get_text().strip()
-                    if len(text) > 20:
-                        snippet = text[:200]
-                        break
-
-                if title:
-                    results.append({"title": title, "snippet": snippet, "link": link})
-
-            if results:
-                output = f"🔍 Search '{query}':\n\n"
-                for i, r in enumerate(results, 1):
-                    output += f"{i}. {r['title']}\n"
-                    if r["snippet"]:
-                        output += f"   {r['snippet']}\n"
-                    output += "\n"
-                return output
-            else:
-                return self.web_search(query)
+            snippet = ""
+            for container in g.find_all(["div", "span"], class_=["VwiC3b", "lEBKkf"]):
+                text = container.get_text().strip()
+                if len(text) > 20:
+                    snippet = text[:200]
+                    break
 
-        except:
-            return self.web_search(query)
+            if title:
+                results.append({"title": title, "snippet": snippet, "link": link})
 
-    def web_search(self, query):
-        """DuckDuckGo search"""
-        try:
-            url = f"https://html.duckduckgo.com/html/?q={urllib.parse.quote(query)}"
-            headers = {"User-Agent": "Mozilla/5.0"}
+        return results
 
-            response = requests.get(url, headers=headers, timeout=5)
-            response.raise_for_status()
+    def _parse_duckduckgo(self, html):
+        soup = BeautifulSoup(html, "html.parser")
+        results = []
 
-            soup = BeautifulSoup(response.text, "html.parser")
-            results = []
-
-            for result in soup.find_all("div", class_="result")[:6]:
-                title_elem = result.find("a", class_="result__a")
-                snippet_elem = result.find("a", class_="result__snippet")
-
-                if title_elem:
-                    results.append(
-                        {
-                            "title": title_elem.text.strip(),
-                            "snippet": (
-                                snippet_elem.text.strip()[:200] if snippet_elem else ""
-                            ),
-                            "link": title_elem.get("href", ""),
-                        }
-                    )
+        for result in soup.find_all("div", class_="result")[:6]:
+            title_elem = result.find("a", class_="result__a")
+            snippet_elem = result.find("a", class_="result__snippet")
 
-            if results:
-                output = f"🔍 Search '{query}':\n\n"
-                for i, r in enumerate(results, 1):
-                    output += f"{i}. {r['title']}\n"
-                    if r["snippet"]:
-                        output += f"   {r['snippet']}\n"
-                    output += "\n"
-                return output
+            if title_elem:
+                results.append(
+                    {
+                        "title": title_elem.text.strip(),
+                        "snippet": (
+                            snippet_elem.text.strip()[:200] if snippet_elem else ""
+                        ),
+                        "link": title_elem.get("href", ""),
+                    }
+                )
 
-            return f"No results for '{query}'"
+        return results
 
-        except Exception as e:
-            return f"Search failed: {str(e)}"
+    def _format_results(self, query, results):
+        output = f"🔍 Search '{query}':\n\n"
+        for i, r in enumerate(results, 1):
+            output += f"{i}. {r['title']}\n"
+            if r["snippet"]:
+                output += f"   {r['snippet']}\n"
+            output += "\n"
+        return output
 
     def fetch_webpage(self, url):
-        """Fetch webpage content"""
+        """Fetch webpage content (cached, revalidated with ETag/Last-Modified)"""
         try:
             if not url.startswith(("http://", "https://")):
                 url = "https://" + url
 
-            headers = {"User-Agent": "Mozilla/5.0"}
-            response = requests.get(url, headers=headers, timeout=8)
-            response.raise_for_status()
-
-            soup = BeautifulSoup(response.text, "html.parser")
-
-            for element in soup(["script", "style", "nav", "footer", "header"]):
-                element.decompose()
-
-            text = soup.get_text()
-            lines = (line.strip() for line in text.splitlines())
-            text = "\n".join(line for line in lines if line)
-
-            if len(text) > 3000:
-                text = text[:3000] + "\n\n[Truncated...]"
+            key = normalize_url(url)
+            cached = self.cache.get("fetch_webpage", key)
+            if cached and cached.fresh:
+                return cached.value
 
-            return f"📄 Content from {url}:\n\n{text}"
+            headers = cached.validators() if cached else {}
+            response = self.http.get(url, headers=headers, timeout=8, stream=True)
+            try:
+                if cached and response.status_code == 304:
+                    return self.cache.refresh("fetch_webpage", key, cached).value
+                response.raise_for_status()
+
+                # Parsed as it downloads; reading stops once there is enough
+                page = extract_stream(
+                    response.iter_content(16384),
+                    response.headers.get("Content-Type", ""),
+                    limit=3000,
+                )
+            finally:
+                response.close()
+
+            if not page.text:
+                return f"No readable text on {url}"
+
+            text = page.text
+            if page.title and not text.startswith(page.title):
+                text = f"{page.title}\n{text}"
+            if page.truncated:
+                text += "\n\n[Truncated...]"
+
+            output = f"📄 Content from {url}:\n\n{text}"
+            self.cache.put(
+                "fetch_webpage",
+                key,
+                output,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            )
+            return output
 
         except Exception as e:
             return f"Failed to fetch {url}: {str(e)}"
@@ -229,8 +556,8 @@ class ToolBox:
 
     # ========== FILE TOOLS ==========
 
-    def read_file(self, filepath):
-        """Read file contents"""
+    def read_file(self, filepath, mode="", arg=""):
+        """Read a file, or part of it: head/tail N, lines A-B, grep TEXT"""
         try:
             path = Path(filepath).expanduser()
 
@@ -242,34 +569,62 @@ class ToolBox:
             if not path.exists():
                 parent = path.parent if path.parent.exists() else Path.cwd()
                 if parent.exists():
-                    matches = list(parent.glob(f"*{path.name}*"))[:3]
+                    matches = dir_scan.similar_names(parent, path.name, 3)
                     if matches:
-                        suggestions = "\n".join([f"   → {m}" for m in matches])
+                        suggestions = "\n".join([f"   → {m.path}" for m in matches])
                         return f"❌ File not found: {filepath}\n\nDid you mean:\n{suggestions}"
 
                 return f"❌ File not found: {filepath}\n📁 Current: {Path.cwd()}"
 
-            if path.stat().st_size > 2_000_000:
-                return f"❌ File too large (>2MB): {filepath}"
+            if path.is_dir():
+                return f"❌ Not a file: {filepath} (try list_files)"
 
-            for encoding in ["utf-8", "latin-1", "cp1252"]:
-                try:
-                    with open(path, "r", encoding=encoding) as f:
-                        content = f.read()
-                    break
-                except UnicodeDecodeError:
-                    continue
-            else:
-                return f"❌ Could not decode: {filepath}"
-
-            size = len(content)
-            lines = content.count("\n") + 1
+            try:
+                excerpt = file_reader.read(path, mode, arg)
+            except file_reader.ReadError as e:
+                return f"❌ {e}: {filepath}"
 
-            return f"📄 {path.name} ({size} chars, {lines} lines)\n📁 {path.parent}\n\n{content}"
+            return self._format_excerpt(path, excerpt, mode, arg)
 
         except Exception as e:
             return f"❌ Read error: {str(e)}"
 
+    def _format_excerpt(self, path, excerpt, mode, arg):
+        """Header, what part is shown, then numbered lines"""
+        if excerpt.complete:
+            content = "\n".join(text for _, text in excerpt.lines)
+            return (
+                f"📄 {path.name} ({len(content)} chars, {excerpt.total_lines} lines)"
+                f"\n📁 {path.parent}\n\n{content}"
+            )
+
+        output = (
+            f"📄 {path.name} ({self._format_size(excerpt.size)}, "
+            f"{excerpt.total_lines:,} lines, {excerpt.encoding})\n📁 {path.parent}\n"
+        )
+
+        shown = excerpt.lines
+        span = f"{shown[0][0]:,}-{shown[-1][0]:,}" if shown else "none"
+        if excerpt.matches is not None:
+            output += (
+                f"🔎 {excerpt.matches:,} line(s) matching '{arg}'"
+                f" - showing {len(shown)}\n"
+            )
+        else:
+            output += f"📑 Lines {span} of {excerpt.total_lines:,}\n"
+
+        width = len(str(shown[-1][0])) if shown else 1
+        output += "\n" + "\n".join(
+            f"{number:>{width}}: {text}" for number, text in shown
+        )
+
+        if excerpt.truncated and not mode:
+            output += (
+                "\n\n[Truncated - ask for head, tail, a line range or grep "
+                "to see more]"
+            )
+        return output
+
     def write_file(self, filepath, content=""):
         """Write to file"""
         try:
@@ -309,6 +664,9 @@ class ToolBox:
             except:
                 pass
 
+            if not existed:
+                self._reindex(path)
+
             new_size = path.stat().st_size
             action = "✏️ Updated" if existed else "✅ Created"
 
@@ -385,6 +743,8 @@ class ToolBox:
             if not new_path.exists():
                 return f"❌ Rename failed"
 
+            self._reindex(old_path, new_path)
+
             return f"""✅ Renamed!
 📄 Old: {old_path.name}
 📄 New: {new_path.name}
@@ -409,33 +769,36 @@ class ToolBox:
             if not path.is_dir():
                 return f"❌ Not a directory: {directory}"
 
+            # Only the 30 shown per kind are ordered and stat()ed
+            listing = dir_scan.list_dir(path, 30)
+
             files = []
-            folders = []
+            folders = [f"   📁 {item.name}/" for item in listing.folders]
 
-            for item in sorted(path.iterdir()):
+            for item in listing.files:
                 try:
-                    if item.is_file():
-                        size = self._format_size(item.stat().st_size)
-                        modified = datetime.fromtimestamp(
-                            item.stat().st_mtime
-                        ).strftime("%Y-%m-%d %H:%M")
-                        files.append(f"   📄 {item.name:<40} {size:>10}  {modified}")
-                    elif item.is_dir():
-                        folders.append(f"   📁 {item.name}/")
-                except PermissionError:
+                    stat = item.stat()
+                except OSError:
                     continue
+                size = self._format_size(stat.st_size)
+                modified = datetime.fromtimestamp(stat.st_mtime).strftime(
+                    "%Y-%m-%d %H:%M"
+                )
+                files.append(f"   📄 {item.name:<40} {size:>10}  {modified}")
 
             output = f"📁 Directory: {path}\n\n"
 
             if folders:
                 output += (
-                    f"📁 Folders ({len(folders)}):\n" + "\n".join(folders[:30]) + "\n\n"
+                    f"📁 Folders ({listing.folder_count}):\n"
+                    + "\n".join(folders)
+                    + "\n\n"
                 )
 
             if files:
-                output += f"📄 Files ({len(files)}):\n" + "\n".join(files[:30])
+                output += f"📄 Files ({listing.file_count}):\n" + "\n".join(files)
 
-            total = len(files) + len(folders)
+            total = listing.file_count + listing.folder_count
             if total > 30:
                 output += f"\n\n... and {total - 30} more items"
 
@@ -471,6 +834,8 @@ class ToolBox:
             if path.exists():
                 return f"❌ Deletion failed"
 
+            self._reindex(path)
+
             return f"✅ Deleted: {name} ({size})"
 
         except Exception as e:
@@ -652,24 +1017,17 @@ class ToolBox:
     def list_running_apps(self):
         """List running applications"""
         try:
-            processes = []
-            for proc in psutil.process_iter(
-                ["pid", "name", "cpu_percent", "memory_percent"]
-            ):
-                try:
-                    info = proc.info
-                    if info["name"] and info["memory_percent"] > 0.1:
-                        processes.append(info)
-                except:
-                    continue
-
-            processes.sort(key=lambda x: x["memory_percent"], reverse=True)
-            processes = processes[:15]
+            processes, sampled = self.metrics.top()
+            if not sampled:
+                # Asked before the first background scan finished
+                self.metrics.sample_processes()
+                processes, sampled = self.metrics.top()
 
             output = "🖥️ Running Apps (Top 15):\n\n"
             for proc in processes:
                 output += (
-                    f"   {proc['name']:<30} | RAM: {proc['memory_percent']:.1f}%\n"
+                    f"   {proc.name:<30} | RAM: {proc.memory:.1f}%"
+                    f" | CPU: {proc.cpu:.1f}%\n"
                 )
 
             return output
@@ -694,15 +1052,16 @@ class ToolBox:
             if any(d in cmd_lower for d in dangerous):
                 return "❌ Blocked: Dangerous command"
 
-            result = subprocess.run(
-                command,
-                shell=True,
-                capture_output=True,
-                text=True,
-                timeout=15,
-            )
+            result = self.sandbox.run_command(command, timeout=15)
 
-            output = result.stdout if result.stdout else result.stderr
+            if result["status"] == "timeout":
+                return "❌ Command timeout (15s)"
+            if result["status"] == "busy":
+                return "❌ Sandbox busy - try again in a moment"
+            if result["status"] != "ok":
+                return f"❌ Failed: {result.get('error', result['status'])}"
+
+            output = result["stdout"] if result["stdout"] else result["stderr"]
 
             if not output:
                 output = "✅ Command executed (no output)"
@@ -712,8 +1071,6 @@ class ToolBox:
 
             return f"💻 Output:\n{output}"
 
-        except subprocess.TimeoutExpired:
-            return "❌ Command timeout (15s)"
         except Exception as e:
             return f"❌ Failed: {str(e)}"
 
@@ -726,18 +1083,22 @@ class ToolBox:
             info.append(f"🖥️ Machine: {platform.machine()}")
             info.append(f"🏷️ Computer: {platform.node()}")
 
-            cpu_percent = psutil.cpu_percent(interval=0.5)
+            # Latest background sample - no half-second cpu_percent wait
+            latest = self.metrics.latest()
+            if latest is None:
+                self.metrics.sample()
+                latest = self.metrics.latest()
+
             cpu_count = psutil.cpu_count()
-            info.append(f"⚡ CPU: {cpu_count} cores | Usage: {cpu_percent}%")
+            info.append(f"⚡ CPU: {cpu_count} cores | Usage: {latest.cpu}%")
 
-            mem = psutil.virtual_memory()
+            metrics = self.metrics
             info.append(
-                f"💾 RAM: {self._format_size(mem.used)} / {self._format_size(mem.total)} ({mem.percent}%)"
+                f"💾 RAM: {self._format_size(latest.memory_used)} / {self._format_size(metrics.memory_total)} ({latest.memory}%)"
             )
 
-            disk = psutil.disk_usage("/")
             info.append(
-                f"💿 Disk: {self._format_size(disk.used)} / {self._format_size(disk.total)} ({disk.percent}%)"
+                f"💿 Disk: {self._format_size(metrics.disk_used)} / {self._format_size(metrics.disk_total)} ({latest.disk}%)"
             )
 
             info.append(
@@ -755,6 +1116,15 @@ class ToolBox:
         except Exception as e:
             return f"❌ Failed: {str(e)}"
 
+    def system_trend(self, metric="cpu", minutes=5):
+        """CPU / memory / disk over the last few minutes"""
+        try:
+            return self.metrics.describe_trend(metric, minutes)
+        except ValueError:
+            return f"❌ '{minutes}' is not a number of minutes"
+        except Exception as e:
+            return f"❌ Failed: {str(e)}"
+
     def execute_python(self, code):
         """Execute Python code"""
         try:
@@ -775,44 +1145,32 @@ class ToolBox:
             if len(code) > 1000:
                 return "❌ Code too long (1000 char limit)"
 
-            safe_builtins = {
-                "abs": abs,
-                "all": all,
-                "any": any,
-                "chr": chr,
-                "len": len,
-                "list": list,
-                "max": max,
-                "min": min,
-                "print": print,
-                "range": range,
-                "str": str,
-                "sum": sum,
-                "type": type,
-            }
+            # Runs in a sandbox worker with SAFE_BUILTINS, CPU/memory limits
+            result = self.sandbox.run_python(code)
+            status = result["status"]
 
-            from io import StringIO
-            import sys
-
-            old_stdout = sys.stdout
-            sys.stdout = StringIO()
-
-            try:
-                local_vars = {}
-                exec(code, {"__builtins__": safe_builtins}, local_vars)
-
-                output = sys.stdout.getvalue()
-                sys.stdout = old_stdout
-
-                if output:
-                    return f"✅ Output:\n{output}"
-                elif local_vars:
-                    return f"✅ Variables: {local_vars}"
+            if status == "ok":
+                if result["output"]:
+                    return f"✅ Output:\n{result['output']}"
+                elif result.get("variables"):
+                    return f"✅ Variables: {result['variables']}"
                 else:
                     return "✅ Code executed"
 
-            finally:
-                sys.stdout = old_stdout
+            if status == "error":
+                return f"❌ Python error: {result['error']}"
+
+            stopped = {
+                "cpu": f"CPU limit ({self.sandbox.cpu_seconds}s) exceeded",
+                "memory": f"memory limit ({self.sandbox.memory_mb} MB) exceeded",
+                "timeout": f"took longer than {self.sandbox.wall_seconds}s",
+                "crashed": "the worker crashed",
+                "busy": "all sandbox workers are busy",
+            }
+            message = f"❌ Stopped: {stopped.get(status, status)}"
+            if result.get("output"):
+                message += f"\n\nOutput before that:\n{result['output'][:500]}"
+            return message
 
         except Exception as e:
             return f"❌ Python error: {str(e)}"
@@ -839,7 +1197,6 @@ class ToolBox:
     def convert_units(self, value, from_unit, to_unit):
         """Convert units"""
         try:
-            value = float(value)
             from_unit = from_unit.lower()
             to_unit = to_unit.lower()
 
@@ -931,7 +1288,9 @@ class ToolBox:
             if not src.exists():
                 return f"❌ Source not found: {source}"
 
+            moved_to = dst / src.name if dst.is_dir() else dst
             shutil.move(str(src), str(dst))
+            self._reindex(src, moved_to)
 
             return f"✅ Moved!\n📤 From: {src.name}\n📥 To: {dst}"
 
@@ -949,6 +1308,7 @@ class ToolBox:
             folder = folder.resolve()
 
             folder.mkdir(parents=True, exist_ok=True)
+            self._reindex(folder)
 
             return f"✅ Created folder: {folder}"
         except PermissionError:
@@ -969,7 +1329,11 @@ class ToolBox:
             if not path.exists():
                 return f"❌ Directory not found: {directory}"
 
-            matches = list(path.rglob(pattern))[:50]
+            index = self.file_index
+            if index is not None and index.covers(path) and "/" not in pattern:
+                matches = self._from_index(lambda: index.glob(path, pattern, 50))
+            else:
+                matches = list(islice(dir_scan.iglob(path, pattern), 50))
 
             if not matches:
                 return f"❌ No files matching '{pattern}'"
@@ -977,7 +1341,8 @@ class ToolBox:
             output = f"🔍 Found {len(matches)} file(s) matching '{pattern}':\n\n"
             for match in matches[:30]:
                 try:
-                    rel_path = match.relative_to(path)
+                    # Paths from the index, DirEntries (cached stat) from a scan
+                    rel_path = os.path.relpath(os.fspath(match), path)
                     size = (
                         self._format_size(match.stat().st_size)
                         if match.is_file()
@@ -996,30 +1361,14 @@ class ToolBox:
             return f"❌ Failed: {str(e)}"
 
     def find_all_files(self, filename):
-        """Search PC for file"""
+        """Search PC for file (indexed: exact, substring, then fuzzy names)"""
         try:
-            search_paths = [
-                Path.cwd(),
-                Path.home() / "Desktop",
-                Path.home() / "Documents",
-                Path.home() / "Downloads",
-            ]
-
-            matches = []
-            for search_path in search_paths:
-                if not search_path.exists():
-                    continue
-
-                try:
-                    for match in search_path.rglob(filename):
-                        matches.append(match)
-                        if len(matches) >= 20:
-                            break
-                except:
-                    continue
-
-                if len(matches) >= 20:
-                    break
+            index = self.file_index
+            if index is not None and index.ready.is_set():
+                matches = self._from_index(lambda: index.find(filename, 20))
+            else:
+                # No index, or its first pass is still running - scan as before
+                matches = self._scan_for_file(filename, 20)
 
             if not matches:
                 return f"❌ File '{filename}' not found"
@@ -1041,6 +1390,41 @@ class ToolBox:
         except Exception as e:
             return f"❌ Failed: {str(e)}"
 
+    def _from_index(self, lookup):
+        """Index hits that still exist - on a miss, catch up and look again"""
+        matches = [Path(p) for p in lookup() if os.path.lexists(p)]
+        if not matches:
+            # Files made by other programs since the last refresh (only
+            # folders whose mtime changed are re-listed)
+            self.file_index.refresh()
+            matches = [Path(p) for p in lookup() if os.path.lexists(p)]
+        return matches
+
+    def _reindex(self, *paths):
+        """Tell the file index about files this tool just changed"""
+        if self.file_index is None:
+            return
+        try:
+            self.file_index.update(*paths)
+        except Exception as e:
+            print(f"   ⚠️  File index: {e}")
+
+    def _scan_for_file(self, filename, limit):
+        matches = []
+        for search_path in default_roots():
+            if not search_path.exists():
+                continue
+
+            try:
+                for match in dir_scan.iglob(search_path, filename):
+                    matches.append(Path(match))
+                    if len(matches) >= limit:
+                        return matches
+            except:
+                continue
+
+        return matches
+
     def get_file_info(self, filepath):
         """Get file info"""
         try:
@@ -1070,3 +1454,173 @@ class ToolBox:
 
         except Exception as e:
             return f"❌ Failed: {str(e)}"
+
+
+# ========== CHECK ==========
+
+_RESULTS_HTML = (
+    '<html><body><div class="result"><a class="result__a" href="http://{0}/">'
+    '{0} result</a><a class="result__snippet">From {0}</a></div></body></html>'
+)
+
+
+def _stub_providers():
+    """
+    Local search providers on a free port → (server, seen).
+      /fast    answers in 50ms        /medium  answers in 300ms
+      /slow    trickles 16KB a tick   /hang    sends nothing for 3s
+      /broken  500                    /empty   200 without results
+    seen[path] = "done" or "aborted" (client went away mid-reply)
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    seen = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status, body):
+            self.send_response(status)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = urllib.parse.urlsplit(self.path).path
+            name = path.strip("/")
+            try:
+                if path == "/slow":
+                    chunk = b" " * 16384
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/html")
+                    self.send_header("Content-Length", str(len(chunk) * 30))
+                    self.end_headers()
+                    for _ in range(30):
+                        self.wfile.write(chunk)
+                        self.wfile.flush()
+                        time.sleep(0.1)
+                elif path == "/broken":
+                    self._send(500, b"provider down")
+                elif path == "/empty":
+                    self._send(200, b"<html><body>Nothing found</body></html>")
+                else:
+                    time.sleep({"/fast": 0.05, "/medium": 0.3, "/hang": 3}[path])
+                    self._send(200, _RESULTS_HTML.format(name).encode("utf-8"))
+                seen[path] = "done"
+            except (BrokenPipeError, ConnectionResetError):
+                seen[path] = "aborted"
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, seen
+
+
+def run_check():
+    import tempfile
+
+    from tool_cache import ToolCache
+
+    passed = True
+
+    def check(label, ok, detail):
+        nonlocal passed
+        passed = passed and ok
+        print(f"  {'✅' if ok else '❌'} {label:<40} {detail}")
+
+    print("\n" + "=" * 70)
+    print("     🧪 TOOLS CHECK - search race against stub providers")
+    print("=" * 70)
+
+    workdir = Path(tempfile.mkdtemp(prefix="tools_check_"))
+    server, seen = _stub_providers()
+    base = f"http://{server.server_address[0]}:{server.server_address[1]}"
+    toolbox = ToolBox(
+        cache=ToolCache(workdir / "tool_cache.db"),
+        search_deadline=2.0,
+        metrics=MetricsSampler(),
+        sandbox=Sandbox(workers=0),
+    )
+
+    def race(*providers, query):
+        toolbox.search_urls = {name: f"{base}/{name}?q={{}}" for name in providers}
+        started = time.perf_counter()
+        output = toolbox.web_search(query)
+        return output, time.perf_counter() - started
+
+    try:
+        output, elapsed = race("slow", "fast", "hang", query="fastest wins")
+        check(
+            "fastest provider answers",
+            "fast result" in output and elapsed < 0.5,
+            f"{elapsed * 1000:.0f}ms (slowest would take 3s)",
+        )
+        check(
+            "win is counted",
+            toolbox.search_wins == {"fast": 1},
+            toolbox.search_wins,
+        )
+
+        for _ in range(40):
+            if "/slow" in seen:
+                break
+            time.sleep(0.05)
+        check(
+            "loser is cancelled mid-download",
+            seen.get("/slow") == "aborted",
+            seen.get("/slow", "still sending"),
+        )
+
+        output, elapsed = race("broken", "empty", "medium", query="failures")
+        check(
+            "failing providers are ignored",
+            "medium result" in output and elapsed < 0.8,
+            f"{elapsed * 1000:.0f}ms",
+        )
+
+        output, elapsed = race("broken", "empty", query="all fail")
+        check(
+            "all failing → error, no waiting",
+            output.startswith("Search failed") and elapsed < 0.5,
+            f"{elapsed * 1000:.0f}ms: {output[:45]}",
+        )
+
+        output, _ = race("empty", query="no results")
+        check(
+            "no results is not a failure",
+            output.startswith("No results"),
+            output[:45],
+        )
+
+        toolbox.search_deadline = 0.3
+        output, elapsed = race("hang", query="deadline")
+        check(
+            "overall deadline holds",
+            "no answer within" in output and elapsed < 0.6,
+            f"{elapsed * 1000:.0f}ms",
+        )
+    finally:
+        toolbox.sandbox.close()
+        toolbox.metrics.stop()
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print("=" * 70)
+    print(f"  {'✅ All checks passed' if passed else '❌ Some checks failed'}\n")
+    return passed
+
+
+def main():
+    import sys
+
+    if "--check" in sys.argv[1:]:
+        sys.exit(0 if run_check() else 1)
+
+    print(__doc__)
+
+
+if __name__ == "__main__":
+    main()
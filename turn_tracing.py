@@ -0,0 +1,377 @@
+# -*- coding: utf-8 -*-
+"""
+Turn Tracing - Per-stage spans for every assistant turn
+A turn's trace covers calibration, capture, recognition, the LLM call
+(split into prompt eval and generation from Ollama's own timings), each
+tool, and every synthesis/playback chunk. Finished traces are written by a
+background thread to the turn_traces table in the memory database, and
+optionally appended to a file as OpenTelemetry (OTLP/JSON) lines.
+
+    python turn_tracing.py [--last=50] [--export-otel=FILE]
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+
+class Span:
+    """One timed stage (perf_counter seconds)"""
+
+    __slots__ = ("name", "span_id", "parent_id", "start", "end", "attributes")
+
+    def __init__(self, name, start, end=None, parent_id=None, attributes=None):
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start = start
+        self.end = end
+        self.attributes = attributes or {}
+
+    @property
+    def duration(self):
+        return (self.end or time.perf_counter()) - self.start
+
+
+class TurnTrace:
+    """Spans for one turn, from listening to the end of playback"""
+
+    def __init__(self, tracer, session_id=None):
+        self.tracer = tracer
+        self.trace_id = uuid.uuid4().hex
+        self.session_id = session_id or "default"
+        self.user_message = ""
+        self.finished = False
+
+        # perf_counter → wall clock, for export
+        self.epoch_offset = time.time() - time.perf_counter()
+
+        self.root = Span("turn", time.perf_counter())
+        self.spans = [self.root]
+        self._local = threading.local()  # current parent, per thread
+        self.lock = threading.Lock()
+
+    def _parent(self):
+        return getattr(self._local, "parent", None) or self.root.span_id
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Time a block as a child of the current span on this thread"""
+        span = self.add_span(name, time.perf_counter(), None, **attributes)
+        previous = getattr(self._local, "parent", None)
+        self._local.parent = span.span_id
+        try:
+            yield span
+        finally:
+            span.end = time.perf_counter()
+            self._local.parent = previous
+
+    def add_span(self, name, start, end, parent=None, **attributes):
+        """Record a span timed elsewhere (e.g. Ollama's prompt_eval_duration)"""
+        span = Span(
+            name,
+            start,
+            end,
+            parent.span_id if parent else self._parent(),
+            attributes,
+        )
+        with self.lock:
+            self.spans.append(span)
+        return span
+
+    def finish(self):
+        """Close the turn and hand it to the background writer"""
+        with self.lock:
+            if self.finished:
+                return
+            self.finished = True
+        self.root.end = time.perf_counter()
+        self.root.attributes["user_message"] = self.user_message[:200]
+        self.tracer.submit(self)
+
+    def discard(self):
+        """Drop the trace (e.g. listening timed out - no turn happened)"""
+        self.finished = True
+
+    # ========== SERIALIZATION ==========
+
+    def to_row(self):
+        """Compact spans (ms relative to turn start) for the database"""
+        start = self.root.start
+        spans = [
+            {
+                "name": s.name,
+                "id": s.span_id,
+                "parent": s.parent_id,
+                "start_ms": round((s.start - start) * 1000, 2),
+                "duration_ms": round(s.duration * 1000, 2),
+                "attributes": s.attributes,
+            }
+            for s in self.spans
+        ]
+        return {
+            "trace_id": self.trace_id,
+            "timestamp": datetime.fromtimestamp(
+                start + self.epoch_offset
+            ).isoformat(),
+            "session_id": self.session_id,
+            "user_message": self.user_message[:500],
+            "duration_ms": round(self.root.duration * 1000, 2),
+            "spans": spans,
+        }
+
+    def to_otel(self):
+        """OTLP/JSON ResourceSpans for this turn"""
+        return otel_resource_spans(self.trace_id, self.to_row())
+
+
+class _NullTrace:
+    """Stand-in when no turn is being traced (greeting, farewell, tracing off)"""
+
+    user_message = ""
+
+    @contextmanager
+    def span(self, name, **attributes):
+        yield None
+
+    def add_span(self, *args, **kwargs):
+        return None
+
+    def finish(self):
+        pass
+
+    def discard(self):
+        pass
+
+
+NULL_TRACE = _NullTrace()
+
+
+def add_ollama_timings(trace, llm, eval_stats):
+    """Split an llm span with Ollama's own prompt-eval/generation timings"""
+    if llm is None:
+        return
+
+    # Anchored to when the response arrived - load time stays unaccounted
+    generation_start = llm.end - eval_stats["eval_ms"] / 1000
+    prompt_start = generation_start - eval_stats["prompt_ms"] / 1000
+
+    trace.add_span(
+        "prompt_eval",
+        max(llm.start, prompt_start),
+        generation_start,
+        parent=llm,
+        tokens=eval_stats["prompt_tokens"],
+    )
+    trace.add_span(
+        "generation",
+        max(llm.start, generation_start),
+        llm.end,
+        parent=llm,
+        tokens=eval_stats["eval_tokens"],
+    )
+
+
+def _otel_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otel_resource_spans(trace_id, row):
+    """Convert a stored trace row to OTLP/JSON"""
+    base_ns = int(datetime.fromisoformat(row["timestamp"]).timestamp() * 1e9)
+    spans = []
+    for s in row["spans"]:
+        start_ns = base_ns + int(s["start_ms"] * 1e6)
+        span = {
+            "traceId": trace_id,
+            "spanId": s["id"],
+            "name": s["name"],
+            "kind": 1,
+            "startTimeUnixNano": str(start_ns),
+            "endTimeUnixNano": str(start_ns + int(s["duration_ms"] * 1e6)),
+            "attributes": [
+                {"key": key, "value": _otel_value(value)}
+                for key, value in s["attributes"].items()
+            ],
+        }
+        if s["parent"]:
+            span["parentSpanId"] = s["parent"]
+        spans.append(span)
+
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": {"stringValue": "assistant"}},
+                        {
+                            "key": "session.id",
+                            "value": {"stringValue": row["session_id"]},
+                        },
+                    ]
+                },
+                "scopeSpans": [{"scope": {"name": "turn_tracing"}, "spans": spans}],
+            }
+        ]
+    }
+
+
+class Tracer:
+    """Creates turn traces and writes finished ones in the background"""
+
+    def __init__(self, memory, otel_path=None, enabled=True):
+        self.memory = memory
+        self.otel_path = otel_path
+        self.enabled = enabled
+
+        self.queue = queue.Queue()
+        self.writer = threading.Thread(target=self._write_loop, daemon=True)
+        self.writer.start()
+
+        self.stats = {"written": 0, "failed": 0}
+
+    def start(self, session_id=None):
+        if not self.enabled:
+            return NULL_TRACE
+        return TurnTrace(self, session_id)
+
+    def submit(self, trace):
+        self.queue.put(trace)
+
+    def _write_loop(self):
+        while True:
+            trace = self.queue.get()
+            if trace is None:
+                self.queue.task_done()
+                return
+            try:
+                row = trace.to_row()
+                if self.memory.save_trace(row):
+                    self.stats["written"] += 1
+                else:
+                    self.stats["failed"] += 1
+
+                if self.otel_path:
+                    with open(self.otel_path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(trace.to_otel()) + "\n")
+            except Exception as e:
+                self.stats["failed"] += 1
+                print(f"   ⚠️  Trace write failed: {e}")
+            finally:
+                self.queue.task_done()
+
+    def close(self, timeout=2.0):
+        """Flush pending traces"""
+        self.queue.put(None)
+        self.writer.join(timeout)
+
+
+# ========== REPORT ==========
+
+
+def summarize(rows):
+    """Per-stage totals, ordered by the time they cost overall"""
+    stages = {}
+    for row in rows:
+        for span in row["spans"]:
+            if span["name"] == "turn":
+                continue
+            stages.setdefault(span["name"], []).append(span["duration_ms"])
+
+    total_turn = sum(row["duration_ms"] for row in rows) or 1.0
+    summary = []
+    for name, durations in stages.items():
+        durations.sort()
+        count = len(durations)
+        summary.append(
+            {
+                "stage": name,
+                "count": count,
+                "total_ms": sum(durations),
+                "p50_ms": durations[count // 2],
+                "p90_ms": durations[min(count - 1, int(count * 0.9))],
+                "max_ms": durations[-1],
+                "share": sum(durations) / total_turn,
+            }
+        )
+    summary.sort(key=lambda s: s["total_ms"], reverse=True)
+    return summary
+
+
+def print_report(rows):
+    if not rows:
+        print("📭 No traces yet - run the assistant first")
+        return
+
+    turn_times = sorted(row["duration_ms"] for row in rows)
+    print("\n" + "=" * 70)
+    print(f"     🔬 SLOWEST STAGES - last {len(rows)} turns")
+    print("=" * 70)
+    print(
+        f"  Turn: p50 {turn_times[len(turn_times) // 2]:.0f}ms | "
+        f"max {turn_times[-1]:.0f}ms"
+    )
+    print(
+        f"  {'stage':<20}{'count':>6}{'p50':>10}{'p90':>10}{'max':>10}{'share':>8}"
+    )
+    for s in summarize(rows):
+        print(
+            f"  {s['stage']:<20}{s['count']:>6}{s['p50_ms']:>8.0f}ms"
+            f"{s['p90_ms']:>8.0f}ms{s['max_ms']:>8.0f}ms{s['share'] * 100:>7.0f}%"
+        )
+
+    slowest = max(rows, key=lambda row: row["duration_ms"])
+    print(
+        f"\n  🐢 Slowest turn: {slowest['duration_ms']:.0f}ms - "
+        f"'{slowest['user_message'][:50]}' ({slowest['timestamp'][:19]})"
+    )
+    print("=" * 70 + "\n")
+
+
+def main():
+    """CLI: summarize (or export) the most recent traces"""
+    import sys
+
+    from memory import AssistantMemory
+
+    last = 50
+    export_path = None
+
+    for arg in sys.argv[1:]:
+        if arg.startswith("--last="):
+            last = int(arg.split("=", 1)[1])
+        elif arg.startswith("--export-otel="):
+            export_path = arg.split("=", 1)[1]
+        elif arg in ["--help", "-h"]:
+            print(__doc__)
+            return
+
+    # Opened read-only: no schema setup, no write-behind log or spool replay
+    memory = AssistantMemory(read_only=True)
+    rows = memory.get_recent_traces(last)
+    memory.close()
+
+    if export_path:
+        with open(export_path, "w", encoding="utf-8") as f:
+            for row in rows:
+                otel = otel_resource_spans(row["trace_id"], row)
+                f.write(json.dumps(otel) + "\n")
+        print(f"📤 Exported {len(rows)} traces to {os.path.abspath(export_path)}")
+        return
+
+    print_report(rows)
+
+
+if __name__ == "__main__":
+    main()
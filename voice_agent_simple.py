@@ -15,6 +15,8 @@ import json
 import datetime
 import threading
 
+import ollama_client
+
 
 class SimpleVoiceAgent:
     def __init__(self, ollama_model="mistral", voice_model_path=None):
@@ -26,6 +28,7 @@ class SimpleVoiceAgent:
             voice_model_path: Path to Piper voice model
         """
         self.ollama_model = ollama_model
+        self.ollama = ollama_client.get_client()
 
         # Auto-detect voice model if not provided
         if voice_model_path is None:
@@ -117,15 +120,7 @@ class SimpleVoiceAgent:
             messages = self.conversation_history.copy()
 
             # Call Ollama API
-            response = requests.post(
-                "http://localhost:11434/api/chat",
-                json={
-                    "model": self.ollama_model,
-                    "messages": messages,
-                    "stream": False,
-                },
-                timeout=60,
-            )
+            response = self.ollama.chat(self.ollama_model, messages, timeout=60)
 
             if response.status_code == 200:
                 result = response.json()
@@ -239,6 +234,8 @@ class SimpleVoiceAgent:
         print("💡 Say 'exit', 'quit', or 'goodbye' to stop")
         print("💡 Press Ctrl+C to force quit\n")
 
+        self.ollama.warm_up(self.ollama_model)
+
         try:
             while True:
                 # Listen for user input
@@ -0,0 +1,684 @@
+# -*- coding: utf-8 -*-
+"""
+Wake Word Spotter - Lightweight keyword detection
+Always-on MFCC template matching over the microphone stream.
+
+Only an energy gate runs while the room is quiet, so idle CPU stays near zero.
+MFCC + DTW matching runs only on short voiced segments, and only the audio
+AFTER the wake word is handed to full speech recognition.
+
+The wake word may follow a short lead-in ("hey jarvis", "ok, jarvis"), but
+it has to start within the first 1.8s (1.5 x max_word_duration) of a voiced
+segment: in the middle of a longer sentence it is not heard - the rest of
+that sentence is skipped until the next pause.
+
+    python wake_word.py --bench      (synthetic audio, no microphone)
+"""
+
+import time
+from pathlib import Path
+
+import numpy as np
+import pyaudio
+import speech_recognition as sr
+
+
+SAMPLE_RATE = 16000
+CHUNK = 480  # 30ms
+FRAME_LEN = 400  # 25ms
+FRAME_HOP = 160  # 10ms
+N_FFT = 512
+N_MELS = 26
+N_MFCC = 13
+
+
+def _mel_filterbank(sample_rate=SAMPLE_RATE, n_fft=N_FFT, n_mels=N_MELS):
+    """Triangular mel filterbank matrix (n_mels x n_fft//2+1)"""
+    mel_max = 2595 * np.log10(1 + (sample_rate / 2) / 700)
+    mel_points = np.linspace(0, mel_max, n_mels + 2)
+    hz_points = 700 * (10 ** (mel_points / 2595) - 1)
+    bins = np.floor((n_fft + 1) * hz_points / sample_rate).astype(int)
+
+    fbank = np.zeros((n_mels, n_fft // 2 + 1))
+    for m in range(1, n_mels + 1):
+        left, center, right = bins[m - 1], bins[m], bins[m + 1]
+        for k in range(left, center):
+            fbank[m - 1, k] = (k - left) / max(center - left, 1)
+        for k in range(center, right):
+            fbank[m - 1, k] = (right - k) / max(right - center, 1)
+    return fbank
+
+
+def _dct_matrix(n_mfcc=N_MFCC, n_mels=N_MELS):
+    """Orthonormal DCT-II matrix (n_mfcc x n_mels)"""
+    n = np.arange(n_mels)
+    k = np.arange(n_mfcc)[:, None]
+    dct = np.cos(np.pi / n_mels * (n + 0.5) * k) * np.sqrt(2.0 / n_mels)
+    dct[0] /= np.sqrt(2)
+    return dct
+
+
+_MEL_FBANK = _mel_filterbank()
+_DCT = _dct_matrix()
+_WINDOW = np.hamming(FRAME_LEN)
+
+
+def mfcc(samples):
+    """Compute MFCCs (without c0) for int16 or float samples"""
+    signal = np.asarray(samples, dtype=np.float32)
+    if signal.size < FRAME_LEN:
+        signal = np.pad(signal, (0, FRAME_LEN - signal.size))
+
+    signal = np.append(signal[0], signal[1:] - 0.97 * signal[:-1])
+
+    n_frames = 1 + (signal.size - FRAME_LEN) // FRAME_HOP
+    idx = np.arange(FRAME_LEN)[None, :] + FRAME_HOP * np.arange(n_frames)[:, None]
+    frames = signal[idx] * _WINDOW
+
+    power = np.abs(np.fft.rfft(frames, N_FFT)) ** 2 / N_FFT
+    mel = np.log(np.maximum(power @ _MEL_FBANK.T, 1e-10))
+    feats = mel @ _DCT.T
+
+    # Drop c0 (overall loudness) so matching is volume independent
+    return feats[:, 1:]
+
+
+def open_end_dtw(template, query, free_start=False):
+    """
+    DTW with a free end point on the query (and, with free_start, a free
+    start point too - the template may match any stretch of the query).
+
+    Returns (normalized_cost, end_frame) where end_frame is the query frame
+    at which the template is best aligned to have finished.
+    """
+    n, m = len(template), len(query)
+    cost = np.sqrt(((template[:, None, :] - query[None, :, :]) ** 2).sum(axis=2))
+    frames = np.arange(m)
+
+    # One row of the accumulated cost at a time, column 0 being "before the
+    # query", plus the query frame each cell's path started at
+    acc = np.full(m + 1, np.inf)
+    acc[0] = 0.0
+    if free_start:
+        acc[:] = 0.0
+    start = np.concatenate(([0], frames))
+
+    for i in range(n):
+        # Vertical/diagonal moves
+        diagonal = acc[:-1] < acc[1:]
+        row = cost[i] + np.where(diagonal, acc[:-1], acc[1:])
+        row_start = np.where(diagonal, start[:-1], start[1:])
+
+        # Horizontal moves: acc[j] = min over k <= j of row[k] + cost[i, k+1..j],
+        # a running minimum of row - prefix sums
+        prefix = np.cumsum(cost[i])
+        shifted = row - prefix
+        best = np.minimum.accumulate(shifted)
+        source = np.maximum.accumulate(np.where(shifted <= best, frames, 0))
+
+        acc = np.concatenate(([np.inf], prefix + best))
+        start = np.concatenate(([0], row_start[source]))
+
+    # Normalize by an approximate path length so short/long matches compare
+    path_len = n + frames + 1 - start[1:]
+    normalized = acc[1:] / path_len
+    end = int(np.argmin(normalized))
+    return float(normalized[end]), end
+
+
+class WakeWordSpotter:
+    """Always-on keyword spotter over a 16kHz mono capture stream"""
+
+    def __init__(self, wake_word="jarvis", memory_dir="assistant_memory"):
+        self.wake_word = wake_word
+        self.template_file = Path(memory_dir) / f"wake_word_{wake_word}.npz"
+        self.templates = self.load_templates()
+
+        # Detection settings
+        self.threshold = 6.0
+        self.min_word_duration = 0.25
+        self.max_word_duration = 1.2
+        self.silence_duration = 0.3
+        self.command_silence = 0.8
+
+        # Energy gate (adapts to the room)
+        self.noise_floor = 200.0
+        self.energy_ratio = 3.0
+
+        # Stats
+        self.stats = {
+            "detections": 0,
+            "rejections": 0,
+            "latency_total": 0.0,
+            "idle_cpu": 0.0,
+            "idle_wall": 0.0,
+        }
+
+    @property
+    def ready(self):
+        """True once at least one template is enrolled"""
+        return len(self.templates) > 0
+
+    # ========== TEMPLATES ==========
+
+    def load_templates(self):
+        """Load enrolled MFCC templates"""
+        if self.template_file.exists():
+            try:
+                data = np.load(self.template_file)
+                return [data[k] for k in sorted(data.files)]
+            except Exception as e:
+                print(f"⚠️  Could not load wake word templates: {e}")
+        return []
+
+    def save_templates(self):
+        """Save enrolled MFCC templates"""
+        self.template_file.parent.mkdir(exist_ok=True)
+        np.savez(
+            self.template_file,
+            **{f"t{i}": t for i, t in enumerate(self.templates)},
+        )
+
+    def enroll(self, samples=3, timeout=10):
+        """Record the wake word a few times and store MFCC templates"""
+        print(f"\n🎙️  Wake word enrollment: say '{self.wake_word}' {samples} times")
+
+        templates = []
+        with self._open_stream() as stream:
+            self._calibrate(stream)
+
+            while len(templates) < samples:
+                print(f"   🎤 Sample {len(templates) + 1}/{samples}...")
+                segment = self._next_segment(stream, timeout=timeout)
+                if segment is None:
+                    print("   ⏱️  Timeout")
+                    continue
+
+                duration = segment.size / SAMPLE_RATE
+                if not self.min_word_duration <= duration <= self.max_word_duration:
+                    print(f"   ⚠️  {duration:.2f}s - say just the wake word")
+                    continue
+
+                templates.append(mfcc(segment))
+                print("   ✅ Got it")
+
+        self.templates = templates
+        self.save_templates()
+        print(f"✅ Enrolled {len(templates)} template(s) → {self.template_file}")
+
+    # ========== DETECTION ==========
+
+    def match(self, samples):
+        """
+        Look for the wake word near the start of a voiced segment (after a
+        lead-in of up to the window length).
+
+        Returns the sample offset where the wake word ends, or None.
+        """
+        if not self.templates:
+            return None
+
+        window = samples[: int(self.max_word_duration * 1.5 * SAMPLE_RATE)]
+        query = mfcc(window)
+
+        best_cost, best_end = np.inf, 0
+        for template in self.templates:
+            cost, end = open_end_dtw(template, query, free_start=True)
+            if cost < best_cost:
+                best_cost, best_end = cost, end
+
+        if best_cost > self.threshold:
+            return None
+
+        return min(best_end * FRAME_HOP + FRAME_LEN, samples.size)
+
+    def wait_for_wake_word(self, command_timeout=8, phrase_time_limit=15):
+        """
+        Block until the wake word is heard, then capture the command.
+
+        Returns sr.AudioData with only the audio after the wake word,
+        or None if nothing followed it.
+        """
+        max_duration = self.max_word_duration * 1.5
+        max_samples = int(max_duration * SAMPLE_RATE / CHUNK) * CHUNK
+
+        with self._open_stream() as stream:
+            self._calibrate(stream)
+
+            while True:
+                idle_wall = time.perf_counter()
+                idle_cpu = time.thread_time()
+                segment = self._next_segment(stream, max_duration=max_duration)
+                self.stats["idle_wall"] += time.perf_counter() - idle_wall
+                self.stats["idle_cpu"] += time.thread_time() - idle_cpu
+
+                if segment is None or segment.size < self.min_word_duration * SAMPLE_RATE:
+                    continue
+
+                started = time.perf_counter()
+                end = self.match(segment)
+                latency = time.perf_counter() - started
+
+                if end is None:
+                    self.stats["rejections"] += 1
+                    # Skip the rest of a long utterance that didn't start with the wake word
+                    if segment.size >= max_samples:
+                        self._drain_until_silence(stream)
+                    continue
+
+                self.stats["detections"] += 1
+                self.stats["latency_total"] += latency
+                print(f"   ✅ Activated! ({latency * 1000:.0f}ms)")
+
+                remainder = segment[end:]
+                command = self._capture_command(
+                    stream, remainder, command_timeout, phrase_time_limit
+                )
+                if command is None:
+                    return None
+
+                return sr.AudioData(command.tobytes(), SAMPLE_RATE, 2)
+
+    def get_stats(self):
+        """Idle CPU and detection latency summary"""
+        detections = self.stats["detections"]
+        idle_wall = self.stats["idle_wall"]
+
+        idle_cpu = 100 * self.stats["idle_cpu"] / idle_wall if idle_wall else 0.0
+        latency = 1000 * self.stats["latency_total"] / detections if detections else 0.0
+
+        return (
+            f"🎯 Wake word: {detections} detections, {self.stats['rejections']} rejections | "
+            f"Idle CPU: {idle_cpu:.2f}% | Avg detection latency: {latency:.0f}ms"
+        )
+
+    # ========== CAPTURE ==========
+
+    def _open_stream(self):
+        return _Stream()
+
+    def _rms(self, chunk):
+        return float(np.sqrt(np.mean(chunk.astype(np.float32) ** 2)))
+
+    def _is_voiced(self, rms):
+        return rms > self.noise_floor * self.energy_ratio
+
+    def _calibrate(self, stream, duration=0.3):
+        """Estimate the noise floor once per stream"""
+        levels = [
+            self._rms(stream.read())
+            for _ in range(int(duration * SAMPLE_RATE / CHUNK))
+        ]
+        if levels:
+            self.noise_floor = max(float(np.median(levels)), 50.0)
+
+    def _next_segment(self, stream, timeout=None, max_duration=None):
+        """Read chunks until a voiced segment ends (or hits max_duration)"""
+        started = time.perf_counter()
+        silence_chunks = int(self.silence_duration * SAMPLE_RATE / CHUNK)
+        max_chunks = int(max_duration * SAMPLE_RATE / CHUNK) if max_duration else None
+
+        chunks = []
+        quiet = 0
+
+        while True:
+            chunk = stream.read()
+            rms = self._rms(chunk)
+
+            if not chunks:
+                if self._is_voiced(rms):
+                    chunks.append(chunk)
+                    continue
+
+                # Slowly track the room while idle
+                self.noise_floor = 0.95 * self.noise_floor + 0.05 * max(rms, 50.0)
+
+                if timeout and time.perf_counter() - started > timeout:
+                    return None
+                continue
+
+            chunks.append(chunk)
+            quiet = 0 if self._is_voiced(rms) else quiet + 1
+
+            if quiet >= silence_chunks:
+                return np.concatenate(chunks[:-quiet])
+
+            if max_chunks and len(chunks) >= max_chunks:
+                return np.concatenate(chunks)
+
+    def _drain_until_silence(self, stream):
+        silence_chunks = int(self.silence_duration * SAMPLE_RATE / CHUNK)
+        quiet = 0
+        while quiet < silence_chunks:
+            quiet = 0 if self._is_voiced(self._rms(stream.read())) else quiet + 1
+
+    def _capture_command(self, stream, remainder, timeout, phrase_time_limit):
+        """Capture the command that follows the wake word"""
+        silence_chunks = int(self.command_silence * SAMPLE_RATE / CHUNK)
+        max_chunks = int(phrase_time_limit * SAMPLE_RATE / CHUNK)
+        wait_chunks = int(timeout * SAMPLE_RATE / CHUNK)
+
+        chunks = [remainder] if remainder.size else []
+        heard = remainder.size > CHUNK
+        quiet = 0
+        waited = 0
+
+        if not heard:
+            print("   🎤 Listening for command...")
+
+        while len(chunks) < max_chunks:
+            chunk = stream.read()
+            voiced = self._is_voiced(self._rms(chunk))
+
+            if not heard:
+                if not voiced:
+                    waited += 1
+                    if waited >= wait_chunks:
+                        return None
+                    continue
+                heard = True
+
+            chunks.append(chunk)
+            quiet = 0 if voiced else quiet + 1
+            if quiet >= silence_chunks:
+                break
+
+        if not heard:
+            return None
+
+        return np.concatenate(chunks)
+
+
+class _Stream:
+    """Blocking 16kHz mono int16 microphone stream"""
+
+    def __enter__(self):
+        self.audio = pyaudio.PyAudio()
+        self.stream = self.audio.open(
+            format=pyaudio.paInt16,
+            channels=1,
+            rate=SAMPLE_RATE,
+            input=True,
+            frames_per_buffer=CHUNK,
+        )
+        return self
+
+    def read(self):
+        data = self.stream.read(CHUNK, exception_on_overflow=False)
+        return np.frombuffer(data, dtype=np.int16)
+
+    def __exit__(self, *exc):
+        try:
+            self.stream.stop_stream()
+            self.stream.close()
+        finally:
+            self.audio.terminate()
+        return False
+
+
+# ========== BENCHMARK ==========
+
+# Formant paths (Hz) of synthetic "words" - what MFCCs tell apart
+_WAKE_FORMANTS = [700, 1800, 600, 2300]
+_LEAD_IN_FORMANTS = [500, 2000]  # "hey"
+_OTHER_FORMANTS = [[300, 900, 300], [2500, 1000], [1200, 1200, 400], [900, 2600, 900]]
+
+# The synthetic voice's DTW costs sit higher than real speech's (wake word
+# 6-8, other words 12+), so the bench uses its own threshold
+_BENCH_THRESHOLD = 9.5
+
+# The old wake word path: every utterance went to full recognition after
+# sr.Recognizer's pause_threshold of silence
+_OLD_PAUSE = 0.8
+
+
+def synthetic_word(formants, duration=0.55, seed=0, amplitude=5000):
+    """
+    A voiced, word-like sound: a falling pitch whose harmonics are shaped
+    by one formant moving through `formants` (Hz), jittered by seed
+    """
+    rng = np.random.default_rng(seed)
+    n = int(duration * rng.uniform(0.92, 1.08) * SAMPLE_RATE)
+    t = np.linspace(0.0, 1.0, n)
+    formant = np.interp(t, np.linspace(0.0, 1.0, len(formants)), formants)
+    formant *= rng.uniform(0.95, 1.05)
+    pitch = 130 * rng.uniform(0.9, 1.1) * (1.1 - 0.2 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    voice = sum(
+        np.exp(-(((k * pitch) - formant) / 250.0) ** 2) * np.sin(k * phase)
+        for k in range(1, 30)
+    )
+    envelope = np.sin(np.pi * t) ** 0.3
+    return (amplitude * envelope * voice / np.abs(voice).max()).astype(np.int16)
+
+
+def _pause(seconds):
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.int16)
+
+
+class _ScriptedStream:
+    """Plays int16 audio over room noise, one CHUNK per 30ms like a microphone"""
+
+    def __init__(self, audio, noise=20.0, seed=0):
+        self.audio = audio
+        self.noise = noise
+        self.rng = np.random.default_rng(seed)
+        self.position = 0
+        self.started = None
+
+    def __enter__(self):
+        self.started = self.next_read = time.perf_counter()
+        return self
+
+    def read(self):
+        self.next_read += CHUNK / SAMPLE_RATE
+        delay = self.next_read - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+        chunk = self.audio[self.position : self.position + CHUNK]
+        self.position += CHUNK
+        if chunk.size < CHUNK:
+            chunk = np.pad(chunk, (0, CHUNK - chunk.size))
+        noisy = chunk + self.rng.normal(0.0, self.noise, CHUNK)
+        return np.clip(noisy, -32768, 32767).astype(np.int16)
+
+    def __exit__(self, *exc):
+        return False
+
+
+def _script(idle, *parts):
+    """
+    (audio, wake word end in seconds, utterances) for idle seconds of
+    room noise followed by parts: ("wake" | "lead" | "other", seed) or a
+    pause length
+    """
+    pieces, wake_end, utterances = [_pause(idle)], None, 0
+    for part in parts:
+        if isinstance(part, float):
+            pieces.append(_pause(part))
+            utterances += part >= _OLD_PAUSE  # the old path's end of utterance
+            continue
+        kind, seed = part
+        formants = {"wake": _WAKE_FORMANTS, "lead": _LEAD_IN_FORMANTS}.get(
+            kind, _OTHER_FORMANTS[seed % len(_OTHER_FORMANTS)]
+        )
+        pieces.append(synthetic_word(formants, 0.3 if kind == "lead" else 0.55, seed))
+        if kind == "wake":
+            wake_end = sum(piece.size for piece in pieces) / SAMPLE_RATE
+    return np.concatenate(pieces), wake_end, utterances
+
+
+def _loop_dtw(template, query):
+    """The previous open_end_dtw: horizontal moves one query frame at a time"""
+    n, m = len(template), len(query)
+    cost = np.sqrt(((template[:, None, :] - query[None, :, :]) ** 2).sum(axis=2))
+
+    acc = np.full((n + 1, m + 1), np.inf)
+    acc[0, 0] = 0.0
+    for i in range(1, n + 1):
+        row = cost[i - 1] + np.minimum(acc[i - 1, 1:], acc[i - 1, :-1])
+        acc[i, 1] = row[0]
+        for j in range(1, m):
+            acc[i, j + 1] = min(row[j], acc[i, j] + cost[i - 1, j])
+
+    normalized = acc[n, 1:] / (n + np.arange(1, m + 1))
+    end = int(np.argmin(normalized))
+    return float(normalized[end]), end
+
+
+def _best_time(fn, runs=5):
+    best = float("inf")
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run_benchmark(whisper_model="tiny"):
+    import contextlib
+    import importlib.util
+    import io
+    import tempfile
+
+    spotter = WakeWordSpotter(memory_dir=tempfile.mkdtemp(prefix="wake_bench_"))
+    spotter.threshold = _BENCH_THRESHOLD
+    spotter.templates = [
+        mfcc(synthetic_word(_WAKE_FORMANTS, seed=seed)) for seed in (1, 2, 3)
+    ]
+
+    # Each script ends with the wake word, a command and the pause after it
+    scripts = [
+        _script(5.0, ("wake", 4), 0.4, ("other", 0), 1.2),
+        _script(
+            1.0,
+            ("other", 1),
+            0.9,
+            ("lead", 5),
+            0.05,
+            ("wake", 6),
+            0.4,
+            ("other", 2),
+            1.2,
+        ),
+        _script(
+            1.0,
+            ("other", 3),
+            0.9,
+            ("other", 4),
+            0.9,
+            ("wake", 7),
+            0.4,
+            ("other", 5),
+            1.2,
+        ),
+    ]
+
+    print("\n" + "=" * 70)
+    print("     🎯 WAKE WORD BENCHMARK - synthetic audio at microphone pace")
+    print("=" * 70)
+
+    # When each detection happened (the spotter's stats only time the match)
+    activations = []
+    match = spotter.match
+
+    def timed_match(samples):
+        end = match(samples)
+        if end is not None:
+            activations.append(time.perf_counter())
+        return end
+
+    spotter.match = timed_match
+
+    latencies, segments = [], 0
+    for audio, wake_end, utterances in scripts:
+        stream = _ScriptedStream(audio)
+        spotter._open_stream = lambda: stream
+        with contextlib.redirect_stdout(io.StringIO()):
+            spotter.wait_for_wake_word(command_timeout=2, phrase_time_limit=5)
+        segments += utterances
+
+        # The wait for the pause after the wake word plus the match, as the
+        # user feels it
+        latencies.append(activations[-1] - stream.started - wake_end)
+
+    stats = spotter.stats
+    idle_cpu = 100 * stats["idle_cpu"] / stats["idle_wall"]
+    match_ms = 1000 * stats["latency_total"] / max(stats["detections"], 1)
+    print(
+        f"  MFCC spotter:  {stats['detections']}/{len(scripts)} detected "
+        f"(1 after a lead-in), {stats['rejections']} other words rejected"
+    )
+    print(f"    idle CPU {idle_cpu:.2f}%  |  match {match_ms:.1f}ms")
+    print(
+        f"    wake word → activation {np.median(latencies) * 1000:.0f}ms "
+        f"(median; waits for a {spotter.silence_duration:.1f}s pause)"
+    )
+
+    # "hey jarvis": the lead-in costs a fixed-start match a warp
+    lead_in = mfcc(
+        np.concatenate(
+            [
+                synthetic_word(_LEAD_IN_FORMANTS, 0.3, seed=5),
+                _pause(0.05),
+                synthetic_word(_WAKE_FORMANTS, seed=6),
+            ]
+        )
+    )
+    costs = [
+        min(open_end_dtw(t, lead_in, free_start)[0] for t in spotter.templates)
+        for free_start in (False, True)
+    ]
+    print(
+        f"    after a lead-in: cost {costs[0]:.2f} fixed start → {costs[1]:.2f} "
+        f"free start (threshold {spotter.threshold})"
+    )
+
+    query = mfcc(scripts[0][0][: int(1.8 * SAMPLE_RATE)])
+    template = spotter.templates[0]
+    loop = _best_time(lambda: _loop_dtw(template, query))
+    vectorized = _best_time(lambda: open_end_dtw(template, query, free_start=True))
+    print(
+        f"    DTW per template: {loop * 1000:.1f}ms loop → "
+        f"{vectorized * 1000:.1f}ms vectorized"
+    )
+
+    # The old path sent every utterance to full recognition
+    print(f"  Always-on recognition: all {segments} utterances sent to recognition")
+    if importlib.util.find_spec("whisper") is None:
+        print("    ⚠️  openai-whisper not installed - no recognition timings")
+    else:
+        import whisper
+
+        model = whisper.load_model(whisper_model)
+        words = [
+            synthetic_word(_OTHER_FORMANTS[0], seed=seed).astype(np.float32) / 32768
+            for seed in range(3)
+        ]
+        cpu_started, started = time.process_time(), time.perf_counter()
+        for word in words:
+            model.transcribe(word, fp16=False)
+        wall = (time.perf_counter() - started) / len(words)
+        cpu = (time.process_time() - cpu_started) / len(words)
+        print(
+            f"    Whisper {whisper_model}: {wall * 1000:.0f}ms and {cpu:.2f} CPU-s "
+            f"per segment | utterance → text "
+            f"{(_OLD_PAUSE + wall) * 1000:.0f}ms"
+        )
+    print("=" * 70 + "\n")
+
+
+def main():
+    import sys
+
+    for arg in sys.argv[1:]:
+        if arg.startswith("--bench"):
+            run_benchmark(arg.split("=", 1)[1] if "=" in arg else "tiny")
+            return
+
+    print(__doc__)
+
+
+if __name__ == "__main__":
+    main()
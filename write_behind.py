@@ -0,0 +1,619 @@
+# -*- coding: utf-8 -*-
+"""
+Write Behind - Batched background inserts for the conversation log
+save_conversation used to insert and commit before the reply was spoken.
+Rows are now handed to a queue and return immediately; a writer thread
+inserts them in one transaction per batch, when batch_size rows are
+waiting or flush_interval seconds after the first one, and on close().
+
+Durability (what a crash of the app can lose):
+
+- "journal" (default): each row is also appended to this instance's own
+  spool file next to the database - a plain write, no fsync. After a
+  crash, the spool is replayed on the next start. A sequence number
+  committed in the same transaction as each batch makes the replay
+  exactly-once.
+- "memory": rows only live in the queue until their batch commits - up
+  to one batch (or flush_interval seconds) can be lost.
+
+Either way, no disk sync happens on the caller's thread. A batch that
+fails to commit (e.g. "database is locked") is kept and retried; nothing
+after it is marked committed or trimmed from the spool until it lands.
+
+Each instance spools to <name>.<pid>-<id>.spool and holds an exclusive
+lock on it while it runs. Recovery only replays spools whose lock it can
+take - ones left behind by a process that died - so a second instance
+(another assistant, a report CLI) never replays a live one.
+
+    python write_behind.py --check      (kills the writer mid-batch)
+    python write_behind.py --bench[=2000]
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+DURABILITY_MODES = ("journal", "memory")
+
+_TICK = object()  # flush_interval passed with nothing new queued
+
+
+def _try_lock(f):
+    """Exclusive, non-blocking lock on an open file → False if it is held"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+class WriteBehindLog:
+    """Queue rows for one INSERT statement and commit them in batches"""
+
+    def __init__(
+        self,
+        pool,
+        name,
+        insert_sql,
+        spool_file=None,
+        durability="journal",
+        batch_size=32,
+        flush_interval=1.0,
+    ):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(
+                f"durability must be one of {', '.join(DURABILITY_MODES)}"
+            )
+        if durability == "journal" and spool_file is None:
+            raise ValueError("journal durability needs a spool_file")
+
+        self.pool = pool
+        self.name = name
+        self.insert_sql = insert_sql
+        # Base name - dead instances' spools next to it are replayed in
+        # either mode, this instance only writes one in journal mode
+        self.spool_file = Path(spool_file) if spool_file is not None else None
+        self.durability = durability
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self.lock = threading.Lock()  # sequence numbers + spool appends
+        self.queue = queue.Queue()
+        self.spool = None
+        self.spool_path = None
+        self.key = name
+        self.closed = False
+
+        self.stats = {
+            "queued": 0,
+            "written": 0,
+            "batches": 0,
+            "retries": 0,
+            "replayed": 0,
+        }
+
+        self._init_table()
+        self.recover()
+        if durability == "journal":
+            self._open_spool()
+        self.next_seq = 1
+        self.committed_seq = 0
+
+        self.writer = threading.Thread(
+            target=self._write_loop, name=f"write-behind-{name}", daemon=True
+        )
+        self.writer.start()
+
+    # ========== SPOOLS & RECOVERY ==========
+
+    def _init_table(self):
+        with self.pool.write() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS write_behind (
+                    name TEXT PRIMARY KEY,
+                    seq INTEGER NOT NULL
+                )
+            """
+            )
+
+    def _spool_key(self, path):
+        """write_behind row for a spool (the old shared spool used the name)"""
+        if path == self.spool_file:
+            return self.name
+        return f"{self.name}:{path.name}"
+
+    def _open_spool(self):
+        stem = self.spool_file.stem
+        spool_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.spool_path = self.spool_file.with_name(f"{stem}.{spool_id}.spool")
+        self.spool = open(self.spool_path, "a", encoding="utf-8")
+        if not _try_lock(self.spool):
+            raise RuntimeError(f"Could not lock {self.spool_path}")
+        self.key = self._spool_key(self.spool_path)
+
+    def _applied_seq(self, key):
+        rows = self.pool.read("SELECT seq FROM write_behind WHERE name = ?", (key,))
+        return rows[0][0] if rows else 0
+
+    def _forget(self, key):
+        with self.pool.write() as conn:
+            conn.execute("DELETE FROM write_behind WHERE name = ?", (key,))
+
+    @staticmethod
+    def _parse_spool(f):
+        """(seq, row) pairs from an open spool - a torn last line is skipped"""
+        entries = []
+        for line in f:
+            try:
+                entry = json.loads(line)
+                entries.append((int(entry["seq"]), entry["row"]))
+            except (ValueError, KeyError, TypeError):
+                continue  # cut off by the crash - never acknowledged
+        return entries
+
+    def orphan_spools(self):
+        """Spool files next to spool_file (including the old shared one)"""
+        if self.spool_file is None:
+            return []
+        stem = self.spool_file.stem
+        spools = sorted(self.spool_file.parent.glob(f"{stem}.*.spool"))
+        if self.spool_file.exists():
+            spools.insert(0, self.spool_file)
+        return [path for path in spools if path != self.spool_path]
+
+    def _recover_spool(self, path):
+        """Replay one spool if no running instance holds it → rows replayed"""
+        try:
+            f = open(path, "r+", encoding="utf-8")
+        except OSError:
+            return 0
+
+        key = self._spool_key(path)
+        with f:
+            if not _try_lock(f):
+                return 0  # a running instance owns it
+
+            applied = self._applied_seq(key)
+            pending = [(q, row) for q, row in self._parse_spool(f) if q > applied]
+            if pending:
+                self._commit(pending, key)
+            # Emptied while still locked: whoever locks it next finds nothing
+            f.truncate(0)
+
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        self._forget(key)
+        return len(pending)
+
+    def recover(self):
+        """Replay rows that dead instances spooled but never committed"""
+        replayed = sum(self._recover_spool(path) for path in self.orphan_spools())
+        if replayed:
+            self.stats["replayed"] += replayed
+            print(f"   ♻️  Recovered {replayed} unsaved {self.name} rows")
+        return replayed
+
+    # ========== WRITING ==========
+
+    def append(self, row):
+        """Queue one row (a tuple for insert_sql) - returns immediately"""
+        if self.closed:
+            raise RuntimeError(f"{self.name} log is closed")
+
+        with self.lock:
+            seq = self.next_seq
+            self.next_seq += 1
+            if self.spool is not None:
+                # flush() hands it to the OS - enough to survive the app dying
+                self.spool.write(json.dumps({"seq": seq, "row": list(row)}) + "\n")
+                self.spool.flush()
+            self.queue.put((seq, row))
+            self.stats["queued"] += 1
+
+    def _commit(self, batch, key):
+        """Insert a batch and record its last sequence number, atomically"""
+        with self.pool.write() as conn:
+            self._apply(conn, batch, key)
+
+    def _apply(self, conn, batch, key):
+        conn.executemany(self.insert_sql, [row for _, row in batch])
+        conn.execute(
+            """
+            INSERT INTO write_behind (name, seq) VALUES (?, ?)
+            ON CONFLICT(name) DO UPDATE SET seq = MAX(seq, excluded.seq)
+        """,
+            (key, batch[-1][0]),
+        )
+
+    def _trim_spool(self):
+        """Empty the spool once everything in it has committed"""
+        with self.lock:
+            if self.spool is not None and self.next_seq - 1 <= self.committed_seq:
+                self.spool.truncate(0)
+
+    def _flush(self, batch):
+        """Commit a batch → False if it failed (the caller keeps it)"""
+        if not batch:
+            return True
+        try:
+            self._commit(batch, self.key)
+        except Exception as e:
+            self.stats["retries"] += 1
+            print(f"⚠️  Could not save {len(batch)} {self.name} rows: {e} - will retry")
+            return False
+
+        self.committed_seq = batch[-1][0]
+        self.stats["written"] += len(batch)
+        self.stats["batches"] += 1
+        self._trim_spool()
+        return True
+
+    def _write_loop(self):
+        batch = []
+        deadline = None
+        failing = False  # the last commit failed - wait for the deadline
+        while True:
+            timeout = None if deadline is None else max(0, deadline - time.monotonic())
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = _TICK
+
+            if isinstance(item, tuple):
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                if failing or len(batch) < self.batch_size:
+                    continue
+
+            # Batch full, interval passed, flush() or close(). A failed batch
+            # stays first in line, so later rows never commit ahead of it
+            if self._flush(batch):
+                batch, deadline, failing = [], None, False
+            else:
+                deadline, failing = time.monotonic() + self.flush_interval, True
+
+            if isinstance(item, threading.Event):
+                item.set()
+            if item is None:
+                if batch and self.spool is None:
+                    print(f"⚠️  Lost {len(batch)} unsaved {self.name} rows")
+                return
+
+    def pending(self):
+        """Rows queued or in the current batch, not yet committed"""
+        return self.next_seq - 1 - self.committed_seq
+
+    def flush(self, timeout=5.0):
+        """Commit everything queued so far (blocks up to timeout)"""
+        if self.closed or not self.writer.is_alive():
+            return False
+        done = threading.Event()
+        self.queue.put(done)
+        return done.wait(timeout) and self.pending() == 0
+
+    def close(self, timeout=5.0):
+        """Flush the queue and stop the writer (idempotent)"""
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(None)
+        self.writer.join(timeout)
+        if self.spool is None:
+            return
+
+        # Everything committed: the spool and its sequence row can go.
+        # Otherwise it stays (unlocked) for the next start to replay
+        done = not self.writer.is_alive() and self.pending() == 0
+        if done:
+            self.spool.truncate(0)
+        self.spool.close()
+        self.spool = None
+        if done:
+            try:
+                os.remove(self.spool_path)
+            except OSError:
+                pass
+            self._forget(self.key)
+
+    def get_stats(self):
+        batches = self.stats["batches"] or 1
+        return (
+            f"📝 {self.name.capitalize()} log: {self.stats['written']} rows "
+            f"in {self.stats['batches']} batches "
+            f"(avg {self.stats['written'] / batches:.1f}) | "
+            f"{self.pending()} pending | {self.stats['retries']} retries | "
+            f"{self.stats['replayed']} recovered | durability={self.durability}"
+        )
+
+
+# ========== CHECK ==========
+
+
+def _crash_child(workdir, crash_at, count):
+    """Queue `count` turns, then die during the batch (see run_check)"""
+    os.chdir(workdir)
+    from memory import AssistantMemory
+
+    memory = AssistantMemory(conversation_batch=count, flush_interval=60)
+    log = memory.conversation_log
+
+    if crash_at == "insert":
+        # Rows inserted, transaction never committed
+        def apply(conn, batch, key, original=log._apply):
+            original(conn, batch, key)
+            os._exit(9)
+
+        log._apply = apply
+    else:
+        # Transaction committed, spool not yet trimmed
+        log._trim_spool = lambda: os._exit(9)
+
+    for i in range(count):
+        memory.save_conversation(f"question {i}", f"answer {i}", None, "check")
+
+    time.sleep(30)  # the batch fills at `count` rows - the writer kills us
+    os._exit(1)
+
+
+def _rows(workdir):
+    import sqlite3
+
+    db_file = os.path.join(workdir, "assistant_memory", "conversations.db")
+    conn = sqlite3.connect(db_file)
+    rows = conn.execute(
+        "SELECT user_message FROM conversations WHERE session_id = 'check'"
+    ).fetchall()
+    conn.close()
+    return [r[0] for r in rows]
+
+
+def run_check(count=50):
+    import glob
+    import shutil
+    import sqlite3
+    import subprocess
+    import sys
+    import tempfile
+
+    passed = True
+
+    def check(label, ok, detail):
+        nonlocal passed
+        passed = passed and ok
+        print(f"  {'✅' if ok else '❌'} {label:<40} {detail}")
+
+    print("\n" + "=" * 70)
+    print("     🧪 WRITE-BEHIND CHECK")
+    print("=" * 70)
+
+    expected = [f"question {i}" for i in range(count)]
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    for crash_at, label in [
+        ("insert", "killed before COMMIT"),
+        ("trim", "killed after COMMIT, before spool trim"),
+    ]:
+        workdir = tempfile.mkdtemp(prefix="write_behind_check_")
+        try:
+            child = subprocess.run(
+                [sys.executable, __file__, f"--crash={crash_at}", workdir, str(count)],
+                cwd=here,
+                capture_output=True,
+                text=True,
+                timeout=60,
+            )
+            before = _rows(workdir)
+
+            # The next start replays the spool
+            cwd = os.getcwd()
+            os.chdir(workdir)
+            try:
+                from memory import AssistantMemory
+
+                memory = AssistantMemory()
+                recovered = memory.conversation_log.stats["replayed"]
+                memory.close()
+            finally:
+                os.chdir(cwd)
+            after = _rows(workdir)
+
+            check(
+                label,
+                child.returncode == 9 and sorted(after) == sorted(expected),
+                f"exit {child.returncode} | {len(before)} rows on disk at the "
+                f"crash | {recovered} replayed → {len(after)} rows, "
+                f"{len(after) - len(set(after))} duplicates",
+            )
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    # memory durability: a crash loses the unflushed batch, nothing else
+    workdir = tempfile.mkdtemp(prefix="write_behind_check_")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        from memory import AssistantMemory
+
+        memory = AssistantMemory(durability="memory")
+        for i in range(count):
+            memory.save_conversation(f"question {i}", f"answer {i}", None, "check")
+        memory.close()
+        check(
+            "memory mode: close() flushes the queue",
+            sorted(_rows(workdir)) == sorted(expected),
+            f"{len(_rows(workdir))}/{count} rows",
+        )
+        spools = glob.glob(os.path.join(workdir, "assistant_memory", "*.spool"))
+        check("memory mode: nothing spooled", not spools, spools or "no spool files")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    # A failed commit is retried - rows queued behind it wait for it
+    workdir = tempfile.mkdtemp(prefix="write_behind_check_")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        from memory import AssistantMemory
+
+        memory = AssistantMemory(conversation_batch=10, flush_interval=0.1)
+        log = memory.conversation_log
+        failures = [sqlite3.OperationalError("database is locked")]
+
+        def apply(conn, batch, key, original=log._apply):
+            if failures:
+                raise failures.pop()
+            original(conn, batch, key)
+
+        log._apply = apply
+        for i in range(count):
+            memory.save_conversation(f"question {i}", f"answer {i}", None, "check")
+        flushed = log.flush()
+        rows = _rows(workdir)
+        check(
+            "failed batch retried, none skipped",
+            flushed and sorted(rows) == sorted(expected),
+            f"{log.stats['retries']} retries → {len(rows)}/{count} rows, "
+            f"{log.pending()} pending",
+        )
+        memory.close()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    # A second instance (e.g. the trace report) must not replay a live spool
+    workdir = tempfile.mkdtemp(prefix="write_behind_check_")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        from memory import AssistantMemory
+
+        first = AssistantMemory(conversation_batch=count * 2, flush_interval=60)
+        for i in range(count):
+            first.save_conversation(f"question {i}", f"answer {i}", None, "check")
+        second = AssistantMemory()
+        replayed = second.conversation_log.stats["replayed"]
+        reader = AssistantMemory(write_behind=False)
+        second.close()
+        reader.close()
+        first.close()
+        rows = _rows(workdir)
+        spools = glob.glob(os.path.join(workdir, "assistant_memory", "*.spool"))
+        check(
+            "live spool left to its owner",
+            replayed == 0 and sorted(rows) == sorted(expected) and not spools,
+            f"{replayed} replayed by the second instance → {len(rows)} rows, "
+            f"{len(rows) - len(set(rows))} duplicates, {len(spools)} spools left",
+        )
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print("=" * 70)
+    print(f"  {'✅ All checks passed' if passed else '❌ Some checks failed'}\n")
+    return passed
+
+
+# ========== BENCHMARK ==========
+
+
+def run_benchmark(count=2000):
+    import shutil
+    import tempfile
+
+    from memory import AssistantMemory
+
+    print("\n" + "=" * 70)
+    print(f"     📝 CONVERSATION LOGGING BENCHMARK - {count} turns")
+    print("=" * 70)
+    print(f"  {'save_conversation':<30}{'p50':>10}{'p99':>10}{'max':>10}{'total':>10}")
+
+    cwd = os.getcwd()
+    for label, options in [
+        ("synchronous (before)", None),
+        ("write-behind, journal", {"durability": "journal"}),
+        ("write-behind, memory", {"durability": "memory"}),
+    ]:
+        workdir = tempfile.mkdtemp(prefix="write_behind_bench_")
+        os.chdir(workdir)
+        try:
+            memory = AssistantMemory(
+                synchronous="FULL", **(options or {"durability": "memory"})
+            )
+            if options is None:
+                # The previous critical path: insert + fsync'd commit per turn
+                def save(i):
+                    memory.db.execute(
+                        memory.conversation_log.insert_sql,
+                        (f"t{i}", f"question {i}", f"answer {i}", None, "bench"),
+                    )
+
+            else:
+
+                def save(i):
+                    memory.save_conversation(
+                        f"question {i}", f"answer {i}", None, "bench"
+                    )
+
+            latencies = []
+            started = time.perf_counter()
+            for i in range(count):
+                call_started = time.perf_counter()
+                save(i)
+                latencies.append(time.perf_counter() - call_started)
+            memory.close()
+            total = time.perf_counter() - started
+
+            latencies.sort()
+            p50 = latencies[len(latencies) // 2] * 1000
+            p99 = latencies[int(len(latencies) * 0.99)] * 1000
+            print(
+                f"  {label:<30}{p50:8.3f}ms{p99:8.3f}ms"
+                f"{latencies[-1] * 1000:8.2f}ms{total:9.2f}s"
+            )
+            if options:
+                print(f"    {memory.conversation_log.get_stats()}")
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(workdir, ignore_errors=True)
+    print("=" * 70 + "\n")
+
+
+def main():
+    import sys
+
+    args = sys.argv[1:]
+    for i, arg in enumerate(args):
+        if arg.startswith("--crash="):
+            _crash_child(args[i + 1], arg.split("=", 1)[1], int(args[i + 2]))
+        elif arg == "--check":
+            sys.exit(0 if run_check() else 1)
+        elif arg.startswith("--bench"):
+            count = int(arg.split("=", 1)[1]) if "=" in arg else 2000
+            run_benchmark(count)
+            return
+
+    print(__doc__)
+
+
+if __name__ == "__main__":
+    main()